@@ -9,6 +9,9 @@ from flask import Flask, render_template, jsonify, request
 import sys
 import os
 import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
 from flask_cors import CORS
 
 # 添加项目根目录到路径 (用于 shared 模块)
@@ -40,10 +43,18 @@ from digital_avatar.api import avatar_bp, init_avatar_api
 # 使用 shared 数据库模块
 from shared.database import (
     get_connection,
+    CGMRepository,
+    CGMRollupRepository,
     TodoRepository,
     MemoryRepository,
     UserRepository,
 )
+from shared.analytics import EVENT_TYPES, downsample_indices
+from shared.database.repositories.cgm_repository import (
+    BUCKET_SIZES,
+    epoch_ms_to_datetime,
+    timestamp_to_epoch_ms,
+)
 
 # 导入 todos API
 from todos_api import todos_bp
@@ -64,6 +75,31 @@ DB_PATH = os.getenv(
     os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'cgm_butler.db'),
 )
 
+# 请求之间复用 SQLite 连接 (CGM_DB_POOL=0 时每个请求新建连接)
+DB_POOLED = os.getenv('CGM_DB_POOL', '1') != '0'
+
+
+def open_db() -> CGMDatabase:
+    """路由使用的数据库实例: with open_db() as db: ..."""
+    return CGMDatabase(DB_PATH, pooled=DB_POOLED)
+
+
+# 启动时建表一次, 之后的请求不再执行建表 DDL
+if DB_POOLED:
+    try:
+        CGMDatabase.bootstrap_schema(DB_PATH)
+    except Exception as exc:
+        print(f"⚠️  数据库建表检查失败, 将在每次连接时重试: {exc}")
+
+# 单次图表请求的最大桶数
+MAX_CHART_BUCKETS = 5000
+
+# 降采样结果缓存: (user_id, start_ms, end_ms, points) -> (watermark, payload)
+# watermark 为用户聚合表最近刷新时间, 有新读数写入时自动失效
+DOWNSAMPLE_CACHE_SIZE = 256
+_downsample_cache = OrderedDict()
+_downsample_cache_lock = threading.Lock()
+
 
 @app.route('/')
 def index():
@@ -155,38 +191,266 @@ def update_agent_preference(user_id):
 
 @app.route('/api/stats/<user_id>')
 def get_stats(user_id):
-    """获取统计信息 API"""
-    with CGMDatabase(DB_PATH) as db:
+    """
+    获取统计信息 API
+    Query: days (标准 CGM 指标的统计天数, 截至最新读数, 默认 14)
+    """
+    days = request.args.get('days', 14, type=int)
+    if days < 1 or days > 90:
+        return jsonify({'error': 'days must be between 1 and 90'}), 400
+
+    with open_db() as db:
         stats = db.get_glucose_statistics(user_id)
         tir = db.get_time_in_range(user_id, 70, 140)
-        
+        metrics = db.get_glucose_metrics(user_id, days=days)
+
         return jsonify({
             'stats': stats,
-            'time_in_range': round(tir, 1)
+            'time_in_range': round(tir, 1),
+            'metrics': metrics
         })
 
 
+def _parse_reading_cursor(value):
+    """游标参数: epoch 毫秒整数或 ISO 8601 时间戳"""
+    if value is None or value == '':
+        return None
+    if value.lstrip('-').isdigit():
+        return int(value)
+    return timestamp_to_epoch_ms(value)
+
+
+def _keyset_readings_response(user_id, limit):
+    """读数列表 (keyset 分页 + 增量同步 + ETag)
+
+    Query:
+        before_ts: 只返回更早的读数, 取上一页最旧的 ts_epoch 继续向历史翻页
+        after_ts / since: 只返回更新的读数, 取客户端已有最新的 ts_epoch (X-Latest-Ts)
+
+    响应仍为读数数组 (按时间降序); ETag 由最新读数、聚合水位、游标与 limit 组成,
+    If-None-Match 命中时返回 304. 若可能还有更多, 默认 / before_ts 模式用 X-Next-Before-Ts
+    给出下一页 (更早) 游标, after_ts / since 模式用 X-Next-After-Ts 给出下一页 (更新) 游标.
+    """
+    if not limit or limit <= 0:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+
+    since = request.args.get('since')
+    if since and request.args.get('after_ts'):
+        return jsonify({'error': 'use either since or after_ts, not both'}), 400
+    try:
+        before_ts = _parse_reading_cursor(request.args.get('before_ts'))
+        after_ts = _parse_reading_cursor(since or request.args.get('after_ts'))
+    except ValueError:
+        return jsonify({'error': 'cursors must be epoch milliseconds or ISO 8601 timestamps'}), 400
+
+    with open_db() as db:
+        latest = CGMRepository(db.conn).get_latest_reading(user_id)
+        latest_ts = latest['ts_epoch'] if latest else None
+        watermark = CGMRollupRepository(db.conn).get_watermark(user_id)
+        etag = f'{latest_ts}-{watermark}-{before_ts}-{after_ts}-{limit}'.replace(' ', 'T')
+
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            readings = db.get_cgm_readings(
+                user_id, limit=limit, before_ts=before_ts, after_ts=after_ts
+            )
+            response = jsonify(readings)
+            if len(readings) == limit:
+                # after 模式按时间升序取页, 最新一条即下一页的起点
+                if after_ts is not None:
+                    response.headers['X-Next-After-Ts'] = str(readings[0]['ts_epoch'])
+                else:
+                    response.headers['X-Next-Before-Ts'] = str(readings[-1]['ts_epoch'])
+
+    response.set_etag(etag)
+    if latest_ts is not None:
+        response.headers['X-Latest-Ts'] = str(latest_ts)
+    return response
+
+
 @app.route('/api/readings/<user_id>')
 def get_readings(user_id):
-    """获取最近的 CGM 读数 API"""
-    limit = 100  # 最近 100 条
-    with CGMDatabase(DB_PATH) as db:
-        readings = db.get_cgm_readings(user_id, limit=limit)
-        return jsonify(readings)
+    """获取最近的 CGM 读数 API (支持 before_ts / after_ts / since 游标)"""
+    limit = request.args.get('limit', 100, type=int)  # 默认最近 100 条
+    return _keyset_readings_response(user_id, limit)
 
 
 @app.route('/api/recent/<user_id>/<int:limit>')
 def get_recent_readings(user_id, limit):
-    """获取指定数量的最近读数"""
-    with CGMDatabase(DB_PATH) as db:
-        readings = db.get_cgm_readings(user_id, limit=limit)
-        return jsonify(readings)
+    """获取指定数量的最近读数 (支持 before_ts / after_ts / since 游标)"""
+    return _keyset_readings_response(user_id, limit)
+
+
+@app.route('/api/readings/<user_id>/buckets')
+def get_reading_buckets(user_id):
+    """按时间桶聚合的读数 (图表使用)
+
+    Query: start / end (ISO 8601, 默认最近 24 小时), bucket (5m/15m/30m/1h/4h/1d, 默认 1h)
+    """
+    bucket = request.args.get('bucket', '1h')
+    if bucket not in BUCKET_SIZES:
+        return jsonify({'error': f"bucket must be one of {', '.join(BUCKET_SIZES)}"}), 400
+
+    end_time = request.args.get('end') or datetime.now(timezone.utc).isoformat()
+    try:
+        end_ms = timestamp_to_epoch_ms(end_time)
+        start_time = request.args.get('start') or epoch_ms_to_datetime(end_ms - 24 * 60 * 60 * 1000).isoformat()
+        start_ms = timestamp_to_epoch_ms(start_time)
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO 8601 timestamps'}), 400
+
+    if start_ms > end_ms:
+        return jsonify({'error': 'start must not be after end'}), 400
+    if (end_ms - start_ms) // BUCKET_SIZES[bucket] >= MAX_CHART_BUCKETS:
+        return jsonify({'error': f'range too large for bucket {bucket} (max {MAX_CHART_BUCKETS} buckets)'}), 400
+
+    with open_db() as db:
+        buckets = db.get_reading_buckets(user_id, start_time, end_time, bucket)
+
+    return jsonify({
+        'user_id': user_id,
+        'bucket': bucket,
+        'start': epoch_ms_to_datetime(start_ms).isoformat(),
+        'end': epoch_ms_to_datetime(end_ms).isoformat(),
+        'buckets': buckets,
+    })
+
+
+@app.route('/api/readings/<user_id>/downsampled')
+def get_downsampled_readings(user_id):
+    """降采样后的读数序列 (LTTB, 保留低/高血糖极值点)
+
+    Query: points (目标点数, 默认 500), start / end (ISO 8601, 可选, 默认全部历史)
+    """
+    points = request.args.get('points', 500, type=int)
+    if points is None or not 3 <= points <= 10000:
+        return jsonify({'error': 'points must be between 3 and 10000'}), 400
+
+    start_time = request.args.get('start')
+    end_time = request.args.get('end')
+    try:
+        start_ms = timestamp_to_epoch_ms(start_time) if start_time else None
+        end_ms = timestamp_to_epoch_ms(end_time) if end_time else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO 8601 timestamps'}), 400
+
+    key = (user_id, start_ms, end_ms, points)
+    with open_db() as db:
+        watermark = CGMRollupRepository(db.conn).get_watermark(user_id)
+
+        with _downsample_cache_lock:
+            cached = _downsample_cache.get(key)
+            if cached and cached[0] == watermark:
+                _downsample_cache.move_to_end(key)
+                return jsonify(cached[1])
+
+        series = CGMRepository(db.conn).get_reading_series(user_id, start_time, end_time)
+
+    keep = downsample_indices(series.ts, series.glucose, points) if len(series) else []
+    ts_epoch = series.ts.tolist()
+    glucose = series.glucose.astype(int).tolist()
+    payload = {
+        'user_id': user_id,
+        'start': epoch_ms_to_datetime(start_ms).isoformat() if start_ms is not None else None,
+        'end': epoch_ms_to_datetime(end_ms).isoformat() if end_ms is not None else None,
+        'points': points,
+        'total': len(ts_epoch),
+        'readings': [
+            {
+                'timestamp': epoch_ms_to_datetime(ts_epoch[i]).isoformat(),
+                'ts_epoch': ts_epoch[i],
+                'glucose_value': glucose[i],
+            }
+            for i in keep
+        ],
+    }
+
+    with _downsample_cache_lock:
+        _downsample_cache[key] = (watermark, payload)
+        _downsample_cache.move_to_end(key)
+        while len(_downsample_cache) > DOWNSAMPLE_CACHE_SIZE:
+            _downsample_cache.popitem(last=False)
+
+    return jsonify(payload)
+
+
+@app.route('/api/readings/<user_id>/bulk', methods=['POST'])
+def bulk_ingest_readings(user_id):
+    """批量写入 CGM 读数 (设备同步 / 回填, 与读数查询接口使用同一数据库 DB_PATH)
+
+    Body: {"readings": [{"timestamp": "2025-07-01T18:15:20Z", "glucose_value": 135,
+                         "local_time": "2025-07-01T11:15:20", "trend": 0}, ...],
+           "mode": "ignore" | "upsert"}
+    local_time (设备本地时间) 与 trend (趋势箭头代码) 可选, 也接受 localTime
+    同一 (user_id, timestamp) 重复提交是安全的: ignore 保留已有读数, upsert 覆盖
+    """
+    payload = request.get_json(silent=True)
+    readings = payload.get('readings') if isinstance(payload, dict) else payload
+    mode = (payload.get('mode') if isinstance(payload, dict) else None) or request.args.get('mode', 'ignore')
+
+    if not isinstance(readings, list):
+        return jsonify({'error': 'readings must be an array'}), 400
+    if mode not in ('ignore', 'upsert'):
+        return jsonify({'error': 'mode must be one of ignore, upsert'}), 400
+
+    # 兼容 camelCase 字段
+    normalised = [
+        {
+            'timestamp': r.get('timestamp'),
+            'glucose_value': r.get('glucose_value', r.get('glucoseValue')),
+            'local_time': r.get('local_time', r.get('localTime')),
+            'trend': r.get('trend'),
+        } if isinstance(r, dict) else r
+        for r in readings
+    ]
+
+    try:
+        with open_db() as db:
+            result = db.add_cgm_readings(user_id, normalised, mode=mode)
+            # 模式识别读取刚写入的同一个数据库
+            identifier = CGMPatternIdentifier(db.db_path)
+        # upsert 时已存在的读数被覆盖
+        updated = result['duplicates'] if mode == 'upsert' else 0
+
+        # 读数有变化时立即增量更新模式; upsert 可能改写历史读数, 重建状态,
+        # ignore 模式补传的旧读数 (早于状态的最后读数) 同样触发重建
+        pattern_changes = None
+        if result['inserted'] or updated:
+            first_ts = None
+            for r in normalised:
+                try:
+                    ts = timestamp_to_epoch_ms(r['timestamp'])
+                except (TypeError, ValueError, KeyError):
+                    continue
+                first_ts = ts if first_ts is None else min(first_ts, ts)
+            try:
+                update = identifier.run_incremental_for_user(
+                    user_id, rebuild=(mode == 'upsert'), changed_from=first_ts
+                )
+                pattern_changes = update['changes']
+            except Exception as exc:
+                print(f"Incremental pattern update failed for {user_id}: {exc}")
+
+        return jsonify({
+            'success': True,
+            'user_id': user_id,
+            'mode': mode,
+            'received': len(readings),
+            'inserted': result['inserted'],
+            'duplicates': result['duplicates'],
+            'updated': updated,
+            'skipped': result['skipped'],
+            'pattern_changes': pattern_changes,
+        }), 201
+    except Exception as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 500
 
 
 @app.route('/api/glucose/<user_id>')
 def get_current_glucose(user_id):
     """获取用户最新的血糖值"""
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         readings = db.get_cgm_readings(user_id, limit=1)
         if readings and len(readings) > 0:
             reading = readings[0]
@@ -213,7 +477,7 @@ def get_current_glucose(user_id):
 @app.route('/api/actions')
 def get_actions():
     """获取所有 Pattern-Action 建议"""
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         actions = db.get_pattern_actions()
         return jsonify(actions)
 
@@ -221,7 +485,7 @@ def get_actions():
 @app.route('/api/actions/<category>')
 def get_actions_by_category(category):
     """获取指定类别的建议"""
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         actions = db.get_pattern_actions(category=category)
         return jsonify(actions)
 
@@ -233,7 +497,7 @@ def list_activity_logs(user_id):
     end_day = request.args.get('end')
     limit = request.args.get('limit', type=int)
 
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         logs = db.get_activity_logs(user_id, start_day=start_day, end_day=end_day, limit=limit)
         return jsonify(logs)
 
@@ -261,7 +525,7 @@ def create_activity_log():
         return jsonify({'error': 'timestampUtc is required'}), 400
 
     try:
-        with CGMDatabase(DB_PATH) as db:
+        with open_db() as db:
             created = db.add_activity_log(
                 user_id,
                 category=category,
@@ -281,7 +545,7 @@ def create_activity_log():
 def delete_activity_log(log_id):
     """删除活动日志"""
     try:
-        with CGMDatabase(DB_PATH) as db:
+        with open_db() as db:
             db.delete_activity_log(log_id)
             return jsonify({'success': True}), 200
     except Exception as exc:
@@ -294,7 +558,7 @@ def update_activity_log(log_id):
     payload = request.get_json(silent=True) or {}
 
     try:
-        with CGMDatabase(DB_PATH) as db:
+        with open_db() as db:
             updated = db.update_activity_log(
                 log_id,
                 title=payload.get('title'),
@@ -310,18 +574,117 @@ def update_activity_log(log_id):
         return jsonify({'error': str(exc)}), 400
 
 
+@app.route('/api/meal-responses/<user_id>')
+def get_meal_responses(user_id):
+    """
+    获取每餐的餐后血糖反应 (基线 / 峰值 / 达峰时间 / iAUC / 回落时间)
+    Query: start / end (YYYY-MM-DD, 可选); 结果按日志缓存, 只重算变化的餐
+    """
+    with open_db() as db:
+        responses = db.get_meal_responses(
+            user_id, start_day=request.args.get('start'), end_day=request.args.get('end')
+        )
+    return jsonify(responses)
+
+
+@app.route('/api/food-responses/<user_id>')
+def get_food_responses(user_id):
+    """
+    获取每种食物的典型餐后反应 (次数, 平均/中位/P90 升幅, 飙升次数, 平均 iAUC)
+    Query: food (只查一种食物, 可选), limit (可选); 索引增量维护, 只重算变化的食物
+    """
+    food = request.args.get('food')
+    with open_db() as db:
+        if food:
+            response = db.get_food_response(user_id, food)
+            if response is None:
+                return jsonify({'error': f'No logged meals of {food}'}), 404
+            return jsonify(response)
+        return jsonify(db.get_food_responses(user_id, limit=request.args.get('limit', type=int)))
+
+
 @app.route('/api/daily_summary/<user_id>/<date>')
 def get_daily_summary(user_id, date):
-    """获取每日总结"""
-    with CGMDatabase(DB_PATH) as db:
-        summary = db.get_daily_summary(user_id, date)
-        return jsonify(summary)
+    """获取每日总结 (date: YYYY-MM-DD)"""
+    try:
+        with open_db() as db:
+            summary = db.get_daily_summary(user_id, date)
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+
+    return jsonify(summary)
+
+
+@app.route('/api/daily_summaries/<user_id>')
+def get_daily_summaries(user_id):
+    """获取日期范围内的每日总结 (日历视图), 参数: start=YYYY-MM-DD&end=YYYY-MM-DD"""
+    start_day = request.args.get('start')
+    end_day = request.args.get('end')
+    if not start_day or not end_day:
+        return jsonify({'error': 'start and end are required (YYYY-MM-DD)'}), 400
+
+    try:
+        with open_db() as db:
+            summaries = db.get_daily_summaries(user_id, start_day, end_day)
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+
+    return jsonify(summaries)
+
+
+@app.route('/api/glucose-events/<user_id>')
+def get_glucose_events(user_id):
+    """
+    获取持续性低/高血糖事件及各类型次数
+    Query: days (默认 14), end (ISO 8601, 默认最新读数时间), type (hypo / severe_hypo / hyper, 可选)
+    """
+    days = request.args.get('days', 14, type=int)
+    if days < 1 or days > 90:
+        return jsonify({'error': 'days must be between 1 and 90'}), 400
+    event_type = request.args.get('type')
+    event_names = [t.name for t in EVENT_TYPES]
+    if event_type is not None and event_type not in event_names:
+        return jsonify({'error': f"type must be one of {', '.join(event_names)}"}), 400
+
+    try:
+        with open_db() as db:
+            events = db.get_glucose_events(
+                user_id, days, request.args.get('end'), event_type
+            )
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    return jsonify(events)
+
+
+@app.route('/api/agp/<user_id>')
+def get_agp(user_id):
+    """
+    获取动态血糖图谱 AGP (按一天内时间分箱的 5/25/50/75/95 百分位)
+    Query: end (YYYY-MM-DD, 默认最新读数所在日), days (默认 14), bin (分钟, 默认 15)
+    """
+    days = request.args.get('days', 14, type=int)
+    bin_minutes = request.args.get('bin', 15, type=int)
+    if days < 1 or days > 90:
+        return jsonify({'error': 'days must be between 1 and 90'}), 400
+
+    try:
+        with open_db() as db:
+            agp = db.get_agp(user_id, request.args.get('end'), days, bin_minutes)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    return jsonify(agp)
 
 
 @app.route('/api/patterns/<user_id>')
 def get_user_patterns(user_id):
-    """获取用户的识别模式 API"""
-    with CGMDatabase(DB_PATH) as db:
+    """获取用户的识别模式 API (数据未变化时直接返回缓存的最新检测结果)"""
+    cached = CGMPatternIdentifier(DB_PATH).get_cached_patterns(user_id)
+    if cached is not None:
+        return jsonify(cached)
+
+    with open_db() as db:
         patterns = db.get_user_patterns(user_id, limit=20)
         return jsonify(patterns if patterns else [])
 
@@ -329,7 +692,7 @@ def get_user_patterns(user_id):
 @app.route('/api/patterns/<user_id>/latest')
 def get_latest_patterns(user_id):
     """获取用户最近的识别模式 (最近24小时)"""
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         patterns = db.get_latest_patterns(user_id, hours=24)
         return jsonify(patterns if patterns else [])
 
@@ -337,11 +700,35 @@ def get_latest_patterns(user_id):
 @app.route('/api/patterns/<user_id>/summary')
 def get_pattern_summary(user_id):
     """获取用户的模式摘要（最近7天）"""
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         summary = db.get_pattern_summary(user_id, days=7)
         return jsonify(summary)
 
 
+
+@app.route('/api/patterns/<user_id>/rules')
+def get_pattern_rules(user_id):
+    """
+    获取用户的每日模式规则结果 (rules.json 格式: {日期: [规则, ...]})
+    Query: start / end (YYYY-MM-DD, 可选), refresh=1 时重新计算该范围
+    """
+    start_date = request.args.get('start')
+    end_date = request.args.get('end')
+    try:
+        for value in (start_date, end_date):
+            if value:
+                datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+    if start_date and end_date and start_date > end_date:
+        return jsonify({'error': 'start must not be after end'}), 400
+
+    identifier = CGMPatternIdentifier(DB_PATH)
+    # 已评估过的日期即使没有规则命中也不再重算
+    if request.args.get('refresh') == '1' or not identifier.daily_rules_evaluated(user_id, start_date, end_date):
+        identifier.run_daily_rules_for_user(user_id, start_date, end_date)
+    return jsonify(identifier.get_daily_rules(user_id, start_date, end_date))
+
 # ============================================================
 # Tavus Tools API Endpoints
 # ============================================================
@@ -361,7 +748,7 @@ def tavus_get_current_glucose():
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
     
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         latest = db.get_latest_glucose(user_id)
         
         if not latest:
@@ -404,7 +791,7 @@ def tavus_get_glucose_statistics():
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
     
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         stats = db.get_glucose_statistics(user_id, hours=hours)
         tir = db.calculate_time_in_range(user_id, hours=hours)
         
@@ -430,7 +817,7 @@ def tavus_get_detected_patterns():
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
     
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         patterns = db.get_latest_patterns(user_id, hours=hours)
         
         return jsonify({
@@ -454,7 +841,7 @@ def tavus_get_user_info():
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
     
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         user = db.get_user(user_id)
         
         if not user:
@@ -484,7 +871,7 @@ def tavus_get_recent_readings():
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
     
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         readings = db.get_recent_readings(user_id, limit=count)
         
         return jsonify({
@@ -507,7 +894,7 @@ def tavus_get_health_recommendations():
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
     
-    with CGMDatabase(DB_PATH) as db:
+    with open_db() as db:
         actions = db.get_pattern_actions(user_id)
         
         return jsonify({
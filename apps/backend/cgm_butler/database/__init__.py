@@ -5,8 +5,8 @@ CGM Butler 数据库模块
 提供数据库操作的核心功能
 """
 
-from .cgm_database import CGMDatabase
+from .cgm_database import CGMDatabase, close_idle_connections
 
-__all__ = ['CGMDatabase']
+__all__ = ['CGMDatabase', 'close_idle_connections']
 __version__ = '1.0.0'
 
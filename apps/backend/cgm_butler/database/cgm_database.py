@@ -5,45 +5,151 @@ CGM Butler 数据库工具类
 提供便捷的数据库操作接口
 """
 import sqlite3
+import threading
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterable
 import sys
 import io
 import os
 
+import numpy as np
+
 # 设置 Windows 控制台输出编码
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+# 添加项目根目录到路径 (用于 shared 模块)
+# cgm_database.py -> database -> cgm_butler -> backend -> apps -> my-glucose-pal (5层)
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from shared.database.repositories.cgm_repository import CGMRepository, epoch_ms_to_datetime, timestamp_to_epoch_ms
+from shared.database.repositories.cgm_rollup_repository import CGMRollupRepository
+from shared.database.repositories.cgm_agp_repository import CGMAgpRepository
+from shared.database.repositories.glucose_event_repository import GlucoseEventRepository
+from shared.database.schema import (
+    MEAL_RESPONSES_TABLE,
+    MEAL_RESPONSES_INDEX,
+    FOOD_RESPONSE_INDEX_TABLE,
+    FOOD_RESPONSE_STATE_TABLE,
+)
+from shared.analytics import glucose_metrics
+from shared.analytics.meals import (
+    BASELINE_MINUTES,
+    RESPONSE_HOURS,
+    RETURN_HOURS,
+    SPIKE_THRESHOLD,
+    food_key,
+    food_response_stats,
+    meal_responses,
+)
+
 
 DEFAULT_DB_PATH = os.getenv('CGM_DB_PATH', 'cgm_butler.db')
 
+# 连接池: 每个数据库路径保留的最大空闲连接数
+POOL_MAX_IDLE = int(os.getenv('CGM_DB_POOL_SIZE', '8'))
+
+# db_path -> 空闲连接 (pooled=True 的实例借出 / 归还)
+_idle_connections: Dict[str, List[sqlite3.Connection]] = {}
+_pool_lock = threading.Lock()
+# 已通过 bootstrap_schema 建表的数据库路径, 其连接不再执行建表 DDL
+_bootstrapped_paths = set()
+
+
+def close_idle_connections(db_path: Optional[str] = None) -> int:
+    """
+    关闭连接池中的空闲连接
+
+    Args:
+        db_path: 只关闭该数据库的连接, 默认全部
+
+    Returns:
+        关闭的连接数
+    """
+    with _pool_lock:
+        paths = [db_path] if db_path else list(_idle_connections)
+        idle = [conn for path in paths for conn in _idle_connections.pop(path, [])]
+    for conn in idle:
+        conn.close()
+    return len(idle)
+
 
 class CGMDatabase:
     """CGM Butler 数据库操作类"""
     
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, pooled: bool = False):
         """
         初始化数据库连接
         
         Args:
             db_path: 数据库文件路径
+            pooled: 从连接池借用连接, close() 时归还而不是关闭
+                (长驻进程如 dashboard 使用, 省去每次请求的建连开销)
         """
         self.db_path = db_path or DEFAULT_DB_PATH
+        self.pooled = pooled
         self.conn = None
     
+    @classmethod
+    def bootstrap_schema(cls, db_path: Optional[str] = None):
+        """
+        创建后端自用的 activity_logs 表, 每个进程每个路径执行一次
+
+        之后该路径上的连接跳过 CREATE ... IF NOT EXISTS 与随之的 commit。
+        应在应用启动时调用; 未调用时仍在每次 connect() 时检查。
+        """
+        db = cls(db_path)
+        db.conn = db._open()
+        try:
+            db._ensure_activity_logs_table()
+        finally:
+            db.close()
+        with _pool_lock:
+            _bootstrapped_paths.add(db.db_path)
+    
+    @property
+    def _schema_ready(self) -> bool:
+        return self.db_path in _bootstrapped_paths
+    
+    def _open(self) -> sqlite3.Connection:
+        # 池化连接会被不同的请求线程复用 (同一时刻只有一个使用者)
+        conn = sqlite3.connect(self.db_path, check_same_thread=not self.pooled)
+        conn.row_factory = sqlite3.Row  # 使查询结果可以通过列名访问
+        return conn
+    
     def connect(self):
-        """建立数据库连接"""
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row  # 使查询结果可以通过列名访问
-        self._ensure_activity_logs_table()
+        """建立数据库连接 (pooled 时优先复用空闲连接)"""
+        conn = None
+        if self.pooled:
+            with _pool_lock:
+                idle = _idle_connections.get(self.db_path)
+                if idle:
+                    conn = idle.pop()
+        self.conn = conn or self._open()
+        if not self._schema_ready:
+            self._ensure_activity_logs_table()
         return self.conn
     
     def close(self):
-        """关闭数据库连接"""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        """关闭数据库连接 (pooled 时回滚未提交的事务并归还连接池)"""
+        if not self.conn:
+            return
+        conn, self.conn = self.conn, None
+        if self.pooled:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                conn.close()
+                return
+            with _pool_lock:
+                idle = _idle_connections.setdefault(self.db_path, [])
+                if len(idle) < POOL_MAX_IDLE:
+                    idle.append(conn)
+                    return
+        conn.close()
     
     def __enter__(self):
         """上下文管理器入口"""
@@ -59,7 +165,7 @@ class CGMDatabase:
     # ============================================================
 
     def _ensure_activity_logs_table(self):
-        """创建活动日志表(如不存在)"""
+        """创建活动日志表及由其派生的餐后反应 / 食物索引表(如不存在, 与迁移 015 / 016 同一定义)"""
         cursor = self.conn.cursor()
         cursor.execute(
             """
@@ -85,8 +191,30 @@ class CGMDatabase:
             ON activity_logs (user_id, day_utc, timestamp_utc DESC)
             """
         )
+        cursor.execute(MEAL_RESPONSES_TABLE)
+        cursor.execute(MEAL_RESPONSES_INDEX)
+        cursor.execute(FOOD_RESPONSE_INDEX_TABLE)
+        cursor.execute(FOOD_RESPONSE_STATE_TABLE)
         self.conn.commit()
 
+    def _sync_food_log(self, log: Dict):
+        """
+        food 日志新增 / 修改后直接更新该餐的反应与相关食物的索引行
+        
+        用户的索引尚未建立时跳过, 由首次查询全量同步
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT 1 FROM food_response_state WHERE user_id = ?", (log['user_id'],))
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("SELECT food_key FROM meal_responses WHERE log_id = ?", (log['id'],))
+        previous = cursor.fetchone()
+        if previous:
+            cursor.execute("DELETE FROM meal_responses WHERE log_id = ?", (log['id'],))
+            self._update_food_index(log['user_id'], [previous['food_key']])
+        if log['category'] == 'food':
+            self._sync_meal_responses(log['user_id'], [log])
+
     @staticmethod
     def _normalise_timestamp_utc(timestamp_str: str) -> Tuple[str, str, int]:
         """将任意 ISO8601 字符串转换为标准 UTC 字段"""
@@ -108,6 +236,25 @@ class CGMDatabase:
         day = dt_utc.date().isoformat()
         minutes = dt_utc.hour * 60 + dt_utc.minute
         return timestamp_utc, day, minutes
+
+    @staticmethod
+    def _epoch_range_filter(
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None
+    ) -> Tuple[str, List[int]]:
+        """将 ISO8601 时间范围转换为 ts_epoch 过滤条件 (无时区视为 UTC)"""
+        clause = ''
+        params = []
+
+        if start_time:
+            clause += ' AND ts_epoch >= ?'
+            params.append(timestamp_to_epoch_ms(start_time))
+
+        if end_time:
+            clause += ' AND ts_epoch <= ?'
+            params.append(timestamp_to_epoch_ms(end_time))
+
+        return clause, params
     
     # ============================================================
     # 用户相关操作
@@ -195,7 +342,7 @@ class CGMDatabase:
     
     def add_cgm_reading(self, user_id: str, timestamp: str, glucose_value: int) -> bool:
         """
-        添加 CGM 读数
+        添加 CGM 读数 (同一用户同一时间点已存在时覆盖)
         
         Args:
             user_id: 用户ID
@@ -206,32 +353,93 @@ class CGMDatabase:
             添加成功返回 True,否则返回 False
         """
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT INTO cgm_readings (user_id, timestamp, glucose_value)
-                VALUES (?, ?, ?)
-            ''', (user_id, timestamp, glucose_value))
-            self.conn.commit()
+            CGMRepository(self.conn).save_reading(user_id, timestamp, glucose_value)
             return True
-        except sqlite3.Error as e:
+        except (sqlite3.Error, ValueError) as e:
             print(f"添加 CGM 读数失败: {e}")
             return False
     
+    def add_cgm_readings(
+        self,
+        user_id: str,
+        readings: Iterable[Dict],
+        mode: str = 'ignore'
+    ) -> Dict[str, int]:
+        """
+        批量添加 CGM 读数 (单个事务, 分块 executemany)
+        
+        Args:
+            user_id: 用户ID
+            readings: 读数列表, 每项包含 timestamp 和 glucose_value
+            mode: 'ignore' 保留已存在的读数, 'upsert' 用新值覆盖
+            
+        Returns:
+            {'inserted': 新增条数, 'duplicates': 已存在条数, 'skipped': 跳过的无效条数}
+        """
+        return CGMRepository(self.conn).save_readings_bulk(user_id, readings, mode=mode)
+    
+    def get_reading_buckets(
+        self,
+        user_id: str,
+        start_time: str,
+        end_time: str,
+        bucket: str = '1h'
+    ) -> List[Dict]:
+        """
+        按固定时间桶聚合读数 (图表使用), 每个桶包含 count/min/max/mean/分位数
+        
+        Args:
+            user_id: 用户ID
+            start_time: 开始时间 (ISO 8601, 含)
+            end_time: 结束时间 (ISO 8601, 含)
+            bucket: 桶宽度 ('5m', '15m', '30m', '1h', '4h', '1d')
+            
+        Returns:
+            按时间升序的桶列表 (无读数的桶不返回)
+        """
+        return CGMRepository(self.conn).get_reading_buckets(user_id, start_time, end_time, bucket)
+    
+    def get_reading_series(
+        self,
+        user_id: str,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        with_trend: bool = False
+    ):
+        """
+        获取列式读数序列 (ReadingSeries, 按时间升序)
+        
+        Args:
+            user_id: 用户ID
+            start_time: 开始时间 (ISO 8601, 含),可选
+            end_time: 结束时间 (ISO 8601, 含),可选
+            with_trend: 是否同时读取 trend 列
+            
+        Returns:
+            ReadingSeries (int64 ts / float32 glucose 数组)
+        """
+        return CGMRepository(self.conn).get_reading_series(user_id, start_time, end_time, with_trend)
+    
     def get_cgm_readings(
         self, 
         user_id: str, 
         start_time: Optional[str] = None,
         end_time: Optional[str] = None,
-        limit: Optional[int] = None
+        limit: Optional[int] = None,
+        before_ts: Optional[int] = None,
+        after_ts: Optional[int] = None
     ) -> List[Dict]:
         """
-        获取 CGM 读数
+        获取 CGM 读数 (按 ts_epoch 降序)
         
         Args:
             user_id: 用户ID
             start_time: 开始时间 (ISO 8601 格式),可选
             end_time: 结束时间 (ISO 8601 格式),可选
             limit: 返回记录数限制,可选
+            before_ts: 游标, 只返回 ts_epoch < before_ts 的读数 (向历史翻页)
+            after_ts: 游标, 只返回 ts_epoch > after_ts 的读数 (增量同步),
+                取紧随游标的最旧 limit 条
             
         Returns:
             CGM 读数列表
@@ -241,23 +449,27 @@ class CGMDatabase:
         query = 'SELECT * FROM cgm_readings WHERE user_id = ?'
         params = [user_id]
         
-        if start_time:
-            query += ' AND timestamp >= ?'
-            params.append(start_time)
+        range_clause, range_params = self._epoch_range_filter(start_time, end_time)
+        query += range_clause
+        params.extend(range_params)
         
-        if end_time:
-            query += ' AND timestamp <= ?'
-            params.append(end_time)
+        if before_ts is not None:
+            query += ' AND ts_epoch < ?'
+            params.append(before_ts)
+        if after_ts is not None:
+            query += ' AND ts_epoch > ?'
+            params.append(after_ts)
         
-        query += ' ORDER BY timestamp DESC'
+        ascending = after_ts is not None
+        query += f" ORDER BY ts_epoch {'ASC' if ascending else 'DESC'}"
         
         if limit:
             query += ' LIMIT ?'
             params.append(limit)
         
         cursor.execute(query, params)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        rows = [dict(row) for row in cursor.fetchall()]
+        return rows[::-1] if ascending else rows
 
     # ============================================================
     # 活动日志相关操作
@@ -314,9 +526,11 @@ class CGMDatabase:
                 meal_type,
             ),
         )
+        log = self.get_activity_log_by_id(cursor.lastrowid)
+        if category == "food":
+            self._sync_food_log(log)
         self.conn.commit()
-        inserted_id = cursor.lastrowid
-        return self.get_activity_log_by_id(inserted_id)
+        return log
 
     def get_activity_log_by_id(self, log_id: int) -> Dict:
         cursor = self.conn.cursor()
@@ -358,10 +572,19 @@ class CGMDatabase:
 
     def delete_activity_log(self, log_id: int) -> bool:
         """删除活动日志"""
+        log = self.get_activity_log_by_id(log_id)
         cursor = self.conn.cursor()
         cursor.execute("DELETE FROM activity_logs WHERE id = ?", (log_id,))
+        deleted = cursor.rowcount > 0
+        # 只有 food 日志有餐后反应记录
+        if log.get('category') == 'food':
+            cursor.execute("SELECT user_id, food_key FROM meal_responses WHERE log_id = ?", (log_id,))
+            response = cursor.fetchone()
+            if response:
+                cursor.execute("DELETE FROM meal_responses WHERE log_id = ?", (log_id,))
+                self._update_food_index(response['user_id'], [response['food_key']])
         self.conn.commit()
-        return cursor.rowcount > 0
+        return deleted
 
     def update_activity_log(
         self,
@@ -416,9 +639,12 @@ class CGMDatabase:
 
         cursor = self.conn.cursor()
         cursor.execute(f"UPDATE activity_logs SET {set_clause} WHERE id = ?", values)
+        log = self.get_activity_log_by_id(log_id)
+        if 'food' in (current['category'], log['category']):
+            self._sync_food_log(log)
         self.conn.commit()
 
-        return self.get_activity_log_by_id(log_id)
+        return log
 
     def get_latest_reading(self, user_id: str) -> Optional[Dict]:
         """
@@ -433,6 +659,17 @@ class CGMDatabase:
         readings = self.get_cgm_readings(user_id, limit=1)
         return readings[0] if readings else None
     
+    def _get_range_stats(
+        self,
+        user_id: str,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None
+    ) -> Dict:
+        """从小时/日聚合表 (加上边缘不足一小时的原始读数) 获取区间统计"""
+        start_ms = timestamp_to_epoch_ms(start_time) if start_time else None
+        end_ms = timestamp_to_epoch_ms(end_time) if end_time else None
+        return CGMRollupRepository(self.conn).get_range_stats(user_id, start_ms, end_ms)
+
     def get_glucose_statistics(
         self, 
         user_id: str,
@@ -440,7 +677,7 @@ class CGMDatabase:
         end_time: Optional[str] = None
     ) -> Dict:
         """
-        获取血糖统计信息
+        获取血糖统计信息 (基于聚合表, 耗时与数据总量无关)
         
         Args:
             user_id: 用户ID
@@ -448,32 +685,24 @@ class CGMDatabase:
             end_time: 结束时间,可选
             
         Returns:
-            统计信息字典 (min, max, avg, count)
+            统计信息字典 (min, max, avg, std_dev, count)
         """
-        cursor = self.conn.cursor()
+        stats = self._get_range_stats(user_id, start_time, end_time)
+        count = stats['count']
         
-        query = '''
-            SELECT 
-                MIN(glucose_value) as min_glucose,
-                MAX(glucose_value) as max_glucose,
-                AVG(glucose_value) as avg_glucose,
-                COUNT(*) as count
-            FROM cgm_readings
-            WHERE user_id = ?
-        '''
-        params = [user_id]
-        
-        if start_time:
-            query += ' AND timestamp >= ?'
-            params.append(start_time)
-        
-        if end_time:
-            query += ' AND timestamp <= ?'
-            params.append(end_time)
+        avg_glucose = stats['sum'] / count if count else None
+        std_dev = None
+        if count > 1:
+            variance = (stats['sum_sq'] - stats['sum'] * stats['sum'] / count) / (count - 1)
+            std_dev = max(variance, 0.0) ** 0.5
         
-        cursor.execute(query, params)
-        row = cursor.fetchone()
-        return dict(row) if row else {}
+        return {
+            'min_glucose': stats['min'],
+            'max_glucose': stats['max'],
+            'avg_glucose': avg_glucose,
+            'std_dev': std_dev,
+            'count': count
+        }
     
     def get_time_in_range(
         self,
@@ -486,6 +715,9 @@ class CGMDatabase:
         """
         计算血糖在目标范围内的时间百分比 (Time In Range)
         
+        聚合表覆盖的阈值 (低: 54/70, 高: 140/180/250) 直接由聚合计数计算,
+        其他阈值回退到原始读数扫描。
+        
         Args:
             user_id: 用户ID
             low_threshold: 低阈值 (默认 70 mg/dL)
@@ -496,6 +728,19 @@ class CGMDatabase:
         Returns:
             在目标范围内的时间百分比 (0-100)
         """
+        below_key = f'below_{low_threshold}'
+        above_key = f'above_{high_threshold}'
+        
+        stats = None
+        if below_key in ('below_54', 'below_70') and above_key in ('above_140', 'above_180', 'above_250'):
+            stats = self._get_range_stats(user_id, start_time, end_time)
+        
+        if stats is not None:
+            if not stats['count']:
+                return 0.0
+            in_range = stats['count'] - stats[below_key] - stats[above_key]
+            return in_range * 100.0 / stats['count']
+        
         cursor = self.conn.cursor()
         
         query = '''
@@ -506,13 +751,9 @@ class CGMDatabase:
         '''
         params = [low_threshold, high_threshold, user_id]
         
-        if start_time:
-            query += ' AND timestamp >= ?'
-            params.append(start_time)
-        
-        if end_time:
-            query += ' AND timestamp <= ?'
-            params.append(end_time)
+        range_clause, range_params = self._epoch_range_filter(start_time, end_time)
+        query += range_clause
+        params.extend(range_params)
         
         cursor.execute(query, params)
         row = cursor.fetchone()
@@ -529,10 +770,100 @@ class CGMDatabase:
         Returns:
             在目标范围内的时间百分比 (0-100)
         """
-        end_time = datetime.now().isoformat()
-        start_time = (datetime.now() - timedelta(hours=hours)).isoformat()
+        now = datetime.now(timezone.utc)
+        end_time = now.isoformat()
+        start_time = (now - timedelta(hours=hours)).isoformat()
         return self.get_time_in_range(user_id, start_time=start_time, end_time=end_time)
     
+    def get_glucose_metrics(
+        self,
+        user_id: str,
+        days: int = 14,
+        end_time: Optional[str] = None,
+        low_threshold: int = 70,
+        high_threshold: int = 180
+    ) -> Dict:
+        """
+        获取标准 CGM 指标 (均值/SD/CV, GMI, TIR/TBR/TAR, MAGE, MODD, CONGA, LBGI/HBGI)
+        
+        Args:
+            user_id: 用户ID
+            days: 统计天数 (默认 14)
+            end_time: 结束时间 (ISO 8601), 默认为最新读数时间
+            low_threshold: 目标范围下限 (默认 70 mg/dL)
+            high_threshold: 目标范围上限 (默认 180 mg/dL)
+            
+        Returns:
+            指标字典 (见 shared.analytics.glucose_metrics), 附 start_time / end_time
+        """
+        if end_time is None:
+            latest = CGMRepository(self.conn).get_latest_reading(user_id)
+            end_ms = latest['ts_epoch'] if latest else int(datetime.now(timezone.utc).timestamp() * 1000)
+        else:
+            end_ms = timestamp_to_epoch_ms(end_time)
+        start_time = epoch_ms_to_datetime(end_ms - days * 24 * 60 * 60 * 1000).isoformat()
+        end_time = epoch_ms_to_datetime(end_ms).isoformat()
+        
+        series = self.get_reading_series(user_id, start_time, end_time)
+        metrics = glucose_metrics(series, (low_threshold, high_threshold))
+        metrics['start_time'] = start_time
+        metrics['end_time'] = end_time
+        return metrics
+    
+    def get_glucose_events(
+        self,
+        user_id: str,
+        days: int = 14,
+        end_time: Optional[str] = None,
+        event_type: Optional[str] = None
+    ) -> Dict:
+        """
+        获取持续性低/高血糖事件 (<70 / <54 持续 ≥15 分钟, >180 持续 ≥2 小时)
+        
+        事件存于 glucose_events, 查询前只增量重扫有新读数的日期; 计数为按开始时间的索引范围计数
+        
+        Args:
+            user_id: 用户ID
+            days: 统计天数 (默认 14)
+            end_time: 结束时间 (ISO 8601), 默认为最新读数时间
+            event_type: 只返回该类型 (hypo / severe_hypo / hyper),可选
+            
+        Returns:
+            {'start_time', 'end_time', 'counts': {类型: 次数}, 'events': [事件...]}
+        """
+        if end_time is None:
+            latest = CGMRepository(self.conn).get_latest_reading(user_id)
+            end_ms = latest['ts_epoch'] if latest else int(datetime.now(timezone.utc).timestamp() * 1000)
+        else:
+            end_ms = timestamp_to_epoch_ms(end_time)
+        start_ms = end_ms - days * 24 * 60 * 60 * 1000
+        
+        repo = GlucoseEventRepository(self.conn)
+        # 包含结束时刻的事件 (结束时间默认就是最新读数)
+        counts = repo.count_events(user_id, start_ms, end_ms + 1)
+        events = repo.get_events(user_id, start_ms, end_ms + 1, event_type)
+        
+        def iso(ms: int) -> str:
+            return epoch_ms_to_datetime(int(ms)).isoformat()
+        
+        return {
+            'start_time': iso(start_ms),
+            'end_time': iso(end_ms),
+            'counts': counts,
+            'events': [
+                {
+                    'event_type': e['event_type'],
+                    'start_time': iso(e['start_ts_epoch']),
+                    'end_time': iso(e['end_ts_epoch']),
+                    'duration_minutes': e['duration_minutes'],
+                    'extreme_glucose': e['extreme_glucose'],
+                    'extreme_time': iso(e['extreme_ts_epoch']),
+                    'reading_count': e['reading_count']
+                }
+                for e in events
+            ]
+        }
+    
     # ============================================================
     # Pattern-Action 相关操作
     # ============================================================
@@ -615,14 +946,14 @@ class CGMDatabase:
         cursor = self.conn.cursor()
         
         # 获取餐前血糖 (用餐前 15 分钟的平均值)
-        meal_dt = datetime.fromisoformat(meal_time)
-        pre_meal_start = (meal_dt - timedelta(minutes=15)).isoformat()
+        meal_epoch = timestamp_to_epoch_ms(meal_time)
+        pre_meal_start = meal_epoch - 15 * 60 * 1000
         
         cursor.execute('''
             SELECT AVG(glucose_value) as pre_meal_glucose
             FROM cgm_readings
-            WHERE user_id = ? AND timestamp BETWEEN ? AND ?
-        ''', (user_id, pre_meal_start, meal_time))
+            WHERE user_id = ? AND ts_epoch BETWEEN ? AND ?
+        ''', (user_id, pre_meal_start, meal_epoch))
         
         pre_meal_row = cursor.fetchone()
         pre_meal_glucose = pre_meal_row['pre_meal_glucose'] if pre_meal_row else None
@@ -631,13 +962,13 @@ class CGMDatabase:
             return False, {'error': '无法获取餐前血糖'}
         
         # 获取餐后最高血糖
-        post_meal_end = (meal_dt + timedelta(hours=window_hours)).isoformat()
+        post_meal_end = meal_epoch + window_hours * 60 * 60 * 1000
         
         cursor.execute('''
             SELECT MAX(glucose_value) as peak_glucose, timestamp as peak_time
             FROM cgm_readings
-            WHERE user_id = ? AND timestamp BETWEEN ? AND ?
-        ''', (user_id, meal_time, post_meal_end))
+            WHERE user_id = ? AND ts_epoch BETWEEN ? AND ?
+        ''', (user_id, meal_epoch, post_meal_end))
         
         post_meal_row = cursor.fetchone()
         peak_glucose = post_meal_row['peak_glucose'] if post_meal_row else None
@@ -657,38 +988,420 @@ class CGMDatabase:
             'threshold': spike_threshold
         }
     
-    def get_daily_summary(self, user_id: str, date: str) -> Dict:
+    def _sync_meal_responses(self, user_id: str, meals: List[Dict], full: bool = False) -> Dict[int, Dict]:
         """
-        获取指定日期的血糖总结
+        重新计算过期的餐后反应并写入 meal_responses, 同时更新受影响食物的索引行
+        
+        新增、时间或食物名被修改、覆盖读数有变化 (日聚合 updated_at) 的餐为过期;
+        所有过期餐的读数一次范围扫描读取, 再一次向量化计算
         
         Args:
             user_id: 用户ID
-            date: 日期 (YYYY-MM-DD 格式)
+            meals: food 活动日志
+            full: meals 为该用户全部 food 日志时为 True, 同时清理已不是 food 日志的行
             
         Returns:
-            日总结字典
+            日志ID -> meal_responses 行
         """
-        start_time = f"{date} 00:00:00"
-        end_time = f"{date} 23:59:59"
+        cursor = self.conn.cursor()
+        meal_ts = np.array([timestamp_to_epoch_ms(meal['timestamp_utc']) for meal in meals], dtype=np.int64)
+        
+        stored = {}
+        if full:
+            cursor.execute("SELECT * FROM meal_responses WHERE user_id = ?", (user_id,))
+            stored = {row['log_id']: dict(row) for row in cursor.fetchall()}
+        elif meals:
+            cursor.execute(
+                """
+                SELECT * FROM meal_responses
+                WHERE user_id = ? AND meal_ts_epoch BETWEEN ? AND ?
+                """,
+                (user_id, int(meal_ts.min()), int(meal_ts.max()))
+            )
+            stored = {row['log_id']: dict(row) for row in cursor.fetchall()}
+        
+        changed = set()
+        if full:
+            # 日志已删除或不再是 food
+            food_ids = {meal['id'] for meal in meals}
+            orphans = [log_id for log_id in stored if log_id not in food_ids]
+            for log_id in orphans:
+                changed.add(stored.pop(log_id)['food_key'])
+            cursor.executemany("DELETE FROM meal_responses WHERE log_id = ?", [(log_id,) for log_id in orphans])
+        if not meals:
+            if changed:
+                self._update_food_index(user_id, changed)
+            self.conn.commit()
+            return stored
+        
+        day_ms = 24 * 60 * 60 * 1000
+        before_ms = BASELINE_MINUTES * 60 * 1000
+        after_ms = max(RESPONSE_HOURS, RETURN_HOURS) * 60 * 60 * 1000
+        first_ms, last_ms = int(meal_ts.min()) - before_ms, int(meal_ts.max()) + after_ms
+        
+        # 每餐的数据版本: 覆盖其窗口的各天日聚合 updated_at
+        day_versions = {
+            row['bucket_start']: row['updated_at']
+            for row in CGMRollupRepository(self.conn).get_daily_rollups(
+                user_id, first_ms // day_ms * day_ms, last_ms // day_ms * day_ms
+            )
+        }
+        versions = [
+            ';'.join(str(day_versions.get(day, '')) for day in range(
+                (ts - before_ms) // day_ms * day_ms, (ts + after_ms) // day_ms * day_ms + 1, day_ms
+            ))
+            for ts in meal_ts.tolist()
+        ]
+        keys = [food_key(meal['title']) for meal in meals]
+        
+        stale = [
+            i for i, meal in enumerate(meals)
+            if meal['id'] not in stored
+            or stored[meal['id']]['meal_timestamp_utc'] != meal['timestamp_utc']
+            or stored[meal['id']]['food_key'] != keys[i]
+            or stored[meal['id']]['source_version'] != versions[i]
+        ]
+        
+        if stale:
+            stale_ts = meal_ts[stale]
+            series = CGMRepository(self.conn).get_reading_series(
+                user_id,
+                epoch_ms_to_datetime(int(stale_ts.min()) - before_ms).isoformat(),
+                epoch_ms_to_datetime(int(stale_ts.max()) + after_ms).isoformat()
+            )
+            response = meal_responses(series, stale_ts)
+            computed_at = datetime.now().isoformat()
+            
+            def value(key, j):
+                number = response[key][j]
+                return None if np.isnan(number) else round(float(number), 2)
+            
+            rows = []
+            for j, i in enumerate(stale):
+                previous = stored.get(meals[i]['id'])
+                if previous:
+                    changed.add(previous['food_key'])
+                changed.add(keys[i])
+                peak_ts = int(response['peak_ts'][j])
+                row = {
+                    'log_id': meals[i]['id'],
+                    'user_id': user_id,
+                    'meal_timestamp_utc': meals[i]['timestamp_utc'],
+                    'meal_ts_epoch': int(meal_ts[i]),
+                    'food_key': keys[i],
+                    'baseline_glucose': value('baseline', j),
+                    'peak_glucose': value('peak', j),
+                    'peak_ts_epoch': peak_ts if peak_ts >= 0 else None,
+                    'rise': value('rise', j),
+                    'time_to_peak_minutes': value('time_to_peak_minutes', j),
+                    'iauc': value('iauc', j),
+                    'return_to_baseline_minutes': value('return_to_baseline_minutes', j),
+                    'reading_count': int(response['reading_count'][j]),
+                    'source_version': versions[i],
+                    'computed_at': computed_at
+                }
+                stored[row['log_id']] = row
+                rows.append(tuple(row.values()))
+            
+            cursor.executemany(
+                """
+                INSERT OR REPLACE INTO meal_responses (
+                    log_id, user_id, meal_timestamp_utc, meal_ts_epoch, food_key,
+                    baseline_glucose, peak_glucose, peak_ts_epoch, rise,
+                    time_to_peak_minutes, iauc, return_to_baseline_minutes,
+                    reading_count, source_version, computed_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+        if changed:
+            self._update_food_index(user_id, changed)
+        self.conn.commit()
+        return stored
+    
+    def get_meal_responses(
+        self,
+        user_id: str,
+        start_day: Optional[str] = None,
+        end_day: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        获取每餐的餐后血糖反应 (food 活动日志: 餐前基线 / 峰值 / 达峰时间 / iAUC / 回落时间)
         
-        # 基本统计
-        stats = self.get_glucose_statistics(user_id, start_time, end_time)
+        结果按日志 ID 存于 meal_responses, 只重新计算过期的餐 (见 _sync_meal_responses)
         
-        # Time In Range
-        tir = self.get_time_in_range(user_id, start_time=start_time, end_time=end_time)
+        Args:
+            user_id: 用户ID
+            start_day: 开始日期 (YYYY-MM-DD, UTC),可选
+            end_day: 结束日期 (YYYY-MM-DD, UTC),可选
+            
+        Returns:
+            按用餐时间倒序的列表 (日志字段 + 反应指标, 无数据的指标为 None)
+        """
+        meals = [
+            log for log in self.get_activity_logs(user_id, start_day=start_day, end_day=end_day)
+            if log['category'] == 'food'
+        ]
+        stored = self._sync_meal_responses(user_id, meals)
+        
+        results = []
+        for meal in meals:
+            response = stored[meal['id']]
+            results.append({
+                'log_id': meal['id'],
+                'title': meal['title'],
+                'meal_type': meal.get('meal_type'),
+                'timestamp_utc': meal['timestamp_utc'],
+                'baseline_glucose': response['baseline_glucose'],
+                'peak_glucose': response['peak_glucose'],
+                'peak_time': epoch_ms_to_datetime(response['peak_ts_epoch']).isoformat()
+                if response['peak_ts_epoch'] is not None else None,
+                'rise': response['rise'],
+                'has_spike': response['rise'] is not None and response['rise'] > SPIKE_THRESHOLD,
+                'time_to_peak_minutes': response['time_to_peak_minutes'],
+                'iauc': response['iauc'],
+                'return_to_baseline_minutes': response['return_to_baseline_minutes'],
+                'reading_count': response['reading_count']
+            })
+        return results
+    
+    def _update_food_index(self, user_id: str, keys: Iterable[str]):
+        """按 meal_responses 重算给定食物的汇总行 (不提交)"""
+        keys = sorted(keys)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT m.food_key, m.rise, m.iauc, a.title, a.timestamp_utc
+            FROM meal_responses m JOIN activity_logs a ON a.id = m.log_id
+            WHERE m.user_id = ? AND m.food_key IN ({', '.join('?' * len(keys))})
+            ORDER BY a.timestamp_utc DESC
+            """,
+            [user_id] + keys
+        )
+        # 按时间倒序, 每组第一条即最近一次
+        groups: Dict[str, List] = {}
+        for row in cursor.fetchall():
+            groups.setdefault(row['food_key'], []).append(row)
+        
+        updated_at = datetime.now().isoformat()
+        rows = []
+        for key, group in groups.items():
+            stats = food_response_stats([r['rise'] for r in group], [r['iauc'] for r in group])
+            rows.append((
+                user_id, key, group[0]['title'], len(group), stats['meal_count'],
+                stats['mean_rise'], stats['median_rise'], stats['p90_rise'], stats['max_rise'],
+                stats['spike_count'], stats['mean_iauc'], group[0]['timestamp_utc'], updated_at
+            ))
+        cursor.executemany(
+            "DELETE FROM food_response_index WHERE user_id = ? AND food_key = ?",
+            [(user_id, key) for key in keys if key not in groups]
+        )
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO food_response_index (
+                user_id, food_key, title, log_count, meal_count,
+                mean_rise, median_rise, p90_rise, max_rise,
+                spike_count, mean_iauc, last_eaten_utc, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows
+        )
+    
+    def _refresh_food_index(self, user_id: str):
+        """
+        同步食物反应索引 (food 日志的增删改已直接更新索引, 这里只跟进读数变化)
+        
+        日聚合水位未变化时直接返回; 否则只重新同步窗口覆盖 updated_at 晚于
+        上次水位的日期的餐, 首次同步 (或无法定位变化日期) 时全量同步
+        """
+        watermark = CGMRollupRepository(self.conn).get_watermark(user_id)
+        watermark = str(watermark) if watermark is not None else ''
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT source_watermark FROM food_response_state WHERE user_id = ?", (user_id,))
+        state = cursor.fetchone()
+        if state and state['source_watermark'] == watermark:
+            return
+        
+        changed = None
+        if state:
+            cursor.execute(
+                """
+                SELECT MIN(bucket_start) AS changed_from FROM cgm_rollup_daily
+                WHERE user_id = ? AND updated_at > ?
+                """,
+                (user_id, state['source_watermark'])
+            )
+            row = cursor.fetchone()
+            changed = row['changed_from'] if row else None
         
-        # 读数数量
-        readings = self.get_cgm_readings(user_id, start_time, end_time)
+        if changed is None:
+            meals = [log for log in self.get_activity_logs(user_id) if log['category'] == 'food']
+            self._sync_meal_responses(user_id, meals, full=True)
+        else:
+            # 餐后窗口最多延伸 max(RESPONSE_HOURS, RETURN_HOURS), 更早的餐不受影响
+            after_ms = max(RESPONSE_HOURS, RETURN_HOURS) * 60 * 60 * 1000
+            first_ms = int(changed) - after_ms
+            start_day = epoch_ms_to_datetime(first_ms).date().isoformat()
+            meals = [
+                log for log in self.get_activity_logs(user_id, start_day=start_day)
+                if log['category'] == 'food' and timestamp_to_epoch_ms(log['timestamp_utc']) >= first_ms
+            ]
+            self._sync_meal_responses(user_id, meals)
+        cursor.execute(
+            "INSERT OR REPLACE INTO food_response_state (user_id, source_watermark, indexed_at) VALUES (?, ?, ?)",
+            (user_id, watermark, datetime.now().isoformat())
+        )
+        self.conn.commit()
+    
+    def get_food_response(self, user_id: str, title: str) -> Optional[Dict]:
+        """
+        获取某种食物的典型餐后反应 (按规范化食物名的主键查询)
+        
+        Args:
+            user_id: 用户ID
+            title: 食物名 (与日志标题按 food_key 规范化后匹配)
+            
+        Returns:
+            food_response_index 行 (次数, 平均/中位/P90/最大升幅, 飙升次数, 平均 iAUC), 未记录过时为 None
+        """
+        self._refresh_food_index(user_id)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT * FROM food_response_index WHERE user_id = ? AND food_key = ?",
+            (user_id, food_key(title))
+        )
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def get_food_responses(self, user_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """
+        获取用户所有食物的典型餐后反应, 平均升幅从高到低 (无数据的食物排在最后)
+        
+        Args:
+            user_id: 用户ID
+            limit: 返回数量限制,可选
+        """
+        self._refresh_food_index(user_id)
+        query = """
+            SELECT * FROM food_response_index WHERE user_id = ?
+            ORDER BY mean_rise IS NULL, mean_rise DESC, food_key
+        """
+        params: List = [user_id]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _daily_summary_from_stats(date: str, stats: Dict) -> Dict:
+        """将聚合统计 (count/sum/min/max/阈值计数) 转换为日总结字典"""
+        count = stats['count']
+        
+        def percent(n: int) -> float:
+            return n * 100.0 / count if count else 0.0
         
         return {
             'date': date,
-            'reading_count': len(readings),
-            'min_glucose': stats.get('min_glucose'),
-            'max_glucose': stats.get('max_glucose'),
-            'avg_glucose': stats.get('avg_glucose'),
-            'time_in_range': tir
+            'reading_count': count,
+            'min_glucose': stats['min'],
+            'max_glucose': stats['max'],
+            'avg_glucose': stats['sum'] / count if count else None,
+            'time_in_range': percent(count - stats['below_70'] - stats['above_140']),
+            'time_below_range': percent(stats['below_70']),
+            'time_above_range': percent(stats['above_140'])
         }
     
+    def get_daily_summary(self, user_id: str, date: str) -> Dict:
+        """
+        获取指定日期 (UTC) 的血糖总结, 单次查询完成
+        
+        Args:
+            user_id: 用户ID
+            date: 日期 (YYYY-MM-DD 格式)
+            
+        Returns:
+            日总结字典 (min/max/avg/count, TIR 70-140, TBR <70, TAR >140)
+        """
+        day_start = timestamp_to_epoch_ms(f"{date}T00:00:00")
+        stats = CGMRollupRepository(self.conn).get_range_stats(
+            user_id, day_start, day_start + 24 * 60 * 60 * 1000 - 1
+        )
+        return self._daily_summary_from_stats(date, stats)
+    
+    def get_daily_summaries(self, user_id: str, start_day: str, end_day: str) -> List[Dict]:
+        """
+        获取日期范围内每天的血糖总结 (一次查询读取日聚合表)
+        
+        Args:
+            user_id: 用户ID
+            start_day: 开始日期 (YYYY-MM-DD, 含)
+            end_day: 结束日期 (YYYY-MM-DD, 含)
+            
+        Returns:
+            按日期升序的日总结列表, 无读数的日期不返回
+        """
+        rows = CGMRollupRepository(self.conn).get_daily_rollups(
+            user_id,
+            timestamp_to_epoch_ms(f"{start_day}T00:00:00"),
+            timestamp_to_epoch_ms(f"{end_day}T00:00:00")
+        )
+        
+        summaries = []
+        for row in rows:
+            date = datetime.fromtimestamp(row['bucket_start'] / 1000, tz=timezone.utc).date().isoformat()
+            summaries.append(self._daily_summary_from_stats(date, {
+                'count': row['reading_count'],
+                'sum': row['glucose_sum'],
+                'min': row['glucose_min'],
+                'max': row['glucose_max'],
+                'below_70': row['below_70'],
+                'above_140': row['above_140']
+            }))
+        return summaries
+    
+    def get_agp(
+        self,
+        user_id: str,
+        end_day: Optional[str] = None,
+        days: int = 14,
+        bin_minutes: int = 15
+    ) -> Dict:
+        """
+        获取动态血糖图谱 (AGP): 按一天内时段统计的 5/25/50/75/95 分位数
+        
+        结果按 (用户, 窗口结束日) 缓存; 窗口后移一天时只读取新一天的原始读数
+        
+        Args:
+            user_id: 用户ID
+            end_day: 窗口最后一天 (YYYY-MM-DD, UTC), 默认为最新读数所在日
+            days: 窗口天数 (默认 14)
+            bin_minutes: 时段宽度 (分钟, 需整除 1440)
+            
+        Returns:
+            AGP 字典 (profile: 每个时段的 time/count/p5/p25/p50/p75/p95,
+            start_day / end_day / days_with_data / reading_count / cached)
+        """
+        if end_day is None:
+            row = self.conn.execute(
+                'SELECT MAX(ts_epoch) FROM cgm_readings WHERE user_id = ?', (user_id,)
+            ).fetchone()
+            if row[0] is None:
+                end_day = datetime.now(timezone.utc).date().isoformat()
+            else:
+                end_day = datetime.fromtimestamp(row[0] / 1000, tz=timezone.utc).date().isoformat()
+        
+        agp = CGMAgpRepository(self.conn).get_agp(
+            user_id, timestamp_to_epoch_ms(f"{end_day}T00:00:00"), days, bin_minutes
+        )
+        agp['start_day'] = datetime.fromtimestamp(
+            agp.pop('start_day_ms') / 1000, tz=timezone.utc
+        ).date().isoformat()
+        agp.pop('end_day_ms')
+        agp['end_day'] = end_day
+        return agp
+    
     # ============================================================
     # 模式识别相关操作
     # ============================================================
@@ -793,39 +1506,24 @@ class CGMDatabase:
         
         cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
         
-        # 统计各类模式的数量
+        # 一次聚合: 各类模式的检测次数 (hit_count 累加) 及其中高严重性的次数
         cursor.execute('''
             SELECT 
                 pattern_type,
                 pattern_name,
-                COUNT(*) as count,
-                AVG(confidence) as avg_confidence,
-                MAX(severity) as max_severity
+                SUM(hit_count) as count,
+                SUM(confidence * hit_count) / SUM(hit_count) as avg_confidence,
+                MAX(severity) as max_severity,
+                SUM(CASE WHEN severity = 'high' THEN hit_count ELSE 0 END) as high_count
             FROM user_patterns
-            WHERE user_id = ? AND detected_at >= ?
+            WHERE user_id = ? AND last_seen >= ?
             GROUP BY pattern_type, pattern_name
             ORDER BY count DESC
         ''', (user_id, cutoff_time))
         
         patterns = [dict(row) for row in cursor.fetchall()]
-        
-        # 统计总数
-        cursor.execute('''
-            SELECT COUNT(*) as total_patterns
-            FROM user_patterns
-            WHERE user_id = ? AND detected_at >= ?
-        ''', (user_id, cutoff_time))
-        
-        total = cursor.fetchone()['total_patterns']
-        
-        # 统计高严重性模式
-        cursor.execute('''
-            SELECT COUNT(*) as high_severity_count
-            FROM user_patterns
-            WHERE user_id = ? AND detected_at >= ? AND severity = 'high'
-        ''', (user_id, cutoff_time))
-        
-        high_severity = cursor.fetchone()['high_severity_count']
+        total = sum(p['count'] for p in patterns)
+        high_severity = sum(p.pop('high_count') for p in patterns)
         
         return {
             'user_id': user_id,
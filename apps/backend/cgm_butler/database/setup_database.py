@@ -1,15 +1,38 @@
 # setup_database.py
 # -*- coding: utf-8 -*-
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import random
 import sys
 import io
+import os
 
 # 设置 Windows 控制台输出编码
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+# 添加项目根目录到路径 (用于 shared 模块)
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from shared.database.schema import (
+    CGM_ROLLUP_HOURLY_TABLE,
+    CGM_ROLLUP_DAILY_TABLE,
+    CGM_AGP_DAILY_TABLE,
+    CGM_AGP_PROFILE_TABLE,
+    GLUCOSE_EVENTS_TABLE,
+    GLUCOSE_EVENT_STATE_TABLE,
+    MEAL_RESPONSES_TABLE,
+    MEAL_RESPONSES_INDEX,
+    FOOD_RESPONSE_INDEX_TABLE,
+    FOOD_RESPONSE_STATE_TABLE,
+    CGM_ALERT_STATE_TABLE,
+    CGM_ALERT_OUTBOX_TABLE,
+    CGM_ALERT_OUTBOX_INDEX,
+)
+from shared.database.repositories.cgm_rollup_repository import CGMRollupRepository
+
 def create_database():
     """创建 CGM Butler 数据库并填充初始数据"""
     conn = sqlite3.connect('cgm_butler.db')
@@ -39,18 +62,52 @@ def create_database():
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id TEXT NOT NULL,
         timestamp TEXT NOT NULL,
+        ts_epoch INTEGER NOT NULL,
         glucose_value INTEGER NOT NULL,
+        local_time TEXT,
+        trend INTEGER,
         created_at TEXT DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY (user_id) REFERENCES users(user_id)
     )
     ''')
     
-    # 为 CGM 读数表创建索引以提高查询性能
+    # 为 CGM 读数表创建唯一索引 (查询性能 + 同一时间点不重复)
     cursor.execute('''
-    CREATE INDEX IF NOT EXISTS idx_user_timestamp 
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_cgm_readings_user_timestamp
     ON cgm_readings(user_id, timestamp)
     ''')
     
+    # 范围查询索引 (整数 UTC 毫秒时间戳)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_cgm_readings_user_epoch
+    ON cgm_readings(user_id, ts_epoch)
+    ''')
+    
+    # 血糖小时/日聚合表 (统计查询使用)
+    cursor.execute(CGM_ROLLUP_HOURLY_TABLE)
+    cursor.execute(CGM_ROLLUP_DAILY_TABLE)
+    
+    # AGP 每日分布缓存 / 窗口结果缓存 (查询时按需填充)
+    cursor.execute(CGM_AGP_DAILY_TABLE)
+    cursor.execute(CGM_AGP_PROFILE_TABLE)
+    
+    # 持续低/高血糖事件及其扫描水位 (查询时增量刷新)
+    cursor.execute(GLUCOSE_EVENTS_TABLE)
+    cursor.execute(GLUCOSE_EVENT_STATE_TABLE)
+    
+    # 实时提醒规则状态与待投递提醒 (写入读数时同一事务内评估)
+    cursor.execute(CGM_ALERT_STATE_TABLE)
+    cursor.execute(CGM_ALERT_OUTBOX_TABLE)
+    cursor.execute(CGM_ALERT_OUTBOX_INDEX)
+    
+    # 餐后血糖反应 (查询时为缺失或过期的餐计算)
+    cursor.execute(MEAL_RESPONSES_TABLE)
+    cursor.execute(MEAL_RESPONSES_INDEX)
+    
+    # 每用户每种食物的反应汇总及其同步水位
+    cursor.execute(FOOD_RESPONSE_INDEX_TABLE)
+    cursor.execute(FOOD_RESPONSE_STATE_TABLE)
+    
     # 3. 创建 CGM Pattern 和 Action 映射表
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS cgm_pattern_actions (
@@ -124,17 +181,24 @@ def create_database():
                 cgm_data.append((
                     'user_001', 
                     timestamp.isoformat(), 
+                    int(timestamp.replace(tzinfo=timezone.utc).timestamp() * 1000),
                     glucose,
                     datetime.now().isoformat()
                 ))
     
     cursor.executemany(
-        'INSERT INTO cgm_readings (user_id, timestamp, glucose_value, created_at) VALUES (?, ?, ?, ?)',
+        'INSERT INTO cgm_readings (user_id, timestamp, ts_epoch, glucose_value, created_at) VALUES (?, ?, ?, ?, ?)',
         cgm_data
     )
     
     print(f"[完成] CGM 读数数据插入完成: {len(cgm_data)} 条记录")
     
+    # 生成聚合数据 (仓储层需要按列名访问的行)
+    conn.commit()
+    conn.row_factory = sqlite3.Row
+    CGMRollupRepository(conn).rebuild('user_001')
+    print("[完成] 血糖聚合数据生成完成")
+    
     # 插入 pattern-action 映射数据
     print("\n正在插入 Pattern-Action 映射数据...")
     actions = [
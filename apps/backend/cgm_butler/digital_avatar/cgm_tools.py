@@ -60,6 +60,19 @@ class CGMTools:
             glucose = reading['glucose_value']
             timestamp = reading['timestamp']
             
+            # 最近 30 分钟走势 (列式序列, 不逐条构造 dict)
+            window_start = datetime.fromisoformat(timestamp) - timedelta(minutes=30)
+            series = db.get_reading_series(user_id, start_time=window_start.isoformat(), end_time=timestamp)
+            trend = None
+            if len(series) >= 2:
+                change = float(series.glucose[-1] - series.glucose[0])
+                if change > 15:
+                    trend = "rising"
+                elif change < -15:
+                    trend = "falling"
+                else:
+                    trend = "stable"
+            
             # Determine status
             if glucose < 70:
                 status = "Low"
@@ -80,6 +93,7 @@ class CGMTools:
                 "unit": "mg/dL",
                 "status": status,
                 "status_emoji": status_emoji,
+                "trend": trend,
                 "timestamp": timestamp,
                 "message": f"Your current glucose is {glucose} mg/dL ({status}) {status_emoji}"
             }
@@ -128,7 +142,152 @@ class CGMTools:
                 "reading_count": stats['count'],
                 "message": f"In the last {hours} hours: Average {stats['avg_glucose']:.1f} mg/dL, Time in Range {tir:.1f}%"
             }
-    
+
+    def get_glucose_profile(self, user_id: str, days: int = 14) -> Dict[str, Any]:
+        """
+        Get the user's typical day (Ambulatory Glucose Profile).
+
+        Args:
+            user_id: User identifier
+            days: Number of days in the profile (default: 14)
+
+        Returns:
+            Median and spread by time of day, highest and most variable times
+        """
+        with CGMDatabase(self.db_path) as db:
+            agp = db.get_agp(user_id, days=days, bin_minutes=60)
+
+        hours = [row for row in agp['profile'] if row['p50'] is not None]
+        if not hours:
+            return {
+                "success": False,
+                "message": f"No data available for the last {days} days"
+            }
+
+        # 按时段汇总每小时的中位数和四分位距 (UTC)
+        periods = {}
+        for name, first, last in (("overnight", 0, 5), ("morning", 6, 11),
+                                  ("afternoon", 12, 17), ("evening", 18, 23)):
+            rows = [row for row in hours if first <= int(row['time'][:2]) <= last]
+            if rows:
+                periods[name] = {
+                    "median_glucose": round(sum(row['p50'] for row in rows) / len(rows), 1),
+                    "typical_range": [
+                        round(sum(row['p25'] for row in rows) / len(rows), 1),
+                        round(sum(row['p75'] for row in rows) / len(rows), 1)
+                    ]
+                }
+
+        highest = max(hours, key=lambda row: row['p50'])
+        widest = max(hours, key=lambda row: row['p75'] - row['p25'])
+        return {
+            "success": True,
+            "time_period": f"{agp['start_day']} to {agp['end_day']}",
+            "days_with_data": agp['days_with_data'],
+            "periods": periods,
+            "highest_time": highest['time'],
+            "highest_median": highest['p50'],
+            "most_variable_time": widest['time'],
+            "message": (
+                f"Over the last {days} days your glucose is typically highest around {highest['time']} "
+                f"(median {highest['p50']:.0f} mg/dL) and most variable around {widest['time']}."
+            )
+        }
+
+    def get_meal_responses(self, user_id: str, days: int = 7) -> Dict[str, Any]:
+        """
+        Get how the user's glucose responded to recently logged meals.
+
+        Args:
+            user_id: User identifier
+            days: Number of days of food logs to include (default: 7)
+
+        Returns:
+            Per-meal rise, time to peak and recovery, largest responses first
+        """
+        start_day = (datetime.utcnow() - timedelta(days=days)).date().isoformat()
+        with CGMDatabase(self.db_path) as db:
+            responses = db.get_meal_responses(user_id, start_day=start_day)
+
+        meals = sorted(
+            (r for r in responses if r['rise'] is not None),
+            key=lambda r: r['rise'],
+            reverse=True
+        )
+        if not meals:
+            return {
+                "success": False,
+                "message": f"No logged meals with glucose data in the last {days} days"
+            }
+
+        biggest = meals[0]
+        return {
+            "success": True,
+            "time_period": f"Last {days} days",
+            "meal_count": len(meals),
+            "spike_count": sum(1 for r in meals if r['has_spike']),
+            "meals": [
+                {
+                    "title": r['title'],
+                    "time": r['timestamp_utc'],
+                    "rise": r['rise'],
+                    "peak_glucose": r['peak_glucose'],
+                    "time_to_peak_minutes": r['time_to_peak_minutes'],
+                    "return_to_baseline_minutes": r['return_to_baseline_minutes'],
+                    "iauc": r['iauc']
+                }
+                for r in meals
+            ],
+            "message": (
+                f"Of {len(meals)} logged meals, {biggest['title']} raised your glucose the most "
+                f"(+{biggest['rise']:.0f} mg/dL, peaking after {biggest['time_to_peak_minutes']:.0f} minutes)."
+            )
+        }
+
+    def get_food_response(self, user_id: str, food: str) -> Dict[str, Any]:
+        """
+        Get how a specific food usually affects the user's glucose.
+
+        Args:
+            user_id: User identifier
+            food: Food name as the user would log it (e.g. "oatmeal")
+
+        Returns:
+            Typical rise (mean, median, 90th percentile), spike count and iAUC
+            over every logged meal with that name
+        """
+        with CGMDatabase(self.db_path) as db:
+            response = db.get_food_response(user_id, food)
+
+        if not response:
+            return {
+                "success": False,
+                "message": f"No logged meals of {food} yet"
+            }
+        if not response['meal_count']:
+            return {
+                "success": False,
+                "message": f"{response['title']} was logged {response['log_count']} times, but without glucose data around the meals"
+            }
+
+        return {
+            "success": True,
+            "food": response['title'],
+            "times_logged": response['log_count'],
+            "meals_with_data": response['meal_count'],
+            "mean_rise": response['mean_rise'],
+            "median_rise": response['median_rise'],
+            "p90_rise": response['p90_rise'],
+            "max_rise": response['max_rise'],
+            "spike_count": response['spike_count'],
+            "mean_iauc": response['mean_iauc'],
+            "last_eaten": response['last_eaten_utc'],
+            "message": (
+                f"{response['title']} usually raises your glucose by about {response['median_rise']:.0f} mg/dL "
+                f"(spiked {response['spike_count']} of {response['meal_count']} times)."
+            )
+        }
+
     def get_recent_patterns(self, user_id: str, hours: int = 24) -> Dict[str, Any]:
         """
         Get recently detected glucose patterns.
@@ -140,46 +299,52 @@ class CGMTools:
         Returns:
             Detected patterns
         """
-        with CGMDatabase(self.db_path) as db:
-            patterns = db.get_latest_patterns(user_id, hours=hours)
-            
-            if not patterns:
-                return {
-                    "success": True,
-                    "pattern_count": 0,
-                    "patterns": [],
-                    "message": f"No significant patterns detected in the last {hours} hours. Your glucose control looks good! ✅"
-                }
-            
-            # Format patterns for conversation
-            pattern_summaries = []
-            high_severity_count = 0
-            
-            for pattern in patterns:
-                if pattern['severity'] == 'high':
-                    high_severity_count += 1
-                
-                pattern_summaries.append({
-                    "name": pattern['pattern_name'],
-                    "description": pattern['description'],
-                    "severity": pattern['severity'],
-                    "confidence": round(pattern['confidence'] * 100, 1),
-                    "details": pattern['details']
-                })
-            
-            # Generate message
-            if high_severity_count > 0:
-                message = f"⚠️ Found {len(patterns)} patterns in the last {hours} hours, including {high_severity_count} that need attention."
-            else:
-                message = f"Found {len(patterns)} patterns in the last {hours} hours. Let me explain them to you."
-            
+        # 读数未变化时直接使用缓存的最新检测结果 (同样只取 hours 内检测到的)
+        patterns = self.pattern_identifier.get_cached_patterns(user_id)
+        if patterns is not None:
+            cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
+            patterns = [p for p in patterns if p['detected_at'] >= cutoff_time]
+        else:
+            with CGMDatabase(self.db_path) as db:
+                patterns = db.get_latest_patterns(user_id, hours=hours)
+        
+        if not patterns:
             return {
                 "success": True,
-                "pattern_count": len(patterns),
-                "high_severity_count": high_severity_count,
-                "patterns": pattern_summaries,
-                "message": message
+                "pattern_count": 0,
+                "patterns": [],
+                "message": f"No significant patterns detected in the last {hours} hours. Your glucose control looks good! ✅"
             }
+        
+        # Format patterns for conversation
+        pattern_summaries = []
+        high_severity_count = 0
+        
+        for pattern in patterns:
+            if pattern['severity'] == 'high':
+                high_severity_count += 1
+            
+            pattern_summaries.append({
+                "name": pattern['pattern_name'],
+                "description": pattern['description'],
+                "severity": pattern['severity'],
+                "confidence": round(pattern['confidence'] * 100, 1),
+                "details": pattern['details']
+            })
+        
+        # Generate message
+        if high_severity_count > 0:
+            message = f"⚠️ Found {len(patterns)} patterns in the last {hours} hours, including {high_severity_count} that need attention."
+        else:
+            message = f"Found {len(patterns)} patterns in the last {hours} hours. Let me explain them to you."
+        
+        return {
+            "success": True,
+            "pattern_count": len(patterns),
+            "high_severity_count": high_severity_count,
+            "patterns": pattern_summaries,
+            "message": message
+        }
     
     def get_pattern_actions(self, user_id: str) -> Dict[str, Any]:
         """
@@ -324,6 +489,62 @@ FUNCTION_DEFINITIONS = [
             "required": ["user_id"]
         }
     },
+    {
+        "name": "get_glucose_profile",
+        "description": "Get the user's typical glucose by time of day over recent days (Ambulatory Glucose Profile)",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "The user identifier"
+                },
+                "days": {
+                    "type": "integer",
+                    "description": "Number of days in the profile (default: 14)",
+                    "default": 14
+                }
+            },
+            "required": ["user_id"]
+        }
+    },
+    {
+        "name": "get_meal_responses",
+        "description": "Get how glucose responded to recently logged meals (rise, time to peak, recovery)",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "The user identifier"
+                },
+                "days": {
+                    "type": "integer",
+                    "description": "Number of days of meals to include (default: 7)",
+                    "default": 7
+                }
+            },
+            "required": ["user_id"]
+        }
+    },
+    {
+        "name": "get_food_response",
+        "description": "Get how a specific food usually affects the user's glucose, across every time they logged it",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "user_id": {
+                    "type": "string",
+                    "description": "The user identifier"
+                },
+                "food": {
+                    "type": "string",
+                    "description": "Food name as logged, e.g. 'oatmeal'"
+                }
+            },
+            "required": ["user_id", "food"]
+        }
+    },
     {
         "name": "get_recent_patterns",
         "description": "Get recently detected glucose patterns (e.g., post-meal spikes, dawn phenomenon)",
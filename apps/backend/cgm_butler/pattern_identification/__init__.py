@@ -7,6 +7,9 @@ such as conversational agents, dashboards, and analytics tools.
 
 Main Components:
 - CGMPatternIdentifier: Core pattern detection class
+- FeatureFrame / VectorizedPatternEngine: Shared feature pre-pass and NumPy detectors
+- IncrementalPatternState: Per-user detector state updated reading by reading
+- DailyRuleEngine: Per-service-date rules in rules.json shape
 - Scheduler: Automated pattern identification scheduler
 
 Usage:
@@ -17,8 +20,19 @@ Usage:
 """
 
 from .identifier import CGMPatternIdentifier
+from .features import FeatureFrame, StageTimer
+from .engine import VectorizedPatternEngine
+from .incremental import IncrementalPatternState
+from .daily_rules import DailyRuleEngine
 
-__all__ = ['CGMPatternIdentifier']
+__all__ = [
+    'CGMPatternIdentifier',
+    'FeatureFrame',
+    'StageTimer',
+    'VectorizedPatternEngine',
+    'IncrementalPatternState',
+    'DailyRuleEngine',
+]
 __version__ = '1.0.0'
 
 
@@ -0,0 +1,527 @@
+"""
+Daily Pattern Rules
+
+Per-service-date rule results in the shape of
+apps/backend/data/example_user/*_rules.json:
+
+    {"2025-07-06": [{"pattern_id": "morning_hyperglycemia",
+                     "metrics": {...}, "evidence": {...},
+                     "confidence": 1.0, "version": "1.1.0"}, ...], ...}
+
+Each service date (UTC day) is evaluated over the most recent valid days
+up to and including it (7 days; 14 for persistent_hyperglycemia and
+day_to_day_variability). A day is valid when its readings cover at least
+MIN_DAY_COVERAGE of the expected 288. Only rules that fire are listed.
+
+Per-day features (means, CV, minutes above thresholds per time window,
+6-hour segments) are computed once for the whole history with NumPy
+group-by reductions; the per-day curve analyses for dual_peak and
+frequent_spike run once per day and are reused by every window that
+contains the day.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from shared.analytics import HYPER_THRESHOLD, ReadingSeries, sliding_max
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MINUTE_MS = 60 * 1000
+HOUR_MS = 60 * MINUTE_MS
+DAY_MS = 24 * HOUR_MS
+
+# 每天预期读数 (5 分钟间隔) 与有效日覆盖率
+EXPECTED_READINGS_PER_DAY = 288
+MIN_DAY_COVERAGE = 0.7
+
+# 分析窗口 (有效日数) 与评估所需最少有效日
+ANALYSIS_DAYS = 7
+EXTENDED_ANALYSIS_DAYS = 14
+MIN_ANALYSIS_DAYS = 5
+
+# 计算某日期范围时, 向前多加载的日历天数 (分析窗口最远回溯到这里)
+LOOKBACK_DAYS = 60
+
+# 读数代表的时长: 到下一条读数的间隔, 断档时最多计 15 分钟
+NOMINAL_READING_MINUTES = 5.0
+MAX_READING_GAP_MINUTES = 15.0
+
+MAX_EXAMPLES = 5
+
+RULE_VERSIONS = {
+    'morning_hyperglycemia': '1.1.0',
+    'overnight_hyperglycemia': '1.2.0',
+    'dual_peak': '1.0.0',
+    'persistent_hyperglycemia': '1.2.0',
+    'high_glycemic_variability': '1.0.0',
+    'day_to_day_variability': '1.0.0',
+    'frequent_spike': '1.0.0',
+}
+
+# 规则阈值
+MORNING = {'high_threshold': 130.0, 'window_start_hour': 4.0, 'window_end_hour': 8.0,
+           'min_minutes_high': 120.0, 'required_mornings': 3}
+OVERNIGHT = {'high_threshold': float(HYPER_THRESHOLD), 'percent_threshold': 0.5,
+             'window_start_hour': 22.0, 'window_end_hour': 6.0, 'nights_required': 3}
+DUAL_PEAK = {'first_peak_threshold': 180.0, 'secondary_rise_threshold': 30.0,
+             'drop_threshold': 20.0, 'max_minutes_between_peaks': 240.0,
+             'smoothing_readings': 11, 'required_days': 2}
+PERSISTENT = {'tar_threshold': 0.3, 'fraction_required': 0.4, 'mean_glucose_threshold': 200.0,
+              'mean_delta_threshold': 20.0, 'segments_required': 3, 'segment_minutes_threshold': 30.0}
+VARIABILITY = {'cv_threshold': 0.36, 'required_detection_days': 1}
+DAY_TO_DAY = {'cv_ratio_threshold': 1.15, 'range_ratio_threshold': 1.25,
+              'absolute_cv_threshold': 0.3, 'absolute_range_threshold': 60.0,
+              'weekends_required': 2, 'min_weekday_days': 5}
+SPIKE = {'rise_threshold': 50.0, 'rise_window_minutes': 60.0,
+         'recovery_minutes_threshold': 90.0, 'min_spikes_per_day': 3, 'required_days': 3}
+
+
+def day_to_date(day: int) -> str:
+    """UTC day number (epoch days) -> 'YYYY-MM-DD'."""
+    return (EPOCH + timedelta(days=int(day))).date().isoformat()
+
+
+def date_to_day(value: str) -> int:
+    """'YYYY-MM-DD' -> UTC day number (epoch days)."""
+    return (datetime.strptime(value[:10], '%Y-%m-%d').replace(tzinfo=timezone.utc) - EPOCH).days
+
+
+def _iso_time(ts_ms: int) -> str:
+    return (EPOCH + timedelta(milliseconds=int(ts_ms))).isoformat()
+
+
+def _rule(pattern_id: str, metrics: Dict, evidence: Dict, hits: int, required: int) -> Dict:
+    return {
+        'pattern_id': pattern_id,
+        'metrics': metrics,
+        'evidence': evidence,
+        'confidence': round(min(1.0, hits / required), 2),
+        'version': RULE_VERSIONS[pattern_id],
+    }
+
+
+class DailyRuleEngine:
+    """Evaluates the daily pattern rules over one user's full reading history."""
+
+    def __init__(self, series: ReadingSeries):
+        """
+        Args:
+            series: Readings in ascending time order (any length of history)
+        """
+        ts = series.ts
+        g = series.glucose.astype(np.float64)
+        self.ts = ts
+        self.glucose = g
+
+        reading_day = ts // DAY_MS
+        self.days, self._starts, inverse, counts = np.unique(
+            reading_day, return_index=True, return_inverse=True, return_counts=True
+        )
+        self._ends = np.append(self._starts[1:], len(ts))
+        n_days = len(self.days)
+        self.count = counts
+
+        minutes = np.minimum(np.diff(ts, append=ts[-1:] + int(NOMINAL_READING_MINUTES * MINUTE_MS)) / MINUTE_MS,
+                             MAX_READING_GAP_MINUTES) if len(ts) else np.zeros(0)
+        hours = (ts % DAY_MS) / HOUR_MS
+
+        def per_day(weights):
+            return np.bincount(inverse, weights=weights, minlength=n_days)
+
+        # 日均值 / 总体标准差 / CV / 极差
+        self.mean = per_day(g) / np.maximum(counts, 1)
+        self.std = np.sqrt(per_day((g - self.mean[inverse]) ** 2) / np.maximum(counts, 1))
+        self.cv = np.divide(self.std, self.mean, out=np.zeros(n_days), where=self.mean > 0)
+        self.min = np.minimum.reduceat(g, self._starts) if n_days else np.zeros(0)
+        self.max = np.maximum.reduceat(g, self._starts) if n_days else np.zeros(0)
+        self.coverage = np.minimum(counts / EXPECTED_READINGS_PER_DAY, 1.0)
+        self.valid = np.flatnonzero(self.coverage >= MIN_DAY_COVERAGE)
+        self.weekday = (self.days + 3) % 7  # 1970-01-01 为周四; 0 = 周一
+
+        # 高/低血糖占比 (按读数) 与 6 小时分段的高血糖分钟数
+        high = g > HYPER_THRESHOLD
+        self.count_high = per_day(high.astype(np.float64))
+        self.count_low = per_day((g < 70).astype(np.float64))
+        segment = np.minimum((hours // 6).astype(np.int64), 3)
+        self.segment_high_minutes = np.bincount(
+            inverse * 4 + segment, weights=minutes * high, minlength=n_days * 4
+        ).reshape(n_days, 4)
+
+        # 清晨 (4-8 点) 高于阈值的分钟数
+        morning = (hours >= MORNING['window_start_hour']) & (hours < MORNING['window_end_hour'])
+        self.morning_high_minutes = per_day(minutes * (morning & (g > MORNING['high_threshold'])))
+
+        # 夜间 22-6 点归入结束当天的服务日
+        night = (hours >= OVERNIGHT['window_start_hour']) | (hours < OVERNIGHT['window_end_hour'])
+        night_day = (ts + (24 - int(OVERNIGHT['window_start_hour'])) * HOUR_MS) // DAY_MS
+        pos = np.searchsorted(self.days, night_day)
+        on_day = night & (pos < n_days) & (self.days[np.minimum(pos, n_days - 1)] == night_day) \
+            if n_days else night
+        self.night_minutes = np.bincount(pos[on_day], weights=minutes[on_day], minlength=n_days)
+        self.night_high_minutes = np.bincount(
+            pos[on_day], weights=minutes[on_day] * (g[on_day] > OVERNIGHT['high_threshold']), minlength=n_days
+        )
+
+        self._dual_peaks: Dict[int, Optional[Dict]] = {}
+        self._spikes: Dict[int, List[Dict]] = {}
+
+    # ------------------------------------------------------------
+    # 按天的曲线分析 (缓存, 多个窗口共用)
+    # ------------------------------------------------------------
+
+    def _day_slice(self, p: int):
+        return slice(self._starts[p], self._ends[p])
+
+    def dual_peak(self, p: int) -> Optional[Dict]:
+        """First peak >= threshold, a dip, then a second rise within the gap limit."""
+        if p in self._dual_peaks:
+            return self._dual_peaks[p]
+
+        result = None
+        day = self._day_slice(p)
+        ts, g = self.ts[day], self.glucose[day]
+        width = DUAL_PEAK['smoothing_readings']
+        if len(g) > width:
+            # 居中滑动平均, 只保留完整窗口 (首尾各 width // 2 条读数不参与)
+            csum = np.concatenate(([0.0], np.cumsum(g)))
+            smooth = np.full(len(g), -np.inf)
+            smooth[width // 2:len(g) - width // 2] = (csum[width:] - csum[:-width]) / width
+
+            # 两个峰都须为平滑曲线的局部极大值 (窗口末端仍在上升不算第二峰)
+            # 行 = >= 阈值的候选第一峰, 列 = 其后 240 分钟内的读数
+            local_max = np.r_[False, smooth[1:] >= smooth[:-1]] & np.r_[smooth[:-1] >= smooth[1:], False]
+            starts = np.flatnonzero(local_max & (smooth >= DUAL_PEAK['first_peak_threshold']))
+            gap_ms = DUAL_PEAK['max_minutes_between_peaks'] * MINUTE_MS
+            span = int(np.max(np.searchsorted(ts, ts[starts] + gap_ms, 'right') - starts)) if len(starts) else 0
+            if span > 1:
+                after = starts[:, None] + np.arange(1, span)
+                in_window = (after < len(g)) & (ts[np.minimum(after, len(g) - 1)] - ts[starts, None] <= gap_ms)
+                in_window &= smooth[np.minimum(after, len(g) - 1)] > -np.inf
+                values = np.where(in_window, smooth[np.minimum(after, len(g) - 1)], np.inf)
+                nadir = np.minimum.accumulate(values, axis=1)
+                rise = np.where(in_window, values - np.where(in_window, nadir, 0.0), -np.inf)
+                ok = (rise >= DUAL_PEAK['secondary_rise_threshold']) & \
+                     (smooth[starts, None] - nadir >= DUAL_PEAK['drop_threshold']) & \
+                     local_max[np.minimum(after, len(g) - 1)]
+                rows = np.flatnonzero(ok.any(axis=1))
+                if len(rows):
+                    # 最早的候选峰; 第二峰取其后回升幅度最大处
+                    row = rows[0]
+                    second = int(np.argmax(np.where(ok[row], rise[row], -np.inf)))
+                    low = int(np.argmin(values[row, :second + 1]))
+                    first, low, second = starts[row], after[row, low], after[row, second]
+                    result = {
+                        'service_date': day_to_date(self.days[p]),
+                        'first_peak_value': float(smooth[first]),
+                        'second_peak_value': float(smooth[second]),
+                        'nadir_value': float(smooth[low]),
+                        'drop_from_first': float(smooth[first] - smooth[low]),
+                        'secondary_rise': float(smooth[second] - smooth[low]),
+                        'time_between_peaks_minutes': float((ts[second] - ts[first]) / MINUTE_MS),
+                        'first_peak_time': _iso_time(ts[first]),
+                        'nadir_time': _iso_time(ts[low]),
+                        'second_peak_time': _iso_time(ts[second]),
+                    }
+
+        self._dual_peaks[p] = result
+        return result
+
+    def spikes(self, p: int) -> List[Dict]:
+        """Rises >= threshold within the rise window that recover halfway within the recovery limit."""
+        if p in self._spikes:
+            return self._spikes[p]
+
+        day = self._day_slice(p)
+        ts, g = self.ts[day], self.glucose[day]
+        rise_ms = SPIKE['rise_window_minutes'] * MINUTE_MS
+        recovery_ms = SPIKE['recovery_minutes_threshold'] * MINUTE_MS
+
+        # 候选起点: 后续 12 条读数内最大值超过阈值 (向量化筛选, 再逐个确认时间窗口)
+        width = int(SPIKE['rise_window_minutes'] // NOMINAL_READING_MINUTES) + 1
+        padded = np.concatenate((g, np.full(width - 1, -np.inf)))
+        candidates = np.flatnonzero(sliding_max(padded, width) - g >= SPIKE['rise_threshold'])
+
+        spikes = []
+        next_start = 0
+        for i in candidates:
+            if i < next_start:
+                continue
+            peak_end = np.searchsorted(ts, ts[i] + rise_ms, 'right')
+            peak = i + int(np.argmax(g[i:peak_end]))
+            amplitude = g[peak] - g[i]
+            if amplitude < SPIKE['rise_threshold']:
+                continue
+            recovery_end = np.searchsorted(ts, ts[peak] + recovery_ms, 'right')
+            recovered = np.flatnonzero(g[peak + 1:recovery_end] <= g[peak] - amplitude / 2)
+            if not len(recovered):
+                continue
+            k = peak + 1 + int(recovered[0])
+            spikes.append({
+                'start_time': _iso_time(ts[i]),
+                'peak_time': _iso_time(ts[peak]),
+                'recovery_time': _iso_time(ts[k]),
+                'baseline_glucose': float(g[i]),
+                'peak_glucose': float(g[peak]),
+                'recovery_glucose': float(g[k]),
+                'rise_amplitude': float(amplitude),
+                'time_to_peak_minutes': float((ts[peak] - ts[i]) / MINUTE_MS),
+                'recovery_minutes': float((ts[k] - ts[peak]) / MINUTE_MS),
+            })
+            next_start = k
+
+        self._spikes[p] = spikes
+        return spikes
+
+    # ------------------------------------------------------------
+    # 规则
+    # ------------------------------------------------------------
+
+    def morning_hyperglycemia(self, days: np.ndarray) -> Optional[Dict]:
+        hits = days[self.morning_high_minutes[days] >= MORNING['min_minutes_high']]
+        if len(hits) < MORNING['required_mornings']:
+            return None
+        return _rule('morning_hyperglycemia', {
+            'analysis_days_considered': len(days),
+            'morning_high_days': len(hits),
+            'high_threshold': MORNING['high_threshold'],
+            'window_start_hour': MORNING['window_start_hour'],
+            'window_end_hour': MORNING['window_end_hour'],
+        }, {
+            'examples': [
+                {'service_date': day_to_date(self.days[p]), 'minutes_high': float(self.morning_high_minutes[p])}
+                for p in hits[:MAX_EXAMPLES]
+            ],
+            'required_mornings': MORNING['required_mornings'],
+        }, len(hits), MORNING['required_mornings'])
+
+    def overnight_hyperglycemia(self, days: np.ndarray) -> Optional[Dict]:
+        window = self.night_minutes[days]
+        percent = np.divide(self.night_high_minutes[days], window, out=np.zeros(len(days)), where=window > 0)
+        hits = days[percent >= OVERNIGHT['percent_threshold']]
+        if len(hits) < OVERNIGHT['nights_required']:
+            return None
+        return _rule('overnight_hyperglycemia', {
+            'analysis_days_considered': len(days),
+            'overnight_high_nights': len(hits),
+            'percent_threshold': OVERNIGHT['percent_threshold'],
+            'high_threshold': OVERNIGHT['high_threshold'],
+            'nights_required': OVERNIGHT['nights_required'],
+            'window_start_hour': OVERNIGHT['window_start_hour'],
+            'window_end_hour': OVERNIGHT['window_end_hour'],
+        }, {
+            'examples': [
+                {
+                    'service_date': day_to_date(self.days[p]),
+                    'percent_high': float(self.night_high_minutes[p] / self.night_minutes[p]),
+                    'high_minutes': float(self.night_high_minutes[p]),
+                    'window_minutes': float(self.night_minutes[p]),
+                }
+                for p in hits[:MAX_EXAMPLES]
+            ],
+            'required_nights': OVERNIGHT['nights_required'],
+        }, len(hits), OVERNIGHT['nights_required'])
+
+    def dual_peak_rule(self, days: np.ndarray) -> Optional[Dict]:
+        found = [peak for peak in (self.dual_peak(p) for p in days) if peak]
+        if len(found) < DUAL_PEAK['required_days']:
+            return None
+        return _rule('dual_peak', {
+            'analysis_days_considered': len(days),
+            'dual_peak_days': len(found),
+            'first_peak_threshold': DUAL_PEAK['first_peak_threshold'],
+            'secondary_rise_threshold': DUAL_PEAK['secondary_rise_threshold'],
+            'drop_threshold': DUAL_PEAK['drop_threshold'],
+            'max_minutes_between_peaks': DUAL_PEAK['max_minutes_between_peaks'],
+            'avg_secondary_rise': float(np.mean([f['secondary_rise'] for f in found])),
+            'avg_drop_from_first': float(np.mean([f['drop_from_first'] for f in found])),
+            'avg_time_between_peaks_minutes': float(np.mean([f['time_between_peaks_minutes'] for f in found])),
+        }, {
+            'examples': found[:MAX_EXAMPLES],
+            'required_days': DUAL_PEAK['required_days'],
+        }, len(found), DUAL_PEAK['required_days'])
+
+    def persistent_hyperglycemia(self, days: np.ndarray) -> Optional[Dict]:
+        percent_high = self.count_high[days] / self.count[days]
+        high_segments = (self.segment_high_minutes[days] >= PERSISTENT['segment_minutes_threshold']).sum(axis=1)
+        baseline = float(np.median(self.mean[days]))
+        mean = self.mean[days]
+        persistent = (
+            (percent_high >= PERSISTENT['tar_threshold'])
+            & (high_segments >= PERSISTENT['segments_required'])
+            & ((mean >= PERSISTENT['mean_glucose_threshold'])
+               | (mean >= baseline + PERSISTENT['mean_delta_threshold']))
+        )
+        required = math.ceil(PERSISTENT['fraction_required'] * len(days))
+        hits = days[persistent]
+        if len(hits) < required:
+            return None
+
+        examples = []
+        for p in hits[:MAX_EXAMPLES]:
+            examples.append({
+                'service_date': day_to_date(self.days[p]),
+                'percent_high': float(self.count_high[p] / self.count[p]),
+                'time_high_minutes': float(self.count_high[p] * NOMINAL_READING_MINUTES),
+                'mean_glucose': float(self.mean[p]),
+                'percent_low': float(self.count_low[p] / self.count[p]),
+                'high_segments': int((self.segment_high_minutes[p] >= PERSISTENT['segment_minutes_threshold']).sum()),
+                'segment_minutes': {
+                    f'{s * 6}-{s * 6 + 6}': float(self.segment_high_minutes[p, s]) for s in range(4)
+                },
+            })
+        return _rule('persistent_hyperglycemia', {
+            'analysis_days_considered': len(days),
+            'persistent_days': len(hits),
+            'tar_threshold': PERSISTENT['tar_threshold'],
+            'fraction_required': PERSISTENT['fraction_required'],
+            'mean_glucose_threshold': PERSISTENT['mean_glucose_threshold'],
+            'mean_delta_threshold': PERSISTENT['mean_delta_threshold'],
+            'baseline_mean_glucose': baseline,
+            'segments_required': PERSISTENT['segments_required'],
+            'segment_minutes_threshold': PERSISTENT['segment_minutes_threshold'],
+        }, {
+            'persistent_examples': examples,
+            'required_days': required,
+            'baseline_source': 'median_daily_mean',
+        }, len(hits), required)
+
+    def high_glycemic_variability(self, days: np.ndarray) -> Optional[Dict]:
+        hits = days[self.cv[days] >= VARIABILITY['cv_threshold']]
+        if len(hits) < VARIABILITY['required_detection_days']:
+            return None
+        return _rule('high_glycemic_variability', {
+            'analysis_days_considered': len(days),
+            'high_variability_days': len(hits),
+            'cv_threshold': VARIABILITY['cv_threshold'],
+            'required_detection_days': VARIABILITY['required_detection_days'],
+        }, {
+            'examples': [
+                {
+                    'service_date': day_to_date(self.days[p]),
+                    'coefficient_of_variation': float(self.cv[p]),
+                    'mean_glucose': float(self.mean[p]),
+                    'std_glucose': float(self.std[p]),
+                    'coverage_ratio': float(self.coverage[p]),
+                }
+                for p in hits[:MAX_EXAMPLES]
+            ],
+        }, len(hits), VARIABILITY['required_detection_days'])
+
+    def day_to_day_variability(self, days: np.ndarray) -> Optional[Dict]:
+        weekdays = days[self.weekday[days] < 5]
+        weekends = days[self.weekday[days] >= 5]
+        if len(weekdays) < DAY_TO_DAY['min_weekday_days'] or not len(weekends):
+            return None
+        weekday_cv = float(self.cv[weekdays].mean())
+        weekday_range = float((self.max[weekdays] - self.min[weekdays]).mean())
+
+        # 周末按 ISO 周合并 (周六 + 周日的全部读数)
+        weeks: Dict[str, List[int]] = {}
+        for p in weekends:
+            year, week, _ = (EPOCH + timedelta(days=int(self.days[p]))).isocalendar()
+            weeks.setdefault(f'{year}-W{week:02d}', []).append(p)
+
+        qualifying = []
+        for week_id, group in weeks.items():
+            n = self.count[group].sum()
+            mean = float((self.mean[group] * self.count[group]).sum() / n)
+            variance = float(((self.std[group] ** 2 + (self.mean[group] - mean) ** 2) * self.count[group]).sum() / n)
+            cv = math.sqrt(variance) / mean
+            value_range = float(self.max[group].max() - self.min[group].min())
+
+            cv_ratio = max(cv, weekday_cv) / max(min(cv, weekday_cv), 1e-9)
+            range_ratio = max(value_range, weekday_range) / max(min(value_range, weekday_range), 1e-9)
+            differs = cv_ratio >= DAY_TO_DAY['cv_ratio_threshold'] or \
+                range_ratio >= DAY_TO_DAY['range_ratio_threshold']
+            material = max(cv, weekday_cv) >= DAY_TO_DAY['absolute_cv_threshold'] or \
+                max(value_range, weekday_range) >= DAY_TO_DAY['absolute_range_threshold']
+            if differs and material:
+                qualifying.append({
+                    'week_identifier': week_id,
+                    'dates': [day_to_date(self.days[p]) for p in group],
+                    'weekend_cv': cv,
+                    'weekend_range': value_range,
+                    'weekday_cv_avg': weekday_cv,
+                    'weekday_range_avg': weekday_range,
+                })
+
+        if len(qualifying) < DAY_TO_DAY['weekends_required']:
+            return None
+        return _rule('day_to_day_variability', {
+            'analysis_days_considered': len(days),
+            'weekday_baseline_days': len(weekdays),
+            'qualifying_weekends': len(qualifying),
+            'weekends_required': DAY_TO_DAY['weekends_required'],
+            'weekday_cv_avg': weekday_cv,
+            'weekday_range_avg': weekday_range,
+            'cv_ratio_threshold': DAY_TO_DAY['cv_ratio_threshold'],
+            'range_ratio_threshold': DAY_TO_DAY['range_ratio_threshold'],
+            'absolute_cv_threshold': DAY_TO_DAY['absolute_cv_threshold'],
+            'absolute_range_threshold': DAY_TO_DAY['absolute_range_threshold'],
+        }, {
+            'examples': qualifying[:MAX_EXAMPLES],
+        }, len(qualifying), DAY_TO_DAY['weekends_required'])
+
+    def frequent_spike(self, days: np.ndarray) -> Optional[Dict]:
+        spike_days = [(p, self.spikes(p)) for p in days]
+        hits = [(p, spikes) for p, spikes in spike_days if len(spikes) >= SPIKE['min_spikes_per_day']]
+        if len(hits) < SPIKE['required_days']:
+            return None
+        return _rule('frequent_spike', {
+            'analysis_days_considered': len(days),
+            'frequent_spike_days': len(hits),
+            'avg_spikes_per_day': float(np.mean([len(spikes) for _, spikes in hits])),
+            'rise_threshold': SPIKE['rise_threshold'],
+            'rise_window_minutes': SPIKE['rise_window_minutes'],
+            'recovery_minutes_threshold': SPIKE['recovery_minutes_threshold'],
+        }, {
+            'examples': [
+                {'service_date': day_to_date(self.days[p]), 'spike_count': len(spikes), 'examples': spikes[:3]}
+                for p, spikes in hits[:MAX_EXAMPLES]
+            ],
+            'required_days': SPIKE['required_days'],
+        }, len(hits), SPIKE['required_days'])
+
+    # ------------------------------------------------------------
+    # 评估
+    # ------------------------------------------------------------
+
+    def evaluate(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """
+        Rule results for every service date with readings in [start_date, end_date].
+
+        Args:
+            start_date: First service date 'YYYY-MM-DD' (default: first day with data)
+            end_date: Last service date 'YYYY-MM-DD' (default: last day with data)
+
+        Returns:
+            {service_date: [rule result, ...]} for dates where at least one rule fired
+        """
+        first = np.searchsorted(self.days, date_to_day(start_date)) if start_date else 0
+        last = np.searchsorted(self.days, date_to_day(end_date), 'right') if end_date else len(self.days)
+
+        results = {}
+        for p in range(first, last):
+            valid_upto = np.searchsorted(self.valid, p, 'right')
+            days = self.valid[max(valid_upto - ANALYSIS_DAYS, 0):valid_upto]
+            if len(days) < MIN_ANALYSIS_DAYS:
+                continue
+            extended = self.valid[max(valid_upto - EXTENDED_ANALYSIS_DAYS, 0):valid_upto]
+
+            rules = [
+                self.morning_hyperglycemia(days),
+                self.overnight_hyperglycemia(days),
+                self.dual_peak_rule(days),
+                self.persistent_hyperglycemia(extended),
+                self.high_glycemic_variability(days),
+                self.day_to_day_variability(extended),
+                self.frequent_spike(days),
+            ]
+            rules = [rule for rule in rules if rule]
+            if rules:
+                results[day_to_date(self.days[p])] = rules
+        return results
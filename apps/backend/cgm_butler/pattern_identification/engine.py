@@ -0,0 +1,264 @@
+"""
+Vectorized Pattern Detection Engine
+
+NumPy implementations of the ten CGMPatternIdentifier detectors. Each
+detector reads precomputed features (rolling window extremes, hour-of-day
+masks, global statistics) from a shared FeatureFrame instead of
+re-slicing a list of dicts for every index.
+
+Thresholds and result formatting live in the *_result builders below, which
+take the summary numbers a detector needs (counts, sums, extremes). The
+batch engine and the incremental state (incremental.py) both feed them, so
+the two modes cannot drift apart.
+
+Results are identical to the list-based detectors in identifier.py,
+including float confidences (means and standard deviations are computed
+exactly, like the statistics module does).
+"""
+
+from typing import Callable, Dict, List, Optional
+
+from .features import FeatureFrame
+
+
+# 检测阈值或逻辑变化时递增, 已缓存的检测结果随之失效
+DETECTOR_VERSION = 1
+
+
+# ============================================================
+# 结果构建 (批量引擎与增量状态共用)
+# ============================================================
+
+def post_meal_spike_result(count: int, spike_count: int, max_spike: int) -> Optional[Dict]:
+    """>50 mg/dL rise to >140 mg/dL within 2 hours, at least 3 times."""
+    if count < 24 or spike_count < 3:
+        return None
+    return {
+        'pattern_type': 'post_meal_spike',
+        'confidence': min(0.9, 0.5 + (spike_count * 0.1)),
+        'details': f'Detected {spike_count} post-meal spikes, max spike: {max_spike:.0f} mg/dL',
+        'severity': 'high' if max_spike > 80 else 'medium'
+    }
+
+
+def dawn_phenomenon_result(
+    morning_count: int,
+    morning_sum: int,
+    overnight_count: int,
+    overnight_sum: int
+) -> Optional[Dict]:
+    """4-8 AM average >20 mg/dL above the 12-4 AM average."""
+    if morning_count < 10 or not overnight_count:
+        return None
+
+    rise = morning_sum / morning_count - overnight_sum / overnight_count
+    if rise <= 20:
+        return None
+    return {
+        'pattern_type': 'dawn_phenomenon',
+        'confidence': min(0.9, 0.6 + (rise / 100)),
+        'details': f'Average glucose rise of {rise:.0f} mg/dL in early morning',
+        'severity': 'high' if rise > 40 else 'medium'
+    }
+
+
+def nocturnal_hypoglycemia_result(low_count: int, lowest: Optional[int]) -> Optional[Dict]:
+    """At least 3 readings <70 mg/dL between 12-6 AM."""
+    if low_count < 3:
+        return None
+    return {
+        'pattern_type': 'nocturnal_hypoglycemia',
+        'confidence': 0.9,
+        'details': f'Detected {low_count} low glucose episodes at night, lowest: {lowest} mg/dL',
+        'severity': 'high'
+    }
+
+
+def afternoon_dip_result(dip_count: int, dip_sum: int) -> Optional[Dict]:
+    """At least 5 readings <80 mg/dL between 2-5 PM."""
+    if dip_count < 5:
+        return None
+
+    avg_dip = dip_sum / dip_count
+    return {
+        'pattern_type': 'afternoon_dip',
+        'confidence': 0.7,
+        'details': f'Detected {dip_count} afternoon dips, average: {avg_dip:.0f} mg/dL',
+        'severity': 'low' if avg_dip > 70 else 'medium'
+    }
+
+
+def high_variability_result(count: int, mean: float, stdev: float) -> Optional[Dict]:
+    """Coefficient of variation >36%."""
+    if count < 50:
+        return None
+
+    cv = (stdev / mean) * 100
+    if cv <= 36:
+        return None
+    return {
+        'pattern_type': 'high_variability',
+        'confidence': min(0.9, 0.5 + (cv / 100)),
+        'details': f'Glucose variability (CV): {cv:.1f}%, std dev: {stdev:.0f} mg/dL',
+        'severity': 'high' if cv > 50 else 'medium'
+    }
+
+
+def sustained_hyperglycemia_result(count: int, high_count: int, high_sum: int) -> Optional[Dict]:
+    """>70% of readings above 180 mg/dL."""
+    if count < 50:
+        return None
+
+    percentage = (high_count / count) * 100
+    if percentage <= 70:
+        return None
+    return {
+        'pattern_type': 'sustained_hyperglycemia',
+        'confidence': 0.9,
+        'details': f'{percentage:.0f}% of readings above 180 mg/dL, average: {high_sum / high_count:.0f} mg/dL',
+        'severity': 'high'
+    }
+
+
+def frequent_hypoglycemia_result(count: int, low_count: int, low_sum: int) -> Optional[Dict]:
+    """>5% of readings below 70 mg/dL."""
+    if count < 50:
+        return None
+
+    percentage = (low_count / count) * 100
+    if percentage <= 5:
+        return None
+    return {
+        'pattern_type': 'frequent_hypoglycemia',
+        'confidence': 0.9,
+        'details': f'{percentage:.1f}% of readings below 70 mg/dL, average: {low_sum / low_count:.0f} mg/dL',
+        'severity': 'high'
+    }
+
+
+def post_exercise_drop_result(count: int, rapid_drops: int) -> Optional[Dict]:
+    """>30 mg/dL drop to <100 mg/dL within 1 hour, at least 3 times."""
+    if count < 12 or rapid_drops < 3:
+        return None
+    return {
+        'pattern_type': 'post_exercise_drop',
+        'confidence': 0.6,  # Lower confidence without exercise data
+        'details': f'Detected {rapid_drops} rapid glucose drops (possibly after exercise)',
+        'severity': 'medium'
+    }
+
+
+def stress_hyperglycemia_result(count: int, sudden_spikes: int) -> Optional[Dict]:
+    """>40 mg/dL rise from >120 mg/dL within 30 minutes, at least 5 times."""
+    if count < 24 or sudden_spikes < 5:
+        return None
+    return {
+        'pattern_type': 'stress_hyperglycemia',
+        'confidence': 0.5,  # Lower confidence without stress data
+        'details': f'Detected {sudden_spikes} sudden glucose spikes (possibly stress-related)',
+        'severity': 'medium'
+    }
+
+
+def roller_coaster_result(count: int, swings: int, lowest: int, highest: int) -> Optional[Dict]:
+    """At least 5 2-hour windows swinging between <80 and >160 mg/dL."""
+    if count < 50 or swings < 5:
+        return None
+    return {
+        'pattern_type': 'roller_coaster',
+        'confidence': 0.8,
+        'details': f'Detected {swings} glucose swings, range: {highest - lowest:.0f} mg/dL',
+        'severity': 'high'
+    }
+
+
+# ============================================================
+# 批量引擎
+# ============================================================
+
+class VectorizedPatternEngine:
+    """Runs the ten CGM pattern detectors over one user's FeatureFrame."""
+
+    def __init__(self, features: FeatureFrame):
+        """
+        Args:
+            features: Feature frame built once for the user's readings
+        """
+        self.features = features
+
+    def detect_post_meal_spike(self) -> Optional[Dict]:
+        f = self.features
+        peaks = f.window_max(24)
+        spikes = peaks - f.window_starts(24)
+        hits = (spikes > 50) & (peaks > 140)
+        spike_count = int(hits.sum())
+        max_spike = int(spikes[hits].max()) if spike_count else 0
+        return post_meal_spike_result(f.count, spike_count, max_spike)
+
+    def detect_dawn_phenomenon(self) -> Optional[Dict]:
+        f = self.features
+        morning = f.glucose[f.hour_mask(4, 8)]
+        overnight = f.glucose[f.hour_mask(0, 4)]
+        return dawn_phenomenon_result(
+            len(morning), int(morning.sum()), len(overnight), int(overnight.sum())
+        )
+
+    def detect_nocturnal_hypoglycemia(self) -> Optional[Dict]:
+        f = self.features
+        night_lows = f.glucose[f.hour_mask(0, 6) & f.low]
+        lowest = int(night_lows.min()) if len(night_lows) else None
+        return nocturnal_hypoglycemia_result(len(night_lows), lowest)
+
+    def detect_afternoon_dip(self) -> Optional[Dict]:
+        f = self.features
+        dips = f.glucose[f.hour_mask(14, 17) & (f.glucose < 80)]
+        return afternoon_dip_result(len(dips), int(dips.sum()))
+
+    def detect_high_variability(self) -> Optional[Dict]:
+        f = self.features
+        if f.count < 50:
+            return None
+        return high_variability_result(f.count, f.mean, f.stdev)
+
+    def detect_sustained_hyperglycemia(self) -> Optional[Dict]:
+        f = self.features
+        high = f.glucose[f.high]
+        return sustained_hyperglycemia_result(f.count, len(high), int(high.sum()))
+
+    def detect_frequent_hypoglycemia(self) -> Optional[Dict]:
+        f = self.features
+        low = f.glucose[f.low]
+        return frequent_hypoglycemia_result(f.count, len(low), int(low.sum()))
+
+    def detect_post_exercise_drop(self) -> Optional[Dict]:
+        f = self.features
+        lows = f.window_min(12)
+        rapid_drops = int((((f.window_starts(12) - lows) > 30) & (lows < 100)).sum())
+        return post_exercise_drop_result(f.count, rapid_drops)
+
+    def detect_stress_hyperglycemia(self) -> Optional[Dict]:
+        f = self.features
+        starts = f.window_starts(6)
+        peaks = f.window_max(6)
+        sudden_spikes = int((((peaks - starts) > 40) & (starts > 120)).sum())
+        return stress_hyperglycemia_result(f.count, sudden_spikes)
+
+    def detect_roller_coaster(self) -> Optional[Dict]:
+        f = self.features
+        swings = int(((f.window_min(24) < 80) & (f.window_max(24) > 160)).sum())
+        return roller_coaster_result(f.count, swings, f.min, f.max)
+
+    def detectors(self) -> List[Callable[[], Optional[Dict]]]:
+        """Bound detectors in CGMPatternIdentifier order."""
+        return [
+            self.detect_post_meal_spike,
+            self.detect_dawn_phenomenon,
+            self.detect_nocturnal_hypoglycemia,
+            self.detect_afternoon_dip,
+            self.detect_high_variability,
+            self.detect_sustained_hyperglycemia,
+            self.detect_frequent_hypoglycemia,
+            self.detect_post_exercise_drop,
+            self.detect_stress_hyperglycemia,
+            self.detect_roller_coaster,
+        ]
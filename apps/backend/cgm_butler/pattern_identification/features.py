@@ -0,0 +1,146 @@
+"""
+Pattern Detection Feature Frame
+
+One feature-extraction pass per user run: hour-of-day buckets, rolling
+window extremes, global metrics (shared.analytics.metrics) and low/high
+masks. All detectors read from the same FeatureFrame, so adding a detector
+does not add another scan of the readings.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+from shared.analytics import (
+    HYPO_THRESHOLD,
+    HYPER_THRESHOLD,
+    ReadingSeries,
+    exact_stdev_from_sums,
+    glucose_metrics,
+    sliding_max,
+    sliding_min,
+)
+
+
+# 预先计算的滚动窗口 (读数个数, 5 分钟间隔): 30 分钟 / 1 小时 / 2 小时
+DEFAULT_WINDOWS = (6, 12, 24)
+
+
+def exact_mean(values: np.ndarray) -> float:
+    """Same value as statistics.mean() on integer readings."""
+    return int(values.sum()) / len(values)
+
+
+def exact_stdev(values: np.ndarray) -> float:
+    """Same value as statistics.stdev() on integer readings."""
+    return exact_stdev_from_sums(len(values), int(values.sum()), int(np.dot(values, values)))
+
+
+class FeatureFrame:
+    """
+    Features of one user's readings shared by all pattern detectors.
+
+    Attributes:
+        glucose: int64 glucose values in time order
+        hours: int8 UTC hour of day per reading
+        count: Number of readings
+        metrics: glucose_metrics() of the readings (GMI, MAGE, MODD, ...)
+        mean / stdev / cv: Global statistics (None when undefined)
+        min / max: Global extremes (None when empty)
+        low / high: Masks of readings below HYPO / above HYPER thresholds
+    """
+
+    def __init__(self, series: ReadingSeries, windows: Iterable[int] = DEFAULT_WINDOWS):
+        """
+        Args:
+            series: Readings in ascending time order
+            windows: Rolling window lengths (readings) to precompute
+        """
+        g = np.rint(series.glucose).astype(np.int64)
+        self.glucose = g
+        self.hours = series.hours()
+        self.count = len(g)
+
+        # 小时区间掩码 (如 0-6 点) 按需缓存, 各检测器共用
+        self._hour_masks: Dict[Tuple[int, int], np.ndarray] = {}
+
+        self.metrics = glucose_metrics(series)
+        self.mean = self.metrics['mean']
+        self.stdev = self.metrics['sd']
+        self.cv = self.metrics['cv']
+        self.min = self.metrics['min']
+        self.max = self.metrics['max']
+
+        self.low = g < HYPO_THRESHOLD
+        self.high = g > HYPER_THRESHOLD
+
+        self._window_max: Dict[int, np.ndarray] = {}
+        self._window_min: Dict[int, np.ndarray] = {}
+        for window in windows:
+            self.window_max(window)
+            self.window_min(window)
+
+    def hour_mask(self, start_hour: int, end_hour: int) -> np.ndarray:
+        """Mask of readings with start_hour <= UTC hour < end_hour (cached)."""
+        key = (start_hour, end_hour)
+        if key not in self._hour_masks:
+            self._hour_masks[key] = (self.hours >= start_hour) & (self.hours < end_hour)
+        return self._hour_masks[key]
+
+    def window_starts(self, window: int) -> np.ndarray:
+        """
+        First value of each window the detectors scan.
+
+        Matches `for i in range(len(readings) - window)`: the final
+        full window is not visited.
+        """
+        return self.glucose[:max(self.count - window, 0)]
+
+    def window_max(self, window: int) -> np.ndarray:
+        """Max of glucose[i:i + window], aligned with window_starts (cached)."""
+        if window not in self._window_max:
+            self._window_max[window] = sliding_max(self.glucose, window)[:max(self.count - window, 0)]
+        return self._window_max[window]
+
+    def window_min(self, window: int) -> np.ndarray:
+        """Min of glucose[i:i + window], aligned with window_starts (cached)."""
+        if window not in self._window_min:
+            self._window_min[window] = sliding_min(self.glucose, window)[:max(self.count - window, 0)]
+        return self._window_min[window]
+
+
+class StageTimer:
+    """Accumulates wall time per named stage of a pattern run."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - started)
+
+    def merge(self, other: 'StageTimer'):
+        """Add another timer's stages into this one."""
+        for name, seconds in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def as_ms(self) -> Dict[str, float]:
+        """Stage -> milliseconds (rounded to 0.001)."""
+        return {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+
+    def report(self) -> str:
+        """Table of stages, slowest first, with share of the total."""
+        total = sum(self.stages.values())
+        width = max((len(name) for name in self.stages), default=5)
+        lines = [
+            f"  {name:<{width}}  {seconds * 1000:9.3f} ms  {seconds / (total or 1.0) * 100:5.1f}%"
+            for name, seconds in sorted(self.stages.items(), key=lambda item: -item[1])
+        ]
+        lines.append(f"  {'total':<{width}}  {total * 1000:9.3f} ms")
+        return '\n'.join(lines)
@@ -6,10 +6,35 @@ actionable recommendations for each detected pattern.
 """
 
 import sqlite3
+import json
 import os
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional, Tuple
 import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# 添加项目根目录到路径 (用于 shared 模块)
+# identifier.py -> pattern_identification -> cgm_butler -> backend -> apps -> my-glucose-pal (5层)
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from shared.analytics import ReadingSeries
+from shared.database.schema import (
+    USER_PATTERNS_TABLE, USER_PATTERNS_INDEX, DAILY_PATTERN_RULES_TABLE, DAILY_PATTERN_RULE_RUNS_TABLE
+)
+
+from .daily_rules import DAY_MS, LOOKBACK_DAYS, DailyRuleEngine, date_to_day, day_to_date
+from .engine import DETECTOR_VERSION, VectorizedPatternEngine
+from .features import FeatureFrame, StageTimer
+from .incremental import WINDOW_MS, IncrementalPatternState
+
+
+# 回填时每写入一次结果和检查点所处理的天数
+BACKFILL_CHECKPOINT_DAYS = 30
 
 
 class CGMPatternIdentifier:
@@ -91,41 +116,60 @@ class CGMPatternIdentifier:
             project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             db_path = os.path.join(project_root, 'database', 'cgm_butler.db')
         self.db_path = db_path
+        self._patterns_table_ready = False
+        self._rules_table_ready = False
     
     def _get_connection(self):
         """Get database connection."""
         return sqlite3.connect(self.db_path)
     
-    def get_user_readings(self, user_id: str, hours: int = 168) -> List[Dict]:
+    def get_user_series(self, user_id: str, hours: int = 168,
+                        conn: Optional[sqlite3.Connection] = None) -> ReadingSeries:
         """
-        Get CGM readings for a user within the specified time window.
+        Get CGM readings for a user as a columnar ReadingSeries.
         
         Args:
             user_id: User identifier
             hours: Number of hours to look back (default: 168 = 7 days)
+            conn: Open connection to reuse (left open); a new one otherwise
         
         Returns:
-            List of reading dictionaries with timestamp and glucose_value
+            ReadingSeries in ascending time order
         """
-        conn = self._get_connection()
+        own_conn = conn is None
+        if own_conn:
+            conn = self._get_connection()
         cursor = conn.cursor()
         
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=hours)
+        cutoff_epoch = int(cutoff_time.timestamp() * 1000)
         
         cursor.execute('''
-            SELECT timestamp, glucose_value
+            SELECT ts_epoch, glucose_value
             FROM cgm_readings
-            WHERE user_id = ? AND timestamp >= ?
-            ORDER BY timestamp ASC
-        ''', (user_id, cutoff_time.isoformat()))
+            WHERE user_id = ? AND ts_epoch >= ?
+            ORDER BY ts_epoch ASC
+        ''', (user_id, cutoff_epoch))
         
-        readings = [
-            {'timestamp': datetime.fromisoformat(row[0]), 'glucose_value': row[1]}
-            for row in cursor.fetchall()
-        ]
+        # 游标结果直接写入数组, 不逐行构造 dict / datetime
+        series = ReadingSeries.from_cursor(cursor)
         
-        conn.close()
-        return readings
+        if own_conn:
+            conn.close()
+        return series
+    
+    def get_user_readings(self, user_id: str, hours: int = 168) -> List[Dict]:
+        """
+        Get CGM readings for a user within the specified time window.
+        
+        Args:
+            user_id: User identifier
+            hours: Number of hours to look back (default: 168 = 7 days)
+        
+        Returns:
+            List of reading dictionaries with timestamp and glucose_value
+        """
+        return self.get_user_series(user_id, hours).to_records()
     
     def detect_post_meal_spike(self, readings: List[Dict]) -> Optional[Dict]:
         """
@@ -390,40 +434,59 @@ class CGMPatternIdentifier:
             }
         return None
     
-    def identify_patterns(self, user_id: str) -> List[Dict]:
+    def identify_patterns(self, user_id: str, timer: Optional[StageTimer] = None,
+                          conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
         """
         Identify all patterns for a given user.
         
+        Readings are loaded once, one FeatureFrame is built from them, and
+        every detector reads from that frame.
+        
         Args:
             user_id: User identifier
+            timer: Optional StageTimer collecting per-stage wall time
+            conn: Optional open read connection (reused across users by workers)
         
         Returns:
             List of detected patterns with details
         """
-        readings = self.get_user_readings(user_id, hours=168)  # Last 7 days
+        timer = timer if timer is not None else StageTimer()
         
-        if not readings:
+        with timer.stage('load'):
+            series = self.get_user_series(user_id, hours=168, conn=conn)  # Last 7 days
+        
+        return self.identify_series_patterns(user_id, series, timer)
+    
+    def identify_series_patterns(self, user_id: str, series: ReadingSeries,
+                                 timer: Optional[StageTimer] = None) -> List[Dict]:
+        """
+        Run every detector over already loaded readings.
+        
+        Args:
+            user_id: User identifier
+            series: Readings of the analysis window, ascending
+            timer: Optional StageTimer collecting per-stage wall time
+        
+        Returns:
+            List of detected patterns with details
+        """
+        timer = timer if timer is not None else StageTimer()
+        
+        if not len(series):
             return []
         
+        with timer.stage('features'):
+            features = FeatureFrame(series)
+        
         detected_patterns = []
         
-        # Run all pattern detection methods
-        detection_methods = [
-            self.detect_post_meal_spike,
-            self.detect_dawn_phenomenon,
-            self.detect_nocturnal_hypoglycemia,
-            self.detect_afternoon_dip,
-            self.detect_high_variability,
-            self.detect_sustained_hyperglycemia,
-            self.detect_frequent_hypoglycemia,
-            self.detect_post_exercise_drop,
-            self.detect_stress_hyperglycemia,
-            self.detect_roller_coaster
-        ]
+        # Run all pattern detection methods (NumPy engine, same results as detect_*)
+        detection_methods = VectorizedPatternEngine(features).detectors()
         
         for method in detection_methods:
             try:
-                result = method(readings)
+                with timer.stage(method.__name__):
+                    result = method()
                 if result:
                     # Add pattern metadata
                     pattern_type = result['pattern_type']
@@ -440,6 +503,10 @@ class CGMPatternIdentifier:
         """
         Save detected patterns to the database.
         
+        user_patterns keeps one occurrence row per (user, pattern type, day):
+        detecting the same pattern again that day updates last_seen, the
+        latest confidence/details and hit_count instead of adding a row.
+        
         Args:
             patterns: List of detected patterns
         
@@ -450,83 +517,486 @@ class CGMPatternIdentifier:
             return 0
         
         conn = self._get_connection()
-        cursor = conn.cursor()
+        try:
+            self._write_patterns(conn, patterns)
+            conn.commit()
+        except sqlite3.Error as e:
+            # 旧表结构 (无 period 列) 需先运行 migrations/011_compact_user_patterns.py
+            print(f"Error saving patterns: {e}")
+            return 0
+        finally:
+            conn.close()
         
-        # Create user_patterns table if it doesn't exist
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_patterns (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                pattern_type TEXT NOT NULL,
-                pattern_name TEXT NOT NULL,
-                description TEXT,
-                severity TEXT,
-                confidence REAL,
-                details TEXT,
-                detected_at TEXT NOT NULL,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(user_id)
+        return len(patterns)
+    
+    def _write_patterns(self, conn, patterns: List[Dict]):
+        """Upsert pattern occurrences into user_patterns on conn (caller commits)."""
+        if not self._patterns_table_ready:
+            conn.execute(USER_PATTERNS_TABLE)
+            conn.execute(USER_PATTERNS_INDEX)
+            self._patterns_table_ready = True
+        
+        conn.executemany('''
+            INSERT INTO user_patterns
+            (user_id, pattern_type, pattern_name, description, severity, confidence, details,
+             period, first_seen, last_seen, hit_count, detected_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+            ON CONFLICT (user_id, pattern_type, period) DO UPDATE SET
+                pattern_name = excluded.pattern_name,
+                description = excluded.description,
+                severity = excluded.severity,
+                confidence = excluded.confidence,
+                details = excluded.details,
+                last_seen = excluded.last_seen,
+                detected_at = excluded.detected_at,
+                hit_count = user_patterns.hit_count + 1
+        ''', [
+            (
+                pattern['user_id'],
+                pattern['pattern_type'],
+                pattern['name'],
+                pattern['description'],
+                pattern['severity'],
+                pattern['confidence'],
+                pattern['details'],
+                pattern['detected_at'][:10],
+                pattern['detected_at'],
+                pattern['detected_at'],
+                pattern['detected_at']
+            )
+            for pattern in patterns
+        ])
+    
+    # ============================================================
+    # 检测结果缓存 (数据未变化的用户跳过重算)
+    # ============================================================
+    
+    def _ensure_cache_table(self, conn):
+        """Create cgm_pattern_cache (latest detection result per user) if missing."""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cgm_pattern_cache (
+                user_id TEXT PRIMARY KEY,
+                detector_version INTEGER NOT NULL,
+                latest_ts_epoch INTEGER,
+                watermark TEXT,
+                oldest_ts_epoch INTEGER,
+                patterns TEXT NOT NULL,
+                computed_at TEXT NOT NULL
             )
         ''')
+    
+    def _data_version(self, conn, user_id: str) -> Tuple[Optional[int], Optional[str]]:
+        """
+        (latest reading ts_epoch, rollup watermark) for a user.
         
-        saved_count = 0
-        for pattern in patterns:
-            try:
-                cursor.execute('''
-                    INSERT INTO user_patterns 
-                    (user_id, pattern_type, pattern_name, description, severity, confidence, details, detected_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    pattern['user_id'],
-                    pattern['pattern_type'],
-                    pattern['name'],
-                    pattern['description'],
-                    pattern['severity'],
-                    pattern['confidence'],
-                    pattern['details'],
-                    pattern['detected_at']
-                ))
-                saved_count += 1
-            except Exception as e:
-                print(f"Error saving pattern: {e}")
+        The watermark changes whenever a reading is inserted or overwritten
+        (also behind the latest timestamp); databases without rollup tables
+        fall back to the latest timestamp alone.
+        """
+        latest = conn.execute(
+            'SELECT MAX(ts_epoch) FROM cgm_readings WHERE user_id = ?', (user_id,)
+        ).fetchone()[0]
+        try:
+            watermark = conn.execute(
+                'SELECT MAX(updated_at) FROM cgm_rollup_daily WHERE user_id = ?', (user_id,)
+            ).fetchone()[0]
+        except sqlite3.OperationalError:
+            watermark = None
+        return latest, watermark
+    
+    def _load_cache(self, conn, user_id: str, data_version: Tuple, hours: int = 168) -> Optional[List[Dict]]:
+        """Cached patterns if still valid for data_version and the current window."""
+        try:
+            row = conn.execute('''
+                SELECT detector_version, latest_ts_epoch, watermark, oldest_ts_epoch, patterns
+                FROM cgm_pattern_cache WHERE user_id = ?
+            ''', (user_id,)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        if row is None or row[0] != DETECTOR_VERSION or tuple(row[1:3]) != tuple(data_version):
+            return None
         
-        conn.commit()
-        conn.close()
+        # 最早的读数移出 7 天窗口后结果会变化, 需要重算
+        cutoff = int((datetime.now(timezone.utc) - timedelta(hours=hours)).timestamp() * 1000)
+        if row[3] is not None and row[3] < cutoff:
+            return None
+        return json.loads(row[4])
+    
+    def _store_cache(self, conn, entries: List[Tuple]):
+        """Upsert (user_id, data_version, oldest_ts_epoch, patterns) cache entries."""
+        computed_at = datetime.now().isoformat()
+        conn.executemany('''
+            INSERT OR REPLACE INTO cgm_pattern_cache
+            (user_id, detector_version, latest_ts_epoch, watermark, oldest_ts_epoch, patterns, computed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (user_id, DETECTOR_VERSION, data_version[0], data_version[1], oldest, json.dumps(patterns), computed_at)
+            for user_id, data_version, oldest, patterns in entries
+        ])
+    
+    def _save_with_cache(self, patterns: List[Dict], cache_entries: List[Tuple], conn=None) -> int:
+        """
+        Save patterns and their cache entries in one transaction.
+        
+        A failed pattern write rolls back the cache entries too, so the cache
+        never reports "unchanged" for patterns that were not saved.
+        
+        Returns:
+            Number of patterns saved (0 on failure)
+        """
+        own_conn = conn is None
+        conn = conn or self._get_connection()
+        try:
+            if patterns:
+                self._write_patterns(conn, patterns)
+            self._store_cache(conn, cache_entries)
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            # 旧表结构 (无 period 列) 需先运行 migrations/011_compact_user_patterns.py
+            print(f"Error saving patterns: {e}")
+            return 0
+        finally:
+            if own_conn:
+                conn.close()
+        return len(patterns)
+    
+    def get_cached_patterns(self, user_id: str) -> Optional[List[Dict]]:
+        """
+        Latest detected patterns for a user, if the user's data has not changed since.
+        
+        Args:
+            user_id: User identifier
+        
+        Returns:
+            The user_patterns rows (all columns) of the cached detection, in
+            detector order, or None when there is no valid cached result
+        """
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        try:
+            patterns = self._load_cache(conn, user_id, self._data_version(conn, user_id))
+            if not patterns:
+                return patterns
+            
+            # 缓存与模式同一事务写入, 按 (类型, 日期) 取回对应的记录
+            keys = [(p['pattern_type'], p['detected_at'][:10]) for p in patterns]
+            periods = sorted({period for _, period in keys})
+            rows = conn.execute(f'''
+                SELECT * FROM user_patterns
+                WHERE user_id = ? AND period IN ({', '.join('?' * len(periods))})
+            ''', [user_id] + periods).fetchall()
+        finally:
+            conn.close()
         
-        return saved_count
+        by_key = {(row['pattern_type'], row['period']): dict(row) for row in rows}
+        return [by_key[key] for key in keys if key in by_key]
     
-    def run_pattern_identification_for_user(self, user_id: str) -> Dict:
+    def run_pattern_identification_for_user(self, user_id: str, timer: Optional[StageTimer] = None) -> Dict:
         """
         Run complete pattern identification for a user and save to database.
         
+        Users whose readings have not changed since the last run (same latest
+        reading, rollup watermark and DETECTOR_VERSION) are served from
+        cgm_pattern_cache and nothing is saved again.
+        
         Args:
             user_id: User identifier
+            timer: Optional StageTimer for this run (cache/load/features/detectors/save)
         
         Returns:
-            Summary dictionary with results
+            Summary dictionary with results (timings_ms: stage -> milliseconds,
+            cached: True when the detectors were skipped)
         """
         print(f"Running pattern identification for user: {user_id}")
         
-        patterns = self.identify_patterns(user_id)
-        saved_count = self.save_patterns_to_db(patterns)
+        timer = timer if timer is not None else StageTimer()
+        conn = self._get_connection()
+        try:
+            with timer.stage('cache'):
+                self._ensure_cache_table(conn)
+                data_version = self._data_version(conn, user_id)
+                patterns = self._load_cache(conn, user_id, data_version)
+            cached = patterns is not None
+            
+            if not cached:
+                with timer.stage('load'):
+                    series = self.get_user_series(user_id, hours=168, conn=conn)  # Last 7 days
+                patterns = self.identify_series_patterns(user_id, series, timer)
+                with timer.stage('save'):
+                    oldest = int(series.ts[0]) if len(series) else None
+                    saved_count = self._save_with_cache(
+                        patterns, [(user_id, data_version, oldest, patterns)], conn
+                    )
+            else:
+                saved_count = 0
+        finally:
+            conn.close()
         
         result = {
             'user_id': user_id,
             'patterns_detected': len(patterns),
             'patterns_saved': saved_count,
+            'cached': cached,
             'timestamp': datetime.now().isoformat(),
-            'patterns': patterns
+            'patterns': patterns,
+            'timings_ms': timer.as_ms()
         }
         
-        print(f"  - Detected {len(patterns)} patterns")
+        print(f"  - Detected {len(patterns)} patterns" + (" (unchanged, cached)" if cached else ""))
         print(f"  - Saved {saved_count} patterns to database")
+        print(f"  - Took {sum(timer.stages.values()) * 1000:.1f} ms")
+        
+        return result
+    
+    def _ensure_state_table(self, conn):
+        """Create cgm_pattern_state (per-user incremental detector state) if missing."""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cgm_pattern_state (
+                user_id TEXT PRIMARY KEY,
+                last_ts_epoch INTEGER,
+                state TEXT NOT NULL,
+                active_patterns TEXT NOT NULL,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    
+    def _reading_loader(self, conn, user_id: str):
+        """load(start_ms, end_ms) for IncrementalPatternState: a user's readings in the range."""
+        def load(start_ms: int, end_ms: int):
+            return conn.execute('''
+                SELECT ts_epoch, glucose_value
+                FROM cgm_readings
+                WHERE user_id = ? AND ts_epoch >= ? AND ts_epoch < ?
+                ORDER BY ts_epoch ASC
+            ''', (user_id, start_ms, end_ms))
+        return load
+    
+    def _rebuild_state(self, conn, user_id: str, now_ms: int) -> IncrementalPatternState:
+        """Fresh state from the readings of the last 7 days."""
+        state = IncrementalPatternState()
+        cursor = conn.execute('''
+            SELECT ts_epoch, glucose_value
+            FROM cgm_readings
+            WHERE user_id = ? AND ts_epoch >= ?
+            ORDER BY ts_epoch ASC
+        ''', (user_id, now_ms - state.window_ms))
+        for ts, glucose in cursor:
+            state.ingest(ts, glucose)
+        return state
+    
+    def run_incremental_for_user(self, user_id: str, rebuild: bool = False,
+                                 now: Optional[datetime] = None,
+                                 changed_from: Optional[int] = None) -> Dict:
+        """
+        Update a user's patterns from readings newer than the stored state.
+        
+        Only readings after the state's last timestamp are read and folded
+        into the per-user detector state; the 7-day window is rescanned only
+        when no usable state exists or rebuild=True (e.g. after readings were
+        inserted or corrected behind the state's last timestamp).
+        
+        Args:
+            user_id: User identifier
+            rebuild: Discard the stored state and rebuild from the last 7 days
+            now: Evaluation time (default: current UTC time)
+            changed_from: Earliest ts_epoch just written, if known; the state
+                is rebuilt when it is at or before the state's last timestamp
+                (back-filled readings the delta read would miss)
         
+        Every active pattern is upserted as today's occurrence (last_seen,
+        hit_count), so a pattern that stays active keeps a current row; the
+        result is also stored in cgm_pattern_cache for get_cached_patterns().
+        
+        Returns:
+            Summary with the current patterns and the changes since the last
+            run (new / updated / resolved pattern types)
+        """
+        now = now or datetime.now(timezone.utc)
+        now_ms = int(now.timestamp() * 1000)
+        
+        conn = self._get_connection()
+        try:
+            self._ensure_state_table(conn)
+            self._ensure_cache_table(conn)
+            result = self._incremental_update(conn, user_id, now_ms, rebuild, changed_from)
+            self._write_incremental(conn, [result])
+        finally:
+            conn.close()
         return result
     
-    def run_pattern_identification_for_all_users(self) -> List[Dict]:
+    def _incremental_update(self, conn, user_id: str, now_ms: int, rebuild: bool = False,
+                            changed_from: Optional[int] = None) -> Dict:
+        """
+        Fold a user's new readings into their detector state (no database writes).
+        
+        Returns:
+            The run_incremental_for_user() summary, plus the new state,
+            cache version and oldest window reading for _write_incremental()
+        """
+        # 先取数据版本: 之后写入的读数会使缓存失效
+        data_version = self._data_version(conn, user_id)
+        
+        row = conn.execute(
+            'SELECT state, active_patterns FROM cgm_pattern_state WHERE user_id = ?',
+            (user_id,)
+        ).fetchone()
+        state = None if rebuild or row is None else IncrementalPatternState.from_dict(json.loads(row[0]))
+        previous = json.loads(row[1]) if row else {}
+        if (state is not None and changed_from is not None
+                and state.last_ts is not None and changed_from <= state.last_ts):
+            state = None
+        
+        if state is None:
+            state = self._rebuild_state(conn, user_id, now_ms)
+            ingested = state.counters['count']
+            rebuilt = True
+        else:
+            cursor = conn.execute('''
+                SELECT ts_epoch, glucose_value
+                FROM cgm_readings
+                WHERE user_id = ? AND ts_epoch > ?
+                ORDER BY ts_epoch ASC
+            ''', (user_id, state.last_ts if state.last_ts is not None else now_ms - state.window_ms))
+            ingested = 0
+            for ts, glucose in cursor:
+                state.ingest(ts, glucose)
+                ingested += 1
+            rebuilt = False
+        
+        detected_at = datetime.now().isoformat()
+        patterns = []
+        for result in state.evaluate(now_ms, self._reading_loader(conn, user_id)):
+            result.update(self.PATTERNS[result['pattern_type']])
+            result['detected_at'] = detected_at
+            result['user_id'] = user_id
+            patterns.append(result)
+        
+        # 与上次结果对比, 只用于报告变化; 仍活跃的模式每次都写入当天的记录
+        active = {p['pattern_type']: [p['severity'], p['details']] for p in patterns}
+        changed = [p for p in patterns if previous.get(p['pattern_type']) != active[p['pattern_type']]]
+        changes = {
+            'new': [p['pattern_type'] for p in changed if p['pattern_type'] not in previous],
+            'updated': [p['pattern_type'] for p in changed if p['pattern_type'] in previous],
+            'resolved': [t for t in previous if t not in active],
+        }
+        
+        oldest = conn.execute(
+            'SELECT MIN(ts_epoch) FROM cgm_readings WHERE user_id = ? AND ts_epoch >= ?',
+            (user_id, now_ms - state.window_ms)
+        ).fetchone()[0]
+        
+        return {
+            'user_id': user_id,
+            'readings_ingested': ingested,
+            'rebuilt': rebuilt,
+            'patterns_detected': len(patterns),
+            'patterns_saved': 0,
+            'changes': changes,
+            'timestamp': detected_at,
+            'patterns': patterns,
+            'last_ts_epoch': state.last_ts,
+            'state': state.to_dict(),
+            'active_patterns': active,
+            'data_version': data_version,
+            'oldest_ts_epoch': oldest
+        }
+    
+    def _write_incremental(self, conn, results: List[Dict]):
+        """
+        Store the states, patterns and cache entries of _incremental_update() results.
+        
+        Everything is committed in one transaction (get_cached_patterns and
+        /api/patterns read the cache); the write-only keys are removed from
+        the results and patterns_saved is filled in.
+        """
+        cache_entries = []
+        for result in results:
+            conn.execute('''
+                INSERT OR REPLACE INTO cgm_pattern_state
+                (user_id, last_ts_epoch, state, active_patterns, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                result['user_id'], result.pop('last_ts_epoch'), json.dumps(result.pop('state')),
+                json.dumps(result.pop('active_patterns')), result['timestamp']
+            ))
+            cache_entries.append((
+                result['user_id'], result.pop('data_version'), result.pop('oldest_ts_epoch'),
+                result['patterns']
+            ))
+        
+        patterns = [pattern for result in results for pattern in result['patterns']]
+        saved_count = self._save_with_cache(patterns, cache_entries, conn)
+        for result in results:
+            result['patterns_saved'] = result['patterns_detected'] if saved_count == len(patterns) else 0
+    
+    def run_incremental_for_all_users(self, rebuild: bool = False, workers: int = 1,
+                                      chunk_size: int = 32) -> List[Dict]:
+        """
+        Incremental pattern update for all users in the database.
+        
+        With workers > 1, users are split into chunks of chunk_size and their
+        states are updated in a process pool over read-only connections; only
+        this process writes (one transaction per finished chunk), as in
+        run_pattern_identification_for_all_users().
+        
+        Args:
+            rebuild: Rebuild every user's state from the last 7 days
+            workers: Maximum number of worker processes (1 = serial, in-process)
+            chunk_size: Users per worker task
+        
+        Returns:
+            List of results for each user
+        """
+        conn = self._get_connection()
+        user_ids = [row[0] for row in conn.execute('SELECT user_id FROM users')]
+        
+        if workers <= 1 or len(user_ids) <= chunk_size:
+            conn.close()
+            results = []
+            for user_id in user_ids:
+                try:
+                    results.append(self.run_incremental_for_user(user_id, rebuild=rebuild))
+                except Exception as e:
+                    print(f"Error updating patterns for {user_id}: {e}")
+            return results
+        
+        try:
+            self._ensure_state_table(conn)
+            self._ensure_cache_table(conn)
+            conn.commit()
+            now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+            chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+            results = []
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(chunks)),
+                initializer=_init_worker,
+                initargs=(self.db_path,)
+            ) as pool:
+                futures = [pool.submit(_incremental_chunk, chunk, now_ms, rebuild) for chunk in chunks]
+                for future in as_completed(futures):
+                    chunk_results = future.result()
+                    self._write_incremental(conn, chunk_results)
+                    results.extend(chunk_results)
+        finally:
+            conn.close()
+        order = {user_id: i for i, user_id in enumerate(user_ids)}
+        results.sort(key=lambda r: order[r['user_id']])
+        return results
+    
+    def run_pattern_identification_for_all_users(self, workers: int = 1, chunk_size: int = 32) -> List[Dict]:
         """
         Run pattern identification for all users in the database.
         
+        With workers > 1, users are split into chunks of chunk_size and
+        detected in a process pool; each worker keeps one read connection
+        for all of its chunks and only this process writes to user_patterns
+        (one transaction per finished chunk).
+        
+        Args:
+            workers: Maximum number of worker processes (1 = serial, in-process)
+            chunk_size: Users per worker task
+        
         Returns:
             List of results for each user
         """
@@ -538,26 +1008,482 @@ class CGMPatternIdentifier:
         conn.close()
         
         print(f"\n{'='*60}")
-        print(f"Starting pattern identification for {len(user_ids)} users")
+        print(f"Starting pattern identification for {len(user_ids)} users"
+              + (f" ({workers} workers)" if workers > 1 else ""))
         print(f"{'='*60}\n")
         
+        started = time.perf_counter()
         results = []
-        for user_id in user_ids:
-            result = self.run_pattern_identification_for_user(user_id)
-            results.append(result)
+        totals = StageTimer()  # 各阶段耗时汇总 (所有用户)
+        if workers > 1 and len(user_ids) > chunk_size:
+            conn = self._get_connection()
+            self._ensure_cache_table(conn)
+            conn.close()
+            chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(chunks)),
+                initializer=_init_worker,
+                initargs=(self.db_path,)
+            ) as pool:
+                futures = [pool.submit(_identify_chunk, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    chunk_results, chunk_timer = future.result()
+                    totals.merge(chunk_timer)
+                    results.extend(self._save_chunk(chunk_results, totals))
+            order = {user_id: i for i, user_id in enumerate(user_ids)}
+            results.sort(key=lambda r: order[r['user_id']])
+        else:
+            for user_id in user_ids:
+                timer = StageTimer()
+                result = self.run_pattern_identification_for_user(user_id, timer)
+                totals.merge(timer)
+                results.append(result)
+        elapsed = time.perf_counter() - started
         
         print(f"\n{'='*60}")
         print(f"Pattern identification complete!")
         print(f"Total patterns detected: {sum(r['patterns_detected'] for r in results)}")
+        print(f"Unchanged users (cached): {sum(1 for r in results if r['cached'])}")
+        print(f"Users: {len(results)} in {elapsed:.2f}s ({len(results) / (elapsed or 1e-9):.1f} users/sec)")
+        if results:
+            print(f"Mean latency per user: {sum(totals.stages.values()) * 1000 / len(results):.2f} ms")
+        print(f"Stage timings (summed over users):")
+        print(totals.report())
         print(f"{'='*60}\n")
         
         return results
+    
+    def _save_chunk(self, chunk_results: List[Dict], totals: StageTimer) -> List[Dict]:
+        """Write one worker chunk's new patterns and cache entries in one pass."""
+        fresh = [r for r in chunk_results if not r['cached']]
+        with totals.stage('save'):
+            patterns = [pattern for result in fresh for pattern in result['patterns']]
+            cache_entries = [
+                (r['user_id'], r.pop('data_version'), r.pop('oldest_ts_epoch'), r['patterns'])
+                for r in fresh
+            ]
+            saved_count = self._save_with_cache(patterns, cache_entries)
+        
+        detected = sum(r['patterns_detected'] for r in fresh)
+        if saved_count != detected:
+            print(f"  - Saved {saved_count} of {detected} patterns for users {fresh[0]['user_id']}..")
+        for result in fresh:
+            result['patterns_saved'] = result['patterns_detected'] if saved_count == detected else None
+        return chunk_results
+
+    
+    # ============================================================
+    # 每日模式规则 (rules.json 格式)
+    # ============================================================
+    
+    def _ensure_rules_table(self, conn):
+        if not self._rules_table_ready:
+            conn.execute(DAILY_PATTERN_RULES_TABLE)
+            conn.execute(DAILY_PATTERN_RULE_RUNS_TABLE)
+            self._rules_table_ready = True
+    
+    def run_daily_rules_for_user(self, user_id: str, start_date: Optional[str] = None,
+                                 end_date: Optional[str] = None) -> Dict:
+        """
+        Evaluate the daily pattern rules for a date range and store the results.
+        
+        Stored results for service dates in the range are replaced, so rules
+        that no longer fire disappear. Readings up to LOOKBACK_DAYS before
+        start_date are loaded for the analysis windows of the first dates.
+        Every evaluated date up to the last reading is recorded in
+        daily_pattern_rule_runs, also when no rule fires (see
+        daily_rules_evaluated).
+        
+        Args:
+            user_id: User identifier
+            start_date: First service date 'YYYY-MM-DD' (default: first day with readings)
+            end_date: Last service date 'YYYY-MM-DD' (default: last day with readings)
+        
+        Returns:
+            Summary dictionary (service_dates with at least one rule, rules_saved,
+            timings_ms: stage -> milliseconds)
+        """
+        timer = StageTimer()
+        conn = self._get_connection()
+        try:
+            with timer.stage('load'):
+                first_ms = (date_to_day(start_date) - LOOKBACK_DAYS) * DAY_MS if start_date else 0
+                end_ms = (date_to_day(end_date) + 1) * DAY_MS if end_date else 2 ** 62
+                cursor = conn.execute('''
+                    SELECT ts_epoch, glucose_value
+                    FROM cgm_readings
+                    WHERE user_id = ? AND ts_epoch >= ? AND ts_epoch < ?
+                    ORDER BY ts_epoch ASC
+                ''', (user_id, first_ms, end_ms))
+                series = ReadingSeries.from_cursor(cursor)
+            
+            if not len(series):
+                return {'user_id': user_id, 'service_dates': 0, 'rules_saved': 0, 'timings_ms': timer.as_ms()}
+            
+            start_date = start_date or day_to_date(series.ts[0] // DAY_MS)
+            end_date = end_date or day_to_date(series.ts[-1] // DAY_MS)
+            with timer.stage('rules'):
+                results = DailyRuleEngine(series).evaluate(start_date, end_date)
+            
+            with timer.stage('save'):
+                self._ensure_rules_table(conn)
+                computed_at = datetime.now().isoformat()
+                conn.execute('''
+                    DELETE FROM daily_pattern_rules
+                    WHERE user_id = ? AND service_date BETWEEN ? AND ?
+                ''', (user_id, start_date, end_date))
+                rows = [
+                    (user_id, service_date, rule['pattern_id'], rule['version'], rule['confidence'],
+                     json.dumps(rule['metrics']), json.dumps(rule['evidence']), computed_at)
+                    for service_date, rules in results.items()
+                    for rule in rules
+                ]
+                conn.executemany('''
+                    INSERT INTO daily_pattern_rules
+                    (user_id, service_date, pattern_id, version, confidence, metrics, evidence, computed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                # 最后一个读数之后的日期尚无数据, 不记为已评估
+                last_day = min(date_to_day(end_date), int(series.ts[-1]) // DAY_MS)
+                conn.executemany('''
+                    INSERT OR REPLACE INTO daily_pattern_rule_runs (user_id, service_date, computed_at)
+                    VALUES (?, ?, ?)
+                ''', [
+                    (user_id, day_to_date(day), computed_at)
+                    for day in range(date_to_day(start_date), last_day + 1)
+                ])
+                conn.commit()
+        finally:
+            conn.close()
+        
+        return {
+            'user_id': user_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'service_dates': len(results),
+            'rules_saved': len(rows),
+            'timings_ms': timer.as_ms()
+        }
+    
+    def daily_rules_evaluated(self, user_id: str, start_date: Optional[str] = None,
+                              end_date: Optional[str] = None) -> bool:
+        """
+        Whether every date in the range has been evaluated, with or without rule hits.
+        
+        The range is clipped to the days that have readings, so dates outside
+        them need no evaluation; a user without readings is never evaluated.
+        
+        Args:
+            user_id: User identifier
+            start_date: First service date 'YYYY-MM-DD' (optional)
+            end_date: Last service date 'YYYY-MM-DD' (optional)
+        """
+        conn = self._get_connection()
+        try:
+            self._ensure_rules_table(conn)
+            first_ms, last_ms = conn.execute(
+                'SELECT MIN(ts_epoch), MAX(ts_epoch) FROM cgm_readings WHERE user_id = ?', (user_id,)
+            ).fetchone()
+            if first_ms is None:
+                return False
+            first = int(first_ms) // DAY_MS
+            last = int(last_ms) // DAY_MS
+            if start_date:
+                first = max(first, date_to_day(start_date))
+            if end_date:
+                last = min(last, date_to_day(end_date))
+            if first > last:
+                return True
+            evaluated = conn.execute('''
+                SELECT COUNT(*) FROM daily_pattern_rule_runs
+                WHERE user_id = ? AND service_date BETWEEN ? AND ?
+            ''', (user_id, day_to_date(first), day_to_date(last))).fetchone()[0]
+        finally:
+            conn.close()
+        return evaluated == last - first + 1
+    
+    def get_daily_rules(self, user_id: str, start_date: Optional[str] = None,
+                        end_date: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """
+        Stored daily rule results in rules.json shape.
+        
+        Args:
+            user_id: User identifier
+            start_date: First service date 'YYYY-MM-DD' (optional)
+            end_date: Last service date 'YYYY-MM-DD' (optional)
+        
+        Returns:
+            {service_date: [{pattern_id, metrics, evidence, confidence, version}, ...]}
+        """
+        conn = self._get_connection()
+        try:
+            self._ensure_rules_table(conn)
+            rows = conn.execute('''
+                SELECT service_date, pattern_id, metrics, evidence, confidence, version
+                FROM daily_pattern_rules
+                WHERE user_id = ? AND service_date BETWEEN ? AND ?
+                ORDER BY service_date, pattern_id
+            ''', (user_id, start_date or '0000-00-00', end_date or '9999-99-99')).fetchall()
+        finally:
+            conn.close()
+        
+        results: Dict[str, List[Dict]] = {}
+        for service_date, pattern_id, metrics, evidence, confidence, version in rows:
+            results.setdefault(service_date, []).append({
+                'pattern_id': pattern_id,
+                'metrics': json.loads(metrics),
+                'evidence': json.loads(evidence),
+                'confidence': confidence,
+                'version': version,
+            })
+        return results
+    
+    # ============================================================
+    # 历史回填 (按天滑动 7 天窗口, 可从检查点续跑)
+    # ============================================================
+    
+    def _ensure_backfill_table(self, conn):
+        """Create cgm_pattern_backfill (per-user backfill checkpoint) if missing."""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cgm_pattern_backfill (
+                user_id TEXT PRIMARY KEY,
+                detector_version INTEGER NOT NULL,
+                last_day TEXT NOT NULL,
+                end_day TEXT NOT NULL,
+                state TEXT NOT NULL,
+                updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    
+    def _insert_backfill_patterns(self, conn, patterns: List[Dict]) -> int:
+        """Bulk-insert backfilled occurrences; days that already have a row are kept."""
+        before = conn.total_changes
+        if not self._patterns_table_ready:
+            conn.execute(USER_PATTERNS_TABLE)
+            conn.execute(USER_PATTERNS_INDEX)
+            self._patterns_table_ready = True
+        conn.executemany('''
+            INSERT INTO user_patterns
+            (user_id, pattern_type, pattern_name, description, severity, confidence, details,
+             period, first_seen, last_seen, hit_count, detected_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+            ON CONFLICT (user_id, pattern_type, period) DO NOTHING
+        ''', [
+            (
+                p['user_id'], p['pattern_type'], p['name'], p['description'], p['severity'],
+                p['confidence'], p['details'], p['detected_at'][:10],
+                p['detected_at'], p['detected_at'], p['detected_at']
+            )
+            for p in patterns
+        ])
+        return conn.total_changes - before
+    
+    def run_backfill_for_user(self, user_id: str, start_date: Optional[str] = None,
+                              end_date: Optional[str] = None, resume: bool = True,
+                              checkpoint_days: int = BACKFILL_CHECKPOINT_DAYS) -> Dict:
+        """
+        Evaluate the detectors for every day of a user's history.
+        
+        Each UTC day is evaluated over the 7 days ending at its midnight, the
+        same window identify_patterns uses at that moment. Readings stream
+        through one IncrementalPatternState (each reading is added once and
+        evicted once), so the cost is linear in the history length. Results
+        go to user_patterns as that day's occurrence (existing rows for a day
+        are kept), written together with a checkpoint every checkpoint_days
+        days; an interrupted or extended backfill continues after the
+        checkpoint.
+        
+        Args:
+            user_id: User identifier
+            start_date: First day 'YYYY-MM-DD' (default: first day with readings)
+            end_date: Last day 'YYYY-MM-DD' (default: last day with readings)
+            resume: Continue from the stored checkpoint (ignored when it was
+                written by another DETECTOR_VERSION)
+            checkpoint_days: Days per bulk write + checkpoint
+        
+        Returns:
+            Summary (days_evaluated, readings_ingested, patterns_saved: newly
+            inserted occurrences, resumed, timings_ms)
+        """
+        timer = StageTimer()
+        conn = self._get_connection()
+        try:
+            self._ensure_backfill_table(conn)
+            row = conn.execute(
+                'SELECT detector_version, last_day, state FROM cgm_pattern_backfill WHERE user_id = ?',
+                (user_id,)
+            ).fetchone()
+            state = None
+            if resume and row is not None and row[0] == DETECTOR_VERSION:
+                state = IncrementalPatternState.from_dict(json.loads(row[2]))
+            
+            resumed = state is not None
+            if resumed:
+                first_day = date_to_day(row[1]) + 1
+                after_ms = state.last_ts if state.last_ts is not None else first_day * DAY_MS - WINDOW_MS - 1
+            else:
+                state = IncrementalPatternState()
+                if start_date:
+                    first_day = date_to_day(start_date)
+                else:
+                    first_ts = conn.execute(
+                        'SELECT MIN(ts_epoch) FROM cgm_readings WHERE user_id = ?', (user_id,)
+                    ).fetchone()[0]
+                    if first_ts is None:
+                        return {'user_id': user_id, 'days_evaluated': 0, 'readings_ingested': 0,
+                                'patterns_saved': 0, 'resumed': False, 'timings_ms': timer.as_ms()}
+                    first_day = first_ts // DAY_MS
+                # 第一天的窗口包含之前 7 天的读数
+                after_ms = first_day * DAY_MS - WINDOW_MS - 1
+            
+            if end_date:
+                last_day = date_to_day(end_date)
+            else:
+                last_ts = conn.execute(
+                    'SELECT MAX(ts_epoch) FROM cgm_readings WHERE user_id = ?', (user_id,)
+                ).fetchone()[0]
+                last_day = last_ts // DAY_MS if last_ts is not None else first_day - 1
+            
+            cursor = conn.execute('''
+                SELECT ts_epoch, glucose_value
+                FROM cgm_readings
+                WHERE user_id = ? AND ts_epoch > ? AND ts_epoch < ?
+                ORDER BY ts_epoch ASC
+            ''', (user_id, after_ms, (last_day + 1) * DAY_MS))
+            readings = iter(cursor)
+            pending = next(readings, None)
+            
+            load = self._reading_loader(conn, user_id)
+            ingested = saved = 0
+            buffer: List[Dict] = []
+            for day in range(first_day, last_day + 1):
+                day_end_ms = (day + 1) * DAY_MS
+                with timer.stage('ingest'):
+                    while pending is not None and pending[0] < day_end_ms:
+                        state.ingest(*pending)
+                        ingested += 1
+                        pending = next(readings, None)
+                
+                with timer.stage('detectors'):
+                    detected_at = f'{day_to_date(day)}T23:59:59'
+                    for result in state.evaluate(day_end_ms, load):
+                        result.update(self.PATTERNS[result['pattern_type']])
+                        result['detected_at'] = detected_at
+                        result['user_id'] = user_id
+                        buffer.append(result)
+                
+                if (day - first_day + 1) % checkpoint_days == 0 or day == last_day:
+                    with timer.stage('save'):
+                        saved += self._insert_backfill_patterns(conn, buffer)
+                        conn.execute('''
+                            INSERT OR REPLACE INTO cgm_pattern_backfill
+                            (user_id, detector_version, last_day, end_day, state, updated_at)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                        ''', (user_id, DETECTOR_VERSION, day_to_date(day), day_to_date(last_day),
+                              json.dumps(state.to_dict()), datetime.now().isoformat()))
+                        conn.commit()
+                    buffer = []
+        finally:
+            conn.close()
+        
+        return {
+            'user_id': user_id,
+            'days_evaluated': max(last_day - first_day + 1, 0),
+            'readings_ingested': ingested,
+            'patterns_saved': saved,
+            'resumed': resumed,
+            'timings_ms': timer.as_ms()
+        }
+    
+    def run_backfill_for_all_users(self, start_date: Optional[str] = None,
+                                   end_date: Optional[str] = None, resume: bool = True) -> List[Dict]:
+        """
+        Historical backfill for all users in the database.
+        
+        Args:
+            start_date: First day 'YYYY-MM-DD' (default: each user's first day with readings)
+            end_date: Last day 'YYYY-MM-DD' (default: each user's last day with readings)
+            resume: Continue each user from its stored checkpoint
+        
+        Returns:
+            List of backfill summaries for each user
+        """
+        conn = self._get_connection()
+        user_ids = [row[0] for row in conn.execute('SELECT user_id FROM users')]
+        conn.close()
+        
+        results = []
+        for user_id in user_ids:
+            try:
+                results.append(self.run_backfill_for_user(user_id, start_date, end_date, resume=resume))
+            except Exception as e:
+                print(f"Error backfilling patterns for {user_id}: {e}")
+        return results
+
+# ============================================================
+# 进程池 worker (每个进程一个只读连接, 不写库)
+# ============================================================
+
+_worker_identifier: Optional[CGMPatternIdentifier] = None
+_worker_conn: Optional[sqlite3.Connection] = None
+
+
+def _init_worker(db_path: str):
+    global _worker_identifier, _worker_conn
+    _worker_identifier = CGMPatternIdentifier(db_path)
+    _worker_conn = sqlite3.connect(Path(db_path).resolve().as_uri() + '?mode=ro', uri=True)
+
+
+def _identify_chunk(user_ids: List[str]) -> Tuple[List[Dict], StageTimer]:
+    """Detect patterns for a chunk of users (no database writes)."""
+    identifier, conn = _worker_identifier, _worker_conn
+    results = []
+    chunk_timer = StageTimer()
+    for user_id in user_ids:
+        timer = StageTimer()
+        with timer.stage('cache'):
+            data_version = identifier._data_version(conn, user_id)
+            patterns = identifier._load_cache(conn, user_id, data_version)
+        result = {
+            'user_id': user_id,
+            'patterns_saved': 0,
+            'cached': patterns is not None,
+            'timestamp': datetime.now().isoformat(),
+        }
+        if patterns is None:
+            with timer.stage('load'):
+                series = identifier.get_user_series(user_id, hours=168, conn=conn)
+            patterns = identifier.identify_series_patterns(user_id, series, timer)
+            # 缓存条目由主进程统一写入
+            result['data_version'] = data_version
+            result['oldest_ts_epoch'] = int(series.ts[0]) if len(series) else None
+        chunk_timer.merge(timer)
+        result.update({
+            'patterns_detected': len(patterns),
+            'patterns': patterns,
+            'timings_ms': timer.as_ms()
+        })
+        results.append(result)
+    return results, chunk_timer
+
+
+def _incremental_chunk(user_ids: List[str], now_ms: int, rebuild: bool) -> List[Dict]:
+    """Update the detector states of a chunk of users (no database writes)."""
+    results = []
+    for user_id in user_ids:
+        try:
+            results.append(_worker_identifier._incremental_update(_worker_conn, user_id, now_ms, rebuild))
+        except Exception as e:
+            print(f"Error updating patterns for {user_id}: {e}")
+    return results
 
 
 if __name__ == '__main__':
     # Test the pattern identifier
     identifier = CGMPatternIdentifier()
-    results = identifier.run_pattern_identification_for_all_users()
+    results = identifier.run_pattern_identification_for_all_users(
+        workers=int(os.getenv('PATTERN_WORKERS', '1'))
+    )
     
     # Print summary
     for result in results:
@@ -0,0 +1,299 @@
+"""
+Incremental Pattern Detection State
+
+Per-user detector state that is updated reading by reading instead of
+rescanning the 7-day window on every run:
+
+- running counts / sums for the hour-of-day and level detectors
+- monotonic deques for the rolling 30 min / 1 h / 2 h window extremes
+  and for the in-window min/max
+- timestamps of the window starts that matched each windowed detector
+
+ingest() is O(1) amortized per reading; evaluate() evicts everything older
+than the 168-hour horizon and feeds the same *_result builders as the
+batch engine, so both modes report identical patterns for the same
+readings. The state does not keep the in-window readings: on eviction the
+readings leaving the window are read back through a load(start_ms, end_ms)
+callback (a cgm_readings range query), so the JSON snapshot stored in
+cgm_pattern_state stays small.
+"""
+
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .engine import (
+    post_meal_spike_result,
+    dawn_phenomenon_result,
+    nocturnal_hypoglycemia_result,
+    afternoon_dip_result,
+    high_variability_result,
+    sustained_hyperglycemia_result,
+    frequent_hypoglycemia_result,
+    post_exercise_drop_result,
+    stress_hyperglycemia_result,
+    roller_coaster_result,
+)
+from .features import exact_stdev_from_sums
+
+
+# 状态结构变化时递增, 旧状态会被丢弃并全量重建
+STATE_VERSION = 2
+
+HOUR_MS = 60 * 60 * 1000
+WINDOW_MS = 168 * HOUR_MS  # 与 identify_patterns 的 7 天窗口一致
+
+# 滚动窗口 (读数个数) 与所需极值
+_ROLLING = (('max', 6), ('min', 12), ('max', 24), ('min', 24))
+_TAIL = 24
+
+# 随读数进出窗口的累计量
+_COUNTERS = (
+    'count', 'total', 'total_sq',
+    'morning_count', 'morning_sum', 'overnight_count', 'overnight_sum',
+    'night_low_count', 'dip_count', 'dip_sum',
+    'high_count', 'high_sum', 'low_count', 'low_sum',
+)
+
+
+# load(start_ms, end_ms): [start_ms, end_ms) 内的 (ts, glucose), 按时间升序
+ReadingLoader = Callable[[int, int], Iterable[Tuple[int, int]]]
+
+
+def _push_monotonic(window: deque, key, value: int, keep_max: bool):
+    """Append (key, value), dropping dominated entries from the back."""
+    while window and (window[-1][1] <= value if keep_max else window[-1][1] >= value):
+        window.pop()
+    window.append((key, value))
+
+
+class IncrementalPatternState:
+    """Rolling detector state for one user."""
+
+    def __init__(self, window_ms: int = WINDOW_MS):
+        self.window_ms = window_ms
+        self.last_ts: Optional[int] = None
+        self.seq = 0  # 已写入的读数序号 (滚动窗口按序号对齐)
+        # 早于该时间的读数已从累计量中移除 (或从未计入)
+        self.evicted_to: Optional[int] = None
+
+        self.tail = deque(maxlen=_TAIL)  # 最近 24 条 (ts, glucose), 用于窗口起点
+        self.counters = dict.fromkeys(_COUNTERS, 0)
+
+        # 单调队列: 窗口内全局 min / max, 夜间低血糖最小值
+        self.global_max = deque()
+        self.global_min = deque()
+        self.night_low_min = deque()
+
+        # 滚动窗口极值 (key = 读数序号)
+        self.rolling = {f'{kind}{width}': deque() for kind, width in _ROLLING}
+
+        # 命中的窗口起点时间戳 (及餐后峰值幅度)
+        self.meal_hits = deque()       # (ts, spike)
+        self.meal_spike_max = deque()  # 单调队列 (ts, spike)
+        self.drop_hits = deque()
+        self.stress_hits = deque()
+        self.swing_hits = deque()
+
+    # ------------------------------------------------------------
+    # 增量更新
+    # ------------------------------------------------------------
+
+    def _apply(self, ts: int, glucose: int, sign: int):
+        """Add (sign=1) or remove (sign=-1) one reading's counter contributions."""
+        c = self.counters
+        hour = (ts // HOUR_MS) % 24
+        c['count'] += sign
+        c['total'] += sign * glucose
+        c['total_sq'] += sign * glucose * glucose
+        if 4 <= hour < 8:
+            c['morning_count'] += sign
+            c['morning_sum'] += sign * glucose
+        elif hour < 4:
+            c['overnight_count'] += sign
+            c['overnight_sum'] += sign * glucose
+        if hour < 6 and glucose < 70:
+            c['night_low_count'] += sign
+        if 14 <= hour < 17 and glucose < 80:
+            c['dip_count'] += sign
+            c['dip_sum'] += sign * glucose
+        if glucose > 180:
+            c['high_count'] += sign
+            c['high_sum'] += sign * glucose
+        if glucose < 70:
+            c['low_count'] += sign
+            c['low_sum'] += sign * glucose
+
+    def ingest(self, ts: int, glucose: int):
+        """
+        Add one reading newer than every reading already ingested.
+
+        Args:
+            ts: Reading time (UTC epoch ms)
+            glucose: Glucose value (mg/dL)
+
+        Raises:
+            ValueError: If ts is not after the last ingested reading
+        """
+        if self.last_ts is not None and ts <= self.last_ts:
+            raise ValueError("readings must be ingested in ascending ts order")
+        glucose = int(glucose)
+        k = self.seq
+
+        # 以第 k 条读数结束的窗口 [k - w, k - 1] 现在完整, 记录其起点
+        for name, window in self.rolling.items():
+            width = int(name[3:])
+            while window and window[0][0] < k - width:
+                window.popleft()
+        if k >= 6:
+            start_ts, start = self.tail[-6]
+            if self.rolling['max6'][0][1] - start > 40 and start > 120:
+                self.stress_hits.append(start_ts)
+        if k >= 12:
+            start_ts, start = self.tail[-12]
+            low = self.rolling['min12'][0][1]
+            if start - low > 30 and low < 100:
+                self.drop_hits.append(start_ts)
+        if k >= 24:
+            start_ts, start = self.tail[-24]
+            peak = self.rolling['max24'][0][1]
+            spike = peak - start
+            if spike > 50 and peak > 140:
+                self.meal_hits.append((start_ts, spike))
+                _push_monotonic(self.meal_spike_max, start_ts, spike, keep_max=True)
+            if self.rolling['min24'][0][1] < 80 and peak > 160:
+                self.swing_hits.append(start_ts)
+
+        for name, window in self.rolling.items():
+            _push_monotonic(window, k, glucose, keep_max=name.startswith('max'))
+
+        self.tail.append((ts, glucose))
+        if self.evicted_to is None:
+            self.evicted_to = ts
+        if ts >= self.evicted_to:
+            self._apply(ts, glucose, 1)
+        _push_monotonic(self.global_max, ts, glucose, keep_max=True)
+        _push_monotonic(self.global_min, ts, glucose, keep_max=False)
+        if (ts // HOUR_MS) % 24 < 6 and glucose < 70:
+            _push_monotonic(self.night_low_min, ts, glucose, keep_max=False)
+
+        self.seq = k + 1
+        self.last_ts = ts
+        self._evict_windows(ts - self.window_ms)
+
+    def evict(self, cutoff_ms: int, load: ReadingLoader):
+        """
+        Drop readings (and window starts) older than cutoff_ms.
+
+        Args:
+            cutoff_ms: New window start (UTC epoch ms)
+            load: Returns the ingested readings in [start_ms, end_ms); only
+                the range leaving the window since the last eviction is read
+        """
+        if self.evicted_to is not None and cutoff_ms > self.evicted_to:
+            end_ms = min(cutoff_ms, self.last_ts + 1)
+            if end_ms > self.evicted_to:
+                for ts, glucose in load(self.evicted_to, end_ms):
+                    self._apply(ts, int(glucose), -1)
+            self.evicted_to = cutoff_ms
+        self._evict_windows(cutoff_ms)
+
+    def _evict_windows(self, cutoff_ms: int):
+        """Drop deque entries older than cutoff_ms (counters are left to evict())."""
+        for window in (self.global_max, self.global_min, self.night_low_min,
+                       self.meal_hits, self.meal_spike_max):
+            while window and window[0][0] < cutoff_ms:
+                window.popleft()
+        for hits in (self.drop_hits, self.stress_hits, self.swing_hits):
+            while hits and hits[0] < cutoff_ms:
+                hits.popleft()
+
+    # ------------------------------------------------------------
+    # 检测
+    # ------------------------------------------------------------
+
+    def evaluate(self, now_ms: int, load: ReadingLoader) -> List[Dict]:
+        """
+        Patterns for readings in [now_ms - window, ...], in detector order.
+
+        Args:
+            now_ms: Evaluation time (UTC epoch ms)
+            load: Reading range loader used to evict old readings (see evict())
+
+        Returns:
+            Detector result dicts (same shape as VectorizedPatternEngine)
+        """
+        self.evict(now_ms - self.window_ms, load)
+        c = self.counters
+        n = c['count']
+        if not n:
+            return []
+
+        results = [
+            post_meal_spike_result(
+                n, len(self.meal_hits), self.meal_spike_max[0][1] if self.meal_spike_max else 0
+            ),
+            dawn_phenomenon_result(
+                c['morning_count'], c['morning_sum'], c['overnight_count'], c['overnight_sum']
+            ),
+            nocturnal_hypoglycemia_result(
+                c['night_low_count'], self.night_low_min[0][1] if self.night_low_min else None
+            ),
+            afternoon_dip_result(c['dip_count'], c['dip_sum']),
+            high_variability_result(
+                n, c['total'] / n, exact_stdev_from_sums(n, c['total'], c['total_sq'])
+            ) if n >= 50 else None,
+            sustained_hyperglycemia_result(n, c['high_count'], c['high_sum']),
+            frequent_hypoglycemia_result(n, c['low_count'], c['low_sum']),
+            post_exercise_drop_result(n, len(self.drop_hits)),
+            stress_hyperglycemia_result(n, len(self.stress_hits)),
+            roller_coaster_result(
+                n, len(self.swing_hits), self.global_min[0][1], self.global_max[0][1]
+            ),
+        ]
+        return [result for result in results if result]
+
+    # ------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable snapshot."""
+        return {
+            'version': STATE_VERSION,
+            'window_ms': self.window_ms,
+            'last_ts': self.last_ts,
+            'seq': self.seq,
+            'evicted_to': self.evicted_to,
+            'tail': list(self.tail),
+            'counters': self.counters,
+            'global_max': list(self.global_max),
+            'global_min': list(self.global_min),
+            'night_low_min': list(self.night_low_min),
+            'rolling': {name: list(window) for name, window in self.rolling.items()},
+            'meal_hits': list(self.meal_hits),
+            'meal_spike_max': list(self.meal_spike_max),
+            'drop_hits': list(self.drop_hits),
+            'stress_hits': list(self.stress_hits),
+            'swing_hits': list(self.swing_hits),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> Optional['IncrementalPatternState']:
+        """Restore a snapshot; None if it was written by another STATE_VERSION."""
+        if not data or data.get('version') != STATE_VERSION:
+            return None
+
+        state = cls(data['window_ms'])
+        state.last_ts = data['last_ts']
+        state.seq = data['seq']
+        state.evicted_to = data['evicted_to']
+        state.tail = deque((tuple(item) for item in data['tail']), maxlen=_TAIL)
+        state.counters = dict(data['counters'])
+        for name in ('global_max', 'global_min', 'night_low_min', 'meal_hits', 'meal_spike_max'):
+            setattr(state, name, deque(tuple(item) for item in data[name]))
+        state.rolling = {
+            name: deque(tuple(item) for item in items) for name, items in data['rolling'].items()
+        }
+        for name in ('drop_hits', 'stress_hits', 'swing_hits'):
+            setattr(state, name, deque(data[name]))
+        return state
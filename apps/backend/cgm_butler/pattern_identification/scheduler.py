@@ -1,9 +1,13 @@
 """
 Pattern Identification Scheduler
 
-This module runs pattern identification for all users every 4 hours.
+This module keeps user patterns current with an incremental update every
+5 minutes (only new readings are processed) and rebuilds every user's
+detector state from the full 7-day window once a day. The daily rebuild
+runs in PATTERN_WORKERS worker processes (default 1 = serial).
 """
 
+import os
 import schedule
 import time
 from datetime import datetime
@@ -15,25 +19,28 @@ import io
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+# 全量重建的 worker 进程数; 5 分钟一次的增量更新只读新读数, 保持串行
+PATTERN_WORKERS = int(os.getenv('PATTERN_WORKERS', '1'))
 
-def run_pattern_identification():
-    """Run pattern identification for all users."""
-    print(f"\n{'='*60}")
-    print(f"Scheduled Pattern Identification - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"{'='*60}")
-    
+
+def run_incremental_pattern_update(rebuild: bool = False):
+    """Fold new readings into each user's pattern state."""
     try:
         identifier = CGMPatternIdentifier()
-        results = identifier.run_pattern_identification_for_all_users()
+        results = identifier.run_incremental_for_all_users(
+            rebuild=rebuild, workers=PATTERN_WORKERS if rebuild else 1
+        )
         
-        # Print summary
-        total_patterns = sum(r['patterns_detected'] for r in results)
-        print(f"\n✓ Successfully completed pattern identification")
-        print(f"  - Users processed: {len(results)}")
-        print(f"  - Total patterns detected: {total_patterns}")
+        changed = [r for r in results if any(r['changes'].values())]
+        if rebuild or changed:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] "
+                  f"{'Rebuilt' if rebuild else 'Updated'} pattern state for {len(results)} users, "
+                  f"{len(changed)} with pattern changes")
+        for result in changed:
+            print(f"  - {result['user_id']}: {result['changes']}")
         
     except Exception as e:
-        print(f"\n✗ Error during pattern identification: {e}")
+        print(f"\n✗ Error during incremental pattern update: {e}")
         import traceback
         traceback.print_exc()
 
@@ -44,17 +51,18 @@ def start_scheduler():
     print("CGM Pattern Identification Scheduler")
     print("="*60)
     print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("Schedule: Every 4 hours")
+    print("Schedule: Incremental update every 5 minutes, full rebuild daily at 03:00")
     print("="*60)
     
-    # Schedule the job to run every 4 hours
-    schedule.every(4).hours.do(run_pattern_identification)
+    # 增量更新只处理新读数; 每日全量重建覆盖补传 / 修正的历史读数
+    schedule.every(5).minutes.do(run_incremental_pattern_update)
+    schedule.every().day.at("03:00").do(run_incremental_pattern_update, rebuild=True)
     
     # Run immediately on startup
     print("\nRunning initial pattern identification...")
-    run_pattern_identification()
+    run_incremental_pattern_update(rebuild=True)
     
-    print(f"\nScheduler is now running. Next run in 4 hours.")
+    print(f"\nScheduler is now running. Next update in 5 minutes.")
     print("Press Ctrl+C to stop.\n")
     
     # Keep the scheduler running
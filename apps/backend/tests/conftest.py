@@ -0,0 +1,13 @@
+"""
+Pytest Configuration for CGM Butler Backend Tests
+"""
+
+import sys
+import os
+
+# Add project root (shared 模块) and cgm_butler (后端模块) to path
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+cgm_butler_root = os.path.join(project_root, 'apps', 'backend', 'cgm_butler')
+for path in (project_root, cgm_butler_root):
+    if path not in sys.path:
+        sys.path.insert(0, path)
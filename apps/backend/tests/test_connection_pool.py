@@ -0,0 +1,71 @@
+"""
+Tests for CGMDatabase connection reuse and one-time schema bootstrap
+"""
+
+import threading
+
+import pytest
+from database import CGMDatabase, close_idle_connections
+from shared.database.schema import create_all_tables
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "cgm.db")
+    yield path
+    close_idle_connections(path)
+
+
+def test_pooled_connection_is_reused_and_rolled_back(db_path):
+    """Test a returned connection is handed out again without its uncommitted writes."""
+    with CGMDatabase(db_path, pooled=True) as db:
+        first = db.conn
+        db.conn.execute("CREATE TABLE notes (body TEXT)")
+        db.conn.commit()
+        db.conn.execute("INSERT INTO notes VALUES ('uncommitted')")
+
+    with CGMDatabase(db_path, pooled=True) as db:
+        assert db.conn is first
+        assert db.conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0] == 0
+
+    # 非池化实例仍然每次新建并关闭连接
+    with CGMDatabase(db_path) as db:
+        assert db.conn is not first
+    assert close_idle_connections(db_path) == 1
+
+
+def test_pooled_connection_can_move_between_threads(db_path):
+    """Test a connection returned by one request thread can serve the next one."""
+    seen = []
+
+    def request():
+        with CGMDatabase(db_path, pooled=True) as db:
+            seen.append(db.conn)
+            db.conn.execute("SELECT 1").fetchone()
+
+    for _ in range(3):
+        worker = threading.Thread(target=request)
+        worker.start()
+        worker.join()
+    assert seen[0] is seen[1] is seen[2]
+
+
+def test_bootstrap_skips_per_connection_ddl(db_path, monkeypatch):
+    """Test connections after bootstrap_schema run no CREATE statements."""
+    CGMDatabase.bootstrap_schema(db_path)
+    with CGMDatabase(db_path) as db:
+        create_all_tables(db.conn)
+    checks = []
+    monkeypatch.setattr(CGMDatabase, "_ensure_activity_logs_table", lambda self: checks.append(self))
+
+    with CGMDatabase(db_path, pooled=True) as db:
+        tables = {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"activity_logs", "meal_responses", "food_response_index"} <= tables
+
+        statements = []
+        db.conn.set_trace_callback(statements.append)
+        assert db.get_meal_responses("u1") == []
+        db.conn.set_trace_callback(None)
+
+    assert checks == []
+    assert not any(sql.lstrip().upper().startswith("CREATE") for sql in statements)
@@ -0,0 +1,122 @@
+"""
+Tests for the daily pattern rule engine
+"""
+
+import sqlite3
+
+import numpy as np
+from pattern_identification.daily_rules import DAY_MS, DailyRuleEngine, date_to_day
+from pattern_identification.identifier import CGMPatternIdentifier
+from shared.analytics import ReadingSeries
+
+START_DAY = date_to_day("2025-07-01")
+STEP_MS = 5 * 60 * 1000
+
+
+def _days(shapes):
+    """One day of 5-minute readings per shape(minute_of_day) -> glucose."""
+    minutes = np.arange(288) * 5
+    ts = [(START_DAY + d) * DAY_MS + minutes.astype(np.int64) * 60000 for d in range(len(shapes))]
+    glucose = [np.asarray(shape(minutes), dtype=np.float32) for shape in shapes]
+    return ReadingSeries(np.concatenate(ts), np.concatenate(glucose))
+
+
+def _flat(m):
+    return np.full(len(m), 110)
+
+
+def _high_morning(m):
+    return np.where((m >= 240) & (m < 480), 200, 110)
+
+
+def _spiky(m):
+    # 三次餐后尖峰: 30 分钟升高 80, 60 分钟内回落
+    g = np.full(len(m), 100.0)
+    for start in (420, 720, 1080):
+        g += np.interp(m, [start, start + 30, start + 90], [0, 80, 0], left=0, right=0)
+    return g
+
+
+def _ids(results, date):
+    return [rule["pattern_id"] for rule in results.get(date, [])]
+
+
+def test_rules_need_enough_qualifying_days():
+    """Test a rule fires only once its required days fall inside the window."""
+    results = DailyRuleEngine(_days([_high_morning] * 3 + [_flat] * 4 + [_flat] * 3)).evaluate()
+
+    assert "2025-07-04" not in results  # 只有 4 个有效日
+    assert _ids(results, "2025-07-05") == ["morning_hyperglycemia"]
+    rule = results["2025-07-07"][0]
+    assert rule["metrics"]["analysis_days_considered"] == 7
+    assert [e["service_date"] for e in rule["evidence"]["examples"]] == ["2025-07-01", "2025-07-02", "2025-07-03"]
+    assert rule["evidence"]["examples"][0]["minutes_high"] == 240.0
+    # 第一个清晨高血糖日移出 7 天窗口
+    assert "2025-07-08" not in results
+
+
+def test_low_coverage_days_are_not_analysis_days():
+    """Test days below the coverage threshold do not count toward the window."""
+    series = _days([_spiky] * 6)
+    sparse = np.flatnonzero((series.ts // DAY_MS != START_DAY + 2) | (np.arange(len(series)) % 2 == 0))
+    results = DailyRuleEngine(series.take(sparse)).evaluate()
+
+    rule = next(r for r in results["2025-07-06"] if r["pattern_id"] == "frequent_spike")
+    assert rule["metrics"]["analysis_days_considered"] == 5
+    assert rule["metrics"]["frequent_spike_days"] == 5
+    assert rule["metrics"]["avg_spikes_per_day"] == 3.0
+    assert "2025-07-03" not in [e["service_date"] for e in rule["evidence"]["examples"]]
+
+
+def test_run_daily_rules_for_user_replaces_stored_range(tmp_path):
+    """Test stored results are replaced per range and read back in rules.json shape."""
+    db_path = str(tmp_path / "cgm.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE cgm_readings (user_id TEXT, ts_epoch INTEGER, glucose_value INTEGER)")
+    series = _days([_high_morning] * 8)
+    conn.executemany("INSERT INTO cgm_readings VALUES (?, ?, ?)",
+                     [("u1", int(t), int(g)) for t, g in zip(series.ts, series.glucose)])
+    conn.commit()
+
+    identifier = CGMPatternIdentifier(db_path=db_path)
+    summary = identifier.run_daily_rules_for_user("u1")
+    assert summary["service_dates"] == 4 and summary["rules_saved"] == 4
+    assert identifier.get_daily_rules("u1") == DailyRuleEngine(series).evaluate()
+
+    # 7 月 4 日起读数改为正常后重算最后两天, 只替换该范围
+    conn.execute("UPDATE cgm_readings SET glucose_value = 110 WHERE ts_epoch >= ?",
+                 ((START_DAY + 3) * DAY_MS,))
+    conn.commit()
+    conn.close()
+    identifier.run_daily_rules_for_user("u1", "2025-07-07", "2025-07-08")
+    stored = identifier.get_daily_rules("u1")
+    assert sorted(stored) == ["2025-07-05", "2025-07-06", "2025-07-07"]
+    assert stored["2025-07-06"][0]["metrics"]["morning_high_days"] == 6
+    assert stored["2025-07-07"][0]["metrics"]["morning_high_days"] == 3
+    assert list(identifier.get_daily_rules("u1", "2025-07-06", "2025-07-06")) == ["2025-07-06"]
+
+
+def test_evaluated_ranges_without_hits_are_not_rerun(tmp_path):
+    """Test a range with no rule hits counts as evaluated until new days of readings arrive."""
+    db_path = str(tmp_path / "cgm.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE cgm_readings (user_id TEXT, ts_epoch INTEGER, glucose_value INTEGER)")
+    series = _days([_flat] * 9)
+    rows = [("u1", int(t), int(g)) for t, g in zip(series.ts, series.glucose)]
+    conn.executemany("INSERT INTO cgm_readings VALUES (?, ?, ?)", rows[:8 * 288])
+    conn.commit()
+
+    identifier = CGMPatternIdentifier(db_path=db_path)
+    assert not identifier.daily_rules_evaluated("u1")
+    summary = identifier.run_daily_rules_for_user("u1", "2025-07-01", "2025-07-31")
+    assert summary["rules_saved"] == 0
+    assert identifier.daily_rules_evaluated("u1")
+    assert identifier.daily_rules_evaluated("u1", "2025-07-03", "2025-07-31")
+
+    # 新的一天有了读数后需要重新评估
+    conn.executemany("INSERT INTO cgm_readings VALUES (?, ?, ?)", rows[8 * 288:])
+    conn.commit()
+    conn.close()
+    assert identifier.daily_rules_evaluated("u1", "2025-07-01", "2025-07-08")
+    assert not identifier.daily_rules_evaluated("u1", "2025-07-01", "2025-07-31")
+    assert not identifier.daily_rules_evaluated("nobody")
@@ -0,0 +1,184 @@
+"""
+Tests for stored meal responses (CGMDatabase.get_meal_responses)
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from database import CGMDatabase
+from shared.database.repositories import CGMRepository
+from shared.database.schema import create_all_tables
+
+
+def _readings(start, hours, meal_offsets_min=()):
+    """5-minute readings at 100 mg/dL with a 60 mg/dL bump 45 minutes after each meal."""
+    readings = []
+    for i in range(hours * 12):
+        minute = i * 5
+        glucose = 100
+        for offset in meal_offsets_min:
+            since = minute - offset
+            if 0 <= since <= 45:
+                glucose += round(60 * since / 45)
+            elif 45 < since <= 120:
+                glucose += round(60 * (120 - since) / 75)
+        readings.append({
+            "timestamp": (start + timedelta(minutes=minute)).isoformat(),
+            "glucose_value": glucose,
+        })
+    return readings
+
+
+@pytest.fixture
+def db(tmp_path):
+    """CGMDatabase on a fresh file with the shared CGM tables."""
+    path = str(tmp_path / "cgm.db")
+    with CGMDatabase(path) as database:
+        create_all_tables(database.conn)
+        database.conn.execute("INSERT INTO users (user_id, name) VALUES ('u1', 'Test User')")
+        database.conn.commit()
+        yield database
+
+
+def _computed_at(db):
+    return dict(db.conn.execute("SELECT log_id, computed_at FROM meal_responses").fetchall())
+
+
+def test_meal_responses_are_stored_and_reused(db):
+    """Test responses are computed once per log and only recomputed when stale."""
+    start = datetime(2025, 1, 1, 6, 0)
+    CGMRepository(db.conn).save_readings_bulk("u1", _readings(start, 10, (60, 360)))
+    breakfast = db.add_activity_log("u1", category="food", title="Oatmeal", timestamp_utc="2025-01-01T07:00:00")
+    lunch = db.add_activity_log("u1", category="food", title="Pasta", timestamp_utc="2025-01-01T12:00:00")
+    db.add_activity_log("u1", category="lifestyle", title="Walk", timestamp_utc="2025-01-01T09:00:00")
+
+    responses = db.get_meal_responses("u1")
+    assert [r["log_id"] for r in responses] == [lunch["id"], breakfast["id"]]
+    oatmeal = responses[1]
+    assert oatmeal["baseline_glucose"] == 100
+    assert oatmeal["peak_glucose"] == 160
+    assert oatmeal["time_to_peak_minutes"] == 45
+    assert oatmeal["rise"] == 60 and oatmeal["has_spike"]
+    assert oatmeal["return_to_baseline_minutes"] == 120
+    assert oatmeal["iauc"] == pytest.approx(60 * 120 / 2, rel=0.01)
+
+    first = _computed_at(db)
+    assert db.get_meal_responses("u1") == responses
+    assert _computed_at(db) == first
+
+    # 修改用餐时间只重算这一餐
+    db.update_activity_log(lunch["id"], timestamp_utc="2025-01-01T12:30:00")
+    moved = {r["log_id"]: r for r in db.get_meal_responses("u1")}
+    assert moved[lunch["id"]]["time_to_peak_minutes"] == 15
+    assert _computed_at(db)[breakfast["id"]] == first[breakfast["id"]]
+
+    db.delete_activity_log(breakfast["id"])
+    assert [r["log_id"] for r in db.get_meal_responses("u1")] == [lunch["id"]]
+    assert list(_computed_at(db)) == [lunch["id"]]
+
+
+def test_new_readings_recompute_covering_meals(db):
+    """Test a meal logged before its readings arrive is recomputed once they do."""
+    start = datetime(2025, 1, 1, 6, 0)
+    repo = CGMRepository(db.conn)
+    repo.save_readings_bulk("u1", _readings(start, 1))
+    meal = db.add_activity_log("u1", category="food", title="Toast", timestamp_utc="2025-01-01T06:50:00")
+
+    pending = db.get_meal_responses("u1")[0]
+    assert pending["reading_count"] == 2 and pending["peak_glucose"] == 100
+
+    repo.save_readings_bulk("u1", _readings(start, 6, (50,)), mode="upsert")
+    done = db.get_meal_responses("u1")[0]
+    assert done["log_id"] == meal["id"]
+    assert done["reading_count"] == 25 and done["peak_glucose"] == 160
+
+
+def test_agrees_with_single_meal_spike_check(db):
+    """Test the batched result matches detect_post_meal_spike for the same meal."""
+    CGMRepository(db.conn).save_readings_bulk("u1", _readings(datetime(2025, 1, 1, 6, 0), 4, (60,)))
+    db.add_activity_log("u1", category="food", title="Rice", timestamp_utc="2025-01-01T07:00:00")
+
+    has_spike, details = db.detect_post_meal_spike("u1", "2025-01-01T07:00:00")
+    response = db.get_meal_responses("u1")[0]
+
+    assert response["has_spike"] == has_spike
+    assert response["baseline_glucose"] == details["pre_meal_glucose"]
+    assert response["peak_glucose"] == details["peak_glucose"]
+    assert response["peak_time"] == details["peak_time"]
+
+
+def test_food_index_groups_titles_and_stays_current(db):
+    """Test the per-food index is keyed by normalised title and follows log and reading changes."""
+    start = datetime(2025, 1, 1, 6, 0)
+    repo = CGMRepository(db.conn)
+    repo.save_readings_bulk("u1", _readings(start, 8, (60, 360)))
+    db.add_activity_log("u1", category="food", title="Oatmeal", timestamp_utc="2025-01-01T07:00:00")
+    pasta = db.add_activity_log("u1", category="food", title="Pasta", timestamp_utc="2025-01-01T12:00:00")
+    db.add_activity_log("u1", category="food", title="oatmeal!", timestamp_utc="2025-01-01T15:00:00")
+
+    oatmeal = db.get_food_response("u1", "OATMEAL")
+    assert oatmeal["log_count"] == 2 and oatmeal["meal_count"] == 1
+    assert oatmeal["title"] == "oatmeal!" and oatmeal["last_eaten_utc"].startswith("2025-01-01T15:00:00")
+    assert oatmeal["median_rise"] == 60 and oatmeal["spike_count"] == 1
+    assert db.get_food_response("u1", "pizza") is None
+
+    # 数据未变化时只做主键查询
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    assert db.get_food_response("u1", "oatmeal") == oatmeal
+    db.conn.set_trace_callback(None)
+    assert not any("FROM meal_responses" in sql or "FROM activity_logs" in sql for sql in statements)
+
+    # 新读数让 15:00 那一餐有了数据
+    repo.save_readings_bulk("u1", _readings(start + timedelta(hours=8), 4))
+    oatmeal = db.get_food_response("u1", "oatmeal")
+    assert oatmeal["meal_count"] == 2 and oatmeal["mean_rise"] == 30 and oatmeal["spike_count"] == 1
+
+    # 改名把这一餐移到另一种食物
+    db.update_activity_log(pasta["id"], title="Oatmeal")
+    assert db.get_food_response("u1", "oatmeal")["log_count"] == 3
+    assert db.get_food_response("u1", "pasta") is None
+
+    db.delete_activity_log(pasta["id"])
+    assert [r["log_count"] for r in db.get_food_responses("u1")] == [2]
+
+
+def test_food_index_updates_only_what_changed(db):
+    """Test log writes update the index directly and new readings only revisit the meals they cover."""
+    repo = CGMRepository(db.conn)
+    repo.save_readings_bulk("u1", _readings(datetime(2025, 1, 1, 6, 0), 4, (60,)))
+    first = db.add_activity_log("u1", category="food", title="Oatmeal", timestamp_utc="2025-01-01T07:00:00")
+    assert db.get_food_response("u1", "oatmeal")["meal_count"] == 1
+
+    # 索引建立后新增日志直接更新索引行, 查询时无需重新同步
+    late = db.add_activity_log("u1", category="food", title="Oatmeal", timestamp_utc="2025-01-05T07:00:00")
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    oatmeal = db.get_food_response("u1", "oatmeal")
+    db.conn.set_trace_callback(None)
+    assert oatmeal["log_count"] == 2 and oatmeal["meal_count"] == 1
+    assert not any("FROM activity_logs" in sql for sql in statements)
+
+    # 新读数只覆盖 1 月 5 日, 更早的餐不再读取
+    computed = _computed_at(db)
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    repo.save_readings_bulk("u1", _readings(datetime(2025, 1, 5, 6, 0), 4, (60,)))
+    oatmeal = db.get_food_response("u1", "oatmeal")
+    db.conn.set_trace_callback(None)
+    assert oatmeal["meal_count"] == 2
+    assert any("FROM activity_logs" in sql and "day_utc >= '2025-01-04'" in sql for sql in statements)
+    assert not any("FROM meal_responses WHERE user_id = 'u1'" in sql for sql in statements)
+    assert _computed_at(db)[first["id"]] == computed[first["id"]]
+    assert _computed_at(db)[late["id"]] != computed[late["id"]]
+
+
+def test_activity_logs_work_without_migrations(tmp_path):
+    """Test logs can be added and deleted on a database that only CGMDatabase has touched."""
+    with CGMDatabase(str(tmp_path / "plain.db")) as db:
+        walk = db.add_activity_log("u1", category="lifestyle", title="Walk", timestamp_utc="2025-01-01T07:00:00Z")
+        meal = db.add_activity_log("u1", category="food", title="Toast", timestamp_utc="2025-01-01T08:00:00Z")
+
+        assert db.delete_activity_log(walk["id"])
+        assert db.delete_activity_log(meal["id"])
+        assert db.get_activity_logs("u1") == []
@@ -0,0 +1,219 @@
+"""
+Tests for the vectorized pattern detection engine
+"""
+
+import random
+import sqlite3
+import statistics
+import time
+
+import numpy as np
+import pytest
+from shared.analytics import ReadingSeries
+from pattern_identification.identifier import CGMPatternIdentifier
+from pattern_identification.engine import VectorizedPatternEngine
+from pattern_identification.features import FeatureFrame, StageTimer, exact_stdev
+
+
+DAY_START = 1735689600000  # 2025-01-01T00:00:00Z
+FIVE_MIN = 300000
+
+
+def _random_series(n, seed):
+    """Random walk with meal spikes, night lows and occasional jumps."""
+    rng = random.Random(seed)
+    values, glucose = [], rng.randint(70, 160)
+    for i in range(n):
+        hour = (i // 12) % 24
+        glucose += rng.randint(-12, 12)
+        if hour in (8, 13, 19) and i % 12 < 4:
+            glucose += rng.randint(5, 30)
+        if hour < 6 and rng.random() < 0.3:
+            glucose -= rng.randint(5, 20)
+        if rng.random() < 0.02:
+            glucose += rng.choice((-60, 60))
+        glucose = min(max(glucose, 40), 350)
+        values.append(glucose)
+    return ReadingSeries(DAY_START + np.arange(n) * FIVE_MIN, values)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_engine_matches_legacy_detectors(seed):
+    """Test every vectorized detector returns exactly what the dict-based one does."""
+    n = random.Random(seed).choice([0, 5, 11, 12, 13, 23, 24, 25, 49, 50, 51, 300, 2016])
+    series = _random_series(n, seed)
+    legacy = CGMPatternIdentifier(db_path=":memory:")
+    readings = series.to_records()
+
+    for detector in VectorizedPatternEngine(FeatureFrame(series)).detectors():
+        expected = getattr(legacy, detector.__name__)(readings)
+        assert detector() == expected, detector.__name__
+
+
+def test_engine_detects_patterns():
+    """Test the parity series actually trigger detectors (not only None == None)."""
+    hits = set()
+    for seed in range(40):
+        for detector in VectorizedPatternEngine(FeatureFrame(_random_series(2016, seed))).detectors():
+            if detector():
+                hits.add(detector.__name__)
+
+    assert len(hits) >= 6
+
+
+def test_stdev_matches_statistics():
+    """Test the exact standard deviation is bit-identical to statistics.stdev."""
+    rng = np.random.default_rng(3)
+    for n in (2, 3, 50, 2016):
+        values = rng.integers(40, 400, n)
+        assert exact_stdev(values) == statistics.stdev(values.tolist())
+    assert exact_stdev(np.array([120, 120, 120])) == 0.0
+
+
+def test_feature_frame_globals():
+    """Test global features match the statistics module and cached windows align."""
+    series = _random_series(300, 1)
+    frame = FeatureFrame(series)
+    values = frame.glucose.tolist()
+
+    assert frame.mean == statistics.mean(values)
+    assert frame.cv == (statistics.stdev(values) / statistics.mean(values)) * 100
+    assert len(frame.window_max(24)) == len(frame.window_starts(24)) == 276
+    assert frame.window_max(24) is frame.window_max(24)
+    assert int(frame.low.sum()) == sum(v < 70 for v in values)
+
+
+def test_identify_patterns_reports_stage_timings(tmp_path):
+    """Test one run times loading, the feature pass and every detector."""
+    db_path = str(tmp_path / "cgm.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE cgm_readings (user_id TEXT, ts_epoch INTEGER, glucose_value INTEGER)")
+    series = _random_series(288, 5)
+    offset = int(time.time() * 1000) - DAY_START - 288 * FIVE_MIN
+    conn.executemany(
+        "INSERT INTO cgm_readings VALUES ('u1', ?, ?)",
+        [(int(ts) + offset, int(g)) for ts, g in zip(series.ts, series.glucose)]
+    )
+    conn.commit()
+    conn.close()
+
+    timer = StageTimer()
+    CGMPatternIdentifier(db_path=db_path).identify_patterns("u1", timer)
+
+    assert {"load", "features", "detect_post_meal_spike", "detect_roller_coaster"} <= set(timer.stages)
+    assert "features" in timer.report()
+
+
+def _write_users(db_path, users, n=864):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE users (user_id TEXT)")
+    conn.execute("CREATE TABLE cgm_readings (user_id TEXT, ts_epoch INTEGER, glucose_value INTEGER)")
+    offset = int(time.time() * 1000) - DAY_START - n * FIVE_MIN
+    for u in range(users):
+        series = _random_series(n, u)
+        conn.execute("INSERT INTO users VALUES (?)", (f"u{u}",))
+        conn.executemany(
+            "INSERT INTO cgm_readings VALUES (?, ?, ?)",
+            [(f"u{u}", int(ts) + offset, int(g)) for ts, g in zip(series.ts, series.glucose)]
+        )
+    conn.commit()
+    conn.close()
+
+
+def _details(results):
+    return [[p["details"] for p in r["patterns"]] for r in results]
+
+
+def test_parallel_run_matches_serial(tmp_path):
+    """Test the worker pool detects the same patterns as the serial loop."""
+    # 文件名含 URI 保留字符, 只读 worker 连接也要打开同一个文件
+    serial_db, parallel_db = str(tmp_path / "serial.db"), str(tmp_path / "parallel ?#%.db")
+    _write_users(serial_db, 12)
+    _write_users(parallel_db, 12)
+
+    serial = CGMPatternIdentifier(db_path=serial_db).run_pattern_identification_for_all_users()
+    parallel = CGMPatternIdentifier(db_path=parallel_db).run_pattern_identification_for_all_users(
+        workers=2, chunk_size=5
+    )
+
+    assert [r["user_id"] for r in parallel] == [f"u{u}" for u in range(12)]
+    assert _details(parallel) == _details(serial)
+    assert any(_details(serial))
+    with sqlite3.connect(parallel_db) as conn:
+        saved = conn.execute("SELECT COUNT(*) FROM user_patterns").fetchone()[0]
+    assert saved == sum(r["patterns_detected"] for r in serial)
+
+    # 数据未变化: 第二轮全部命中缓存, 不再重复写入
+    again = CGMPatternIdentifier(db_path=parallel_db).run_pattern_identification_for_all_users(
+        workers=2, chunk_size=5
+    )
+    assert all(r["cached"] for r in again) and _details(again) == _details(serial)
+    with sqlite3.connect(parallel_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM user_patterns").fetchone()[0] == saved
+
+
+def test_cached_result_invalidated_by_new_reading(tmp_path):
+    """Test a new reading (or a new detector version) forces a recompute."""
+    db_path = str(tmp_path / "cgm.db")
+    _write_users(db_path, 1)
+    identifier = CGMPatternIdentifier(db_path=db_path)
+
+    first = identifier.run_pattern_identification_for_user("u0")
+    assert not first["cached"]
+    assert identifier.run_pattern_identification_for_user("u0")["cached"]
+    cached = identifier.get_cached_patterns("u0")
+    assert [p["pattern_name"] for p in cached] == [p["name"] for p in first["patterns"]]
+    # 与 user_patterns 记录同一结构 (/api/patterns 不因缓存状态改变)
+    with sqlite3.connect(db_path) as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(user_patterns)")]
+    assert all(list(p) == columns for p in cached)
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO cgm_readings VALUES ('u0', ?, 120)", (int(time.time() * 1000),))
+    assert identifier.get_cached_patterns("u0") is None
+    assert not identifier.run_pattern_identification_for_user("u0")["cached"]
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("UPDATE cgm_pattern_cache SET detector_version = -1")
+    assert not identifier.run_pattern_identification_for_user("u0")["cached"]
+    assert identifier.get_cached_patterns("nobody") is None
+
+
+def test_failed_pattern_save_leaves_no_cache(tmp_path):
+    """Test patterns and cache entries commit together, so a failed save is retried."""
+    db_path = str(tmp_path / "cgm.db")
+    _write_users(db_path, 4)
+    with sqlite3.connect(db_path) as conn:
+        # 旧表结构 (无 period 列) 使写入失败
+        conn.execute("CREATE TABLE user_patterns (user_id TEXT, pattern_type TEXT)")
+
+    results = CGMPatternIdentifier(db_path=db_path).run_pattern_identification_for_all_users(
+        workers=2, chunk_size=2
+    )
+    assert any(r["patterns_detected"] for r in results)
+    assert not CGMPatternIdentifier(db_path=db_path).run_pattern_identification_for_user("u0")["cached"]
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM cgm_pattern_cache").fetchone()[0] == 0
+
+
+def test_save_patterns_upserts_daily_occurrences(tmp_path):
+    """Test repeated detections update one row per (user, pattern, day)."""
+    db_path = str(tmp_path / "cgm.db")
+    identifier = CGMPatternIdentifier(db_path=db_path)
+    pattern = {
+        "user_id": "u1", "pattern_type": "dawn_phenomenon", "name": "Dawn Phenomenon",
+        "description": "", "severity": "medium", "confidence": 0.7, "details": "first",
+    }
+
+    identifier.save_patterns_to_db([dict(pattern, detected_at="2025-01-01T04:00:00")])
+    identifier.save_patterns_to_db([dict(pattern, detected_at="2025-01-01T08:00:00", details="second")])
+    identifier.save_patterns_to_db([dict(pattern, detected_at="2025-01-02T04:00:00")])
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT period, first_seen, last_seen, hit_count, details FROM user_patterns ORDER BY period"
+        ).fetchall()
+    assert rows == [
+        ("2025-01-01", "2025-01-01T04:00:00", "2025-01-01T08:00:00", 2, "second"),
+        ("2025-01-02", "2025-01-02T04:00:00", "2025-01-02T04:00:00", 1, "first"),
+    ]
@@ -0,0 +1,244 @@
+"""
+Tests for incremental pattern detection state
+"""
+
+import json
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pattern_identification.identifier import CGMPatternIdentifier
+from pattern_identification.engine import VectorizedPatternEngine
+from pattern_identification.features import FeatureFrame
+from pattern_identification.incremental import IncrementalPatternState, WINDOW_MS
+
+from .test_pattern_engine import _random_series, _write_users
+
+
+def _with_gaps(series, seed):
+    """Drop random readings and 3-hour stretches (sensor gaps)."""
+    rng = random.Random(seed)
+    gaps = {rng.randrange(len(series) // 36) for _ in range(4)}
+    keep = [i for i in range(len(series)) if i // 36 not in gaps and rng.random() > 0.05]
+    return series.take(keep)
+
+
+def _loader(series):
+    """load(start_ms, end_ms) over an in-memory series."""
+    def load(start_ms, end_ms):
+        window = series.slice_time(start_ms, end_ms)
+        return zip(window.ts.tolist(), window.glucose.tolist())
+    return load
+
+
+def _batch(series, now_ms):
+    window = series.slice_time(now_ms - WINDOW_MS)
+    if not len(window):
+        return []
+    return [r for r in (d() for d in VectorizedPatternEngine(FeatureFrame(window)).detectors()) if r]
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_incremental_matches_batch_engine(seed):
+    """Test streaming readings one by one gives the batch result at every checkpoint."""
+    series = _with_gaps(_random_series(2016 * 2, seed), seed)
+    state = IncrementalPatternState()
+    load = _loader(series)
+
+    for i, (ts, glucose) in enumerate(zip(series.ts.tolist(), series.glucose.tolist())):
+        state.ingest(ts, glucose)
+        if i % 397 == 0 or i == len(series) - 1:
+            assert state.evaluate(ts, load) == _batch(series.slice_time(0, ts + 1), ts)
+
+    # 无新读数时, 随时间推移旧读数移出窗口
+    later = int(series.ts[-1]) + WINDOW_MS // 2
+    assert state.evaluate(later, load) == _batch(series, later)
+
+
+def test_state_round_trips_through_json():
+    """Test a restored snapshot continues exactly like the original state."""
+    series = _random_series(2016 + 500, 3)
+    ts, glucose = series.ts.tolist(), series.glucose.tolist()
+    load = _loader(series)
+    state = IncrementalPatternState()
+    for t, g in zip(ts[:2016], glucose[:2016]):
+        state.ingest(t, g)
+    state.evaluate(ts[2015], load)
+
+    snapshot = json.dumps(state.to_dict())
+    assert "readings" not in json.loads(snapshot)
+    restored = IncrementalPatternState.from_dict(json.loads(snapshot))
+    for t, g in zip(ts[2016:], glucose[2016:]):
+        state.ingest(t, g)
+        restored.ingest(t, g)
+
+    assert restored.evaluate(ts[-1], load) == state.evaluate(ts[-1], load)
+    assert restored.evaluate(ts[-1], load) == _batch(series, ts[-1])
+    assert IncrementalPatternState.from_dict({"version": -1}) is None
+    with pytest.raises(ValueError):
+        state.ingest(ts[-1], 100)
+
+
+def test_run_incremental_for_user_reads_only_new_readings(tmp_path):
+    """Test the identifier persists state, ingests the delta and reports changes."""
+    db_path = str(tmp_path / "cgm.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE cgm_readings (user_id TEXT, ts_epoch INTEGER, glucose_value INTEGER)")
+    series = _random_series(2016, 7)
+    rows = [("u1", int(t), int(g)) for t, g in zip(series.ts, series.glucose)]
+    conn.executemany("INSERT INTO cgm_readings VALUES (?, ?, ?)", rows[:1500])
+    conn.commit()
+
+    identifier = CGMPatternIdentifier(db_path=db_path)
+    now = datetime.fromtimestamp(rows[-1][1] / 1000, timezone.utc)
+    first = identifier.run_incremental_for_user("u1", now=now)
+    assert first["rebuilt"] and first["readings_ingested"] == 1500
+    assert first["changes"]["new"] == [p["pattern_type"] for p in first["patterns"]]
+
+    conn.executemany("INSERT INTO cgm_readings VALUES (?, ?, ?)", rows[1500:])
+    conn.commit()
+    conn.close()
+
+    second = identifier.run_incremental_for_user("u1", now=now)
+    assert not second["rebuilt"] and second["readings_ingested"] == 516
+    assert second["patterns_saved"] == second["patterns_detected"]
+
+    # 未变化的模式也写入当天记录 (last_seen / hit_count 前进)
+    def hits():
+        with sqlite3.connect(db_path) as check:
+            return dict(check.execute("SELECT pattern_type, hit_count FROM user_patterns"))
+
+    before = hits()
+    unchanged = identifier.run_incremental_for_user("u1", now=now)
+    assert not any(unchanged["changes"].values())
+    assert unchanged["patterns_saved"] == unchanged["patterns_detected"] > 0
+    assert hits() == {t: count + 1 for t, count in before.items()}
+
+    rebuilt = identifier.run_incremental_for_user("u1", rebuild=True, now=now)
+    assert [p["details"] for p in rebuilt["patterns"]] == [p["details"] for p in second["patterns"]]
+    assert not any(rebuilt["changes"].values())
+
+
+def test_incremental_run_fills_pattern_cache(tmp_path):
+    """Test the incremental path stores its result for get_cached_patterns."""
+    db_path = str(tmp_path / "cgm.db")
+    _write_users(db_path, 1)
+    identifier = CGMPatternIdentifier(db_path=db_path)
+
+    result = identifier.run_incremental_for_user("u0")
+    assert result["patterns"]
+    cached = identifier.get_cached_patterns("u0")
+    assert [(p["pattern_type"], p["details"]) for p in cached] == \
+        [(p["pattern_type"], p["details"]) for p in result["patterns"]]
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO cgm_readings VALUES ('u0', ?, 120)", (int(time.time() * 1000),))
+    assert identifier.get_cached_patterns("u0") is None
+
+
+def test_parallel_rebuild_matches_serial(tmp_path):
+    """Test the scheduled rebuild gives the same states and patterns with a worker pool."""
+    serial_db, parallel_db = str(tmp_path / "serial.db"), str(tmp_path / "parallel.db")
+    _write_users(serial_db, 12)
+    _write_users(parallel_db, 12)
+
+    serial = CGMPatternIdentifier(db_path=serial_db).run_incremental_for_all_users(rebuild=True)
+    identifier = CGMPatternIdentifier(db_path=parallel_db)
+    parallel = identifier.run_incremental_for_all_users(rebuild=True, workers=2, chunk_size=5)
+
+    assert [r["user_id"] for r in parallel] == [f"u{u}" for u in range(12)]
+    assert all(r["rebuilt"] for r in parallel)
+    assert [[p["details"] for p in r["patterns"]] for r in parallel] == \
+        [[p["details"] for p in r["patterns"]] for r in serial]
+    assert [r["patterns_saved"] for r in parallel] == [r["patterns_detected"] for r in serial]
+    assert all("state" not in r for r in parallel)
+    with sqlite3.connect(parallel_db) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM cgm_pattern_state").fetchone()[0] == 12
+    cached = identifier.get_cached_patterns("u3")
+    assert [p["details"] for p in cached] == [p["details"] for p in parallel[3]["patterns"]]
+
+    # 之后的增量运行接着 worker 写入的状态
+    again = identifier.run_incremental_for_all_users(workers=2, chunk_size=5)
+    assert not any(r["rebuilt"] for r in again)
+
+
+def test_backfilled_readings_rebuild_the_state(tmp_path):
+    """Test readings written behind the state's last timestamp trigger a rebuild."""
+    db_path = str(tmp_path / "cgm.db")
+    series = _random_series(2016, 11)
+    rows = [("u1", int(t), int(g)) for t, g in zip(series.ts, series.glucose)]
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE cgm_readings (user_id TEXT, ts_epoch INTEGER, glucose_value INTEGER)")
+    conn.executemany("INSERT INTO cgm_readings VALUES (?, ?, ?)", rows[::2])
+    conn.commit()
+
+    identifier = CGMPatternIdentifier(db_path=db_path)
+    now = datetime.fromtimestamp(rows[-1][1] / 1000, timezone.utc)
+    identifier.run_incremental_for_user("u1", now=now)
+
+    conn.executemany("INSERT INTO cgm_readings VALUES (?, ?, ?)", rows[1::2])
+    conn.commit()
+    conn.close()
+
+    update = identifier.run_incremental_for_user("u1", now=now, changed_from=rows[1][1])
+    assert update["rebuilt"] and update["readings_ingested"] == len(rows)
+    rebuilt = identifier.run_incremental_for_user("u1", rebuild=True, now=now)
+    assert [p["details"] for p in update["patterns"]] == [p["details"] for p in rebuilt["patterns"]]
+
+
+def _readings_db(path, series):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE cgm_readings (user_id TEXT, ts_epoch INTEGER, glucose_value INTEGER)")
+    conn.executemany("INSERT INTO cgm_readings VALUES (?, ?, ?)",
+                     [("u1", int(t), int(g)) for t, g in zip(series.ts, series.glucose)])
+    conn.commit()
+    return conn
+
+
+def _stored(conn):
+    return conn.execute(
+        "SELECT period, pattern_type, details, hit_count FROM user_patterns ORDER BY period, pattern_type"
+    ).fetchall()
+
+
+def test_backfill_matches_batch_engine_per_day(tmp_path):
+    """Test every backfilled day equals the batch engine over the 7 days ending at its midnight."""
+    series = _with_gaps(_random_series(2016 * 3, 5), 5)
+    conn = _readings_db(str(tmp_path / "cgm.db"), series)
+
+    summary = CGMPatternIdentifier(str(tmp_path / "cgm.db")).run_backfill_for_user("u1", checkpoint_days=4)
+    assert summary["readings_ingested"] == len(series)
+
+    day_ms = 24 * 60 * 60 * 1000
+    expected = []
+    for day in range(int(series.ts[0]) // day_ms, int(series.ts[-1]) // day_ms + 1):
+        period = datetime.fromtimestamp(day * 86400, timezone.utc).date().isoformat()
+        for result in _batch(series.slice_time(0, (day + 1) * day_ms), (day + 1) * day_ms):
+            expected.append((period, result["pattern_type"], result["details"], 1))
+    assert _stored(conn) == sorted(expected)
+    assert summary["patterns_saved"] == len(expected)
+
+
+def test_backfill_resumes_from_checkpoint(tmp_path):
+    """Test an interrupted backfill continues after its checkpoint and keeps live rows."""
+    series = _random_series(2016 * 2, 9)
+    full = _readings_db(str(tmp_path / "full.db"), series)
+    CGMPatternIdentifier(str(tmp_path / "full.db")).run_backfill_for_user("u1")
+
+    conn = _readings_db(str(tmp_path / "cgm.db"), series)
+    identifier = CGMPatternIdentifier(str(tmp_path / "cgm.db"))
+    first_day = datetime.fromtimestamp(int(series.ts[0]) / 1000, timezone.utc).date()
+    middle = (first_day + timedelta(days=6)).isoformat()
+    identifier.run_backfill_for_user("u1", end_date=middle)
+
+    # 回填前已有的实时检测结果不被覆盖
+    conn.execute("UPDATE user_patterns SET hit_count = 5 WHERE period = ?", (middle,))
+    conn.commit()
+
+    resumed = identifier.run_backfill_for_user("u1")
+    assert resumed["resumed"] and resumed["readings_ingested"] < len(series)
+    assert [row[:3] for row in _stored(conn)] == [row[:3] for row in _stored(full)]
+    assert {row[3] for row in _stored(conn) if row[0] == middle} == {5}
+    assert identifier.run_backfill_for_user("u1")["days_evaluated"] == 0
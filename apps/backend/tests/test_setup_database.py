@@ -0,0 +1,56 @@
+"""
+Tests for databases created by setup_database.py
+"""
+
+import pytest
+from database import CGMDatabase
+from database.setup_database import create_database
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """CGMDatabase on a database built from scratch by create_database()."""
+    monkeypatch.chdir(tmp_path)
+    create_database()
+    with CGMDatabase(str(tmp_path / "cgm_butler.db")) as db:
+        yield db
+
+
+def test_agp_on_fresh_database(fresh_db):
+    """Test the AGP cache tables exist without running migrations."""
+    agp = fresh_db.get_agp("user_001", days=7)
+    assert agp["days_with_data"] >= 7
+    assert fresh_db.get_agp("user_001", days=7)["cached"] is True
+
+
+def test_glucose_events_on_fresh_database(fresh_db):
+    """Test the glucose event tables exist without running migrations."""
+    events = fresh_db.get_glucose_events("user_001", days=7)
+    assert set(events["counts"]) == {"hypo", "severe_hypo", "hyper"}
+
+
+def test_meal_responses_on_fresh_database(fresh_db):
+    """Test meal responses are stored without running migrations."""
+    log = fresh_db.add_activity_log(
+        "user_001", category="food", title="Oatmeal", timestamp_utc="2025-01-01T08:00:00Z"
+    )
+    responses = fresh_db.get_meal_responses("user_001")
+    assert [meal["log_id"] for meal in responses] == [log["id"]]
+
+
+def test_food_response_on_fresh_database(fresh_db):
+    """Test the food response index is maintained without running migrations."""
+    fresh_db.add_activity_log(
+        "user_001", category="food", title="Oatmeal", timestamp_utc="2025-01-01T08:00:00Z"
+    )
+    assert fresh_db.get_food_response("user_001", "oatmeal")["log_count"] == 1
+
+
+def test_reading_writes_on_fresh_database(fresh_db):
+    """Test reading writes run the alert rules without running migrations."""
+    assert fresh_db.add_cgm_reading("user_001", "2030-01-01T08:00:00Z", 110) is True
+    result = fresh_db.add_cgm_readings("user_001", [
+        {"timestamp": "2030-01-01T08:05:00Z", "glucose_value": 112},
+        {"timestamp": "2030-01-01T08:10:00Z", "glucose_value": 115},
+    ])
+    assert result["inserted"] == 2
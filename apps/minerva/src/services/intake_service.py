@@ -10,7 +10,7 @@ import sys
 import logging
 import requests
 from typing import Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 
 # Add project root to sys.path
@@ -35,6 +35,7 @@ except ImportError as e:
 
 # Import shared database repositories
 from shared.database import get_connection, MemoryRepository, TodoRepository, ConversationRepository, OnboardingStatusRepository
+from shared.analytics import ReadingSeries, glucose_metrics
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -179,51 +180,36 @@ async def get_cgm_data_summary(user_id: str) -> Dict[str, Any]:
         stats_prev_7d = None
         week_over_week_change = None
         
+        # 列式读数序列: 以下各项统计都是数组运算, 不再逐条解析时间戳
+        series = ReadingSeries.empty()
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        day_ms = 24 * 60 * 60 * 1000
+        
         try:
-            from datetime import datetime, timedelta
-            
             # 本周（最近7天）
             response = requests.get(
                 f"{CGM_BACKEND_URL}/api/recent/{user_id}/2016",  # 7天 * 24小时 * 12次/小时 = 2016
                 timeout=3
             )
             if response.status_code == 200:
-                readings = response.json()
+                series = ReadingSeries.from_records(response.json())
                 
-                if len(readings) > 0:
-                    # 计算本周（最近7天）的平均
-                    now = datetime.now()
-                    seven_days_ago = now - timedelta(days=7)
-                    fourteen_days_ago = now - timedelta(days=14)
-                    
-                    this_week_readings = []
-                    last_week_readings = []
-                    
-                    for reading in readings:
-                        try:
-                            timestamp = datetime.fromisoformat(reading['timestamp'].replace('Z', '+00:00'))
-                            glucose = reading['glucose_value']
-                            
-                            if timestamp >= seven_days_ago:
-                                this_week_readings.append(glucose)
-                            elif timestamp >= fourteen_days_ago:
-                                last_week_readings.append(glucose)
-                        except:
-                            continue
+                if len(series) > 0:
+                    this_week = glucose_metrics(series.slice_time(now_ms - 7 * day_ms), target_range=(70, 140))
+                    last_week = glucose_metrics(series.slice_time(now_ms - 14 * day_ms, now_ms - 7 * day_ms))
                     
                     # 计算本周平均
-                    if this_week_readings:
-                        this_week_avg = sum(this_week_readings) / len(this_week_readings)
-                        this_week_tir = sum(1 for g in this_week_readings if 70 <= g <= 140) / len(this_week_readings) * 100
+                    if this_week['count']:
+                        this_week_avg = this_week['mean']
                         
                         stats_7d = {
                             'avg': round(this_week_avg, 1),
-                            'time_in_range': round(this_week_tir, 1)
+                            'time_in_range': round(this_week['time_in_range'], 1)
                         }
                     
                     # 计算上周平均和周对周变化
-                    if last_week_readings and this_week_readings:
-                        last_week_avg = sum(last_week_readings) / len(last_week_readings)
+                    if last_week['count'] and this_week['count']:
+                        last_week_avg = last_week['mean']
                         stats_prev_7d = {
                             'avg': round(last_week_avg, 1)
                         }
@@ -252,138 +238,85 @@ async def get_cgm_data_summary(user_id: str) -> Dict[str, Any]:
         # 5. 计算每日模式（早餐后、午餐后、晚餐后、夜间）
         daily_patterns = None
         try:
-            if len(readings) > 0:
-                from datetime import datetime
-                
-                breakfast_readings = []  # 7-10 AM
-                lunch_readings = []      # 12-2 PM
-                dinner_readings = []     # 6-9 PM
-                overnight_readings = []  # 12-6 AM
-                
-                for reading in readings:
-                    try:
-                        timestamp = datetime.fromisoformat(reading['timestamp'].replace('Z', '+00:00'))
-                        hour = timestamp.hour
-                        glucose = reading['glucose_value']
-                        
-                        if 7 <= hour < 10:
-                            breakfast_readings.append(glucose)
-                        elif 12 <= hour < 14:
-                            lunch_readings.append(glucose)
-                        elif 18 <= hour < 21:
-                            dinner_readings.append(glucose)
-                        elif 0 <= hour < 6:
-                            overnight_readings.append(glucose)
-                    except:
-                        continue
+            if len(series) > 0:
+                def window_avg(start_hour, end_hour):
+                    values = series.glucose[series.hour_mask(start_hour, end_hour)]
+                    return round(float(values.mean(dtype='float64')), 1) if len(values) else None
                 
                 daily_patterns = {
-                    'breakfast_avg': round(sum(breakfast_readings) / len(breakfast_readings), 1) if breakfast_readings else None,
-                    'lunch_avg': round(sum(lunch_readings) / len(lunch_readings), 1) if lunch_readings else None,
-                    'dinner_avg': round(sum(dinner_readings) / len(dinner_readings), 1) if dinner_readings else None,
-                    'overnight_avg': round(sum(overnight_readings) / len(overnight_readings), 1) if overnight_readings else None
+                    'breakfast_avg': window_avg(7, 10),   # 7-10 AM
+                    'lunch_avg': window_avg(12, 14),      # 12-2 PM
+                    'dinner_avg': window_avg(18, 21),     # 6-9 PM
+                    'overnight_avg': window_avg(0, 6)     # 12-6 AM
                 }
         except Exception as e:
             logger.warning(f"Failed to calculate daily patterns: {e}")
         
-        # 6. 计算波动性（标准差和变异系数）
+        # 6. 计算波动性（标准差、变异系数、GMI、MAGE 与低/高血糖风险指数）
         variability = None
         try:
-            if len(readings) > 0:
-                import statistics
-                glucose_values = [r['glucose_value'] for r in readings if 'glucose_value' in r]
+            if len(series) > 1:
+                metrics = glucose_metrics(series)
+                cv = metrics['cv'] or 0
                 
-                if len(glucose_values) > 1:
-                    mean_glucose = statistics.mean(glucose_values)
-                    std_dev = statistics.stdev(glucose_values)
-                    cv = (std_dev / mean_glucose * 100) if mean_glucose > 0 else 0
-                    
-                    variability = {
-                        'std_dev': round(std_dev, 1),
-                        'cv': round(cv, 1),
-                        'stability': 'stable' if cv < 36 else 'variable'  # CV < 36% is considered stable
-                    }
+                def rounded(key):
+                    return round(metrics[key], 1) if metrics[key] is not None else None
+                
+                variability = {
+                    'std_dev': rounded('sd'),
+                    'cv': round(cv, 1),
+                    'stability': 'stable' if cv < 36 else 'variable',  # CV < 36% is considered stable
+                    'gmi': rounded('gmi'),
+                    'mage': rounded('mage'),
+                    'lbgi': rounded('lbgi'),
+                    'hbgi': rounded('hbgi')
+                }
         except Exception as e:
             logger.warning(f"Failed to calculate variability: {e}")
         
-        # 7. 统计低血糖和高血糖事件
+        # 7. 统计低血糖和高血糖事件 (持续 ≥15 分钟 <70 / ≥2 小时 >180 的事件, 而非单个读数)
+        #    事件由后端持久化在 glucose_events 中, 这里只取按开始时间的计数
         hypo_hyper_events = None
         try:
-            if len(readings) > 0:
-                from datetime import datetime, timedelta
-                now = datetime.now()
-                one_day_ago = now - timedelta(days=1)
-                seven_days_ago = now - timedelta(days=7)
-                
-                hypo_24h = 0
-                hyper_24h = 0
-                hypo_7d = 0
-                hyper_7d = 0
-                
-                for reading in readings:
-                    try:
-                        timestamp = datetime.fromisoformat(reading['timestamp'].replace('Z', '+00:00'))
-                        glucose = reading['glucose_value']
-                        
-                        is_hypo = glucose < 70
-                        is_hyper = glucose > 180
-                        
-                        if timestamp >= one_day_ago:
-                            if is_hypo:
-                                hypo_24h += 1
-                            if is_hyper:
-                                hyper_24h += 1
-                        
-                        if timestamp >= seven_days_ago:
-                            if is_hypo:
-                                hypo_7d += 1
-                            if is_hyper:
-                                hyper_7d += 1
-                    except:
-                        continue
-                
-                hypo_hyper_events = {
-                    'hypo_24h': hypo_24h,
-                    'hyper_24h': hyper_24h,
-                    'hypo_7d': hypo_7d,
-                    'hyper_7d': hyper_7d
-                }
+            now_iso = datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+            counts = {}
+            for days in (1, 7):
+                response = requests.get(
+                    f"{CGM_BACKEND_URL}/api/glucose-events/{user_id}",
+                    params={'days': days, 'end': now_iso},
+                    timeout=3
+                )
+                response.raise_for_status()
+                counts[days] = response.json().get('counts', {})
+            
+            hypo_hyper_events = {
+                'hypo_24h': counts[1].get('hypo', 0),
+                'hyper_24h': counts[1].get('hyper', 0),
+                'hypo_7d': counts[7].get('hypo', 0),
+                'hyper_7d': counts[7].get('hyper', 0)
+            }
         except Exception as e:
-            logger.warning(f"Failed to calculate hypo/hyper events: {e}")
+            logger.warning(f"Failed to fetch hypo/hyper events: {e}")
         
         # 8. 找到最近的峰值（过去24小时内的高峰）
         recent_peaks = None
         try:
-            if len(readings) > 0:
-                from datetime import datetime, timedelta
-                now = datetime.now()
-                one_day_ago = now - timedelta(days=1)
+            if len(series) > 0:
+                recent = series.slice_time(now_ms - day_ms)
                 
-                recent_readings = []
-                for reading in readings:
-                    try:
-                        timestamp = datetime.fromisoformat(reading['timestamp'].replace('Z', '+00:00'))
-                        if timestamp >= one_day_ago:
-                            recent_readings.append({
-                                'glucose': reading['glucose_value'],
-                                'timestamp': timestamp
-                            })
-                    except:
-                        continue
+                # 找到最高的3个读数（同值时较新的优先）
+                newest_first = recent.take(slice(None, None, -1))
+                top_peaks = newest_first.take((-newest_first.glucose).argsort(kind='stable')[:3])
                 
-                # 找到最高的3个读数
-                if recent_readings:
-                    sorted_readings = sorted(recent_readings, key=lambda x: x['glucose'], reverse=True)
-                    top_peaks = sorted_readings[:3]
-                    
-                    # 只保留明显的峰值（>160）
-                    significant_peaks = [p for p in top_peaks if p['glucose'] > 160]
-                    
-                    if significant_peaks:
-                        recent_peaks = [{
-                            'glucose': p['glucose'],
-                            'time_ago': _format_time_ago(now, p['timestamp'])
-                        } for p in significant_peaks]
+                # 只保留明显的峰值（>160）
+                significant_peaks = top_peaks.take(top_peaks.glucose > 160)
+                
+                if len(significant_peaks):
+                    now = datetime.now(timezone.utc).replace(tzinfo=None)
+                    recent_peaks = [{
+                        'glucose': int(glucose),
+                        'time_ago': _format_time_ago(now, timestamp)
+                    } for glucose, timestamp in zip(significant_peaks.glucose.tolist(), significant_peaks.datetimes())]
         except Exception as e:
             logger.warning(f"Failed to find recent peaks: {e}")
         
@@ -573,7 +506,12 @@ def format_cgm_data_for_prompt(cgm_data: Dict[str, Any]) -> str:
     if variability and variability.get('cv'):
         cv = variability['cv']
         stability = variability.get('stability', 'unknown')
-        sections.append(f"**Variability:** CV {cv}% ({stability})")
+        variability_text = f"**Variability:** CV {cv}% ({stability})"
+        if variability.get('mage') is not None:
+            variability_text += f", MAGE {variability['mage']} mg/dL"
+        if variability.get('gmi') is not None:
+            variability_text += f", GMI {variability['gmi']}%"
+        sections.append(variability_text)
     
     # 低血糖/高血糖事件
     events = cgm_data.get("hypo_hyper_events")
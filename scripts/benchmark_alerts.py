@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+实时提醒规则 (shared.analytics.alerts) 性能测试
+
+- AlertState.ingest 纯规则吞吐 (目标 ≥100k 条读数/秒)
+- save_readings_bulk 在内存 SQLite 上开启 / 关闭提醒评估的耗时对比
+
+使用方法:
+    python scripts/benchmark_alerts.py [--readings 100000] [--batch 12]
+"""
+
+import argparse
+import contextlib
+import io
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.analytics import AlertState
+from shared.database.repositories import CGMAlertRepository, CGMRepository
+from shared.database.schema import create_all_tables
+
+
+def synthetic_points(n: int, seed: int = 0):
+    """低/高血糖交替出现的 5 分钟读数 (epoch ms, mg/dL)"""
+    rng = np.random.default_rng(seed)
+    ts = 1735689600000 + np.arange(n, dtype=np.int64) * 300000
+    glucose = 140 + 110 * np.sin(np.arange(n) / 120 * 2 * np.pi) + rng.normal(0, 8, n)
+    return list(zip(ts.tolist(), np.clip(np.rint(glucose), 40, 400).tolist()))
+
+
+def best_of(func, repeat: int = 5) -> float:
+    """多次运行取最短耗时 (秒)"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def fresh_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_all_tables(conn)
+    conn.execute("INSERT INTO users (user_id, name) VALUES ('bench', 'Bench')")
+    conn.commit()
+    return conn
+
+
+def sync_batches(points, batch: int):
+    """按设备同步的粒度切分读数"""
+    readings = [
+        {'timestamp': datetime.fromtimestamp(ts / 1000, timezone.utc).isoformat(), 'glucose_value': int(g)}
+        for ts, g in points
+    ]
+    return [readings[i:i + batch] for i in range(0, len(readings), batch)]
+
+
+def run_syncs(batches) -> float:
+    conn = fresh_db()
+    repo = CGMRepository(conn)
+    started = time.perf_counter()
+    for readings in batches:
+        repo.save_readings_bulk('bench', readings)
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark shared.analytics.alerts')
+    parser.add_argument('--readings', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=12, help='readings per sync (12 = 1 小时)')
+    parser.add_argument('--syncs', type=int, default=500)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"实时提醒规则性能测试: {args.readings} 条读数")
+    print("=" * 80)
+
+    points = synthetic_points(args.readings)
+    fired = AlertState().ingest(points)
+    elapsed = best_of(lambda: AlertState().ingest(points))
+    print(f"\n📊 AlertState.ingest ({len(fired)} 条提醒)")
+    print(f"  总耗时:   {elapsed * 1000:8.2f} ms")
+    print(f"  吞吐:     {args.readings / elapsed:12,.0f} 条/秒")
+    print(f"  单条:     {elapsed / args.readings * 1e9:8.0f} ns")
+
+    batches = sync_batches(points[:args.syncs * args.batch], args.batch)
+    with_alerts = min(run_syncs(batches) for _ in range(3))
+    with mock.patch.object(CGMAlertRepository, 'evaluate', return_value=[]):
+        without_alerts = min(run_syncs(batches) for _ in range(3))
+    print(f"\n📊 save_readings_bulk ({len(batches)} 次同步 × {args.batch} 条)")
+    print(f"  含提醒评估:   {with_alerts / len(batches) * 1000:8.3f} ms/次")
+    print(f"  不含提醒评估: {without_alerts / len(batches) * 1000:8.3f} ms/次")
+
+    print("\n✅ 完成")
+
+
+if __name__ == '__main__':
+    main()
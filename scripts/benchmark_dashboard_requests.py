@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Dashboard 请求延迟性能测试: 每个请求新建连接 vs 连接池 + 启动时建表
+
+在临时目录中生成合成数据库 (单用户 N 天 5 分钟读数 + 若干餐食记录),
+用 Flask test client 依次请求 /api/* 路由, 对比:
+- 之前: 每个请求 sqlite3.connect() + CREATE TABLE/INDEX IF NOT EXISTS + commit
+- 之后: CGMDatabase(pooled=True) 复用连接, bootstrap_schema() 只在启动时执行一次
+
+使用方法:
+    python scripts/benchmark_dashboard_requests.py [--days 30] [--repeat 200]
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+# dashboard 以 cgm_butler / dashboard 目录为导入根
+cgm_butler_dir = project_root / 'apps' / 'backend' / 'cgm_butler'
+for path in (cgm_butler_dir, cgm_butler_dir / 'dashboard'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+USER_ID = 'bench_user'
+
+
+def build_database(db_path: str, days: int):
+    """合成数据库: 三餐波动的 5 分钟读数 + 每天三条餐食记录"""
+    from database import CGMDatabase
+    from shared.database.repositories import CGMRepository
+    from shared.database.schema import create_all_tables
+
+    start = datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0) - timedelta(days=days)
+    with CGMDatabase(db_path) as db:
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_all_tables(db.conn)
+        db.conn.execute("INSERT INTO users (user_id, name) VALUES (?, 'Bench User')", (USER_ID,))
+        db.conn.commit()
+
+        CGMRepository(db.conn).save_readings_bulk(USER_ID, (
+            {
+                'timestamp': (start + timedelta(minutes=5 * i)).isoformat(),
+                'glucose_value': round(130 + 50 * math.sin(i / 96 * 2 * math.pi)),
+            }
+            for i in range(days * 288)
+        ))
+        for day in range(days):
+            for hour, title in ((7, 'Oatmeal'), (12, 'Pasta'), (19, 'Rice')):
+                db.add_activity_log(
+                    USER_ID, category='food', title=title,
+                    timestamp_utc=(start + timedelta(days=day, hours=hour)).isoformat()
+                )
+
+
+def routes(days: int):
+    u = USER_ID
+    return [
+        f'/api/stats/{u}',
+        f'/api/readings/{u}',
+        f'/api/recent/{u}/50',
+        f'/api/readings/{u}/buckets?bucket=1h',
+        f'/api/glucose/{u}',
+        f'/api/actions',
+        f'/api/activity-logs/{u}',
+        f'/api/meal-responses/{u}',
+        f'/api/food-responses/{u}',
+        f'/api/glucose-events/{u}?days={days}',
+        f'/api/agp/{u}?days={days}',
+    ]
+
+
+def measure(client, paths, repeat: int):
+    """每个路由的中位延迟 (毫秒) 与状态码"""
+    results = {}
+    for path in paths:
+        client.get(path)  # 预热 (首次计算的缓存)
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(path)
+            samples.append(time.perf_counter() - started)
+        results[path] = (statistics.median(samples) * 1000, response.status_code)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dashboard request latency')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='cgm_bench_')
+    db_path = os.path.join(workdir, 'cgm_butler.db')
+
+    # 先以关闭连接池的方式导入 (不在导入时建表)
+    os.environ['CGM_DB_PATH'] = db_path
+    os.environ['CGM_DB_POOL'] = '0'
+    build_database(db_path, args.days)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as dashboard
+        from database import CGMDatabase, close_idle_connections
+
+    print("=" * 80)
+    print(f"Dashboard 请求延迟: {args.days} 天读数, 每个路由 {args.repeat} 次取中位数")
+    print("=" * 80)
+
+    paths = routes(args.days)
+    client = dashboard.app.test_client()
+    before = measure(client, paths, args.repeat)
+
+    dashboard.DB_POOLED = True
+    CGMDatabase.bootstrap_schema(db_path)
+    after = measure(client, paths, args.repeat)
+    close_idle_connections()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'路由':<48}{'之前 ms':>10}{'之后 ms':>10}{'节省':>8}")
+    for path in paths:
+        (old, status), (new, _) = before[path], after[path]
+        flag = '' if status == 200 else f'  (HTTP {status})'
+        print(f"{path:<48}{old:>10.3f}{new:>10.3f}{(1 - new / old) * 100:>7.0f}%{flag}")
+    total_old = sum(v[0] for v in before.values())
+    total_new = sum(v[0] for v in after.values())
+    print(f"{'合计':<48}{total_old:>10.3f}{total_new:>10.3f}{(1 - total_new / total_old) * 100:>7.0f}%")
+
+    print("\n✅ 完成")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+标准 CGM 指标 (shared.analytics.metrics) 性能测试
+
+在合成的 90 天 5 分钟读数上计时:
+- 单用户 glucose_metrics
+- 多用户 batch_glucose_metrics 与逐个调用对比
+- 原先逐条读数的 statistics 写法 (仅均值 / SD / CV / TIR) 作为参照
+
+使用方法:
+    python scripts/benchmark_glucose_metrics.py [--days 90] [--users 100]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.analytics import ReadingSeries, batch_glucose_metrics, glucose_metrics
+
+
+def synthetic_series(days: int, seed: int) -> ReadingSeries:
+    """三餐波动 + 随机游走 + 传感器噪声, 带时间抖动的 5 分钟读数"""
+    rng = np.random.default_rng(seed)
+    n = days * 288
+    ts = 1735689600000 + np.arange(n, dtype=np.int64) * 300000 + rng.integers(-20000, 20000, n)
+    walk = np.cumsum(rng.normal(0, 3, n))
+    walk -= np.convolve(walk, np.ones(145) / 145, 'same')
+    glucose = 140 + 40 * np.sin(np.arange(n) / 288 * 2 * np.pi * 3) + walk + rng.normal(0, 2, n)
+    return ReadingSeries(ts, np.clip(np.rint(glucose), 40, 400).astype(np.float32))
+
+
+def python_reference(series: ReadingSeries) -> dict:
+    """原先的逐条写法 (detect_high_variability / get_cgm_data_summary)"""
+    values = [int(v) for v in series.glucose]
+    mean = statistics.mean(values)
+    stdev = statistics.stdev(values)
+    return {
+        'mean': mean,
+        'sd': stdev,
+        'cv': stdev / mean * 100,
+        'time_in_range': sum(1 for v in values if 70 <= v <= 180) * 100 / len(values),
+    }
+
+
+def best_of(func, repeat: int = 5) -> float:
+    """多次运行取最短耗时 (秒)"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark shared.analytics.metrics')
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--users', type=int, default=100)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"标准 CGM 指标性能测试: {args.days} 天, {args.users} 个用户")
+    print("=" * 80)
+
+    single = synthetic_series(args.days, seed=0)
+    users = {f'user_{i:03d}': synthetic_series(args.days, seed=i) for i in range(args.users)}
+    total_readings = sum(len(series) for series in users.values())
+
+    elapsed = best_of(lambda: glucose_metrics(single))
+    print(f"\n📊 单用户 ({len(single)} 条读数)")
+    print(f"  glucose_metrics (全部指标):     {elapsed * 1000:8.2f} ms")
+    elapsed = best_of(lambda: python_reference(single))
+    print(f"  statistics 逐条 (均值/SD/TIR):  {elapsed * 1000:8.2f} ms")
+
+    print(f"\n📊 多用户 ({args.users} 个用户, {total_readings} 条读数)")
+    elapsed = best_of(lambda: batch_glucose_metrics(users), repeat=3)
+    print(f"  batch_glucose_metrics:          {elapsed * 1000:8.2f} ms")
+    elapsed = best_of(lambda: [glucose_metrics(series) for series in users.values()], repeat=3)
+    print(f"  逐个 glucose_metrics:           {elapsed * 1000:8.2f} ms")
+
+    print("\n✅ 完成")
+
+
+if __name__ == '__main__':
+    main()
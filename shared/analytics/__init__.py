@@ -0,0 +1,80 @@
+"""
+Shared Glucose Analytics
+
+NumPy-based computations over CGM reading series, shared by the backend
+dashboard and other services.
+
+Usage:
+    from shared.analytics import ReadingSeries, downsample_indices
+
+    series = ReadingSeries.from_cursor(cursor)  # SELECT ts_epoch, glucose_value ...
+    keep = downsample_indices(series.ts, series.glucose, budget=500)
+    metrics = glucose_metrics(series)  # GMI, MAGE, MODD, CONGA, LBGI/HBGI, ...
+"""
+
+from .series import ReadingSeries, TREND_MISSING
+from .windows import sliding_max, sliding_min
+from .downsample import (
+    HYPO_THRESHOLD,
+    HYPER_THRESHOLD,
+    lttb_indices,
+    excursion_extreme_indices,
+    downsample_indices,
+)
+from .agp import (
+    AGP_PERCENTILES,
+    AGP_WINDOW_DAYS,
+    AGP_BIN_MINUTES,
+    agp_codes,
+    agp_histogram,
+    histogram_percentiles,
+    agp_profile,
+    series_agp,
+)
+from .metrics import (
+    TARGET_RANGE,
+    exact_stdev_from_sums,
+    gmi,
+    mage,
+    segment_metrics,
+    glucose_metrics,
+    batch_glucose_metrics,
+)
+from .meals import SPIKE_THRESHOLD, meal_responses, food_key, food_response_stats
+from .events import EVENT_TYPES, detect_episodes
+from .alerts import ALERT_TYPES, AlertState
+
+__all__ = [
+    'ReadingSeries',
+    'TREND_MISSING',
+    'sliding_max',
+    'sliding_min',
+    'HYPO_THRESHOLD',
+    'HYPER_THRESHOLD',
+    'lttb_indices',
+    'excursion_extreme_indices',
+    'downsample_indices',
+    'AGP_PERCENTILES',
+    'AGP_WINDOW_DAYS',
+    'AGP_BIN_MINUTES',
+    'agp_codes',
+    'agp_histogram',
+    'histogram_percentiles',
+    'agp_profile',
+    'series_agp',
+    'TARGET_RANGE',
+    'exact_stdev_from_sums',
+    'gmi',
+    'mage',
+    'segment_metrics',
+    'glucose_metrics',
+    'batch_glucose_metrics',
+    'SPIKE_THRESHOLD',
+    'meal_responses',
+    'food_key',
+    'food_response_stats',
+    'EVENT_TYPES',
+    'detect_episodes',
+    'ALERT_TYPES',
+    'AlertState',
+]
@@ -0,0 +1,142 @@
+"""
+Ambulatory Glucose Profile (AGP)
+
+5th/25th/50th/75th/95th glucose percentiles by time of day over a
+multi-day window (14 days by default).
+
+Each reading is encoded as one integer (minute of day * AGP_LEVELS +
+clipped glucose level). A window's histogram is a single bincount over the
+codes of its days, folded into a fixed time-of-day grid, and the
+percentiles of every bin come from its cumulative counts, so a day can be
+added to or dropped from a window without touching the other days.
+Percentiles match numpy.percentile (linear interpolation) on the raw
+values of each bin.
+"""
+
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .series import ReadingSeries
+
+
+AGP_PERCENTILES = (5, 25, 50, 75, 95)
+AGP_WINDOW_DAYS = 14
+AGP_BIN_MINUTES = 15
+
+# CGM 报告范围 (mg/dL), 范围外的读数按边界值计
+GLUCOSE_FLOOR = 40
+GLUCOSE_CEILING = 400
+AGP_LEVELS = GLUCOSE_CEILING - GLUCOSE_FLOOR + 1
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def agp_bins(bin_minutes: int = AGP_BIN_MINUTES) -> int:
+    """Number of time-of-day bins for a bin width (must divide 24 h)."""
+    if bin_minutes < 1 or 1440 % bin_minutes:
+        raise ValueError("bin_minutes must divide 1440")
+    return 1440 // bin_minutes
+
+
+def agp_codes(series: ReadingSeries, utc_offset_minutes: int = 0) -> np.ndarray:
+    """
+    Encode readings as minute_of_day * AGP_LEVELS + (glucose - GLUCOSE_FLOOR).
+
+    Args:
+        series: Readings
+        utc_offset_minutes: Local time offset for the time of day
+
+    Returns:
+        int32 array aligned with series
+    """
+    minute_of_day = ((series.ts + utc_offset_minutes * 60000) % DAY_MS) // 60000
+    levels = np.clip(np.rint(series.glucose), GLUCOSE_FLOOR, GLUCOSE_CEILING).astype(np.int32) - GLUCOSE_FLOOR
+    return minute_of_day.astype(np.int32) * AGP_LEVELS + levels
+
+
+def agp_histogram(codes: np.ndarray, bin_minutes: int = AGP_BIN_MINUTES) -> np.ndarray:
+    """(bins, AGP_LEVELS) reading counts for a set of codes."""
+    bins = agp_bins(bin_minutes)
+    by_minute = np.bincount(codes, minlength=1440 * AGP_LEVELS).reshape(1440, AGP_LEVELS)
+    return by_minute.reshape(bins, bin_minutes, AGP_LEVELS).sum(axis=1)
+
+
+def histogram_percentiles(
+    histogram: np.ndarray,
+    percentiles: Sequence[float] = AGP_PERCENTILES
+) -> np.ndarray:
+    """
+    Per-bin percentiles from a (bins, levels) histogram.
+
+    Args:
+        histogram: Reading counts per time-of-day bin and glucose level
+        percentiles: Percentiles in [0, 100]
+
+    Returns:
+        (bins, len(percentiles)) float array in mg/dL, NaN for empty bins
+    """
+    cumulative = np.cumsum(histogram, axis=1)
+    counts = cumulative[:, -1]
+    rank = (counts[:, None] - 1) * (np.asarray(percentiles, dtype=float) / 100.0)[None, :]
+    lower = np.floor(rank)
+    upper = np.minimum(lower + 1, np.maximum(counts[:, None] - 1, 0))
+
+    def value_at(index):
+        # 第 index 个 (从 0 起) 排序值所在的血糖档位
+        return (cumulative[:, :, None] > index[:, None, :]).argmax(axis=1)
+
+    low_value, high_value = value_at(lower), value_at(upper)
+    result = GLUCOSE_FLOOR + low_value + (high_value - low_value) * (rank - lower)
+    result[counts == 0] = np.nan
+    return result
+
+
+def agp_profile(
+    codes: np.ndarray,
+    bin_minutes: int = AGP_BIN_MINUTES,
+    percentiles: Sequence[float] = AGP_PERCENTILES
+) -> Dict:
+    """
+    AGP rows for the readings behind codes.
+
+    Args:
+        codes: agp_codes() of every reading in the window
+        bin_minutes: Time-of-day bin width
+        percentiles: Percentiles to report
+
+    Returns:
+        {'bin_minutes', 'reading_count', 'profile': [{'time': 'HH:MM', 'count',
+        'p5', 'p25', ...}, ...]} with None percentiles for empty bins
+    """
+    histogram = agp_histogram(codes, bin_minutes)
+    values = histogram_percentiles(histogram, percentiles)
+    counts = histogram.sum(axis=1)
+
+    profile = []
+    for b in range(len(counts)):
+        minute = b * bin_minutes
+        row = {'time': f'{minute // 60:02d}:{minute % 60:02d}', 'count': int(counts[b])}
+        for p, value in zip(percentiles, values[b]):
+            row[f'p{p:g}'] = None if np.isnan(value) else round(float(value), 1)
+        profile.append(row)
+
+    return {
+        'bin_minutes': bin_minutes,
+        'reading_count': int(counts.sum()),
+        'profile': profile,
+    }
+
+
+def series_agp(
+    series: ReadingSeries,
+    bin_minutes: int = AGP_BIN_MINUTES,
+    utc_offset_minutes: int = 0,
+    percentiles: Optional[Sequence[float]] = None
+) -> Dict:
+    """AGP of every reading in series (see agp_profile)."""
+    return agp_profile(
+        agp_codes(series, utc_offset_minutes),
+        bin_minutes,
+        percentiles or AGP_PERCENTILES
+    )
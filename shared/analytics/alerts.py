@@ -0,0 +1,148 @@
+"""
+Real-Time Glucose Alerts
+
+Per-reading alert rules evaluated as readings are ingested. Each user
+carries a handful of scalars (AlertState): the previous reading, a
+smoothed rate of change, whether each alert is currently active and when
+the current high run started. Every new reading updates them in O(1) and
+may fire:
+
+- urgent_low: a reading below URGENT_LOW
+- predicted_low: the smoothed rate of change projects a reading below
+  URGENT_LOW within PREDICTION_MINUTES
+- sustained_high: readings have stayed above the hyper episode threshold
+  for its minimum duration (same definition as glucose_events)
+
+An alert fires once when its condition starts and re-arms only after
+glucose recovers by REARM_MARGIN (or after a gap in the data), so noise
+around a threshold does not repeat it.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .events import EVENT_TYPES, MAX_GAP_MINUTES
+from .series import MINUTE_MS
+
+
+_EVENTS = {event.name: event for event in EVENT_TYPES}
+
+# 紧急低血糖 (与 severe_hypo 事件阈值一致)
+URGENT_LOW = _EVENTS['severe_hypo'].threshold
+# 按当前变化速率预测未来多少分钟内的血糖
+PREDICTION_MINUTES = 20
+# 持续高血糖 (与 hyper 事件定义一致)
+SUSTAINED_HIGH = _EVENTS['hyper'].threshold
+SUSTAINED_HIGH_MINUTES = _EVENTS['hyper'].min_minutes
+# 恢复超过阈值该幅度后才会再次提醒
+REARM_MARGIN = 10
+# 变化速率的指数平滑系数 (越大越灵敏)
+RATE_SMOOTHING = 0.5
+
+ALERT_TYPES = ('urgent_low', 'predicted_low', 'sustained_high')
+
+
+class AlertState:
+    """Per-user alert state; everything needed to evaluate the next reading."""
+
+    __slots__ = (
+        'last_ts', 'last_glucose', 'rate',
+        'low_active', 'predicted_active', 'high_start', 'high_fired',
+    )
+
+    def __init__(
+        self,
+        last_ts: Optional[int] = None,
+        last_glucose: Optional[float] = None,
+        rate: Optional[float] = None,
+        low_active: bool = False,
+        predicted_active: bool = False,
+        high_start: Optional[int] = None,
+        high_fired: bool = False
+    ):
+        self.last_ts = last_ts
+        self.last_glucose = last_glucose
+        self.rate = rate                    # mg/dL per minute, None without a recent reading
+        self.low_active = low_active
+        self.predicted_active = predicted_active
+        self.high_start = high_start        # 当前高血糖段的首个读数 (epoch ms)
+        self.high_fired = high_fired
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def ingest(self, readings: Iterable[Tuple[int, float]]) -> List[Dict]:
+        """
+        Evaluate readings in ascending time order and return fired alerts.
+
+        Readings at or before last_ts (replays, backfill behind the state)
+        are skipped: alerts only describe new points.
+
+        Args:
+            readings: (epoch ms, glucose mg/dL) pairs, ascending
+
+        Returns:
+            Alerts with alert_type, ts, glucose and value (projected glucose
+            for predicted_low, minutes above range for sustained_high)
+        """
+        # 状态读入局部变量, 循环内只有标量比较
+        last_ts, last_glucose, rate = self.last_ts, self.last_glucose, self.rate
+        low_active, predicted_active = self.low_active, self.predicted_active
+        high_start, high_fired = self.high_start, self.high_fired
+
+        max_gap = MAX_GAP_MINUTES * MINUTE_MS
+        high_ms = SUSTAINED_HIGH_MINUTES * MINUTE_MS
+        low_rearm = URGENT_LOW + REARM_MARGIN
+        high_rearm = SUSTAINED_HIGH - REARM_MARGIN
+        alerts = []
+
+        for ts, glucose in readings:
+            if last_ts is not None and ts <= last_ts:
+                continue
+            if last_ts is None or ts - last_ts > max_gap:
+                # 断档: 速率与高血糖段重新开始
+                rate = None
+                low_active = predicted_active = False
+                high_start, high_fired = None, False
+            else:
+                step = (glucose - last_glucose) * MINUTE_MS / (ts - last_ts)
+                rate = step if rate is None else rate + RATE_SMOOTHING * (step - rate)
+
+            if glucose < URGENT_LOW:
+                if not low_active:
+                    alerts.append({'alert_type': 'urgent_low', 'ts': ts, 'glucose': glucose, 'value': None})
+                    low_active = True
+            elif glucose >= low_rearm:
+                low_active = False
+
+            if rate is not None:
+                projected = glucose + rate * PREDICTION_MINUTES
+                if projected < URGENT_LOW and not low_active:
+                    if not predicted_active:
+                        alerts.append({
+                            'alert_type': 'predicted_low', 'ts': ts, 'glucose': glucose,
+                            'value': round(projected, 1)
+                        })
+                        predicted_active = True
+                elif projected >= low_rearm:
+                    predicted_active = False
+
+            if glucose > SUSTAINED_HIGH:
+                if high_start is None:
+                    high_start = ts
+                if not high_fired and ts - high_start >= high_ms:
+                    alerts.append({
+                        'alert_type': 'sustained_high', 'ts': ts, 'glucose': glucose,
+                        'value': (ts - high_start) // MINUTE_MS
+                    })
+                    high_fired = True
+            else:
+                high_start = None
+                if glucose <= high_rearm:
+                    high_fired = False
+
+            last_ts, last_glucose = ts, glucose
+
+        self.last_ts, self.last_glucose, self.rate = last_ts, last_glucose, rate
+        self.low_active, self.predicted_active = low_active, predicted_active
+        self.high_start, self.high_fired = high_start, high_fired
+        return alerts
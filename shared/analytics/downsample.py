@@ -0,0 +1,140 @@
+"""
+Glucose Series Downsampling
+
+Largest-Triangle-Three-Buckets (LTTB) over NumPy arrays, plus excursion
+extremes so hypo/hyper lows and peaks survive downsampling exactly.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+
+# 低血糖 / 高血糖阈值 (mg/dL), 每段越界区间的极值点一定保留
+HYPO_THRESHOLD = 70
+HYPER_THRESHOLD = 180
+
+
+def lttb_indices(x: Sequence[float], y: Sequence[float], n_out: int) -> np.ndarray:
+    """
+    Select n_out point indices with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. Each bucket's triangle areas
+    are computed as one vectorized NumPy expression.
+
+    Args:
+        x: Ascending x values (e.g. epoch ms)
+        y: Values aligned with x
+        n_out: Number of points to keep (>= 3)
+
+    Returns:
+        Ascending indices into x/y
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError("n_out must be at least 3")
+
+    # 中间 n - 2 个点均分为 n_out - 2 个桶
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(int) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+        else:
+            next_lo, next_hi = n - 1, n
+
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+
+    return selected
+
+
+def excursion_extreme_indices(
+    y: Sequence[float],
+    low: float = HYPO_THRESHOLD,
+    high: float = HYPER_THRESHOLD
+) -> np.ndarray:
+    """
+    Indices of the series min/max and of every excursion's extreme.
+
+    Each contiguous run below `low` contributes its minimum point; each run
+    above `high` contributes its maximum point.
+
+    Args:
+        y: Glucose values in time order
+        low: Hypo threshold (strictly below)
+        high: Hyper threshold (strictly above)
+
+    Returns:
+        Ascending unique indices
+    """
+    y = np.asarray(y, dtype=float)
+    if len(y) == 0:
+        return np.arange(0)
+
+    def run_extremes(mask: np.ndarray, key: np.ndarray) -> np.ndarray:
+        idx = np.flatnonzero(mask)
+        if len(idx) == 0:
+            return idx
+        run_id = np.concatenate(([0], np.cumsum(np.diff(idx) != 1)))
+        order = np.lexsort((key[idx], run_id))
+        first = np.concatenate(([True], np.diff(run_id[order]) != 0))
+        return idx[order[first]]
+
+    return np.unique(np.concatenate((
+        [int(y.argmin()), int(y.argmax())],
+        run_extremes(y < low, y),
+        run_extremes(y > high, -y),
+    )))
+
+
+def downsample_indices(
+    x: Sequence[float],
+    y: Sequence[float],
+    budget: int,
+    low: float = HYPO_THRESHOLD,
+    high: float = HYPER_THRESHOLD
+) -> np.ndarray:
+    """
+    Downsample a glucose series to about `budget` points.
+
+    Excursion extremes are always kept; LTTB fills the remaining budget.
+    The result can exceed the budget only when there are more excursions
+    than points allowed.
+
+    Args:
+        x: Ascending timestamps
+        y: Glucose values
+        budget: Target number of points (>= 3)
+        low: Hypo threshold
+        high: Hyper threshold
+
+    Returns:
+        Ascending unique indices into x/y
+    """
+    n = len(x)
+    if budget >= n:
+        return np.arange(n)
+
+    extremes = excursion_extreme_indices(y, low, high)
+    shape = lttb_indices(x, y, max(budget - len(extremes), 3))
+    return np.union1d(shape, extremes)
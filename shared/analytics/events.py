@@ -0,0 +1,99 @@
+"""
+Glucose Episodes
+
+Run-length encoding of threshold crossings into clinically defined events
+(consensus CGM definitions): a run is a stretch of consecutive readings on
+the wrong side of a threshold, broken by a reading back in range or by a
+gap in the data, and it counts as an episode once it lasts long enough.
+Every event type is found with a handful of array operations over the
+whole series instead of tallying single readings.
+"""
+
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+
+from .series import MINUTE_MS, ReadingSeries
+
+
+class EventType(NamedTuple):
+    """A threshold episode definition."""
+    name: str
+    below: bool          # True: glucose < threshold, False: glucose > threshold
+    threshold: float     # mg/dL
+    min_minutes: int     # 最短持续时间 (首末读数之差)
+
+
+# 低血糖 1/2 级: <70 / <54 持续 ≥15 分钟; 高血糖: >180 持续 ≥2 小时
+EVENT_TYPES = (
+    EventType('hypo', True, 70, 15),
+    EventType('severe_hypo', True, 54, 15),
+    EventType('hyper', False, 180, 120),
+)
+
+# 相邻读数间隔超过该值视为断档, 事件在此中断
+MAX_GAP_MINUTES = 15
+
+# 增量重算需回看的长度: 最长的最短持续时间 + 断档容忍
+EVENT_LOOKBACK_MS = (max(t.min_minutes for t in EVENT_TYPES) + MAX_GAP_MINUTES) * MINUTE_MS
+
+
+def run_bounds(mask: np.ndarray, ts: np.ndarray, max_gap_ms: int) -> np.ndarray:
+    """
+    Runs of consecutive True readings not separated by more than max_gap_ms.
+
+    Returns:
+        (n_runs, 2) int64 array of [first, last] reading indices
+    """
+    if not mask.any():
+        return np.zeros((0, 2), dtype=np.int64)
+    joined = mask[1:] & mask[:-1] & (np.diff(ts) <= max_gap_ms)
+    hits = np.flatnonzero(mask)
+    # 一个 run 从一个 True 开始, 且它与前一个读数不相连
+    starts = hits[(hits == 0) | ~np.r_[False, joined][hits]]
+    ends = hits[(hits == len(mask) - 1) | ~np.r_[joined, False][hits]]
+    return np.stack([starts, ends], axis=1)
+
+
+def detect_episodes(
+    series: ReadingSeries,
+    event_types=EVENT_TYPES,
+    max_gap_minutes: int = MAX_GAP_MINUTES
+) -> List[Dict]:
+    """
+    Glucose episodes in a series.
+
+    Args:
+        series: Readings in ascending time order
+        event_types: EventType definitions to detect
+        max_gap_minutes: Longest gap between readings inside one episode
+
+    Returns:
+        Episodes in (start_ts, event_type) order, each with event_type,
+        start_ts, end_ts (first / last reading past the threshold, epoch ms),
+        duration_minutes, extreme_glucose (nadir for lows, peak for highs),
+        extreme_ts and reading_count
+    """
+    ts, glucose = series.ts, series.glucose
+    episodes = []
+    for event in event_types:
+        mask = glucose < event.threshold if event.below else glucose > event.threshold
+        runs = run_bounds(mask, ts, max_gap_minutes * MINUTE_MS)
+        durations = ts[runs[:, 1]] - ts[runs[:, 0]]
+        runs = runs[durations >= event.min_minutes * MINUTE_MS]
+        for first, last in runs.tolist():
+            window = glucose[first:last + 1]
+            # 最低 / 最高值 (首次出现)
+            at = first + int(np.argmin(window) if event.below else np.argmax(window))
+            episodes.append({
+                'event_type': event.name,
+                'start_ts': int(ts[first]),
+                'end_ts': int(ts[last]),
+                'duration_minutes': round(float(ts[last] - ts[first]) / MINUTE_MS, 2),
+                'extreme_glucose': float(glucose[at]),
+                'extreme_ts': int(ts[at]),
+                'reading_count': last - first + 1,
+            })
+
+    episodes.sort(key=lambda e: (e['start_ts'], e['event_type']))
+    return episodes
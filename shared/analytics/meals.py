@@ -0,0 +1,183 @@
+"""
+Meal Glucose Response
+
+Pre-meal baseline, peak, time to peak, incremental AUC and return to
+baseline for many meals against one reading series in a single merge
+pass: every meal's window bounds come from one searchsorted over the
+reading timestamps, and each metric is a segmented reduction over the
+concatenated post-meal windows, so the cost does not grow with a query
+per meal.
+
+food_key() normalises free-text meal titles so repeated meals of the same
+food can be grouped into one glycemic response profile.
+"""
+
+import re
+import unicodedata
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+from .series import MINUTE_MS, HOUR_MS, ReadingSeries
+
+
+# 餐前基线: 用餐前 15 分钟 (含用餐时刻) 的平均值
+BASELINE_MINUTES = 15
+# 峰值 / iAUC 窗口与回落到基线的最长观察时间
+RESPONSE_HOURS = 2
+RETURN_HOURS = 4
+# 餐后升高超过该值视为血糖飙升 (mg/dL)
+SPIKE_THRESHOLD = 50
+
+
+def food_key(title: str) -> str:
+    """
+    Grouping key for a logged food title.
+
+    Unicode-normalised, case-folded, punctuation removed and whitespace
+    collapsed, so "Oatmeal", " oatmeal!" and "OATMEAL" share one key.
+    """
+    text = unicodedata.normalize('NFKC', title or '').casefold()
+    return ' '.join(re.sub(r'[^\w\s]|_', ' ', text).split())
+
+
+def _flat_windows(lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Concatenate the index ranges [lo[i], hi[i]).
+
+    Returns:
+        (reading index, owning window) per element, grouped by window
+    """
+    lengths = np.maximum(hi - lo, 0)
+    owner = np.repeat(np.arange(len(lo)), lengths)
+    offsets = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return lo[owner] + offsets, owner
+
+
+def _first_per_window(hits: np.ndarray, owner: np.ndarray, n: int) -> np.ndarray:
+    """Index into hits' positions of each window's first True (-1 when none)."""
+    positions = np.flatnonzero(hits)
+    windows, first = np.unique(owner[positions], return_index=True)
+    result = np.full(n, -1, dtype=np.int64)
+    result[windows] = positions[first]
+    return result
+
+
+def meal_responses(
+    series: ReadingSeries,
+    meal_ts: Sequence[int],
+    baseline_minutes: int = BASELINE_MINUTES,
+    response_hours: float = RESPONSE_HOURS,
+    return_hours: float = RETURN_HOURS
+) -> Dict[str, np.ndarray]:
+    """
+    Glucose response to each meal.
+
+    Args:
+        series: Readings in ascending time order covering the meals
+        meal_ts: Meal times (epoch ms), any order
+        baseline_minutes: Pre-meal averaging window
+        response_hours: Window after the meal for peak and iAUC
+        return_hours: Window after the meal to look for the return to baseline
+
+    Returns:
+        Arrays aligned with meal_ts (NaN / -1 where undefined):
+        baseline, peak, peak_ts, rise (peak - baseline), time_to_peak_minutes,
+        iauc (mg/dL x min above baseline, trapezoidal),
+        return_to_baseline_minutes (meal to first reading back at or below
+        baseline after the peak) and reading_count (readings in the
+        response window)
+    """
+    ts = series.ts
+    g = series.glucose.astype(np.float64)
+    meals = np.asarray(meal_ts, dtype=np.int64)
+    n = len(meals)
+
+    # 餐前基线: 前缀和一次求出所有餐的窗口均值
+    prefix = np.r_[0.0, np.cumsum(g)]
+    b_lo = np.searchsorted(ts, meals - baseline_minutes * MINUTE_MS, 'left')
+    b_hi = np.searchsorted(ts, meals, 'right')
+    b_count = b_hi - b_lo
+    baseline = np.divide(prefix[b_hi] - prefix[b_lo], b_count,
+                         out=np.full(n, np.nan), where=b_count > 0)
+
+    # 餐后窗口: 峰值 (首次达到) 与 iAUC
+    lo = np.searchsorted(ts, meals, 'left')
+    hi = np.searchsorted(ts, meals + int(response_hours * HOUR_MS), 'right')
+    reading_count = np.maximum(hi - lo, 0)
+    index, owner = _flat_windows(lo, hi)
+    values = g[index]
+
+    peak = np.full(n, np.nan)
+    has_readings = reading_count > 0
+    starts = np.cumsum(reading_count) - reading_count
+    if len(values):
+        peak[has_readings] = np.maximum.reduceat(values, starts[has_readings])
+    first_peak = _first_per_window(values == peak[owner], owner, n)
+    peak_ts = np.full(n, -1, dtype=np.int64)
+    found = first_peak >= 0
+    peak_ts[found] = ts[index[first_peak[found]]]
+
+    excess = np.maximum(values - baseline[owner], 0)
+    pair = np.flatnonzero(owner[1:] == owner[:-1]) if len(owner) else np.zeros(0, dtype=np.int64)
+    minutes = (ts[index[pair + 1]] - ts[index[pair]]) / MINUTE_MS
+    iauc = np.bincount(owner[pair], weights=(excess[pair] + excess[pair + 1]) / 2 * minutes,
+                       minlength=n).astype(np.float64)
+    iauc[np.isnan(baseline) | ~has_readings] = np.nan
+
+    # 峰值之后首次回落到基线以下
+    r_lo = np.searchsorted(ts, peak_ts, 'left')
+    r_hi = np.where(~found | np.isnan(baseline), r_lo,
+                    np.searchsorted(ts, meals + int(return_hours * HOUR_MS), 'right'))
+    r_index, r_owner = _flat_windows(r_lo, r_hi)
+    back = _first_per_window(g[r_index] <= baseline[r_owner], r_owner, n)
+    return_minutes = np.full(n, np.nan)
+    returned = back >= 0
+    return_minutes[returned] = (ts[r_index[back[returned]]] - meals[returned]) / MINUTE_MS
+
+    return {
+        'baseline': baseline,
+        'peak': peak,
+        'peak_ts': peak_ts,
+        'rise': peak - baseline,
+        'time_to_peak_minutes': np.where(peak_ts >= 0, (peak_ts - meals) / MINUTE_MS, np.nan),
+        'iauc': iauc,
+        'return_to_baseline_minutes': return_minutes,
+        'reading_count': reading_count,
+    }
+
+
+def food_response_stats(
+    rise: Sequence[float],
+    iauc: Sequence[float],
+    spike_threshold: float = SPIKE_THRESHOLD
+) -> Dict:
+    """
+    Typical response to one food over its logged meals.
+
+    Args:
+        rise: Peak minus baseline per meal (NaN/None where undefined)
+        iauc: Incremental AUC per meal (NaN/None where undefined)
+        spike_threshold: Rise counted as a spike
+
+    Returns:
+        meal_count (meals with a rise), mean/median/p90/max rise,
+        spike_count and mean iAUC; statistics are None without data
+    """
+    rise = np.asarray(rise, dtype=np.float64)
+    iauc = np.asarray(iauc, dtype=np.float64)
+    rise = rise[~np.isnan(rise)]
+    iauc = iauc[~np.isnan(iauc)]
+
+    def stat(values, reducer):
+        return round(float(reducer(values)), 2) if len(values) else None
+
+    return {
+        'meal_count': len(rise),
+        'mean_rise': stat(rise, np.mean),
+        'median_rise': stat(rise, np.median),
+        'p90_rise': stat(rise, lambda v: np.percentile(v, 90)),
+        'max_rise': stat(rise, np.max),
+        'spike_count': int((rise > spike_threshold).sum()),
+        'mean_iauc': stat(iauc, np.mean),
+    }
@@ -0,0 +1,293 @@
+"""
+Standard CGM Metrics
+
+Summary, range, variability and risk metrics over ReadingSeries:
+mean / SD / CV, GMI, time below / in / above range, MAGE, MODD, CONGA
+and LBGI / HBGI.
+
+Many users (or any other segments, e.g. days) are computed together: the
+readings are concatenated, per-segment sums come from one bincount per
+quantity, and the lagged pairs behind MODD / CONGA are matched for every
+segment with a single searchsorted. Only MAGE walks a short per-segment
+list of turning points. Batches are capped at BATCH_READINGS readings so
+the working arrays stay cache sized.
+
+Readings are whole mg/dL (as stored in cgm_readings), so mean and SD are
+computed from exact integer sums and equal statistics.mean / stdev.
+"""
+
+import math
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .downsample import HYPO_THRESHOLD, HYPER_THRESHOLD
+from .series import ReadingSeries
+
+
+TARGET_RANGE = (HYPO_THRESHOLD, HYPER_THRESHOLD)
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+
+# CONGA 的时间差 (小时) 与配对读数的容差 (半个 5 分钟采样间隔)
+CONGA_HOURS = 1
+LAG_TOLERANCE_MS = 150 * 1000
+
+# 每段的时间戳编码到同一个有序键: segment << SEGMENT_SHIFT | ts
+SEGMENT_SHIFT = 43
+
+# batch_glucose_metrics 每批的读数上限
+BATCH_READINGS = 1 << 16
+
+
+def exact_stdev_from_sums(count: int, total: int, total_sq: int) -> float:
+    """
+    Sample standard deviation from integer count / sum / sum of squares.
+
+    The sample variance is an exact fraction of integers; its square root is
+    rounded once (round-to-odd on an extended integer root, then to float),
+    which is what statistics.stdev() returns.
+    """
+    num = count * total_sq - total * total
+    den = count * (count - 1)
+    if num == 0:
+        return 0.0
+
+    shift = max(0, (112 - num.bit_length() + den.bit_length()) // 2)
+    scaled, remainder = divmod(num << (2 * shift), den)
+    root = math.isqrt(scaled)
+    if remainder or root * root != scaled:
+        root |= 1
+    return root / (1 << shift)
+
+
+def gmi(mean_glucose: Optional[float]) -> Optional[float]:
+    """Glucose Management Indicator (%) from mean glucose in mg/dL."""
+    return None if mean_glucose is None else 3.31 + 0.02392 * mean_glucose
+
+
+def risk_values(glucose: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Kovatchev low / high blood glucose risk per reading.
+
+    Returns:
+        (rl, rh) arrays; their means are LBGI and HBGI
+    """
+    f = 1.509 * (np.log(np.maximum(glucose, 1).astype(np.float64)) ** 1.084 - 5.381)
+    risk = 10 * f * f
+    return np.where(f < 0, risk, 0.0), np.where(f > 0, risk, 0.0)
+
+
+def lagged_pairs(keys: np.ndarray, lag_ms: int, tolerance_ms: int = LAG_TOLERANCE_MS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Match each reading with the reading closest to lag_ms earlier.
+
+    Args:
+        keys: Ascending segment-encoded timestamps (see SEGMENT_SHIFT)
+        lag_ms: Time difference to look back
+        tolerance_ms: Largest allowed distance from the exact lagged time
+
+    Returns:
+        (index, earlier_index) arrays of matched pairs
+    """
+    target = keys - lag_ms
+    right = np.searchsorted(keys, target)
+    left = np.maximum(right - 1, 0)
+    right = np.minimum(right, len(keys) - 1)
+    nearest = np.where(np.abs(keys[left] - target) <= np.abs(keys[right] - target), left, right)
+    matched = np.flatnonzero(np.abs(keys[nearest] - target) <= tolerance_ms) if len(keys) else np.zeros(0, dtype=int)
+    return matched, nearest[matched]
+
+
+def mage(glucose: np.ndarray, sd: Optional[float]) -> Optional[float]:
+    """
+    Mean Amplitude of Glycemic Excursions.
+
+    Turning points are found vectorized; swings between consecutive
+    confirmed peaks and nadirs count when they exceed one SD, and smaller
+    swings are absorbed into the surrounding excursion. Upward and downward
+    excursions are averaged together.
+
+    Args:
+        glucose: One segment's readings in time order
+        sd: The segment's standard deviation
+
+    Returns:
+        MAGE in mg/dL, or None without any excursion larger than sd
+    """
+    if not sd or len(glucose) < 3:
+        return None
+
+    g = glucose[np.r_[True, np.diff(glucose) != 0]]
+    step = np.sign(np.diff(g))
+    turning = np.flatnonzero(step[1:] != step[:-1]) + 1
+    points = g[np.r_[0, turning, len(g) - 1]].tolist()
+
+    # 首个超过 1 SD 的波动确定起点与方向
+    low = high = points[0]
+    direction = 0
+    for i, value in enumerate(points):
+        if value < low:
+            low = value
+        elif value > high:
+            high = value
+        if value - low > sd:
+            direction, pivot, extreme = 1, low, value
+            break
+        if high - value > sd:
+            direction, pivot, extreme = -1, high, value
+            break
+    if not direction:
+        return None
+
+    total = 0
+    count = 0
+    for value in points[i + 1:]:
+        if direction > 0:
+            if value >= extreme:
+                extreme = value
+            elif extreme - value > sd:
+                total += extreme - pivot
+                count += 1
+                direction, pivot, extreme = -1, extreme, value
+        else:
+            if value <= extreme:
+                extreme = value
+            elif value - extreme > sd:
+                total += pivot - extreme
+                count += 1
+                direction, pivot, extreme = 1, extreme, value
+    # 最后一段波动在确认方向时已超过 1 SD
+    return (total + abs(extreme - pivot)) / (count + 1)
+
+
+def segment_metrics(
+    series: ReadingSeries,
+    segments: np.ndarray,
+    n_segments: int,
+    target_range: Tuple[int, int] = TARGET_RANGE
+) -> List[Dict]:
+    """
+    Metrics of every segment of a series in one pass.
+
+    Args:
+        series: Readings ordered by (segment, time)
+        segments: Segment index (0 .. n_segments - 1) per reading
+        n_segments: Number of segments
+        target_range: (low, high) inclusive target range in mg/dL
+
+    Returns:
+        One glucose_metrics() dict per segment
+    """
+    g = np.rint(series.glucose).astype(np.int64)
+    segments = np.asarray(segments, dtype=np.int64)
+
+    def per_segment(weights, index=segments):
+        return np.bincount(index, weights=weights, minlength=n_segments)
+
+    counts = np.bincount(segments, minlength=n_segments)
+    totals = per_segment(g)
+    totals_sq = per_segment(g * g)
+    low, high = target_range
+    below = per_segment(g < low)
+    above = per_segment(g > high)
+    rl, rh = risk_values(g)
+    lbgi = per_segment(rl)
+    hbgi = per_segment(rh)
+
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    nonempty = counts > 0
+    mins = np.zeros(n_segments, dtype=np.int64)
+    maxs = np.zeros(n_segments, dtype=np.int64)
+    if len(g):
+        mins[nonempty] = np.minimum.reduceat(g, starts[nonempty])
+        maxs[nonempty] = np.maximum.reduceat(g, starts[nonempty])
+
+    # MODD: 相邻两天同一时刻的绝对差; CONGA: n 小时差值的标准差
+    keys = (segments << SEGMENT_SHIFT) | series.ts
+    now, day_before = lagged_pairs(keys, DAY_MS)
+    modd_counts = np.bincount(segments[now], minlength=n_segments)
+    modd_sums = per_segment(np.abs(g[now] - g[day_before]), segments[now])
+    now, earlier = lagged_pairs(keys, CONGA_HOURS * HOUR_MS)
+    diffs = g[now] - g[earlier]
+    conga_counts = np.bincount(segments[now], minlength=n_segments)
+    conga_sums = per_segment(diffs, segments[now])
+    conga_sums_sq = per_segment(diffs * diffs, segments[now])
+
+    results = []
+    for s in range(n_segments):
+        count = int(counts[s])
+        total, total_sq = int(totals[s]), int(totals_sq[s])
+        mean = total / count if count else None
+        sd = exact_stdev_from_sums(count, total, total_sq) if count >= 2 else None
+        n_conga = int(conga_counts[s])
+        results.append({
+            'count': count,
+            'mean': mean,
+            'sd': sd,
+            'cv': sd / mean * 100 if sd is not None and mean else None,
+            'min': int(mins[s]) if count else None,
+            'max': int(maxs[s]) if count else None,
+            'gmi': gmi(mean),
+            'time_below_range': float(below[s]) * 100 / count if count else None,
+            'time_in_range': float(count - below[s] - above[s]) * 100 / count if count else None,
+            'time_above_range': float(above[s]) * 100 / count if count else None,
+            'mage': mage(g[starts[s]:starts[s] + count], sd),
+            'modd': float(modd_sums[s]) / int(modd_counts[s]) if modd_counts[s] else None,
+            'conga': exact_stdev_from_sums(n_conga, int(conga_sums[s]), int(conga_sums_sq[s]))
+            if n_conga >= 2 else None,
+            'lbgi': float(lbgi[s]) / count if count else None,
+            'hbgi': float(hbgi[s]) / count if count else None,
+        })
+    return results
+
+
+def glucose_metrics(series: ReadingSeries, target_range: Tuple[int, int] = TARGET_RANGE) -> Dict:
+    """
+    Standard CGM metrics of one series.
+
+    Args:
+        series: Readings in ascending time order
+        target_range: (low, high) inclusive target range in mg/dL
+
+    Returns:
+        {'count', 'mean', 'sd', 'cv', 'min', 'max', 'gmi', 'time_below_range',
+        'time_in_range', 'time_above_range', 'mage', 'modd', 'conga', 'lbgi',
+        'hbgi'}; values that need more data than available are None
+    """
+    return segment_metrics(series, np.zeros(len(series), dtype=np.int64), 1, target_range)[0]
+
+
+def batch_glucose_metrics(
+    series_by_user: Mapping[str, ReadingSeries],
+    target_range: Tuple[int, int] = TARGET_RANGE
+) -> Dict[str, Dict]:
+    """
+    glucose_metrics() for many users at once.
+
+    Args:
+        series_by_user: Each user's readings in ascending time order
+        target_range: (low, high) inclusive target range in mg/dL
+
+    Returns:
+        {user_id: metrics}
+    """
+    results: Dict[str, Dict] = {}
+    chunk: List[str] = []
+    chunk_readings = 0
+    for user in list(series_by_user) + [None]:
+        # 按读数量分批, 每批一次向量化计算 (数组保持在缓存大小以内)
+        if user is None or (chunk and chunk_readings + len(series_by_user[user]) > BATCH_READINGS):
+            parts = [series_by_user[u] for u in chunk]
+            combined = ReadingSeries(
+                np.concatenate([p.ts for p in parts]) if parts else np.zeros(0, dtype=np.int64),
+                np.concatenate([p.glucose for p in parts]) if parts else np.zeros(0, dtype=np.float32),
+            )
+            segments = np.repeat(np.arange(len(parts), dtype=np.int64), [len(p) for p in parts])
+            results.update(zip(chunk, segment_metrics(combined, segments, len(parts), target_range)))
+            chunk, chunk_readings = [], 0
+        if user is not None:
+            chunk.append(user)
+            chunk_readings += len(series_by_user[user])
+    return results
@@ -0,0 +1,235 @@
+"""
+Columnar CGM Reading Series
+
+ReadingSeries keeps a user's readings as contiguous NumPy arrays
+(int64 epoch ms, float32 glucose, optional int8 trend) instead of a list of
+dicts with one datetime per reading.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+# cgm_readings.ts_epoch 原点 (UTC epoch 毫秒)
+EPOCH = datetime(1970, 1, 1)
+MINUTE_MS = 60 * 1000
+HOUR_MS = 60 * MINUTE_MS
+
+# trend 列为 NULL 时的占位值
+TREND_MISSING = -128
+
+
+def _iso_to_epoch_ms(value: str) -> int:
+    """ISO 8601 -> UTC epoch ms (无时区视为 UTC)"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return (parsed - EPOCH) // timedelta(milliseconds=1)
+
+
+class ReadingSeries:
+    """
+    A user's CGM readings in ascending time order.
+
+    Attributes:
+        ts: int64 UTC epoch milliseconds (cgm_readings.ts_epoch)
+        glucose: float32 glucose values (mg/dL)
+        trend: int8 vendor trend codes (TREND_MISSING for NULL), or None
+    """
+
+    __slots__ = ('ts', 'glucose', 'trend')
+
+    def __init__(
+        self,
+        ts: Sequence[int],
+        glucose: Sequence[float],
+        trend: Optional[Sequence[int]] = None
+    ):
+        self.ts = np.ascontiguousarray(ts, dtype=np.int64)
+        self.glucose = np.ascontiguousarray(glucose, dtype=np.float32)
+        self.trend = None if trend is None else np.ascontiguousarray(trend, dtype=np.int8)
+
+        if len(self.glucose) != len(self.ts) or (
+            self.trend is not None and len(self.trend) != len(self.ts)
+        ):
+            raise ValueError("ts, glucose and trend must have the same length")
+
+    @classmethod
+    def empty(cls) -> 'ReadingSeries':
+        """Series without readings."""
+        return cls(np.empty(0, np.int64), np.empty(0, np.float32))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence]) -> 'ReadingSeries':
+        """
+        Build a series from (ts_epoch, glucose_value[, trend]) rows.
+
+        Rows must already be in ascending ts_epoch order, e.g. the result of
+        `SELECT ts_epoch, glucose_value ... ORDER BY ts_epoch ASC`. Columns
+        are copied straight into arrays without per-row dicts.
+
+        Args:
+            rows: Tuples, sqlite3.Row objects or dict rows (MySQL DictCursor)
+
+        Returns:
+            ReadingSeries
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return cls.empty()
+
+        if isinstance(rows[0], dict):
+            rows = [tuple(row.values()) for row in rows]
+
+        count = len(rows)
+        columns = list(zip(*rows))
+        ts = np.fromiter(columns[0], dtype=np.int64, count=count)
+        glucose = np.fromiter(columns[1], dtype=np.float32, count=count)
+
+        trend = None
+        if len(columns) > 2:
+            trend = np.fromiter(
+                (TREND_MISSING if code is None else code for code in columns[2]),
+                dtype=np.int8,
+                count=count
+            )
+        return cls(ts, glucose, trend)
+
+    @classmethod
+    def from_cursor(cls, cursor) -> 'ReadingSeries':
+        """Build a series from an executed cursor (see from_rows)."""
+        return cls.from_rows(cursor.fetchall())
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict]) -> 'ReadingSeries':
+        """
+        Build a series from reading dicts (e.g. the dashboard API JSON).
+
+        Uses 'ts_epoch' when present, otherwise parses 'timestamp'. Records
+        may come in any order (the API returns newest first).
+
+        Args:
+            records: Dicts with 'glucose_value' and 'ts_epoch' or 'timestamp'
+
+        Returns:
+            ReadingSeries sorted by time
+        """
+        if not records:
+            return cls.empty()
+
+        ts = np.fromiter(
+            (
+                r['ts_epoch'] if r.get('ts_epoch') is not None else _iso_to_epoch_ms(r['timestamp'])
+                for r in records
+            ),
+            dtype=np.int64,
+            count=len(records)
+        )
+        glucose = np.fromiter(
+            (r['glucose_value'] for r in records), dtype=np.float32, count=len(records)
+        )
+
+        order = np.argsort(ts, kind='stable')
+        return cls(ts[order], glucose[order])
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __repr__(self) -> str:
+        return f"ReadingSeries(n={len(self)})"
+
+    def take(self, index) -> 'ReadingSeries':
+        """Subset by slice, boolean mask or index array."""
+        trend = None if self.trend is None else self.trend[index]
+        return ReadingSeries(self.ts[index], self.glucose[index], trend)
+
+    def slice_time(
+        self,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None
+    ) -> 'ReadingSeries':
+        """
+        Readings with start_ms <= ts < end_ms.
+
+        Uses binary search on the sorted timestamps; the result shares memory
+        with this series.
+
+        Args:
+            start_ms: Inclusive start (epoch ms), optional
+            end_ms: Exclusive end (epoch ms), optional
+
+        Returns:
+            ReadingSeries view
+        """
+        lo = 0 if start_ms is None else int(np.searchsorted(self.ts, start_ms, side='left'))
+        hi = len(self.ts) if end_ms is None else int(np.searchsorted(self.ts, end_ms, side='left'))
+        return self.take(slice(lo, max(lo, hi)))
+
+    def hours(self, utc_offset_minutes: int = 0) -> np.ndarray:
+        """
+        Hour of day (0-23) of every reading.
+
+        Args:
+            utc_offset_minutes: Shift from UTC to the wanted wall clock
+
+        Returns:
+            int8 array aligned with ts
+        """
+        local_ms = self.ts + utc_offset_minutes * MINUTE_MS
+        return ((local_ms // HOUR_MS) % 24).astype(np.int8)
+
+    def hour_mask(
+        self,
+        start_hour: int,
+        end_hour: int,
+        utc_offset_minutes: int = 0
+    ) -> np.ndarray:
+        """
+        Boolean mask of readings with start_hour <= hour < end_hour.
+
+        Windows that wrap midnight (e.g. 22 -> 6) are supported.
+        """
+        hours = self.hours(utc_offset_minutes)
+        if start_hour <= end_hour:
+            return (hours >= start_hour) & (hours < end_hour)
+        return (hours >= start_hour) | (hours < end_hour)
+
+    def resample(self, step_ms: int) -> 'ReadingSeries':
+        """
+        Mean glucose per fixed-width bucket aligned to the UTC epoch.
+
+        Empty buckets are omitted; ts of the result is each bucket's start.
+
+        Args:
+            step_ms: Bucket width in milliseconds
+
+        Returns:
+            ReadingSeries without trend
+        """
+        if step_ms <= 0:
+            raise ValueError("step_ms must be positive")
+        if len(self) == 0:
+            return ReadingSeries.empty()
+
+        buckets = self.ts // step_ms
+        starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+        sums = np.add.reduceat(self.glucose.astype(np.float64), starts)
+        counts = np.diff(np.append(starts, len(buckets)))
+        return ReadingSeries(buckets[starts] * step_ms, sums / counts)
+
+    def datetimes(self) -> List[datetime]:
+        """Naive UTC datetimes of every reading."""
+        return [EPOCH + timedelta(milliseconds=ms) for ms in self.ts.tolist()]
+
+    def to_records(self) -> List[Dict]:
+        """
+        Legacy list-of-dicts view: {'timestamp': datetime, 'glucose_value': int}.
+
+        Only for callers that still iterate dicts; prefer the arrays.
+        """
+        return [
+            {'timestamp': ts, 'glucose_value': value}
+            for ts, value in zip(self.datetimes(), np.rint(self.glucose).astype(int).tolist())
+        ]
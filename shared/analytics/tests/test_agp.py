@@ -0,0 +1,43 @@
+"""
+Tests for the Ambulatory Glucose Profile
+"""
+
+import numpy as np
+import pytest
+from shared.analytics import AGP_PERCENTILES, ReadingSeries, agp_codes, agp_histogram, histogram_percentiles, series_agp
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def _series(days, seed=3):
+    """Irregularly timed readings over several days, values 40-400."""
+    rng = np.random.default_rng(seed)
+    ts = np.sort(rng.integers(0, days * DAY_MS, days * 288)).astype(np.int64)
+    return ReadingSeries(ts, rng.integers(40, 401, len(ts)).astype(np.float32))
+
+
+@pytest.mark.parametrize("bin_minutes", [5, 15, 60])
+def test_percentiles_match_numpy(bin_minutes):
+    """Test histogram percentiles equal numpy.percentile on each bin's raw values."""
+    series = _series(14)
+    values = histogram_percentiles(agp_histogram(agp_codes(series), bin_minutes))
+
+    bins = (series.ts % DAY_MS) // (bin_minutes * 60000)
+    for b in range(1440 // bin_minutes):
+        expected = np.percentile(series.glucose[bins == b], AGP_PERCENTILES)
+        np.testing.assert_allclose(values[b], expected, atol=1e-9)
+
+
+def test_profile_empty_bins_and_clipping():
+    """Test empty bins report None and out-of-range values are clipped."""
+    ts = np.array([0, 60000, 12 * 3600000], dtype=np.int64)
+    agp = series_agp(ReadingSeries(ts, np.array([20, 100, 450], dtype=np.float32)), bin_minutes=60)
+
+    assert agp["reading_count"] == 3
+    assert agp["profile"][0] == {"time": "00:00", "count": 2, "p5": 43.0, "p25": 55.0,
+                                 "p50": 70.0, "p75": 85.0, "p95": 97.0}
+    assert agp["profile"][12]["p50"] == 400.0
+    assert agp["profile"][1]["count"] == 0 and agp["profile"][1]["p50"] is None
+
+    with pytest.raises(ValueError):
+        series_agp(ReadingSeries(ts, np.zeros(3, dtype=np.float32)), bin_minutes=7)
@@ -0,0 +1,92 @@
+"""
+Tests for real-time glucose alert rules
+"""
+
+from shared.analytics import AlertState
+from shared.analytics.alerts import PREDICTION_MINUTES, SUSTAINED_HIGH_MINUTES, URGENT_LOW
+
+START = 1735689600000  # 2025-01-01T00:00:00Z
+MINUTE_MS = 60 * 1000
+
+
+def _points(values, start=START, step_minutes=5):
+    return [(start + i * step_minutes * MINUTE_MS, value) for i, value in enumerate(values)]
+
+
+def _types(alerts):
+    return [alert["alert_type"] for alert in alerts]
+
+
+def test_urgent_low_fires_once_until_recovered():
+    """Test noise around the threshold does not repeat the alert."""
+    state = AlertState()
+    alerts = state.ingest(_points([60, 52, 55, 50, 53, 70, 52]))
+    lows = [alert for alert in alerts if alert["alert_type"] == "urgent_low"]
+    # 55 仍低于重新提醒线, 70 之后再次跌破才再提醒
+    assert [alert["glucose"] for alert in lows] == [52, 52]
+    assert lows[1]["ts"] == START + 6 * 5 * MINUTE_MS
+
+
+def test_predicted_low_from_falling_rate():
+    """Test a steady fall is flagged before glucose reaches the urgent low threshold."""
+    state = AlertState()
+    alerts = state.ingest(_points([120, 110, 100, 90, 80]))
+    assert _types(alerts) == ["predicted_low"]
+    predicted = alerts[0]
+    # 每分钟下降 2 mg/dL
+    assert predicted["ts"] == START + 3 * 5 * MINUTE_MS
+    assert predicted["value"] == 90 - 2 * PREDICTION_MINUTES
+    assert predicted["value"] < URGENT_LOW
+
+    # 平稳后重新布防, 再次下降会再次提醒
+    assert state.ingest(_points([85, 85, 85, 85], start=START + 25 * MINUTE_MS)) == []
+    assert not state.predicted_active
+    assert _types(state.ingest(_points([75, 65], start=START + 45 * MINUTE_MS))) == ["predicted_low"]
+
+
+def test_sustained_high_after_minimum_duration():
+    """Test sustained_high fires once after the hyper episode duration."""
+    state = AlertState()
+    steps = SUSTAINED_HIGH_MINUTES // 5
+    alerts = state.ingest(_points([200] * (steps + 10)))
+    assert _types(alerts) == ["sustained_high"]
+    assert alerts[0]["ts"] == START + SUSTAINED_HIGH_MINUTES * MINUTE_MS
+    assert alerts[0]["value"] == SUSTAINED_HIGH_MINUTES
+
+    # 短暂回落到 175 不会重新布防, 降到 170 以下才会
+    more = state.ingest(_points([175] + [200] * (steps + 1), start=START + (steps + 10) * 5 * MINUTE_MS))
+    assert more == []
+    assert state.ingest(_points([165], start=START + 500 * MINUTE_MS)) == []
+    assert not state.high_fired
+
+
+def test_gap_resets_rate_and_high_run():
+    """Test a gap in the data restarts the rate and the high run."""
+    state = AlertState()
+    steps = SUSTAINED_HIGH_MINUTES // 5
+    points = _points([200] * steps) + _points([200] * 5, start=START + (steps * 5 + 30) * MINUTE_MS)
+    assert state.ingest(points) == []
+    assert state.high_start == points[steps][0]
+
+    # 断档前的下降速率不会带到断档之后
+    state = AlertState()
+    state.ingest(_points([150, 130, 110]))
+    assert state.ingest([(START + 60 * MINUTE_MS, 100)]) == []
+    assert state.rate is None
+
+
+def test_split_batches_match_single_batch_and_skip_replays():
+    """Test state carries across batches and replayed readings are ignored."""
+    values = [140, 120, 100, 80, 60, 50, 48, 60, 90, 120, 190] + [220] * 30 + [150, 52]
+    points = _points(values)
+
+    whole = AlertState().ingest(points)
+    state = AlertState()
+    split = []
+    for i in range(0, len(points), 7):
+        split += state.ingest(points[max(0, i - 3):i + 7])
+    assert split == whole
+    assert set(_types(whole)) == {"urgent_low", "predicted_low", "sustained_high"}
+
+    restored = AlertState(**state.to_dict())
+    assert restored.ingest(points) == []
@@ -0,0 +1,52 @@
+"""
+Tests for glucose series downsampling
+"""
+
+import numpy as np
+import pytest
+from shared.analytics import lttb_indices, excursion_extreme_indices, downsample_indices
+
+
+def _series(n=2000):
+    x = np.arange(n) * 300000.0
+    y = 120 + 60 * np.sin(np.arange(n) / 40) + (np.arange(n) % 7)
+    return x, y
+
+
+def test_lttb_keeps_endpoints_and_budget():
+    """Test LTTB returns exactly n_out ascending indices including both ends."""
+    x, y = _series()
+
+    idx = lttb_indices(x, y, 100)
+
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_lttb_short_series_unchanged():
+    """Test series shorter than the budget are returned whole."""
+    x, y = _series(10)
+    assert list(lttb_indices(x, y, 50)) == list(range(10))
+
+    with pytest.raises(ValueError):
+        lttb_indices(*_series(), 2)
+
+
+def test_excursion_extreme_indices():
+    """Test one extreme per hypo/hyper run plus the global min and max."""
+    y = [100, 65, 60, 68, 100, 200, 250, 190, 100, 50, 100, 185, 100]
+
+    assert list(excursion_extreme_indices(y)) == [2, 6, 9, 11]
+
+
+def test_downsample_preserves_extremes():
+    """Test isolated hypo/hyper spikes survive heavy downsampling."""
+    x, y = _series()
+    y[777] = 38
+    y[1500] = 320
+
+    idx = downsample_indices(x, y, 50)
+
+    assert 777 in idx and 1500 in idx
+    assert y[idx].min() == 38 and y[idx].max() == 320
@@ -0,0 +1,71 @@
+"""
+Tests for run-length glucose episode detection
+"""
+
+import numpy as np
+from shared.analytics import EVENT_TYPES, ReadingSeries, detect_episodes
+
+START = 1735689600000  # 2025-01-01T00:00:00Z
+MINUTE_MS = 60 * 1000
+
+
+def _brute(ts, glucose, event, max_gap_minutes=15):
+    """Episodes of one type by walking the readings one at a time."""
+    episodes, run = [], []
+    for i, (t, g) in enumerate(zip(ts, glucose)):
+        hit = g < event.threshold if event.below else g > event.threshold
+        if run and (not hit or t - ts[run[-1]] > max_gap_minutes * MINUTE_MS):
+            episodes.append(run)
+            run = []
+        if hit:
+            run.append(i)
+    if run:
+        episodes.append(run)
+
+    result = []
+    for run in episodes:
+        if ts[run[-1]] - ts[run[0]] < event.min_minutes * MINUTE_MS:
+            continue
+        pick = min if event.below else max
+        extreme = pick(glucose[i] for i in run)
+        at = next(i for i in run if glucose[i] == extreme)
+        result.append((event.name, ts[run[0]], ts[run[-1]], extreme, ts[at], len(run)))
+    return result
+
+
+def test_episodes_match_reading_by_reading_scan():
+    """Test every event type against a direct run scan, including data gaps."""
+    rng = np.random.default_rng(7)
+    ts = START + np.arange(4 * 288, dtype=np.int64) * 5 * MINUTE_MS
+    walk = 140 + 110 * np.sin(np.arange(len(ts)) / 120 * 2 * np.pi) + rng.normal(0, 12, len(ts))
+    keep = rng.random(len(ts)) > 0.05
+    keep[300:310] = False  # 50 分钟断档
+    series = ReadingSeries(ts[keep], np.rint(walk[keep]))
+
+    expected = sorted(
+        (run for event in EVENT_TYPES for run in _brute(series.ts.tolist(), series.glucose.tolist(), event)),
+        key=lambda e: (e[1], e[0])
+    )
+    episodes = detect_episodes(series)
+    assert [
+        (e['event_type'], e['start_ts'], e['end_ts'], e['extreme_glucose'], e['extreme_ts'], e['reading_count'])
+        for e in episodes
+    ] == expected
+    assert {e['event_type'] for e in episodes} == {'hypo', 'severe_hypo', 'hyper'}
+
+
+def test_duration_and_gap_rules():
+    """Test the minimum durations and that a gap splits an episode."""
+    ts = START + np.arange(40, dtype=np.int64) * 5 * MINUTE_MS
+    glucose = np.full(40, 100.0)
+    glucose[2:5] = 65      # 10 分钟, 不足 15 分钟
+    glucose[10:14] = [65, 50, 52, 60]  # 15 分钟, 其中 <54 只有 5 分钟
+    series = ReadingSeries(ts, glucose)
+
+    episodes = detect_episodes(series)
+    assert [(e['event_type'], e['duration_minutes'], e['extreme_glucose']) for e in episodes] == [('hypo', 15.0, 50.0)]
+
+    gapped = series.take(np.r_[0:12, 13:40])  # 删掉一个读数后间隔 10 分钟仍连续
+    assert len(detect_episodes(gapped)) == 1
+    assert detect_episodes(gapped, max_gap_minutes=5) == []
+    assert detect_episodes(ReadingSeries.empty()) == []
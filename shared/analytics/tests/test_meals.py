@@ -0,0 +1,95 @@
+"""
+Tests for the batched meal response engine
+"""
+
+import numpy as np
+import pytest
+from shared.analytics import ReadingSeries, food_key, food_response_stats, meal_responses
+
+START = 1735689600000  # 2025-01-01T00:00:00Z
+MINUTE_MS = 60 * 1000
+
+
+def _series(days=3, seed=4):
+    """5-minute readings with a gap and a post-meal bump after every meal."""
+    rng = np.random.default_rng(seed)
+    ts = START + np.arange(days * 288, dtype=np.int64) * 5 * MINUTE_MS
+    glucose = 110 + rng.normal(0, 4, len(ts))
+    meals = [START + (d * 24 + h) * 60 * MINUTE_MS + 7 * MINUTE_MS for d in range(days) for h in (7, 12, 19)]
+    for meal in meals:
+        minutes = (ts - meal) / MINUTE_MS
+        glucose += np.interp(minutes, [0, 40, 150], [0, 60 + rng.integers(0, 40), 0], left=0, right=0)
+    keep = (ts < START + 30 * 60 * MINUTE_MS) | (ts > START + 33 * 60 * MINUTE_MS)
+    return ReadingSeries(ts[keep], np.rint(glucose[keep]).astype(np.float32)), meals
+
+
+def _brute(series, meal):
+    """One meal's response straight from the readings."""
+    ts, g = series.ts.tolist(), series.glucose.astype(float).tolist()
+    pre = [v for t, v in zip(ts, g) if meal - 15 * MINUTE_MS <= t <= meal]
+    post = [(t, v) for t, v in zip(ts, g) if meal <= t <= meal + 120 * MINUTE_MS]
+    if not pre or not post:
+        return None
+    baseline = sum(pre) / len(pre)
+    peak = max(v for _, v in post)
+    peak_ts = next(t for t, v in post if v == peak)
+    excess = [max(v - baseline, 0) for _, v in post]
+    iauc = sum((excess[i] + excess[i + 1]) / 2 * (post[i + 1][0] - post[i][0]) / MINUTE_MS
+               for i in range(len(post) - 1))
+    back = [t for t, v in zip(ts, g) if peak_ts <= t <= meal + 240 * MINUTE_MS and v <= baseline]
+    return {
+        'baseline': baseline,
+        'peak': peak,
+        'time_to_peak_minutes': (peak_ts - meal) / MINUTE_MS,
+        'iauc': iauc,
+        'return_to_baseline_minutes': (back[0] - meal) / MINUTE_MS if back else None,
+        'reading_count': len(post),
+    }
+
+
+def test_responses_match_per_meal_computation():
+    """Test every meal's metrics against a direct scan of its own window."""
+    series, meals = _series()
+    meals = meals[::-1] + [START - 10 * 60 * MINUTE_MS]  # 乱序 + 一餐没有读数
+    result = meal_responses(series, meals)
+
+    for i, meal in enumerate(meals):
+        expected = _brute(series, meal)
+        if expected is None:
+            assert np.isnan(result['peak'][i]) or np.isnan(result['baseline'][i])
+            continue
+        for key, value in expected.items():
+            if value is None:
+                assert np.isnan(result[key][i])
+            else:
+                assert result[key][i] == pytest.approx(value), (meal, key)
+
+    assert np.isnan(result['iauc'][-1]) and result['peak_ts'][-1] == -1
+
+
+def test_no_meals_or_readings():
+    """Test empty inputs produce empty or undefined results."""
+    series, meals = _series(1)
+    assert len(meal_responses(series, [])['peak']) == 0
+
+    empty = meal_responses(ReadingSeries.empty(), meals)
+    assert np.isnan(empty['baseline']).all() and (empty['reading_count'] == 0).all()
+
+
+def test_food_key_and_stats():
+    """Test title normalisation and per-food aggregation skip missing responses."""
+    assert food_key(" Oatmeal!") == food_key("OATMEAL") == "oatmeal"
+    assert food_key("Greek-yogurt & berries") == "greek yogurt berries"
+    assert food_key("燕麦粥（加牛奶）") == "燕麦粥 加牛奶"
+
+    stats = food_response_stats([30, None, 70, 50, np.nan], [900, None, 2100, 1500, np.nan])
+    assert stats == {
+        'meal_count': 3,
+        'mean_rise': 50.0,
+        'median_rise': 50.0,
+        'p90_rise': 66.0,
+        'max_rise': 70.0,
+        'spike_count': 1,
+        'mean_iauc': 1500.0,
+    }
+    assert food_response_stats([None], [None])['mean_rise'] is None
@@ -0,0 +1,90 @@
+"""
+Tests for the standard CGM metrics
+"""
+
+import math
+import statistics
+
+import numpy as np
+import pytest
+from shared.analytics import ReadingSeries, batch_glucose_metrics, glucose_metrics, mage, segment_metrics
+
+START = 1735689600000  # 2025-01-01T00:00:00Z
+STEP_MS = 5 * 60 * 1000
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def _series(days, seed=5):
+    """5-minute readings with timestamp jitter and a few gaps."""
+    rng = np.random.default_rng(seed)
+    n = days * 288
+    ts = START + np.arange(n, dtype=np.int64) * STEP_MS + rng.integers(-20000, 20000, n)
+    glucose = 140 + 50 * np.sin(np.arange(n) / 96 * np.pi) + rng.normal(0, 20, n)
+    keep = rng.random(n) > 0.05
+    return ReadingSeries(ts[keep], np.clip(np.rint(glucose[keep]), 40, 400).astype(np.float32))
+
+
+def _lagged_diffs(ts, g, lag_ms):
+    """Brute-force differences to the nearest reading lag_ms earlier (within 2.5 minutes)."""
+    diffs = []
+    for i, t in enumerate(ts):
+        j = int(np.argmin(np.abs(ts - (t - lag_ms))))
+        if abs(ts[j] - (t - lag_ms)) <= 150000:
+            diffs.append(g[i] - g[j])
+    return diffs
+
+
+def test_metrics_match_reference_formulas():
+    """Test every metric against a direct per-reading computation."""
+    series = _series(4)
+    metrics = glucose_metrics(series)
+    ts, g = series.ts, [int(v) for v in series.glucose]
+
+    assert metrics['count'] == len(g)
+    assert metrics['mean'] == statistics.mean(g)
+    assert metrics['sd'] == statistics.stdev(g)
+    assert metrics['cv'] == (statistics.stdev(g) / statistics.mean(g)) * 100
+    assert (metrics['min'], metrics['max']) == (min(g), max(g))
+    assert metrics['gmi'] == pytest.approx(3.31 + 0.02392 * statistics.mean(g))
+    assert metrics['time_in_range'] == pytest.approx(100 * sum(70 <= v <= 180 for v in g) / len(g))
+    assert metrics['time_below_range'] == pytest.approx(100 * sum(v < 70 for v in g) / len(g))
+
+    modd = _lagged_diffs(ts, g, DAY_MS)
+    assert metrics['modd'] == pytest.approx(statistics.mean(abs(d) for d in modd))
+    assert metrics['conga'] == pytest.approx(statistics.stdev(_lagged_diffs(ts, g, 60 * 60 * 1000)))
+
+    f = [1.509 * (math.log(v) ** 1.084 - 5.381) for v in g]
+    assert metrics['lbgi'] == pytest.approx(sum(10 * x * x for x in f if x < 0) / len(g))
+    assert metrics['hbgi'] == pytest.approx(sum(10 * x * x for x in f if x > 0) / len(g))
+
+
+def test_mage_counts_only_excursions_above_one_sd():
+    """Test small swings are absorbed and large ones averaged in both directions."""
+    glucose = np.array([100, 105, 100, 200, 195, 200, 90, 95, 150])
+    # 100 -> 200 (+100), 200 -> 90 (-110), 90 -> 150 (+60); 5 mg/dL wiggles are ignored
+    assert mage(glucose, 50) == pytest.approx((100 + 110 + 60) / 3)
+    assert mage(glucose, 70) == pytest.approx((100 + 110) / 2)
+    assert mage(np.array([100, 110, 100]), 20) is None
+
+
+def test_batch_matches_single_user_metrics():
+    """Test batched users (including an empty one) equal separate calls."""
+    users = {'a': _series(3, seed=1), 'b': ReadingSeries.empty(), 'c': _series(2, seed=2)}
+    batch = batch_glucose_metrics(users, target_range=(70, 140))
+
+    assert list(batch) == ['a', 'b', 'c']
+    for user, series in users.items():
+        assert batch[user] == glucose_metrics(series, target_range=(70, 140))
+    assert batch['b']['mean'] is None and batch['b']['count'] == 0
+
+
+def test_segments_do_not_pair_across_boundaries():
+    """Test lagged pairs never match readings from a neighbouring segment."""
+    series = _series(2)
+    segment = (series.ts >= START + 20 * 60 * 60 * 1000).astype(np.int64)
+    metrics = segment_metrics(series, segment, 2)
+
+    assert metrics[0]['modd'] is None
+    assert metrics[1]['modd'] is not None
+    assert metrics[0] == glucose_metrics(series.take(segment == 0))
+    assert metrics[1] == glucose_metrics(series.take(segment == 1))
@@ -0,0 +1,79 @@
+"""
+Tests for ReadingSeries
+"""
+
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pytest
+from shared.analytics import ReadingSeries, TREND_MISSING
+
+
+DAY_START = 1735689600000  # 2025-01-01T00:00:00Z
+FIVE_MIN = 300000
+
+
+def _series(n=24, start=DAY_START):
+    return ReadingSeries(start + np.arange(n) * FIVE_MIN, 100 + np.arange(n))
+
+
+def test_from_cursor_builds_columns():
+    """Test cursor rows load into typed arrays, NULL trend becomes TREND_MISSING."""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE r (ts_epoch INTEGER, glucose_value INTEGER, trend INTEGER)")
+    conn.executemany("INSERT INTO r VALUES (?, ?, ?)", [
+        (DAY_START, 100, 1), (DAY_START + FIVE_MIN, 110, None),
+    ])
+
+    series = ReadingSeries.from_cursor(conn.execute("SELECT * FROM r ORDER BY ts_epoch"))
+
+    assert series.ts.dtype == np.int64 and series.glucose.dtype == np.float32
+    assert list(series.trend) == [1, TREND_MISSING]
+    assert len(ReadingSeries.from_cursor(conn.execute("SELECT * FROM r WHERE 0"))) == 0
+
+
+def test_from_records_sorts_and_parses_timestamps():
+    """Test API records (newest first, with or without ts_epoch) become ascending."""
+    series = ReadingSeries.from_records([
+        {"timestamp": "2025-01-01T08:05:00+08:00", "glucose_value": 120},
+        {"ts_epoch": DAY_START, "timestamp": "2025-01-01T00:00:00", "glucose_value": 100},
+    ])
+
+    assert list(series.ts) == [DAY_START, DAY_START + FIVE_MIN]
+    assert list(series.glucose) == [100, 120]
+
+
+def test_slice_time_is_half_open():
+    """Test slice_time keeps start <= ts < end."""
+    series = _series()
+
+    window = series.slice_time(DAY_START + FIVE_MIN, DAY_START + 4 * FIVE_MIN)
+
+    assert list(window.glucose) == [101, 102, 103]
+    assert len(series.slice_time(DAY_START + 10 ** 9)) == 0
+
+
+def test_hour_mask_wraps_midnight():
+    """Test hour masks honour the UTC offset and windows across midnight."""
+    series = ReadingSeries([DAY_START + h * 3600000 for h in range(24)], [100] * 24)
+
+    assert list(np.flatnonzero(series.hour_mask(4, 8))) == [4, 5, 6, 7]
+    assert list(np.flatnonzero(series.hour_mask(22, 2))) == [0, 1, 22, 23]
+    assert series.hours(utc_offset_minutes=8 * 60)[0] == 8
+
+
+def test_resample_means():
+    """Test resampling averages readings per aligned bucket."""
+    resampled = _series(24).resample(3600000)
+
+    assert list(resampled.ts) == [DAY_START, DAY_START + 3600000]
+    assert list(resampled.glucose) == pytest.approx([105.5, 117.5])
+
+
+def test_to_records_matches_legacy_shape():
+    """Test the dict view carries naive UTC datetimes and int glucose."""
+    records = _series(2).to_records()
+
+    assert records[1] == {"timestamp": datetime(2025, 1, 1, 0, 5), "glucose_value": 101}
+    assert isinstance(records[1]["glucose_value"], int)
@@ -0,0 +1,27 @@
+"""
+Tests for sliding window extremes
+"""
+
+import numpy as np
+import pytest
+from shared.analytics import sliding_max, sliding_min
+
+
+@pytest.mark.parametrize("n, window", [(1, 1), (10, 3), (25, 24), (100, 7), (2016, 24)])
+def test_sliding_extremes_match_brute_force(n, window):
+    """Test O(n) window extremes equal max/min over every slice."""
+    values = np.random.default_rng(n).integers(40, 300, n)
+
+    expected_max = [values[i:i + window].max() for i in range(n - window + 1)]
+    expected_min = [values[i:i + window].min() for i in range(n - window + 1)]
+
+    assert list(sliding_max(values, window)) == expected_max
+    assert list(sliding_min(values, window)) == expected_min
+
+
+def test_sliding_extremes_short_input():
+    """Test inputs shorter than the window yield no windows."""
+    assert len(sliding_max([1, 2, 3], 5)) == 0
+
+    with pytest.raises(ValueError):
+        sliding_min([1, 2, 3], 0)
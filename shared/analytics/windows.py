@@ -0,0 +1,57 @@
+"""
+Sliding Window Extremes
+
+O(n) running max/min over fixed-size windows (van Herk / Gil-Werman):
+block-wise prefix and suffix extremes, each computed in one vectorized
+accumulate pass, independent of the window width.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+
+def _sliding_extreme(values: Sequence[float], window: int, ufunc: np.ufunc) -> np.ndarray:
+    values = np.asarray(values)
+    if window < 1:
+        raise ValueError("window must be at least 1")
+
+    n = len(values)
+    if n < window:
+        return values[:0].copy()
+
+    # 按窗口宽度分块; 末尾填充值不会参与任何完整窗口
+    blocks = -(-n // window)
+    padded = np.pad(values, (0, blocks * window - n), mode='edge').reshape(blocks, window)
+    prefix = ufunc.accumulate(padded, axis=1).ravel()
+    suffix = ufunc.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    return ufunc(suffix[:n - window + 1], prefix[window - 1:n])
+
+
+def sliding_max(values: Sequence[float], window: int) -> np.ndarray:
+    """
+    Maximum of every window values[i:i + window].
+
+    Args:
+        values: Series values
+        window: Window length in samples (>= 1)
+
+    Returns:
+        Array of length len(values) - window + 1 (empty if shorter than window)
+    """
+    return _sliding_extreme(values, window, np.maximum)
+
+
+def sliding_min(values: Sequence[float], window: int) -> np.ndarray:
+    """
+    Minimum of every window values[i:i + window].
+
+    Args:
+        values: Series values
+        window: Window length in samples (>= 1)
+
+    Returns:
+        Array of length len(values) - window + 1 (empty if shorter than window)
+    """
+    return _sliding_extreme(values, window, np.minimum)
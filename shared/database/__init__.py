@@ -17,6 +17,7 @@ from .repositories import (
     ConversationRepository,
     MemoryRepository,
     CGMRepository,
+    CGMRollupRepository,
     UserRepository,
     OnboardingStatusRepository,
     TodoRepository,
@@ -29,6 +30,7 @@ __all__ = [
     'ConversationRepository',
     'MemoryRepository',
     'CGMRepository',
+    'CGMRollupRepository',
     'UserRepository',
     'OnboardingStatusRepository',
     'TodoRepository',
@@ -0,0 +1,258 @@
+"""
+Vendor CGM Export Importer
+
+Streams vendor export files into cgm_readings through the bulk write path.
+
+Export format (e.g. apps/backend/data/example_user/*_reading.json):
+    {"code": 200, "data": {"rawData": [
+        {"level": null, "trend": 4, "value": 135.0,
+         "utc": "2025-07-01T18:15:20.000", "localTime": "2025-07-01T11:15:20.000"},
+        ...
+    ]}}
+
+The file is parsed incrementally: it is read in fixed-size chunks and each
+rawData element is decoded on its own, so memory stays bounded by the read
+chunk plus one write batch no matter how large the export is.
+
+Usage:
+    python -m shared.database.cgm_import <export.json> --user-id <user_id>
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, Optional
+
+# 添加项目根目录到路径
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from shared.database.repositories.cgm_repository import CGMRepository
+
+
+# Characters read from disk per chunk
+READ_CHUNK_SIZE = 64 * 1024
+
+# Readings per save_readings_bulk() call (one transaction each)
+DEFAULT_BATCH_SIZE = 5000
+
+RAW_DATA_KEY = '"rawData"'
+
+
+def iter_raw_readings(path: str, read_size: int = READ_CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Yield rawData elements from a vendor export without loading the whole file.
+
+    Args:
+        path: Path to the export JSON file
+        read_size: Characters read per chunk
+
+    Yields:
+        Raw reading dicts as they appear in the file
+
+    Raises:
+        ValueError: If the file has no rawData array or is malformed
+    """
+    decoder = json.JSONDecoder()
+
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buffer, eof
+            data = f.read(read_size)
+            if not data:
+                eof = True
+                return False
+            buffer += data
+            return True
+
+        # 1. 定位 "rawData": [
+        while True:
+            key_pos = buffer.find(RAW_DATA_KEY)
+            if key_pos != -1:
+                array_pos = buffer.find('[', key_pos + len(RAW_DATA_KEY))
+                if array_pos != -1:
+                    pos = array_pos + 1
+                    break
+            elif len(buffer) > len(RAW_DATA_KEY):
+                # 只保留可能跨块的尾部
+                buffer = buffer[-len(RAW_DATA_KEY):]
+            if not fill():
+                raise ValueError(f"No rawData array found in {path}")
+
+        # 2. 逐个解码数组元素
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+
+            if pos >= len(buffer):
+                if not fill():
+                    raise ValueError(f"Unterminated rawData array in {path}")
+                continue
+
+            if buffer[pos] == ']':
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 元素跨块: 读入更多数据再试
+                if eof or not fill():
+                    raise ValueError(f"Malformed rawData element in {path} near offset {pos}")
+                continue
+
+            yield item
+            pos = end
+
+            # 丢弃已消费的部分, 保持缓冲区有界
+            if pos > read_size:
+                buffer = buffer[pos:]
+                pos = 0
+
+
+def normalize_vendor_reading(raw: Dict) -> Optional[Dict]:
+    """
+    Map one vendor rawData element to the cgm_readings bulk format.
+
+    Args:
+        raw: Vendor element with 'value', 'utc', 'localTime', 'trend'
+
+    Returns:
+        Reading dict for CGMRepository.save_readings_bulk(), or None if the
+        element has no value or UTC time
+    """
+    if not isinstance(raw, dict):
+        return None
+    if raw.get('value') is None or not raw.get('utc'):
+        return None
+
+    return {
+        'timestamp': raw['utc'],
+        'glucose_value': raw['value'],
+        'local_time': raw.get('localTime'),
+        'trend': raw.get('trend'),
+    }
+
+
+class VendorCGMImporter:
+    """Streams vendor CGM exports into cgm_readings in bounded batches."""
+
+    def __init__(
+        self,
+        conn,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        mode: str = 'ignore',
+        verbose: bool = True
+    ):
+        """
+        Initialize importer.
+
+        Args:
+            conn: Database connection (SQLite or MySQL)
+            batch_size: Readings per write transaction
+            mode: 'ignore' or 'upsert' for readings already stored
+            verbose: Print progress after every batch
+        """
+        self.cgm_repo = CGMRepository(conn)
+        self.batch_size = batch_size
+        self.mode = mode
+        self.verbose = verbose
+
+    def import_file(self, path: str, user_id: str) -> Dict:
+        """
+        Import one export file for a user.
+
+        Args:
+            path: Path to the export JSON file
+            user_id: Target user ID (must exist in users)
+
+        Returns:
+            Summary dict with read/inserted/duplicates/skipped counts and throughput
+        """
+        started = time.perf_counter()
+        read = 0
+        inserted = 0
+        duplicates = 0
+        skipped = 0
+        batch = []
+
+        def flush():
+            nonlocal inserted, duplicates, skipped, batch
+            result = self.cgm_repo.save_readings_bulk(user_id, batch, mode=self.mode)
+            inserted += result['inserted']
+            duplicates += result['duplicates']
+            skipped += result['skipped']
+            batch = []
+            if self.verbose:
+                elapsed = time.perf_counter() - started
+                rate = read / elapsed if elapsed > 0 else 0.0
+                print(f"  ✓ {read:,} readings | {inserted:,} new | {rate:,.0f} readings/sec")
+
+        for raw in iter_raw_readings(path):
+            read += 1
+            reading = normalize_vendor_reading(raw)
+            if reading is None:
+                skipped += 1
+                continue
+
+            batch.append(reading)
+            if len(batch) >= self.batch_size:
+                flush()
+
+        if batch:
+            flush()
+
+        elapsed = time.perf_counter() - started
+        return {
+            'user_id': user_id,
+            'file': path,
+            'read': read,
+            'inserted': inserted,
+            'duplicates': duplicates,
+            'skipped': skipped,
+            'elapsed_seconds': round(elapsed, 3),
+            'readings_per_sec': round(read / elapsed, 1) if elapsed > 0 else None,
+        }
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='Import vendor CGM export files into cgm_readings')
+    parser.add_argument('files', nargs='+', help='Vendor export JSON file(s)')
+    parser.add_argument('--user-id', required=True, help='Target user ID')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Readings per transaction (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--mode', choices=['ignore', 'upsert'], default='ignore',
+                        help='Keep (ignore) or overwrite (upsert) readings already stored')
+    parser.add_argument('--db-path', help='SQLite database path (default: CGM_DB_PATH / storage)')
+    args = parser.parse_args(argv)
+
+    from shared.database.connection import get_connection
+    from shared.database.repositories.user_repository import UserRepository
+
+    conn = get_connection(args.db_path)
+    try:
+        if not UserRepository(conn).get_by_id(args.user_id):
+            print(f"❌ 用户不存在: {args.user_id}")
+            return 1
+
+        importer = VendorCGMImporter(conn, batch_size=args.batch_size, mode=args.mode)
+        for path in args.files:
+            print(f"\n📥 导入 {path} -> {args.user_id}")
+            summary = importer.import_file(path, args.user_id)
+            print(f"✅ 完成: 读取 {summary['read']:,} 条, 新增 {summary['inserted']:,} 条, "
+                  f"已存在 {summary['duplicates']:,} 条, 跳过 {summary['skipped']:,} 条, "
+                  f"{summary['elapsed_seconds']}s ({summary['readings_per_sec']:,} readings/sec)")
+    finally:
+        conn.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
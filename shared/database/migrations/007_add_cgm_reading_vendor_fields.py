@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+数据库迁移: 为 cgm_readings 表添加厂商导出字段
+
+新增字段:
+- local_time: 设备本地时间 (vendor localTime)
+- trend: 设备趋势箭头代码 (vendor trend)
+
+运行方式:
+    python3 shared/database/migrations/007_add_cgm_reading_vendor_fields.py
+    python3 shared/database/migrations/007_add_cgm_reading_vendor_fields.py rollback
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path for shared modules
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.database.connection import get_connection
+from config.settings import settings
+
+
+# (字段名, SQLite 类型, MySQL 类型)
+NEW_COLUMNS = [
+    ('local_time', 'TEXT', 'DATETIME NULL'),
+    ('trend', 'INTEGER', 'TINYINT NULL'),
+]
+
+
+def _get_columns(cursor, is_mysql: bool):
+    """读取 cgm_readings 当前字段"""
+    if is_mysql:
+        cursor.execute("""
+            SELECT COLUMN_NAME
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'cgm_readings'
+        """)
+        return [row['COLUMN_NAME'] for row in cursor.fetchall()]
+
+    cursor.execute("PRAGMA table_info(cgm_readings)")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def apply_migration(db_path: str):
+    """应用迁移：添加 local_time / trend 字段"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🚀 数据库迁移: 为 cgm_readings 添加 local_time / trend 字段")
+        print("=" * 80)
+        print(f"📁 数据库: {'MySQL' if is_mysql else db_path}")
+        print(f"⏰ 迁移时间: {datetime.now().isoformat()}")
+        print()
+
+        columns = _get_columns(cursor, is_mysql)
+
+        for name, sqlite_type, mysql_type in NEW_COLUMNS:
+            if name in columns:
+                print(f"✓  {name} 字段已存在")
+                continue
+
+            column_type = mysql_type if is_mysql else sqlite_type
+            print(f"➕ 添加字段: {name} ({column_type})")
+            cursor.execute(f"ALTER TABLE cgm_readings ADD COLUMN {name} {column_type}")
+
+        conn.commit()
+
+        print()
+        print("=" * 80)
+        print("✅ 迁移成功完成!")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+def rollback_migration(db_path: str):
+    """回滚迁移：删除 local_time / trend 字段 (SQLite 需要 3.35+)"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🔄 回滚迁移: 删除 cgm_readings 的 local_time / trend 字段")
+        print("=" * 80)
+
+        columns = _get_columns(cursor, is_mysql)
+        for name, _, _ in NEW_COLUMNS:
+            if name in columns:
+                cursor.execute(f"ALTER TABLE cgm_readings DROP COLUMN {name}")
+                print(f"  ✅ 已删除 {name}")
+
+        conn.commit()
+        print("✅ 回滚成功")
+
+    except Exception as e:
+        print(f"❌ 回滚失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    # Ensure environment variables are loaded
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(project_root, '.env'))
+
+    db_path = settings.DB_PATH
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback_migration(db_path)
+    else:
+        apply_migration(db_path)
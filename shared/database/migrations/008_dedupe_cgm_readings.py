@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+数据库迁移: cgm_readings 去重并添加 (user_id, timestamp) 唯一键
+
+步骤:
+1. (SQLite) 将 timestamp 统一为 UTC 'YYYY-MM-DDTHH:MM:SS' 格式
+   (去掉 Z/时区偏移和小数秒, 与写入路径一致)
+2. 删除重复读数, 每个 (user_id, timestamp) 只保留最新写入的一条 (最大 id)
+3. 创建唯一索引 uq_cgm_readings_user_timestamp, 删除旧的 idx_user_timestamp
+
+运行方式:
+    python3 shared/database/migrations/008_dedupe_cgm_readings.py
+    python3 shared/database/migrations/008_dedupe_cgm_readings.py rollback
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path for shared modules
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.database.connection import get_connection
+from shared.database.repositories.cgm_repository import normalize_timestamp_utc
+from config.settings import settings
+
+
+# 每批更新的行数
+BATCH_SIZE = 5000
+
+
+def _normalize_sqlite_timestamps(cursor) -> int:
+    """将非标准格式的 timestamp 规范化 (仅 SQLite, MySQL 为 DATETIME 类型)"""
+    cursor.execute("""
+        SELECT id, timestamp FROM cgm_readings
+        WHERE timestamp NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]T[0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+    """)
+
+    updated = 0
+    while True:
+        rows = cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+
+        updates = []
+        for row_id, timestamp in rows:
+            try:
+                updates.append((normalize_timestamp_utc(timestamp), row_id))
+            except ValueError:
+                print(f"  ⚠️  无法解析 timestamp, 保留原值: id={row_id} {timestamp!r}")
+
+        # 使用独立游标, 避免打断 fetchmany
+        cursor.connection.executemany(
+            "UPDATE cgm_readings SET timestamp = ? WHERE id = ?", updates
+        )
+        updated += len(updates)
+
+    return updated
+
+
+def apply_migration(db_path: str):
+    """应用迁移：去重并添加唯一键"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🚀 数据库迁移: cgm_readings 去重 + (user_id, timestamp) 唯一键")
+        print("=" * 80)
+        print(f"📁 数据库: {'MySQL' if is_mysql else db_path}")
+        print(f"⏰ 迁移时间: {datetime.now().isoformat()}")
+        print()
+
+        # 1. 规范化 timestamp
+        if not is_mysql:
+            print("📝 规范化 timestamp 格式...")
+            normalized = _normalize_sqlite_timestamps(cursor)
+            print(f"  ✅ 规范化 {normalized} 条")
+
+        # 2. 删除重复读数 (保留最大 id)
+        print("📝 删除重复读数...")
+        if is_mysql:
+            cursor.execute("""
+                DELETE c FROM cgm_readings c
+                LEFT JOIN (
+                    SELECT MAX(id) AS id FROM cgm_readings GROUP BY user_id, timestamp
+                ) keep ON c.id = keep.id
+                WHERE keep.id IS NULL
+            """)
+        else:
+            cursor.execute("""
+                DELETE FROM cgm_readings
+                WHERE id NOT IN (
+                    SELECT MAX(id) FROM cgm_readings GROUP BY user_id, timestamp
+                )
+            """)
+        print(f"  ✅ 删除 {cursor.rowcount} 条重复读数")
+
+        # 3. 唯一索引 (先建唯一键再删旧索引, MySQL 外键需要 user_id 前缀索引)
+        print("📝 创建唯一索引 uq_cgm_readings_user_timestamp...")
+        if is_mysql:
+            cursor.execute("""
+                SELECT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'cgm_readings'
+            """)
+            indexes = {row['INDEX_NAME'] for row in cursor.fetchall()}
+            if 'uq_cgm_readings_user_timestamp' not in indexes:
+                cursor.execute("""
+                    ALTER TABLE cgm_readings
+                    ADD UNIQUE KEY uq_cgm_readings_user_timestamp (user_id, timestamp)
+                """)
+            if 'idx_user_timestamp' in indexes:
+                cursor.execute("ALTER TABLE cgm_readings DROP INDEX idx_user_timestamp")
+        else:
+            cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS uq_cgm_readings_user_timestamp
+                ON cgm_readings(user_id, timestamp)
+            """)
+            cursor.execute("DROP INDEX IF EXISTS idx_user_timestamp")
+        print("  ✅ 唯一索引已就绪")
+
+        conn.commit()
+
+        print()
+        print("=" * 80)
+        print("✅ 迁移成功完成!")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+def rollback_migration(db_path: str):
+    """回滚迁移：恢复普通索引 (已删除的重复读数无法恢复)"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🔄 回滚迁移: 恢复 idx_user_timestamp, 删除唯一索引")
+        print("=" * 80)
+
+        if is_mysql:
+            cursor.execute("""
+                SELECT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'cgm_readings'
+            """)
+            indexes = {row['INDEX_NAME'] for row in cursor.fetchall()}
+            if 'idx_user_timestamp' not in indexes:
+                cursor.execute("ALTER TABLE cgm_readings ADD INDEX idx_user_timestamp (user_id, timestamp)")
+            if 'uq_cgm_readings_user_timestamp' in indexes:
+                cursor.execute("ALTER TABLE cgm_readings DROP INDEX uq_cgm_readings_user_timestamp")
+        else:
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_user_timestamp
+                ON cgm_readings(user_id, timestamp)
+            """)
+            cursor.execute("DROP INDEX IF EXISTS uq_cgm_readings_user_timestamp")
+
+        conn.commit()
+        print("✅ 回滚成功")
+
+    except Exception as e:
+        print(f"❌ 回滚失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    # Ensure environment variables are loaded
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(project_root, '.env'))
+
+    db_path = settings.DB_PATH
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback_migration(db_path)
+    else:
+        apply_migration(db_path)
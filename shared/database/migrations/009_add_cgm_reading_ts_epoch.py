@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+数据库迁移: 为 cgm_readings 添加整数时间戳 ts_epoch
+
+新增字段:
+- ts_epoch: UTC epoch 毫秒, 由 timestamp 回填
+新增索引:
+- idx_cgm_readings_user_epoch (user_id, ts_epoch): 范围查询按整数扫描
+
+需先运行 008 (timestamp 已统一为 UTC 'YYYY-MM-DDTHH:MM:SS').
+
+运行方式:
+    python3 shared/database/migrations/009_add_cgm_reading_ts_epoch.py
+    python3 shared/database/migrations/009_add_cgm_reading_ts_epoch.py rollback
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path for shared modules
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.database.connection import get_connection
+from config.settings import settings
+
+
+def _get_columns(cursor, is_mysql: bool):
+    """读取 cgm_readings 当前字段"""
+    if is_mysql:
+        cursor.execute("""
+            SELECT COLUMN_NAME
+            FROM INFORMATION_SCHEMA.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'cgm_readings'
+        """)
+        return [row['COLUMN_NAME'] for row in cursor.fetchall()]
+
+    cursor.execute("PRAGMA table_info(cgm_readings)")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _get_indexes(cursor, is_mysql: bool):
+    """读取 cgm_readings 当前索引"""
+    if is_mysql:
+        cursor.execute("""
+            SELECT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'cgm_readings'
+        """)
+        return {row['INDEX_NAME'] for row in cursor.fetchall()}
+
+    cursor.execute("PRAGMA index_list(cgm_readings)")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def apply_migration(db_path: str):
+    """应用迁移：添加并回填 ts_epoch"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🚀 数据库迁移: 为 cgm_readings 添加 ts_epoch (UTC 毫秒)")
+        print("=" * 80)
+        print(f"📁 数据库: {'MySQL' if is_mysql else db_path}")
+        print(f"⏰ 迁移时间: {datetime.now().isoformat()}")
+        print()
+
+        if 'ts_epoch' in _get_columns(cursor, is_mysql):
+            print("✓  ts_epoch 字段已存在")
+        else:
+            column_type = 'BIGINT NULL' if is_mysql else 'INTEGER'
+            print(f"➕ 添加字段: ts_epoch ({column_type})")
+            cursor.execute(f"ALTER TABLE cgm_readings ADD COLUMN ts_epoch {column_type}")
+
+        # 回填: timestamp 为 UTC, 与会话时区无关
+        print("📝 回填 ts_epoch...")
+        if is_mysql:
+            cursor.execute("""
+                UPDATE cgm_readings
+                SET ts_epoch = TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', timestamp) * 1000
+                WHERE ts_epoch IS NULL
+            """)
+        else:
+            cursor.execute("""
+                UPDATE cgm_readings
+                SET ts_epoch = CAST(strftime('%s', timestamp) AS INTEGER) * 1000
+                WHERE ts_epoch IS NULL
+            """)
+        print(f"  ✅ 回填 {cursor.rowcount} 条")
+
+        if 'idx_cgm_readings_user_epoch' in _get_indexes(cursor, is_mysql):
+            print("✓  idx_cgm_readings_user_epoch 索引已存在")
+        else:
+            print("📝 创建索引 idx_cgm_readings_user_epoch...")
+            cursor.execute("""
+                CREATE INDEX idx_cgm_readings_user_epoch
+                ON cgm_readings(user_id, ts_epoch)
+            """)
+
+        conn.commit()
+
+        print()
+        print("=" * 80)
+        print("✅ 迁移成功完成!")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+def rollback_migration(db_path: str):
+    """回滚迁移：删除 ts_epoch 字段和索引 (SQLite 需要 3.35+)"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🔄 回滚迁移: 删除 cgm_readings 的 ts_epoch 字段")
+        print("=" * 80)
+
+        if 'idx_cgm_readings_user_epoch' in _get_indexes(cursor, is_mysql):
+            if is_mysql:
+                cursor.execute("ALTER TABLE cgm_readings DROP INDEX idx_cgm_readings_user_epoch")
+            else:
+                cursor.execute("DROP INDEX idx_cgm_readings_user_epoch")
+            print("  ✅ 已删除 idx_cgm_readings_user_epoch")
+
+        if 'ts_epoch' in _get_columns(cursor, is_mysql):
+            cursor.execute("ALTER TABLE cgm_readings DROP COLUMN ts_epoch")
+            print("  ✅ 已删除 ts_epoch")
+
+        conn.commit()
+        print("✅ 回滚成功")
+
+    except Exception as e:
+        print(f"❌ 回滚失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    # Ensure environment variables are loaded
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(project_root, '.env'))
+
+    db_path = settings.DB_PATH
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback_migration(db_path)
+    else:
+        apply_migration(db_path)
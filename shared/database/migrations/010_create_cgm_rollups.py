@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+数据库迁移: 创建血糖小时/日聚合表并回填
+
+新增表:
+- cgm_rollup_hourly: 每用户每小时的 count/sum/sum_sq/min/max 及阈值计数
+- cgm_rollup_daily: 每用户每 UTC 日的同类聚合
+
+写入路径 (CGMRepository) 会在每个写入批次后增量维护这两张表。
+需先运行 009 (ts_epoch 已回填)。
+
+运行方式:
+    python3 shared/database/migrations/010_create_cgm_rollups.py
+    python3 shared/database/migrations/010_create_cgm_rollups.py rollback
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path for shared modules
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.database.connection import get_connection
+from shared.database.repositories.cgm_rollup_repository import CGMRollupRepository
+from config.settings import settings
+
+
+def apply_migration(db_path: str):
+    """应用迁移：创建聚合表并按用户回填"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🚀 数据库迁移: 创建 cgm_rollup_hourly / cgm_rollup_daily")
+        print("=" * 80)
+        print(f"📁 数据库: {'MySQL' if is_mysql else db_path}")
+        print(f"⏰ 迁移时间: {datetime.now().isoformat()}")
+        print()
+
+        if is_mysql:
+            from shared.database.mysql_schema import CGM_ROLLUP_HOURLY_TABLE, CGM_ROLLUP_DAILY_TABLE
+        else:
+            from shared.database.schema import CGM_ROLLUP_HOURLY_TABLE, CGM_ROLLUP_DAILY_TABLE
+
+        cursor.execute(CGM_ROLLUP_HOURLY_TABLE)
+        cursor.execute(CGM_ROLLUP_DAILY_TABLE)
+        conn.commit()
+        print("✅ 聚合表已就绪")
+
+        cursor.execute("SELECT DISTINCT user_id FROM cgm_readings")
+        user_ids = [row['user_id'] for row in cursor.fetchall()]
+
+        print(f"📝 回填 {len(user_ids)} 个用户的聚合数据...")
+        rollups = CGMRollupRepository(conn)
+        for user_id in user_ids:
+            rollups.rebuild(user_id)
+            print(f"  ✓ {user_id}")
+
+        print()
+        print("=" * 80)
+        print("✅ 迁移成功完成!")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+def rollback_migration(db_path: str):
+    """回滚迁移：删除聚合表"""
+    conn = None
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🔄 回滚迁移: 删除 cgm_rollup_hourly / cgm_rollup_daily")
+        print("=" * 80)
+
+        cursor.execute("DROP TABLE IF EXISTS cgm_rollup_daily")
+        cursor.execute("DROP TABLE IF EXISTS cgm_rollup_hourly")
+
+        conn.commit()
+        print("✅ 回滚成功")
+
+    except Exception as e:
+        print(f"❌ 回滚失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    # Ensure environment variables are loaded
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(project_root, '.env'))
+
+    db_path = settings.DB_PATH
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback_migration(db_path)
+    else:
+        apply_migration(db_path)
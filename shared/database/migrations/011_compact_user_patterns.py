@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+数据库迁移: user_patterns 改为按 (user_id, pattern_type, period) 记录出现次数
+
+旧表每次运行为每个模式追加一行, 无限增长。新表每个用户每种模式每天一行:
+- period: 检测日期 (YYYY-MM-DD)
+- first_seen / last_seen: 当天首次 / 最近一次检测时间
+- hit_count: 当天检测次数
+- severity / confidence / details: 最近一次检测的结果
+
+步骤:
+1. 旧表重命名为 user_patterns_legacy
+2. 创建新表, 按 (user_id, pattern_type, 日期) 压缩历史记录
+3. 删除旧表
+
+运行方式:
+    python3 shared/database/migrations/011_compact_user_patterns.py
+    python3 shared/database/migrations/011_compact_user_patterns.py rollback
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path for shared modules
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.database.connection import get_connection
+from config.settings import settings
+
+
+LEGACY_USER_PATTERNS_TABLE = """
+CREATE TABLE IF NOT EXISTS user_patterns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    pattern_type TEXT NOT NULL,
+    pattern_name TEXT NOT NULL,
+    description TEXT,
+    severity TEXT,
+    confidence REAL,
+    details TEXT,
+    detected_at TEXT NOT NULL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+
+def _sqlite_columns(cursor, table: str) -> set:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row['name'] for row in cursor.fetchall()}
+
+
+def apply_migration(db_path: str):
+    """应用迁移：压缩 user_patterns 历史为出现记录"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🚀 数据库迁移: user_patterns 压缩为 (user_id, pattern_type, period) 出现记录")
+        print("=" * 80)
+        print(f"📁 数据库: {'MySQL' if is_mysql else db_path}")
+        print(f"⏰ 迁移时间: {datetime.now().isoformat()}")
+        print()
+
+        # MySQL 此前没有 user_patterns 表 (模式识别只写 SQLite), 直接建表
+        if is_mysql:
+            from shared.database.mysql_schema import USER_PATTERNS_TABLE
+            cursor.execute(USER_PATTERNS_TABLE)
+            conn.commit()
+            print("✅ user_patterns 表已就绪")
+            return
+
+        from shared.database.schema import USER_PATTERNS_TABLE, USER_PATTERNS_INDEX
+
+        columns = _sqlite_columns(cursor, 'user_patterns')
+        if 'period' in columns:
+            print("⚠️  user_patterns 已是新结构, 跳过")
+            return
+
+        legacy_rows = 0
+        if columns:
+            cursor.execute("SELECT COUNT(*) AS n FROM user_patterns")
+            legacy_rows = cursor.fetchone()['n']
+            cursor.execute("ALTER TABLE user_patterns RENAME TO user_patterns_legacy")
+
+        cursor.execute(USER_PATTERNS_TABLE)
+        cursor.execute(USER_PATTERNS_INDEX)
+
+        if columns:
+            print(f"📝 压缩 {legacy_rows} 条历史记录...")
+            # 每组取最近一次 (最大 id) 的检测结果, 并统计首次/最近时间和次数
+            cursor.execute("""
+                INSERT INTO user_patterns
+                (user_id, pattern_type, pattern_name, description, severity, confidence, details,
+                 period, first_seen, last_seen, hit_count, detected_at, created_at)
+                SELECT
+                    latest.user_id, latest.pattern_type, latest.pattern_name, latest.description,
+                    latest.severity, latest.confidence, latest.details,
+                    grouped.period, grouped.first_seen, grouped.last_seen, grouped.hit_count,
+                    grouped.last_seen, grouped.created_at
+                FROM (
+                    SELECT
+                        MAX(id) AS id,
+                        substr(detected_at, 1, 10) AS period,
+                        MIN(detected_at) AS first_seen,
+                        MAX(detected_at) AS last_seen,
+                        COUNT(*) AS hit_count,
+                        MIN(created_at) AS created_at
+                    FROM user_patterns_legacy
+                    GROUP BY user_id, pattern_type, substr(detected_at, 1, 10)
+                ) grouped
+                JOIN user_patterns_legacy latest ON latest.id = grouped.id
+            """)
+            print(f"  ✅ 压缩为 {cursor.rowcount} 条出现记录")
+            cursor.execute("DROP TABLE user_patterns_legacy")
+
+        conn.commit()
+
+        print()
+        print("=" * 80)
+        print("✅ 迁移成功完成!")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+def rollback_migration(db_path: str):
+    """回滚迁移：恢复旧表结构 (每条出现记录还原为一行, hit_count 无法展开)"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🔄 回滚迁移: user_patterns 恢复为逐次追加结构")
+        print("=" * 80)
+
+        if is_mysql:
+            cursor.execute("DROP TABLE IF EXISTS user_patterns")
+        elif 'period' in _sqlite_columns(cursor, 'user_patterns'):
+            cursor.execute("ALTER TABLE user_patterns RENAME TO user_patterns_occurrences")
+            cursor.execute("DROP INDEX IF EXISTS idx_user_patterns_user_seen")
+            cursor.execute(LEGACY_USER_PATTERNS_TABLE)
+            cursor.execute("""
+                INSERT INTO user_patterns
+                (user_id, pattern_type, pattern_name, description, severity, confidence, details,
+                 detected_at, created_at)
+                SELECT user_id, pattern_type, pattern_name, description, severity, confidence, details,
+                       last_seen, created_at
+                FROM user_patterns_occurrences
+                ORDER BY id
+            """)
+            cursor.execute("DROP TABLE user_patterns_occurrences")
+
+        conn.commit()
+        print("✅ 回滚成功")
+
+    except Exception as e:
+        print(f"❌ 回滚失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    # Ensure environment variables are loaded
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(project_root, '.env'))
+
+    db_path = settings.DB_PATH
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback_migration(db_path)
+    else:
+        apply_migration(db_path)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+数据库迁移: 创建 AGP 缓存表
+
+新增表:
+- cgm_agp_daily: 每用户每 UTC 日的读数编码, 按 cgm_rollup_daily.updated_at 判断是否过期
+- cgm_agp_profile: 按 (用户, 窗口结束日, 窗口天数, 时段宽度) 缓存的分位数结果
+
+两张表都在首次请求 AGP 时按需填充, 无需回填。需先运行 010 (聚合表已存在)。
+
+运行方式:
+    python3 shared/database/migrations/012_create_cgm_agp_tables.py
+    python3 shared/database/migrations/012_create_cgm_agp_tables.py rollback
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path for shared modules
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.database.connection import get_connection
+from config.settings import settings
+
+
+def apply_migration(db_path: str):
+    """应用迁移：创建 AGP 缓存表"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🚀 数据库迁移: 创建 cgm_agp_daily / cgm_agp_profile")
+        print("=" * 80)
+        print(f"📁 数据库: {'MySQL' if is_mysql else db_path}")
+        print(f"⏰ 迁移时间: {datetime.now().isoformat()}")
+        print()
+
+        if is_mysql:
+            from shared.database.mysql_schema import CGM_AGP_DAILY_TABLE, CGM_AGP_PROFILE_TABLE
+        else:
+            from shared.database.schema import CGM_AGP_DAILY_TABLE, CGM_AGP_PROFILE_TABLE
+
+        cursor.execute(CGM_AGP_DAILY_TABLE)
+        cursor.execute(CGM_AGP_PROFILE_TABLE)
+        conn.commit()
+
+        print("=" * 80)
+        print("✅ 迁移成功完成!")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+def rollback_migration(db_path: str):
+    """回滚迁移：删除 AGP 缓存表"""
+    conn = None
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🔄 回滚迁移: 删除 cgm_agp_daily / cgm_agp_profile")
+        print("=" * 80)
+
+        cursor.execute("DROP TABLE IF EXISTS cgm_agp_profile")
+        cursor.execute("DROP TABLE IF EXISTS cgm_agp_daily")
+
+        conn.commit()
+        print("✅ 回滚成功")
+
+    except Exception as e:
+        print(f"❌ 回滚失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    # Ensure environment variables are loaded
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(project_root, '.env'))
+
+    db_path = settings.DB_PATH
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback_migration(db_path)
+    else:
+        apply_migration(db_path)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+数据库迁移: 创建血糖事件表
+
+新增表:
+- glucose_events: 持续低/高血糖事件 (开始/结束、最低/最高值、持续时间), 按开始时间索引
+- glucose_event_state: 每用户已扫描到的 cgm_rollup_daily.updated_at 水位
+
+事件在首次查询时全量扫描, 之后只重扫水位之后变化的日期, 无需回填。需先运行 010 (聚合表已存在)。
+
+运行方式:
+    python3 shared/database/migrations/013_create_glucose_events.py
+    python3 shared/database/migrations/013_create_glucose_events.py rollback
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path for shared modules
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.database.connection import get_connection
+from config.settings import settings
+
+
+def apply_migration(db_path: str):
+    """应用迁移：创建血糖事件表"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🚀 数据库迁移: 创建 glucose_events / glucose_event_state")
+        print("=" * 80)
+        print(f"📁 数据库: {'MySQL' if is_mysql else db_path}")
+        print(f"⏰ 迁移时间: {datetime.now().isoformat()}")
+        print()
+
+        if is_mysql:
+            from shared.database.mysql_schema import GLUCOSE_EVENTS_TABLE, GLUCOSE_EVENT_STATE_TABLE
+        else:
+            from shared.database.schema import GLUCOSE_EVENTS_TABLE, GLUCOSE_EVENT_STATE_TABLE
+
+        cursor.execute(GLUCOSE_EVENTS_TABLE)
+        cursor.execute(GLUCOSE_EVENT_STATE_TABLE)
+        conn.commit()
+
+        print("=" * 80)
+        print("✅ 迁移成功完成!")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+def rollback_migration(db_path: str):
+    """回滚迁移：删除血糖事件表"""
+    conn = None
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🔄 回滚迁移: 删除 glucose_events / glucose_event_state")
+        print("=" * 80)
+
+        cursor.execute("DROP TABLE IF EXISTS glucose_event_state")
+        cursor.execute("DROP TABLE IF EXISTS glucose_events")
+
+        conn.commit()
+        print("✅ 回滚成功")
+
+    except Exception as e:
+        print(f"❌ 回滚失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    # Ensure environment variables are loaded
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(project_root, '.env'))
+
+    db_path = settings.DB_PATH
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback_migration(db_path)
+    else:
+        apply_migration(db_path)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+数据库迁移: 创建实时提醒表
+
+新增表:
+- cgm_alert_state: 每用户的提醒规则状态 (上一读数、平滑变化速率、各提醒是否处于触发中)
+- cgm_alert_outbox: 待下游消费的提醒 (urgent_low / predicted_low / sustained_high)
+
+写入读数 (CGMRepository.save_readings_bulk / save_reading) 时在同一事务内评估,
+因此本迁移需在部署新写入代码之前运行。无需回填: 历史读数不会产生提醒。
+
+运行方式:
+    python3 shared/database/migrations/014_create_cgm_alert_tables.py
+    python3 shared/database/migrations/014_create_cgm_alert_tables.py rollback
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path for shared modules
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.database.connection import get_connection
+from config.settings import settings
+
+
+def apply_migration(db_path: str):
+    """应用迁移：创建实时提醒表"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🚀 数据库迁移: 创建 cgm_alert_state / cgm_alert_outbox")
+        print("=" * 80)
+        print(f"📁 数据库: {'MySQL' if is_mysql else db_path}")
+        print(f"⏰ 迁移时间: {datetime.now().isoformat()}")
+        print()
+
+        if is_mysql:
+            from shared.database.mysql_schema import CGM_ALERT_STATE_TABLE, CGM_ALERT_OUTBOX_TABLE
+        else:
+            from shared.database.schema import (
+                CGM_ALERT_STATE_TABLE, CGM_ALERT_OUTBOX_TABLE, CGM_ALERT_OUTBOX_INDEX
+            )
+
+        cursor.execute(CGM_ALERT_STATE_TABLE)
+        cursor.execute(CGM_ALERT_OUTBOX_TABLE)
+        if not is_mysql:
+            cursor.execute(CGM_ALERT_OUTBOX_INDEX)
+        conn.commit()
+
+        print("=" * 80)
+        print("✅ 迁移成功完成!")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+def rollback_migration(db_path: str):
+    """回滚迁移：删除实时提醒表"""
+    conn = None
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🔄 回滚迁移: 删除 cgm_alert_state / cgm_alert_outbox")
+        print("=" * 80)
+
+        cursor.execute("DROP TABLE IF EXISTS cgm_alert_outbox")
+        cursor.execute("DROP TABLE IF EXISTS cgm_alert_state")
+
+        conn.commit()
+        print("✅ 回滚成功")
+
+    except Exception as e:
+        print(f"❌ 回滚失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    # Ensure environment variables are loaded
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(project_root, '.env'))
+
+    db_path = settings.DB_PATH
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback_migration(db_path)
+    else:
+        apply_migration(db_path)
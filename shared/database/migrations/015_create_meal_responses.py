@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+数据库迁移: 创建餐后血糖反应表
+
+新增表:
+- meal_responses: 每条 food 活动日志的餐后反应 (基线 / 峰值 / 达峰时间 / iAUC / 回落时间)
+
+此前由 CGMDatabase 在查询时按需建表; 现改为迁移创建, 需在部署新代码之前运行。
+无需回填: 查询时只为缺失或过期的餐计算反应。
+
+运行方式:
+    python3 shared/database/migrations/015_create_meal_responses.py
+    python3 shared/database/migrations/015_create_meal_responses.py rollback
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path for shared modules
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.database.connection import get_connection
+from config.settings import settings
+
+
+def apply_migration(db_path: str):
+    """应用迁移：创建餐后血糖反应表"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🚀 数据库迁移: 创建 meal_responses")
+        print("=" * 80)
+        print(f"📁 数据库: {'MySQL' if is_mysql else db_path}")
+        print(f"⏰ 迁移时间: {datetime.now().isoformat()}")
+        print()
+
+        if is_mysql:
+            from shared.database.mysql_schema import MEAL_RESPONSES_TABLE
+        else:
+            from shared.database.schema import MEAL_RESPONSES_TABLE, MEAL_RESPONSES_INDEX
+
+        cursor.execute(MEAL_RESPONSES_TABLE)
+        if not is_mysql:
+            cursor.execute(MEAL_RESPONSES_INDEX)
+        conn.commit()
+
+        print("=" * 80)
+        print("✅ 迁移成功完成!")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+def rollback_migration(db_path: str):
+    """回滚迁移：删除餐后血糖反应表"""
+    conn = None
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🔄 回滚迁移: 删除 meal_responses")
+        print("=" * 80)
+
+        cursor.execute("DROP TABLE IF EXISTS meal_responses")
+
+        conn.commit()
+        print("✅ 回滚成功")
+
+    except Exception as e:
+        print(f"❌ 回滚失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    # Ensure environment variables are loaded
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(project_root, '.env'))
+
+    db_path = settings.DB_PATH
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback_migration(db_path)
+    else:
+        apply_migration(db_path)
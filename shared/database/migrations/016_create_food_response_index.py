@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+数据库迁移: 创建食物反应索引表
+
+新增表:
+- food_response_index: 每用户每种食物的餐后反应汇总 (平均 / 中位 / P90 / 最大升幅, 尖峰次数, 平均 iAUC)
+- food_response_state: 每用户的索引同步水位
+
+此前由 CGMDatabase 在查询时按需建表; 现改为迁移创建, 需在迁移 015 之后、部署新代码之前运行。
+无需回填: 没有水位行的用户在下次查询时全量同步。
+
+运行方式:
+    python3 shared/database/migrations/016_create_food_response_index.py
+    python3 shared/database/migrations/016_create_food_response_index.py rollback
+"""
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to sys.path for shared modules
+project_root = Path(__file__).parent.parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from shared.database.connection import get_connection
+from config.settings import settings
+
+
+def apply_migration(db_path: str):
+    """应用迁移：创建食物反应索引表"""
+    conn = None
+    is_mysql = settings.DB_TYPE.lower() == 'mysql'
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🚀 数据库迁移: 创建 food_response_index / food_response_state")
+        print("=" * 80)
+        print(f"📁 数据库: {'MySQL' if is_mysql else db_path}")
+        print(f"⏰ 迁移时间: {datetime.now().isoformat()}")
+        print()
+
+        if is_mysql:
+            from shared.database.mysql_schema import FOOD_RESPONSE_INDEX_TABLE, FOOD_RESPONSE_STATE_TABLE
+        else:
+            from shared.database.schema import FOOD_RESPONSE_INDEX_TABLE, FOOD_RESPONSE_STATE_TABLE
+
+        cursor.execute(FOOD_RESPONSE_INDEX_TABLE)
+        cursor.execute(FOOD_RESPONSE_STATE_TABLE)
+        conn.commit()
+
+        print("=" * 80)
+        print("✅ 迁移成功完成!")
+        print("=" * 80)
+
+    except Exception as e:
+        print(f"❌ 迁移失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+def rollback_migration(db_path: str):
+    """回滚迁移：删除食物反应索引表"""
+    conn = None
+    try:
+        conn = get_connection(db_path)
+        cursor = conn.cursor()
+
+        print("=" * 80)
+        print("🔄 回滚迁移: 删除 food_response_index / food_response_state")
+        print("=" * 80)
+
+        cursor.execute("DROP TABLE IF EXISTS food_response_state")
+        cursor.execute("DROP TABLE IF EXISTS food_response_index")
+
+        conn.commit()
+        print("✅ 回滚成功")
+
+    except Exception as e:
+        print(f"❌ 回滚失败: {e}")
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    # Ensure environment variables are loaded
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(project_root, '.env'))
+
+    db_path = settings.DB_PATH
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rollback':
+        rollback_migration(db_path)
+    else:
+        apply_migration(db_path)
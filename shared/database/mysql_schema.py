@@ -36,10 +36,135 @@ CREATE TABLE IF NOT EXISTS cgm_readings (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id VARCHAR(50) NOT NULL,
     timestamp DATETIME NOT NULL,
+    ts_epoch BIGINT NOT NULL,
     glucose_value INT NOT NULL,
+    local_time DATETIME NULL,
+    trend TINYINT NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
-    INDEX idx_user_timestamp (user_id, timestamp)
+    UNIQUE KEY uq_cgm_readings_user_timestamp (user_id, timestamp),
+    INDEX idx_cgm_readings_user_epoch (user_id, ts_epoch)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+CGM_ROLLUP_HOURLY_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_rollup_hourly (
+    user_id VARCHAR(50) NOT NULL,
+    bucket_start BIGINT NOT NULL,
+    reading_count INT NOT NULL,
+    glucose_sum BIGINT NOT NULL,
+    glucose_sum_sq BIGINT NOT NULL,
+    glucose_min INT NULL,
+    glucose_max INT NULL,
+    below_54 INT NOT NULL DEFAULT 0,
+    below_70 INT NOT NULL DEFAULT 0,
+    above_140 INT NOT NULL DEFAULT 0,
+    above_180 INT NOT NULL DEFAULT 0,
+    above_250 INT NOT NULL DEFAULT 0,
+    updated_at DATETIME(6) NULL,
+    PRIMARY KEY (user_id, bucket_start),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+CGM_ROLLUP_DAILY_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_rollup_daily (
+    user_id VARCHAR(50) NOT NULL,
+    bucket_start BIGINT NOT NULL,
+    reading_count INT NOT NULL,
+    glucose_sum BIGINT NOT NULL,
+    glucose_sum_sq BIGINT NOT NULL,
+    glucose_min INT NULL,
+    glucose_max INT NULL,
+    below_54 INT NOT NULL DEFAULT 0,
+    below_70 INT NOT NULL DEFAULT 0,
+    above_140 INT NOT NULL DEFAULT 0,
+    above_180 INT NOT NULL DEFAULT 0,
+    above_250 INT NOT NULL DEFAULT 0,
+    updated_at DATETIME(6) NULL,
+    PRIMARY KEY (user_id, bucket_start),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+CGM_AGP_DAILY_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_agp_daily (
+    user_id VARCHAR(50) NOT NULL,
+    bucket_start BIGINT NOT NULL,
+    source_updated_at VARCHAR(32) NOT NULL,
+    reading_count INT NOT NULL,
+    codes MEDIUMBLOB NOT NULL,
+    PRIMARY KEY (user_id, bucket_start),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+CGM_AGP_PROFILE_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_agp_profile (
+    user_id VARCHAR(50) NOT NULL,
+    end_day BIGINT NOT NULL,
+    window_days INT NOT NULL,
+    bin_minutes INT NOT NULL,
+    fingerprint VARCHAR(64) NOT NULL,
+    profile JSON NOT NULL,
+    computed_at DATETIME(6) NOT NULL,
+    PRIMARY KEY (user_id, end_day, window_days, bin_minutes),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+GLUCOSE_EVENTS_TABLE = """
+CREATE TABLE IF NOT EXISTS glucose_events (
+    user_id VARCHAR(50) NOT NULL,
+    start_ts_epoch BIGINT NOT NULL,
+    event_type VARCHAR(20) NOT NULL,
+    end_ts_epoch BIGINT NOT NULL,
+    duration_minutes DOUBLE NOT NULL,
+    extreme_glucose DOUBLE NOT NULL,
+    extreme_ts_epoch BIGINT NOT NULL,
+    reading_count INT NOT NULL,
+    PRIMARY KEY (user_id, start_ts_epoch, event_type),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+GLUCOSE_EVENT_STATE_TABLE = """
+CREATE TABLE IF NOT EXISTS glucose_event_state (
+    user_id VARCHAR(50) PRIMARY KEY,
+    source_watermark VARCHAR(32) NOT NULL,
+    scanned_at DATETIME(6) NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+CGM_ALERT_STATE_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_alert_state (
+    user_id VARCHAR(50) PRIMARY KEY,
+    last_ts BIGINT,
+    last_glucose DOUBLE,
+    rate DOUBLE,
+    low_active TINYINT(1) NOT NULL DEFAULT 0,
+    predicted_active TINYINT(1) NOT NULL DEFAULT 0,
+    high_start BIGINT,
+    high_fired TINYINT(1) NOT NULL DEFAULT 0,
+    updated_at DATETIME(6) NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+CGM_ALERT_OUTBOX_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_alert_outbox (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    user_id VARCHAR(50) NOT NULL,
+    alert_type VARCHAR(20) NOT NULL,
+    ts_epoch BIGINT NOT NULL,
+    glucose_value DOUBLE NOT NULL,
+    value DOUBLE,
+    created_at DATETIME(6) NOT NULL,
+    delivered_at DATETIME(6) NULL,
+    UNIQUE KEY uq_cgm_alert_outbox (user_id, alert_type, ts_epoch),
+    INDEX idx_cgm_alert_outbox_pending (delivered_at, id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
 """
 
@@ -58,6 +183,53 @@ CREATE TABLE IF NOT EXISTS cgm_pattern_actions (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
 """
 
+USER_PATTERNS_TABLE = """
+CREATE TABLE IF NOT EXISTS user_patterns (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id VARCHAR(50) NOT NULL,
+    pattern_type VARCHAR(100) NOT NULL,
+    pattern_name VARCHAR(200) NOT NULL,
+    description TEXT,
+    severity VARCHAR(20),
+    confidence FLOAT,
+    details TEXT,
+    period DATE NOT NULL,
+    first_seen DATETIME(6) NOT NULL,
+    last_seen DATETIME(6) NOT NULL,
+    hit_count INT NOT NULL DEFAULT 1,
+    detected_at DATETIME(6) NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_user_patterns_period (user_id, pattern_type, period),
+    INDEX idx_user_last_seen (user_id, last_seen),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+DAILY_PATTERN_RULES_TABLE = """
+CREATE TABLE IF NOT EXISTS daily_pattern_rules (
+    user_id VARCHAR(50) NOT NULL,
+    service_date DATE NOT NULL,
+    pattern_id VARCHAR(100) NOT NULL,
+    version VARCHAR(20) NOT NULL,
+    confidence FLOAT,
+    metrics JSON NOT NULL,
+    evidence JSON NOT NULL,
+    computed_at DATETIME(6) NOT NULL,
+    PRIMARY KEY (user_id, service_date, pattern_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+DAILY_PATTERN_RULE_RUNS_TABLE = """
+CREATE TABLE IF NOT EXISTS daily_pattern_rule_runs (
+    user_id VARCHAR(50) NOT NULL,
+    service_date DATE NOT NULL,
+    computed_at DATETIME(6) NOT NULL,
+    PRIMARY KEY (user_id, service_date),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
 ACTIVITY_LOGS_TABLE = """
 CREATE TABLE IF NOT EXISTS activity_logs (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -74,6 +246,57 @@ CREATE TABLE IF NOT EXISTS activity_logs (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
 """
 
+MEAL_RESPONSES_TABLE = """
+CREATE TABLE IF NOT EXISTS meal_responses (
+    log_id BIGINT PRIMARY KEY,
+    user_id VARCHAR(50) NOT NULL,
+    meal_timestamp_utc VARCHAR(32) NOT NULL,
+    meal_ts_epoch BIGINT NOT NULL,
+    food_key VARCHAR(255) NOT NULL,
+    baseline_glucose DOUBLE,
+    peak_glucose DOUBLE,
+    peak_ts_epoch BIGINT,
+    rise DOUBLE,
+    time_to_peak_minutes DOUBLE,
+    iauc DOUBLE,
+    return_to_baseline_minutes DOUBLE,
+    reading_count INT NOT NULL,
+    source_version TEXT NOT NULL,
+    computed_at VARCHAR(32) NOT NULL,
+    INDEX idx_meal_responses_user_ts (user_id, meal_ts_epoch),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+FOOD_RESPONSE_INDEX_TABLE = """
+CREATE TABLE IF NOT EXISTS food_response_index (
+    user_id VARCHAR(50) NOT NULL,
+    food_key VARCHAR(255) NOT NULL,
+    title VARCHAR(500) NOT NULL,
+    log_count INT NOT NULL,
+    meal_count INT NOT NULL,
+    mean_rise DOUBLE,
+    median_rise DOUBLE,
+    p90_rise DOUBLE,
+    max_rise DOUBLE,
+    spike_count INT NOT NULL,
+    mean_iauc DOUBLE,
+    last_eaten_utc VARCHAR(32) NOT NULL,
+    updated_at VARCHAR(32) NOT NULL,
+    PRIMARY KEY (user_id, food_key),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+FOOD_RESPONSE_STATE_TABLE = """
+CREATE TABLE IF NOT EXISTS food_response_state (
+    user_id VARCHAR(50) PRIMARY KEY,
+    source_watermark VARCHAR(32) NOT NULL,
+    indexed_at VARCHAR(32) NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
 # ============================================================
 # 3. 对话相关表
 # ============================================================
@@ -309,8 +532,22 @@ ALL_TABLES = [
     # 基础表
     ("users", USERS_TABLE),
     ("cgm_readings", CGM_READINGS_TABLE),
+    ("cgm_rollup_hourly", CGM_ROLLUP_HOURLY_TABLE),
+    ("cgm_rollup_daily", CGM_ROLLUP_DAILY_TABLE),
+    ("cgm_agp_daily", CGM_AGP_DAILY_TABLE),
+    ("cgm_agp_profile", CGM_AGP_PROFILE_TABLE),
+    ("glucose_events", GLUCOSE_EVENTS_TABLE),
+    ("glucose_event_state", GLUCOSE_EVENT_STATE_TABLE),
+    ("cgm_alert_state", CGM_ALERT_STATE_TABLE),
+    ("cgm_alert_outbox", CGM_ALERT_OUTBOX_TABLE),
     ("cgm_pattern_actions", CGM_PATTERN_ACTIONS_TABLE),
+    ("user_patterns", USER_PATTERNS_TABLE),
+    ("daily_pattern_rules", DAILY_PATTERN_RULES_TABLE),
+    ("daily_pattern_rule_runs", DAILY_PATTERN_RULE_RUNS_TABLE),
     ("activity_logs", ACTIVITY_LOGS_TABLE),
+    ("meal_responses", MEAL_RESPONSES_TABLE),
+    ("food_response_index", FOOD_RESPONSE_INDEX_TABLE),
+    ("food_response_state", FOOD_RESPONSE_STATE_TABLE),
 
     # 对话表
     ("conversations", CONVERSATIONS_TABLE),
@@ -8,17 +8,39 @@ from .base import BaseRepository
 from .conversation_repository import ConversationRepository
 from .memory_repository import MemoryRepository
 from .cgm_repository import CGMRepository
+from .cgm_rollup_repository import CGMRollupRepository
 from .user_repository import UserRepository
 from .onboarding_status_repository import OnboardingStatusRepository
 from .todo_repository import TodoRepository
 from .todo_checkin_repository import TodoCheckinRepository
 from .habit_logs_repository import HabitLogsRepository
 
+# 依赖 shared.analytics (NumPy) 的仓库按需导入, 只用其他仓库的服务无需安装 NumPy
+_ANALYTICS_REPOSITORIES = {
+    'CGMAgpRepository': '.cgm_agp_repository',
+    'GlucoseEventRepository': '.glucose_event_repository',
+    'CGMAlertRepository': '.cgm_alert_repository',
+}
+
+
+def __getattr__(name):
+    if name in _ANALYTICS_REPOSITORIES:
+        from importlib import import_module
+        value = getattr(import_module(_ANALYTICS_REPOSITORIES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     'BaseRepository',
     'ConversationRepository',
     'MemoryRepository',
     'CGMRepository',
+    'CGMRollupRepository',
+    'CGMAgpRepository',
+    'GlucoseEventRepository',
+    'CGMAlertRepository',
     'UserRepository',
     'OnboardingStatusRepository',
     'TodoRepository',
@@ -214,6 +214,21 @@ class BaseRepository:
             return query.replace('?', '%s')
         return query
     
+    def _floor_expr(self, column: str, width: int) -> str:
+        """
+        SQL expression flooring an integer column to a multiple of width.
+        
+        Args:
+            column: Integer column (e.g. an epoch-ms timestamp)
+            width: Bucket width in the column's unit
+            
+        Returns:
+            Expression using integer division for the current database
+        """
+        if self.db_type == 'mysql':
+            return f'({column} DIV {width}) * {width}'
+        return f'({column} / {width}) * {width}'
+    
     def execute(self, query: str, params: tuple = ()):
         """
         Execute a query.
@@ -228,6 +243,20 @@ class BaseRepository:
         converted_query = self._convert_query(query)
         return self.cursor.execute(converted_query, params)
     
+    def executemany(self, query: str, seq_of_params: List[tuple]):
+        """
+        Execute a query once per parameter tuple (batched).
+        
+        Args:
+            query: SQL query (can use ? placeholders, will be converted)
+            seq_of_params: Sequence of parameter tuples
+            
+        Returns:
+            Cursor object
+        """
+        converted_query = self._convert_query(query)
+        return self.cursor.executemany(converted_query, seq_of_params)
+    
     def fetchone(self, query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
         """
         Fetch one row as dictionary.
@@ -0,0 +1,133 @@
+"""
+CGM AGP Repository
+
+Serves Ambulatory Glucose Profiles (shared.analytics.agp) from two caches:
+
+- cgm_agp_daily: each UTC day's reading codes, tagged with the day's
+  cgm_rollup_daily.updated_at. Only days whose rollup changed (new or
+  rewritten readings) are re-read from cgm_readings, so moving the window
+  forward by a day reads one day of raw readings.
+- cgm_agp_profile: the finished profile per (user, window end day, window
+  length, bin width), keyed by a fingerprint of the window's rollup days.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from shared.analytics import ReadingSeries
+from shared.analytics.agp import AGP_BIN_MINUTES, AGP_WINDOW_DAYS, agp_codes, agp_profile
+
+from .base import BaseRepository
+from .cgm_rollup_repository import DAY_MS, CGMRollupRepository, _contiguous_runs
+
+
+class CGMAgpRepository(BaseRepository):
+    """Repository for cached AGP day codes and profiles."""
+
+    def _replace_into(self) -> str:
+        return 'REPLACE INTO' if self.db_type == 'mysql' else 'INSERT OR REPLACE INTO'
+
+    def _refresh_days(self, user_id: str, versions: Dict[int, str]) -> Dict[int, np.ndarray]:
+        """Recompute and store the codes of the given days from raw readings."""
+        fresh = {}
+        for start, end in _contiguous_runs(versions, DAY_MS):
+            series = ReadingSeries.from_cursor(self.execute('''
+            SELECT ts_epoch, glucose_value FROM cgm_readings
+            WHERE user_id = ? AND ts_epoch >= ? AND ts_epoch < ?
+            ORDER BY ts_epoch
+            ''', (user_id, start, end)))
+            codes = agp_codes(series)
+            bounds = np.searchsorted(series.ts, np.arange(start, end + DAY_MS, DAY_MS))
+            for i, day in enumerate(range(start, end, DAY_MS)):
+                fresh[day] = codes[bounds[i]:bounds[i + 1]]
+
+        self.executemany(f'''
+        {self._replace_into()} cgm_agp_daily
+        (user_id, bucket_start, source_updated_at, reading_count, codes)
+        VALUES (?, ?, ?, ?, ?)
+        ''', [
+            (user_id, day, versions[day], len(codes), codes.astype(np.int32).tobytes())
+            for day, codes in fresh.items()
+        ])
+        return fresh
+
+    def get_agp(
+        self,
+        user_id: str,
+        end_day_ms: int,
+        window_days: int = AGP_WINDOW_DAYS,
+        bin_minutes: int = AGP_BIN_MINUTES
+    ) -> Dict:
+        """
+        AGP for the window_days UTC days ending with end_day_ms, and commit.
+
+        Args:
+            user_id: User ID
+            end_day_ms: Start of the window's last day (epoch ms, day aligned)
+            window_days: Window length in days
+            bin_minutes: Time-of-day bin width (must divide 24 h)
+
+        Returns:
+            agp_profile() result plus start_day_ms, end_day_ms, window_days,
+            days_with_data and cached (True when served from cgm_agp_profile)
+        """
+        start_day_ms = end_day_ms - (window_days - 1) * DAY_MS
+        versions = {
+            int(row['bucket_start']): str(row['updated_at'])
+            for row in CGMRollupRepository(self.conn).get_daily_rollups(user_id, start_day_ms, end_day_ms)
+        }
+        fingerprint = hashlib.sha1(
+            ';'.join(f'{day}:{version}' for day, version in sorted(versions.items())).encode()
+        ).hexdigest()
+
+        cached = self.fetchone('''
+        SELECT fingerprint, profile FROM cgm_agp_profile
+        WHERE user_id = ? AND end_day = ? AND window_days = ? AND bin_minutes = ?
+        ''', (user_id, end_day_ms, window_days, bin_minutes))
+        if cached and cached['fingerprint'] == fingerprint:
+            result = self._deserialize_json_from_db(cached['profile'])
+            result['cached'] = True
+            return result
+
+        try:
+            stored = {
+                int(row['bucket_start']): row
+                for row in self.fetchall('''
+                SELECT bucket_start, source_updated_at, codes FROM cgm_agp_daily
+                WHERE user_id = ? AND bucket_start >= ? AND bucket_start <= ?
+                ''', (user_id, start_day_ms, end_day_ms))
+            }
+            stale = {
+                day: version for day, version in versions.items()
+                if day not in stored or stored[day]['source_updated_at'] != version
+            }
+            day_codes = self._refresh_days(user_id, stale)
+            for day in versions:
+                if day not in day_codes:
+                    day_codes[day] = np.frombuffer(stored[day]['codes'], dtype=np.int32)
+
+            parts: List[np.ndarray] = [day_codes[day] for day in sorted(day_codes)]
+            result = agp_profile(np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32), bin_minutes)
+            result.update({
+                'start_day_ms': start_day_ms,
+                'end_day_ms': end_day_ms,
+                'window_days': window_days,
+                'days_with_data': len(versions),
+            })
+
+            self.execute(f'''
+            {self._replace_into()} cgm_agp_profile
+            (user_id, end_day, window_days, bin_minutes, fingerprint, profile, computed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (user_id, end_day_ms, window_days, bin_minutes, fingerprint,
+                  self._serialize_json_for_db(result), datetime.now().isoformat()))
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+
+        result['cached'] = False
+        return result
@@ -0,0 +1,128 @@
+"""
+CGM Alert Repository
+
+Evaluates real-time alert rules (shared.analytics.alerts) as readings are
+written and queues fired alerts in cgm_alert_outbox for downstream
+consumers (push notifications, the avatar, caregivers).
+
+evaluate() runs inside the ingest transaction: one state read, the O(1)
+per-reading rule loop and one state write per batch, plus an insert only
+when an alert fires. Consumers poll get_pending() and acknowledge with
+mark_delivered().
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from shared.analytics.alerts import AlertState
+
+from .base import BaseRepository
+
+
+# 早于该时长的读数 (历史导入/回填) 只更新状态, 不产生提醒
+ALERT_MAX_AGE_MS = 60 * 60 * 1000
+
+_STATE_COLUMNS = AlertState.__slots__
+
+
+class CGMAlertRepository(BaseRepository):
+    """Repository for per-user alert state and the alert outbox."""
+
+    def _replace_into(self) -> str:
+        return 'REPLACE INTO' if self.db_type == 'mysql' else 'INSERT OR REPLACE INTO'
+
+    def _insert_ignore(self) -> str:
+        return 'INSERT IGNORE INTO' if self.db_type == 'mysql' else 'INSERT OR IGNORE INTO'
+
+    def get_state(self, user_id: str) -> AlertState:
+        """Stored alert state for a user (fresh state if none)."""
+        row = self.fetchone(
+            f"SELECT {', '.join(_STATE_COLUMNS)} FROM cgm_alert_state WHERE user_id = ?",
+            (user_id,)
+        )
+        if not row:
+            return AlertState()
+        state = AlertState(**row)
+        state.low_active = bool(state.low_active)
+        state.predicted_active = bool(state.predicted_active)
+        state.high_fired = bool(state.high_fired)
+        return state
+
+    def evaluate(
+        self,
+        user_id: str,
+        readings: Iterable[Tuple[int, float]],
+        now_ms: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Run the alert rules over newly written readings (caller commits).
+
+        Args:
+            user_id: User ID
+            readings: (ts_epoch, glucose_value) pairs in any order
+            now_ms: Current time (epoch ms), default now; alerts for
+                readings older than ALERT_MAX_AGE_MS are not queued
+
+        Returns:
+            Alerts queued in the outbox
+        """
+        readings = sorted(readings)
+        if not readings:
+            return []
+
+        state = self.get_state(user_id)
+        alerts = state.ingest(readings)
+
+        values = state.to_dict()
+        self.execute(f'''
+        {self._replace_into()} cgm_alert_state (user_id, {', '.join(_STATE_COLUMNS)}, updated_at)
+        VALUES (?, {', '.join('?' * len(_STATE_COLUMNS))}, ?)
+        ''', (user_id, *(values[name] for name in _STATE_COLUMNS), datetime.now().isoformat()))
+
+        if now_ms is None:
+            now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        alerts = [alert for alert in alerts if alert['ts'] >= now_ms - ALERT_MAX_AGE_MS]
+        if alerts:
+            created_at = datetime.now().isoformat()
+            self.executemany(f'''
+            {self._insert_ignore()} cgm_alert_outbox
+            (user_id, alert_type, ts_epoch, glucose_value, value, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', [
+                (user_id, alert['alert_type'], alert['ts'], alert['glucose'], alert['value'], created_at)
+                for alert in alerts
+            ])
+        return alerts
+
+    def get_pending(self, limit: int = 100, user_id: Optional[str] = None) -> List[Dict]:
+        """
+        Undelivered alerts, oldest first.
+
+        Args:
+            limit: Maximum number of alerts
+            user_id: Only this user's alerts, optional
+        """
+        query = 'SELECT * FROM cgm_alert_outbox WHERE delivered_at IS NULL'
+        params: List = []
+        if user_id:
+            query += ' AND user_id = ?'
+            params.append(user_id)
+        query += ' ORDER BY id LIMIT ?'
+        params.append(limit)
+        return self.fetchall(query, tuple(params))
+
+    def mark_delivered(self, alert_ids: Iterable[int]) -> int:
+        """Acknowledge delivered alerts and commit; returns the number marked."""
+        delivered_at = datetime.now().isoformat()
+        try:
+            self.executemany(
+                'UPDATE cgm_alert_outbox SET delivered_at = ? WHERE id = ? AND delivered_at IS NULL',
+                [(delivered_at, alert_id) for alert_id in alert_ids]
+            )
+            # 未知或已投递的 ID 不计入
+            marked = self.cursor.rowcount
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        return marked
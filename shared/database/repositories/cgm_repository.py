@@ -4,59 +4,469 @@ CGM Repository
 Handles CGM data operations (readings, patterns, actions).
 """
 
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable
+from datetime import datetime, timedelta, timezone
 
 from .base import BaseRepository
+from .cgm_rollup_repository import CGMRollupRepository, HOUR_MS
+
+
+# Rows per executemany() call when bulk-saving readings
+BULK_CHUNK_SIZE = 1000
+
+# Conflict handling on the (user_id, timestamp) unique key
+WRITE_MODES = ('ignore', 'upsert')
+
+# ts_epoch origin (naive UTC, matching stored timestamps)
+EPOCH = datetime(1970, 1, 1)
+
+# Chart bucket widths for get_reading_buckets() (ms, aligned to UTC epoch)
+BUCKET_SIZES = {
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+}
+
+# Percentiles reported per bucket
+BUCKET_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _parse_timestamp_utc(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp into a naive UTC datetime."""
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError("timestamp is required")
+    
+    dt = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def normalize_timestamp_utc(value: str) -> str:
+    """
+    Normalize an ISO 8601 timestamp to the stored cgm_readings format.
+    
+    Offsets (including a 'Z' suffix) are converted to UTC; naive values are
+    taken as UTC already. Sub-second precision is dropped.
+    
+    Args:
+        value: ISO 8601 timestamp string
+        
+    Returns:
+        UTC timestamp as 'YYYY-MM-DDTHH:MM:SS'
+        
+    Raises:
+        ValueError: If the value is empty or not ISO 8601
+    """
+    return _parse_timestamp_utc(value).isoformat(timespec='seconds')
+
+
+def timestamp_to_epoch_ms(value: str) -> int:
+    """
+    Convert an ISO 8601 timestamp to UTC epoch milliseconds (ts_epoch).
+    
+    Uses the same rules as normalize_timestamp_utc(): offsets are converted
+    to UTC and naive values are taken as UTC.
+    
+    Args:
+        value: ISO 8601 timestamp string
+        
+    Returns:
+        Milliseconds since 1970-01-01T00:00:00Z
+        
+    Raises:
+        ValueError: If the value is empty or not ISO 8601
+    """
+    delta = _parse_timestamp_utc(value) - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+
+def epoch_ms_to_datetime(ts_epoch: int) -> datetime:
+    """Convert ts_epoch milliseconds back to a naive UTC datetime."""
+    return EPOCH + timedelta(milliseconds=ts_epoch)
+
+
+def _percentile(sorted_values: List[int], q: float) -> float:
+    """Linear-interpolated percentile of an ascending list (numpy's default method)."""
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
 
 
 class CGMRepository(BaseRepository):
     """Repository for CGM data operations."""
     
+    @staticmethod
+    def _prepare_reading(reading: Dict) -> Optional[tuple]:
+        """
+        Validate one reading for bulk insert.
+        
+        Args:
+            reading: Dict with 'timestamp' (ISO 8601) and 'glucose_value' (mg/dL),
+                optionally 'local_time' (device wall clock) and 'trend' (arrow code)
+            
+        Returns:
+            (timestamp, ts_epoch, glucose_value, local_time, trend) tuple, or
+            None if the reading is invalid
+        """
+        if not isinstance(reading, dict):
+            return None
+        
+        glucose_value = reading.get('glucose_value')
+        if isinstance(glucose_value, bool) or not isinstance(glucose_value, (int, float)):
+            return None
+        if glucose_value <= 0:
+            return None
+        
+        try:
+            timestamp = normalize_timestamp_utc(reading.get('timestamp'))
+        except (TypeError, ValueError):
+            return None
+        
+        local_time = reading.get('local_time')
+        if local_time is not None:
+            try:
+                local_dt = datetime.fromisoformat(str(local_time).strip())
+                local_time = local_dt.replace(tzinfo=None).isoformat(timespec='seconds')
+            except ValueError:
+                local_time = None
+        
+        trend = reading.get('trend')
+        if isinstance(trend, bool) or not isinstance(trend, (int, float)):
+            trend = None
+        else:
+            trend = int(trend)
+        
+        return timestamp, timestamp_to_epoch_ms(timestamp), int(round(glucose_value)), local_time, trend
+    
+    def _insert_query(self, mode: str) -> str:
+        """
+        Build the cgm_readings INSERT for a write mode.
+        
+        Args:
+            mode: 'ignore' keeps the stored row when (user_id, timestamp)
+                already exists; 'upsert' overwrites it with the new values
+            
+        Returns:
+            SQL with ? placeholders (7 params per row)
+        """
+        if mode not in WRITE_MODES:
+            raise ValueError(f"mode must be one of {', '.join(WRITE_MODES)}")
+        
+        query = '''
+        INSERT INTO cgm_readings (
+            user_id, timestamp, ts_epoch, glucose_value, local_time, trend, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        '''
+        
+        if self.db_type == 'mysql':
+            if mode == 'upsert':
+                return query + '''
+        ON DUPLICATE KEY UPDATE
+            glucose_value = VALUES(glucose_value),
+            local_time = COALESCE(VALUES(local_time), local_time),
+            trend = COALESCE(VALUES(trend), trend)
+        '''
+            return query + 'ON DUPLICATE KEY UPDATE id = id'
+        
+        if mode == 'upsert':
+            return query + '''
+        ON CONFLICT(user_id, timestamp) DO UPDATE SET
+            glucose_value = excluded.glucose_value,
+            local_time = COALESCE(excluded.local_time, cgm_readings.local_time),
+            trend = COALESCE(excluded.trend, cgm_readings.trend)
+        '''
+        return query + 'ON CONFLICT(user_id, timestamp) DO NOTHING'
+    
     def save_reading(
         self,
         user_id: str,
         timestamp: str,
         glucose_value: int
     ) -> int:
-        """Save a CGM reading."""
-        self.execute('''
-        INSERT INTO cgm_readings (user_id, timestamp, glucose_value, created_at)
-        VALUES (?, ?, ?, ?)
-        ''', (user_id, timestamp, glucose_value, datetime.now().isoformat()))
-        
-        self.commit()
-        return self.cursor.lastrowid
+        """Save (upsert) a CGM reading and return its row ID."""
+        # 按需导入: 提醒规则依赖 shared.analytics (NumPy), 只读的调用方不需要
+        from .cgm_alert_repository import CGMAlertRepository
+        
+        timestamp = normalize_timestamp_utc(timestamp)
+        ts_epoch = timestamp_to_epoch_ms(timestamp)
+        try:
+            self.execute(self._insert_query('upsert'), (
+                user_id, timestamp, ts_epoch, glucose_value,
+                None, None, datetime.now().isoformat()
+            ))
+            CGMRollupRepository(self.conn).refresh_hours(user_id, [ts_epoch - ts_epoch % HOUR_MS])
+            CGMAlertRepository(self.conn).evaluate(user_id, [(ts_epoch, glucose_value)])
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        
+        row = self.fetchone(
+            'SELECT id FROM cgm_readings WHERE user_id = ? AND timestamp = ?',
+            (user_id, timestamp)
+        )
+        return row['id'] if row else None
+    
+    def save_readings_bulk(
+        self,
+        user_id: str,
+        readings: Iterable[Dict],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        mode: str = 'ignore'
+    ) -> Dict[str, int]:
+        """
+        Save many CGM readings in a single transaction.
+        
+        Readings are written with chunked executemany() calls and committed
+        once at the end, so a device sync costs one commit instead of one
+        per reading. Invalid readings are skipped rather than failing the batch.
+        Hourly/daily rollups for each chunk's hours are refreshed as the chunk
+        is written, and the real-time alert rules run over the whole batch
+        in time order before the commit.
+        
+        Writes are idempotent on (user_id, timestamp): replaying a sync or an
+        import never duplicates points, and no per-reading lookup is needed.
+        
+        Args:
+            user_id: User ID
+            readings: Iterable of dicts with 'timestamp' and 'glucose_value'
+                (optionally 'local_time' and 'trend'); generators are consumed
+                chunk by chunk, only the (ts_epoch, glucose_value) pairs for
+                the alert rules are kept until the end
+            chunk_size: Rows per executemany() call
+            mode: 'ignore' (keep existing rows) or 'upsert' (overwrite them)
+            
+        Returns:
+            {'inserted': new rows, 'duplicates': rows matching an existing
+            (user_id, timestamp), 'skipped': invalid readings}
+        """
+        from .cgm_alert_repository import CGMAlertRepository
+        
+        query = self._insert_query(mode)
+        created_at = datetime.now().isoformat()
+        
+        rollups = CGMRollupRepository(self.conn)
+        written = 0
+        skipped = 0
+        chunk = []
+        points = []
+        
+        def flush():
+            # 写入一块并在同一事务内重算它涉及的小时/天聚合
+            self.executemany(query, chunk)
+            rollups.refresh_hours(user_id, {row[2] - row[2] % HOUR_MS for row in chunk})
+        
+        try:
+            # id 水位线: 写入后统计新增行数 (主键范围扫描, 只覆盖新行)
+            watermark = self.fetchone('SELECT MAX(id) AS max_id FROM cgm_readings')
+            max_id = (watermark or {}).get('max_id') or 0
+            
+            for reading in readings:
+                prepared = self._prepare_reading(reading)
+                if prepared is None:
+                    skipped += 1
+                    continue
+                
+                chunk.append((user_id, *prepared, created_at))
+                points.append((prepared[1], prepared[2]))
+                if len(chunk) >= chunk_size:
+                    flush()
+                    written += len(chunk)
+                    chunk = []
+            
+            if chunk:
+                flush()
+                written += len(chunk)
+            
+            new_rows = self.fetchone(
+                'SELECT COUNT(*) AS inserted FROM cgm_readings WHERE id > ? AND user_id = ?',
+                (max_id, user_id)
+            )
+            inserted = new_rows['inserted'] if new_rows else 0
+            
+            # 实时提醒规则: 每条读数 O(1), 触发的提醒写入发件箱
+            CGMAlertRepository(self.conn).evaluate(user_id, points)
+            
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        
+        return {
+            'inserted': inserted,
+            'duplicates': written - inserted,
+            'skipped': skipped
+        }
     
     def get_readings(
         self,
         user_id: str,
         start_time: Optional[str] = None,
         end_time: Optional[str] = None,
-        limit: int = 1000
+        limit: int = 1000,
+        before_ts: Optional[int] = None,
+        after_ts: Optional[int] = None
     ) -> List[Dict]:
-        """Get CGM readings for a user."""
-        if start_time and end_time:
-            return self.fetchall('''
-            SELECT * FROM cgm_readings
-            WHERE user_id = ? AND timestamp BETWEEN ? AND ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-            ''', (user_id, start_time, end_time, limit))
-        else:
-            return self.fetchall('''
-            SELECT * FROM cgm_readings
-            WHERE user_id = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-            ''', (user_id, limit))
+        """
+        Get CGM readings for a user, newest first, with keyset pagination.
+        
+        Page backwards with before_ts = the oldest ts_epoch of the previous
+        page; fetch newer data (delta sync) with after_ts = the newest
+        ts_epoch the client already holds. Both seek on (user_id, ts_epoch),
+        so deep pages cost the same as the first one.
+        
+        Args:
+            user_id: User ID
+            start_time: Range start (ISO 8601, inclusive), optional
+            end_time: Range end (ISO 8601, inclusive), optional
+            limit: Max rows returned
+            before_ts: Only readings with ts_epoch < before_ts (epoch ms)
+            after_ts: Only readings with ts_epoch > after_ts (epoch ms); the
+                `limit` oldest such readings are returned
+            
+        Returns:
+            Reading dicts ordered by ts_epoch descending
+        """
+        query = 'SELECT * FROM cgm_readings WHERE user_id = ?'
+        params = [user_id]
+        
+        if start_time:
+            query += ' AND ts_epoch >= ?'
+            params.append(timestamp_to_epoch_ms(start_time))
+        if end_time:
+            query += ' AND ts_epoch <= ?'
+            params.append(timestamp_to_epoch_ms(end_time))
+        if before_ts is not None:
+            query += ' AND ts_epoch < ?'
+            params.append(before_ts)
+        if after_ts is not None:
+            query += ' AND ts_epoch > ?'
+            params.append(after_ts)
+        
+        # after_ts 向前翻页: 取紧随游标的最旧 limit 条, 再按降序返回
+        ascending = after_ts is not None
+        query += f" ORDER BY ts_epoch {'ASC' if ascending else 'DESC'} LIMIT ?"
+        params.append(limit)
+        
+        rows = self.fetchall(query, tuple(params))
+        return rows[::-1] if ascending else rows
+    
+    def get_reading_series(
+        self,
+        user_id: str,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        with_trend: bool = False
+    ) -> 'ReadingSeries':
+        """
+        Get readings as a columnar ReadingSeries in ascending time order.
+        
+        Rows go straight from the cursor into NumPy arrays, without building
+        a dict per reading.
+        
+        Args:
+            user_id: User ID
+            start_time: Range start (ISO 8601, inclusive), optional
+            end_time: Range end (ISO 8601, inclusive), optional
+            with_trend: Also load the vendor trend column
+            
+        Returns:
+            ReadingSeries
+        """
+        # 按需导入: shared.analytics 依赖 NumPy, 其余仓储不需要
+        from shared.analytics.series import ReadingSeries
+        
+        columns = 'ts_epoch, glucose_value, trend' if with_trend else 'ts_epoch, glucose_value'
+        query = f'SELECT {columns} FROM cgm_readings WHERE user_id = ?'
+        params = [user_id]
+        if start_time:
+            query += ' AND ts_epoch >= ?'
+            params.append(timestamp_to_epoch_ms(start_time))
+        if end_time:
+            query += ' AND ts_epoch <= ?'
+            params.append(timestamp_to_epoch_ms(end_time))
+        query += ' ORDER BY ts_epoch'
+        
+        return ReadingSeries.from_cursor(self.execute(query, tuple(params)))
+    
+    def get_reading_buckets(
+        self,
+        user_id: str,
+        start_time: str,
+        end_time: str,
+        bucket: str = '1h'
+    ) -> List[Dict]:
+        """
+        Aggregate readings into fixed-width time buckets for charts.
+        
+        SQL assigns each reading to its bucket and sorts by (bucket, value);
+        a single linear pass then derives count/min/max/mean/percentiles.
+        
+        Args:
+            user_id: User ID
+            start_time: Range start (ISO 8601, inclusive)
+            end_time: Range end (ISO 8601, inclusive)
+            bucket: Bucket width, one of BUCKET_SIZES
+            
+        Returns:
+            Buckets with readings, ordered by time: {'bucket_start', 'ts_epoch',
+            'count', 'min', 'max', 'mean', 'p10', 'p25', 'p50', 'p75', 'p90'}
+            
+        Raises:
+            ValueError: If bucket is unknown or a time is not ISO 8601
+        """
+        if bucket not in BUCKET_SIZES:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKET_SIZES)}")
+        
+        rows = self.fetchall(f'''
+        SELECT {self._floor_expr('ts_epoch', BUCKET_SIZES[bucket])} AS bucket_epoch, glucose_value
+        FROM cgm_readings
+        WHERE user_id = ? AND ts_epoch >= ? AND ts_epoch <= ?
+        ORDER BY bucket_epoch, glucose_value
+        ''', (user_id, timestamp_to_epoch_ms(start_time), timestamp_to_epoch_ms(end_time)))
+        
+        buckets = []
+        
+        def close(bucket_epoch, values):
+            entry = {
+                'bucket_start': epoch_ms_to_datetime(bucket_epoch).isoformat(),
+                'ts_epoch': bucket_epoch,
+                'count': len(values),
+                'min': values[0],
+                'max': values[-1],
+                'mean': sum(values) / len(values),
+            }
+            for q in BUCKET_PERCENTILES:
+                entry[f'p{q}'] = _percentile(values, q)
+            buckets.append(entry)
+        
+        current = None
+        values = []
+        for row in rows:
+            bucket_epoch = int(row['bucket_epoch'])
+            if bucket_epoch != current:
+                if values:
+                    close(current, values)
+                current = bucket_epoch
+                values = []
+            values.append(row['glucose_value'])
+        if values:
+            close(current, values)
+        
+        return buckets
     
     def get_latest_reading(self, user_id: str) -> Optional[Dict]:
         """Get latest CGM reading."""
         return self.fetchone('''
         SELECT * FROM cgm_readings
         WHERE user_id = ?
-        ORDER BY timestamp DESC
+        ORDER BY ts_epoch DESC
         LIMIT 1
         ''', (user_id,))
     
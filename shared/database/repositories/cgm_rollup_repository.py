@@ -0,0 +1,284 @@
+"""
+CGM Rollup Repository
+
+Maintains hourly/daily glucose aggregates (cgm_rollup_hourly / cgm_rollup_daily)
+and answers range statistics from them.
+
+Each bucket stores count, sum, sum of squares, min, max and threshold counts,
+so any range can be answered by combining whole days, whole hours and only
+the partial edge hours from raw cgm_readings. Buckets are recomputed from raw
+data after every write batch, which keeps them exact under upserts.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+
+from .base import BaseRepository
+
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+
+# 开放区间的上界 (按天对齐, 远大于任何真实读数)
+MAX_EPOCH_MS = 10 ** 8 * DAY_MS
+
+# 阈值计数 (mg/dL): TBR <54 / <70, TAR >140 / >180 / >250
+ROLLUP_THRESHOLD_COLUMNS = (
+    ('below_54', '< 54'),
+    ('below_70', '< 70'),
+    ('above_140', '> 140'),
+    ('above_180', '> 180'),
+    ('above_250', '> 250'),
+)
+
+_STAT_COLUMNS = (
+    ['reading_count', 'glucose_sum', 'glucose_sum_sq', 'glucose_min', 'glucose_max']
+    + [name for name, _ in ROLLUP_THRESHOLD_COLUMNS]
+)
+
+# get_range_stats() 返回的键 (与 _STAT_COLUMNS 一一对应)
+STAT_KEYS = ['count', 'sum', 'sum_sq', 'min', 'max'] + [name for name, _ in ROLLUP_THRESHOLD_COLUMNS]
+
+
+def _contiguous_runs(buckets: Iterable[int], width: int) -> List[Tuple[int, int]]:
+    """Merge bucket starts into [start, end) runs of adjacent buckets."""
+    runs = []
+    for bucket in sorted(set(buckets)):
+        if runs and runs[-1][1] == bucket:
+            runs[-1][1] = bucket + width
+        else:
+            runs.append([bucket, bucket + width])
+    return [(start, end) for start, end in runs]
+
+
+class CGMRollupRepository(BaseRepository):
+    """Repository for hourly/daily CGM rollups."""
+
+    def _upsert_clause(self) -> str:
+        """Conflict clause overwriting every aggregate column."""
+        if self.db_type == 'mysql':
+            assignments = ', '.join(f'{c} = VALUES({c})' for c in _STAT_COLUMNS)
+            return f'ON DUPLICATE KEY UPDATE {assignments}, updated_at = VALUES(updated_at)'
+        assignments = ', '.join(f'{c} = excluded.{c}' for c in _STAT_COLUMNS)
+        return f'ON CONFLICT(user_id, bucket_start) DO UPDATE SET {assignments}, updated_at = excluded.updated_at'
+
+    @staticmethod
+    def _raw_aggregates() -> List[str]:
+        """Aggregate expressions over raw cgm_readings (in _STAT_COLUMNS order)."""
+        return [
+            'COUNT(*)',
+            'SUM(glucose_value)',
+            'SUM(glucose_value * glucose_value)',
+            'MIN(glucose_value)',
+            'MAX(glucose_value)',
+        ] + [
+            f'SUM(CASE WHEN glucose_value {cond} THEN 1 ELSE 0 END)'
+            for _, cond in ROLLUP_THRESHOLD_COLUMNS
+        ]
+
+    @staticmethod
+    def _rollup_aggregates() -> List[str]:
+        """Aggregate expressions combining rollup rows (in _STAT_COLUMNS order)."""
+        return [
+            f'MIN({column})' if column == 'glucose_min'
+            else f'MAX({column})' if column == 'glucose_max'
+            else f'SUM({column})'
+            for column in _STAT_COLUMNS
+        ]
+
+    def _rollup_aggregates_as_stats(self) -> List[str]:
+        """Outer aggregates over the union, labelled with STAT_KEYS."""
+        return [
+            f'{expr} AS {key}'
+            for expr, key in zip(self._rollup_aggregates(), STAT_KEYS)
+        ]
+
+    # ============================================================
+    # 维护
+    # ============================================================
+
+    def refresh_hours(self, user_id: str, hour_buckets: Iterable[int]):
+        """
+        Recompute rollups for the given hours and the days containing them.
+
+        Does not commit; callers run this inside their write transaction.
+
+        Args:
+            user_id: User ID
+            hour_buckets: Hour starts (epoch ms, hour aligned) that received writes
+        """
+        hour_buckets = set(hour_buckets)
+        if not hour_buckets:
+            return
+
+        updated_at = datetime.now().isoformat()
+        columns = ', '.join(['user_id', 'bucket_start'] + _STAT_COLUMNS + ['updated_at'])
+
+        hourly_query = f'''
+        INSERT INTO cgm_rollup_hourly ({columns})
+        SELECT user_id, {self._floor_expr('ts_epoch', HOUR_MS)} AS bucket,
+               {', '.join(self._raw_aggregates())}, ?
+        FROM cgm_readings
+        WHERE user_id = ? AND ts_epoch >= ? AND ts_epoch < ?
+        GROUP BY user_id, bucket
+        {self._upsert_clause()}
+        '''
+        for start, end in _contiguous_runs(hour_buckets, HOUR_MS):
+            self.execute(hourly_query, (updated_at, user_id, start, end))
+
+        daily_query = f'''
+        INSERT INTO cgm_rollup_daily ({columns})
+        SELECT user_id, {self._floor_expr('bucket_start', DAY_MS)} AS bucket,
+               {', '.join(self._rollup_aggregates())}, ?
+        FROM cgm_rollup_hourly
+        WHERE user_id = ? AND bucket_start >= ? AND bucket_start < ?
+        GROUP BY user_id, bucket
+        {self._upsert_clause()}
+        '''
+        day_buckets = {bucket - bucket % DAY_MS for bucket in hour_buckets}
+        for start, end in _contiguous_runs(day_buckets, DAY_MS):
+            self.execute(daily_query, (updated_at, user_id, start, end))
+
+    def rebuild(self, user_id: str):
+        """
+        Rebuild all rollups for a user from raw readings and commit.
+
+        Args:
+            user_id: User ID
+        """
+        try:
+            self.execute('DELETE FROM cgm_rollup_hourly WHERE user_id = ?', (user_id,))
+            self.execute('DELETE FROM cgm_rollup_daily WHERE user_id = ?', (user_id,))
+
+            rows = self.fetchall(f'''
+            SELECT DISTINCT {self._floor_expr('ts_epoch', HOUR_MS)} AS bucket
+            FROM cgm_readings
+            WHERE user_id = ?
+            ''', (user_id,))
+            self.refresh_hours(user_id, (int(row['bucket']) for row in rows))
+
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+
+    # ============================================================
+    # 查询
+    # ============================================================
+
+    def get_range_stats(
+        self,
+        user_id: str,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None
+    ) -> Dict:
+        """
+        Aggregate statistics for readings with start_ms <= ts_epoch <= end_ms.
+
+        Whole days come from cgm_rollup_daily, whole hours from
+        cgm_rollup_hourly, and only partial edge hours from raw readings,
+        all combined in a single query.
+
+        Args:
+            user_id: User ID
+            start_ms: Inclusive lower bound (epoch ms), None for no bound
+            end_ms: Inclusive upper bound (epoch ms), None for no bound
+
+        Returns:
+            Dict with count, sum, sum_sq, min, max and the threshold counts
+            (below_54, below_70, above_140, above_180, above_250)
+        """
+        start = 0 if start_ms is None else start_ms
+        end = MAX_EPOCH_MS if end_ms is None else end_ms + 1  # 半开区间
+
+        parts = []
+        params = []
+
+        def add_part(expressions, source, column, lo, hi):
+            if lo < hi:
+                select_list = ', '.join(
+                    f'{expr} AS {name}' for expr, name in zip(expressions, _STAT_COLUMNS)
+                )
+                parts.append(
+                    f'SELECT {select_list} FROM {source} '
+                    f'WHERE user_id = ? AND {column} >= ? AND {column} < ?'
+                )
+                params.extend([user_id, lo, hi])
+
+        def raw(lo, hi):
+            add_part(self._raw_aggregates(), 'cgm_readings', 'ts_epoch', lo, hi)
+
+        def rollup(table, lo, hi):
+            add_part(self._rollup_aggregates(), table, 'bucket_start', lo, hi)
+
+        hour_lo = -(-start // HOUR_MS) * HOUR_MS
+        hour_hi = end // HOUR_MS * HOUR_MS
+
+        if hour_lo >= hour_hi:
+            raw(start, end)
+        else:
+            raw(start, hour_lo)
+            day_lo = -(-hour_lo // DAY_MS) * DAY_MS
+            day_hi = hour_hi // DAY_MS * DAY_MS
+            if day_lo < day_hi:
+                rollup('cgm_rollup_hourly', hour_lo, day_lo)
+                rollup('cgm_rollup_daily', day_lo, day_hi)
+                rollup('cgm_rollup_hourly', day_hi, hour_hi)
+            else:
+                rollup('cgm_rollup_hourly', hour_lo, hour_hi)
+            raw(hour_hi, end)
+
+        row = None
+        if parts:
+            row = self.fetchone(f'''
+            SELECT {', '.join(self._rollup_aggregates_as_stats())}
+            FROM ({' UNION ALL '.join(parts)}) parts
+            ''', tuple(params))
+
+        stats = {key: (row or {}).get(key) for key in STAT_KEYS}
+        for key in STAT_KEYS:
+            if key not in ('min', 'max'):
+                stats[key] = int(stats[key] or 0)
+        return stats
+
+    def get_watermark(self, user_id: str) -> Optional[str]:
+        """
+        Latest rollup refresh time for a user.
+
+        Changes whenever any reading of the user is inserted or overwritten,
+        so it can key caches of derived series.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            updated_at of the most recently refreshed day, or None if no data
+        """
+        row = self.fetchone(
+            'SELECT MAX(updated_at) AS watermark FROM cgm_rollup_daily WHERE user_id = ?',
+            (user_id,)
+        )
+        return row['watermark'] if row else None
+
+    def get_daily_rollups(
+        self,
+        user_id: str,
+        start_day_ms: int,
+        end_day_ms: int
+    ) -> List[Dict]:
+        """
+        Daily rollup rows for UTC days in [start_day_ms, end_day_ms].
+
+        Args:
+            user_id: User ID
+            start_day_ms: First day start (epoch ms, day aligned)
+            end_day_ms: Last day start (epoch ms, day aligned)
+
+        Returns:
+            Rows ordered by bucket_start; days without readings are absent
+        """
+        return self.fetchall('''
+        SELECT * FROM cgm_rollup_daily
+        WHERE user_id = ? AND bucket_start >= ? AND bucket_start <= ?
+        ORDER BY bucket_start
+        ''', (user_id, start_day_ms, end_day_ms))
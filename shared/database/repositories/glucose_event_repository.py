@@ -0,0 +1,153 @@
+"""
+Glucose Event Repository
+
+Persists run-length glucose episodes (shared.analytics.events) in
+glucose_events, keyed by (user_id, start_ts_epoch, event_type), so counting
+the events of any window is an index range count.
+
+Episodes are maintained incrementally: glucose_event_state keeps the
+MAX(cgm_rollup_daily.updated_at) already scanned, and a refresh only
+re-reads readings from the first UTC day whose rollup changed since then,
+backed up far enough to rebuild any episode still running into that day.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from shared.analytics import ReadingSeries
+from shared.analytics.events import EVENT_LOOKBACK_MS, EVENT_TYPES, MAX_GAP_MINUTES, detect_episodes
+
+from .base import BaseRepository
+from .cgm_rollup_repository import CGMRollupRepository
+
+
+MAX_GAP_MS = MAX_GAP_MINUTES * 60 * 1000
+
+
+class GlucoseEventRepository(BaseRepository):
+    """Repository for persisted hypo/hyper episodes."""
+
+    def _replace_into(self) -> str:
+        return 'REPLACE INTO' if self.db_type == 'mysql' else 'INSERT OR REPLACE INTO'
+
+    def _resume_point(self, user_id: str, changed_from: int) -> int:
+        """Earliest reading time a rescan must start from to rebuild episodes touching changed_from."""
+        resume = changed_from - EVENT_LOOKBACK_MS
+        while True:
+            # 跨过重扫起点的已存事件整段重建
+            row = self.fetchone('''
+            SELECT MIN(start_ts_epoch) AS start FROM glucose_events
+            WHERE user_id = ? AND start_ts_epoch < ? AND end_ts_epoch >= ?
+            ''', (user_id, resume, resume - MAX_GAP_MS))
+            if not row or row['start'] is None:
+                return resume
+            resume = int(row['start'])
+
+    def refresh(self, user_id: str) -> bool:
+        """
+        Bring a user's episodes up to date with their readings, and commit.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            True if readings were rescanned, False if already up to date
+        """
+        watermark = CGMRollupRepository(self.conn).get_watermark(user_id)
+        if watermark is None:
+            return False
+        watermark = str(watermark)
+
+        state = self.fetchone(
+            'SELECT source_watermark FROM glucose_event_state WHERE user_id = ?', (user_id,)
+        )
+        if state and state['source_watermark'] == watermark:
+            return False
+
+        changed = None
+        if state:
+            row = self.fetchone('''
+            SELECT MIN(bucket_start) AS changed_from FROM cgm_rollup_daily
+            WHERE user_id = ? AND updated_at > ?
+            ''', (user_id, state['source_watermark']))
+            changed = row['changed_from'] if row else None
+        # 首次扫描 (或无法定位变化日期) 时全量重建
+        resume = self._resume_point(user_id, int(changed)) if changed is not None else 0
+
+        try:
+            series = ReadingSeries.from_cursor(self.execute('''
+            SELECT ts_epoch, glucose_value FROM cgm_readings
+            WHERE user_id = ? AND ts_epoch >= ?
+            ORDER BY ts_epoch
+            ''', (user_id, resume)))
+
+            self.execute(
+                'DELETE FROM glucose_events WHERE user_id = ? AND start_ts_epoch >= ?',
+                (user_id, resume)
+            )
+            self.executemany('''
+            INSERT INTO glucose_events
+            (user_id, start_ts_epoch, event_type, end_ts_epoch, duration_minutes,
+             extreme_glucose, extreme_ts_epoch, reading_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (user_id, e['start_ts'], e['event_type'], e['end_ts'], e['duration_minutes'],
+                 e['extreme_glucose'], e['extreme_ts'], e['reading_count'])
+                for e in detect_episodes(series)
+            ])
+            self.execute(f'''
+            {self._replace_into()} glucose_event_state (user_id, source_watermark, scanned_at)
+            VALUES (?, ?, ?)
+            ''', (user_id, watermark, datetime.now().isoformat()))
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        return True
+
+    def get_events(
+        self,
+        user_id: str,
+        start_ms: int,
+        end_ms: int,
+        event_type: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Episodes starting in [start_ms, end_ms), refreshed first.
+
+        Args:
+            user_id: User ID
+            start_ms: Window start (epoch ms)
+            end_ms: Window end (epoch ms, exclusive)
+            event_type: Only this EVENT_TYPES name, optional
+
+        Returns:
+            glucose_events rows ordered by start_ts_epoch
+        """
+        self.refresh(user_id)
+        query = '''
+        SELECT * FROM glucose_events
+        WHERE user_id = ? AND start_ts_epoch >= ? AND start_ts_epoch < ?
+        '''
+        params = [user_id, start_ms, end_ms]
+        if event_type:
+            query += ' AND event_type = ?'
+            params.append(event_type)
+        return self.fetchall(query + ' ORDER BY start_ts_epoch, event_type', tuple(params))
+
+    def count_events(self, user_id: str, start_ms: int, end_ms: int) -> Dict[str, int]:
+        """
+        Number of episodes of each type starting in [start_ms, end_ms), refreshed first.
+
+        Returns:
+            {event type name: count} for every EVENT_TYPES entry
+        """
+        self.refresh(user_id)
+        counts = {event.name: 0 for event in EVENT_TYPES}
+        for row in self.fetchall('''
+        SELECT event_type, COUNT(*) AS n FROM glucose_events
+        WHERE user_id = ? AND start_ts_epoch >= ? AND start_ts_epoch < ?
+        GROUP BY event_type
+        ''', (user_id, start_ms, end_ms)):
+            counts[row['event_type']] = int(row['n'])
+        return counts
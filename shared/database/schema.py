@@ -30,18 +30,161 @@ CGM_READINGS_TABLE = """
 CREATE TABLE IF NOT EXISTS cgm_readings (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id TEXT NOT NULL,
-    timestamp TEXT NOT NULL,
+    timestamp TEXT NOT NULL,           -- UTC, ISO 8601 (YYYY-MM-DDTHH:MM:SS)
+    ts_epoch INTEGER NOT NULL,         -- UTC epoch 毫秒 (范围查询使用)
     glucose_value INTEGER NOT NULL,
+    local_time TEXT,                   -- 设备本地时间 (vendor localTime)
+    trend INTEGER,                     -- 设备趋势箭头代码 (vendor trend)
     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(user_id)
 )
 """
 
+# 唯一键: 同一用户同一时间点只保留一条读数 (重放同步/导入时幂等)
 CGM_READINGS_INDEX = """
-CREATE INDEX IF NOT EXISTS idx_user_timestamp 
+CREATE UNIQUE INDEX IF NOT EXISTS uq_cgm_readings_user_timestamp
 ON cgm_readings(user_id, timestamp)
 """
 
+# 范围扫描索引: 按整数时间戳过滤/排序, 读路径无需解析时间字符串
+CGM_READINGS_EPOCH_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_cgm_readings_user_epoch
+ON cgm_readings(user_id, ts_epoch)
+"""
+
+# 血糖聚合表: 写入时按小时/天增量维护, 统计查询无需扫描全部原始读数
+CGM_ROLLUP_HOURLY_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_rollup_hourly (
+    user_id TEXT NOT NULL,
+    bucket_start INTEGER NOT NULL,     -- 小时起点 (UTC epoch 毫秒)
+    reading_count INTEGER NOT NULL,
+    glucose_sum INTEGER NOT NULL,
+    glucose_sum_sq INTEGER NOT NULL,
+    glucose_min INTEGER,
+    glucose_max INTEGER,
+    below_54 INTEGER NOT NULL DEFAULT 0,
+    below_70 INTEGER NOT NULL DEFAULT 0,
+    above_140 INTEGER NOT NULL DEFAULT 0,
+    above_180 INTEGER NOT NULL DEFAULT 0,
+    above_250 INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (user_id, bucket_start),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+CGM_ROLLUP_DAILY_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_rollup_daily (
+    user_id TEXT NOT NULL,
+    bucket_start INTEGER NOT NULL,     -- UTC 日起点 (UTC epoch 毫秒)
+    reading_count INTEGER NOT NULL,
+    glucose_sum INTEGER NOT NULL,
+    glucose_sum_sq INTEGER NOT NULL,
+    glucose_min INTEGER,
+    glucose_max INTEGER,
+    below_54 INTEGER NOT NULL DEFAULT 0,
+    below_70 INTEGER NOT NULL DEFAULT 0,
+    above_140 INTEGER NOT NULL DEFAULT 0,
+    above_180 INTEGER NOT NULL DEFAULT 0,
+    above_250 INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (user_id, bucket_start),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+# AGP 缓存: 每日读数编码 (分钟 * 档位 + 血糖档位) 与按窗口结束日缓存的分位数结果
+# source_updated_at / fingerprint 对应 cgm_rollup_daily.updated_at, 读数变化后自动失效
+CGM_AGP_DAILY_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_agp_daily (
+    user_id TEXT NOT NULL,
+    bucket_start INTEGER NOT NULL,     -- UTC 日起点 (UTC epoch 毫秒)
+    source_updated_at TEXT NOT NULL,
+    reading_count INTEGER NOT NULL,
+    codes BLOB NOT NULL,               -- int32 数组
+    PRIMARY KEY (user_id, bucket_start),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+CGM_AGP_PROFILE_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_agp_profile (
+    user_id TEXT NOT NULL,
+    end_day INTEGER NOT NULL,          -- 窗口最后一天起点 (UTC epoch 毫秒)
+    window_days INTEGER NOT NULL,
+    bin_minutes INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    profile TEXT NOT NULL,             -- JSON
+    computed_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, end_day, window_days, bin_minutes),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+# 血糖事件 (run-length 检测的持续低/高血糖): 主键前缀 (user_id, start_ts_epoch) 即窗口计数索引
+# 状态表记录已扫描到的 cgm_rollup_daily.updated_at 水位, 只重扫之后变化的日期
+GLUCOSE_EVENTS_TABLE = """
+CREATE TABLE IF NOT EXISTS glucose_events (
+    user_id TEXT NOT NULL,
+    start_ts_epoch INTEGER NOT NULL,   -- 首个越界读数 (UTC epoch 毫秒)
+    event_type TEXT NOT NULL,          -- hypo / severe_hypo / hyper
+    end_ts_epoch INTEGER NOT NULL,     -- 最后一个越界读数
+    duration_minutes REAL NOT NULL,
+    extreme_glucose REAL NOT NULL,     -- 低血糖为最低值, 高血糖为最高值
+    extreme_ts_epoch INTEGER NOT NULL,
+    reading_count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, start_ts_epoch, event_type),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+GLUCOSE_EVENT_STATE_TABLE = """
+CREATE TABLE IF NOT EXISTS glucose_event_state (
+    user_id TEXT PRIMARY KEY,
+    source_watermark TEXT NOT NULL,    -- 已扫描的 MAX(cgm_rollup_daily.updated_at)
+    scanned_at TEXT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+# 实时提醒: 每用户一行的规则状态 (写入读数时 O(1) 更新) 与待下游消费的提醒发件箱
+# (user_id, alert_type, ts_epoch) 唯一, 重放同步不会重复提醒
+CGM_ALERT_STATE_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_alert_state (
+    user_id TEXT PRIMARY KEY,
+    last_ts INTEGER,                   -- 最后评估的读数 (UTC epoch 毫秒)
+    last_glucose REAL,
+    rate REAL,                         -- 平滑后的变化速率 (mg/dL/分钟)
+    low_active INTEGER NOT NULL DEFAULT 0,
+    predicted_active INTEGER NOT NULL DEFAULT 0,
+    high_start INTEGER,                -- 当前高血糖段起点 (UTC epoch 毫秒)
+    high_fired INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+CGM_ALERT_OUTBOX_TABLE = """
+CREATE TABLE IF NOT EXISTS cgm_alert_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    alert_type TEXT NOT NULL,          -- urgent_low / predicted_low / sustained_high
+    ts_epoch INTEGER NOT NULL,         -- 触发提醒的读数 (UTC epoch 毫秒)
+    glucose_value REAL NOT NULL,
+    value REAL,                        -- predicted_low: 预测血糖; sustained_high: 已持续分钟数
+    created_at TEXT NOT NULL,
+    delivered_at TEXT,                 -- 下游消费后写入
+    UNIQUE (user_id, alert_type, ts_epoch),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+# 待投递扫描: delivered_at IS NULL 按 id 顺序
+CGM_ALERT_OUTBOX_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_cgm_alert_outbox_pending
+ON cgm_alert_outbox(delivered_at, id)
+"""
+
 CGM_PATTERN_ACTIONS_TABLE = """
 CREATE TABLE IF NOT EXISTS cgm_pattern_actions (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -55,6 +198,59 @@ CREATE TABLE IF NOT EXISTS cgm_pattern_actions (
 )
 """
 
+# 模式识别结果: 每个 (用户, 模式, 周期) 一行, 重复检测只更新 last_seen / hit_count
+USER_PATTERNS_TABLE = """
+CREATE TABLE IF NOT EXISTS user_patterns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    pattern_type TEXT NOT NULL,
+    pattern_name TEXT NOT NULL,
+    description TEXT,
+    severity TEXT,
+    confidence REAL,
+    details TEXT,
+    period TEXT NOT NULL,              -- 检测日期 YYYY-MM-DD
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    hit_count INTEGER NOT NULL DEFAULT 1,
+    detected_at TEXT NOT NULL,         -- 同 last_seen (兼容旧查询)
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, pattern_type, period),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+USER_PATTERNS_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_user_patterns_user_seen
+ON user_patterns(user_id, last_seen)
+"""
+
+# 每日模式规则 (rules.json 格式): 每个 (用户, 服务日, 规则) 一行, 只保存触发的规则
+DAILY_PATTERN_RULES_TABLE = """
+CREATE TABLE IF NOT EXISTS daily_pattern_rules (
+    user_id TEXT NOT NULL,
+    service_date TEXT NOT NULL,        -- UTC 日期 YYYY-MM-DD
+    pattern_id TEXT NOT NULL,
+    version TEXT NOT NULL,
+    confidence REAL,
+    metrics TEXT NOT NULL,             -- JSON
+    evidence TEXT NOT NULL,            -- JSON
+    computed_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, service_date, pattern_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+DAILY_PATTERN_RULE_RUNS_TABLE = """
+CREATE TABLE IF NOT EXISTS daily_pattern_rule_runs (
+    user_id TEXT NOT NULL,
+    service_date TEXT NOT NULL,        -- 已评估的 UTC 日期 (无论是否有规则命中)
+    computed_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, service_date),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
 ACTIVITY_LOGS_TABLE = """
 CREATE TABLE IF NOT EXISTS activity_logs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -69,6 +265,64 @@ CREATE TABLE IF NOT EXISTS activity_logs (
 )
 """
 
+# 餐后血糖反应: 每条 food 活动日志一行 (log_id 即 activity_logs.id), source_version 变化时重新计算
+MEAL_RESPONSES_TABLE = """
+CREATE TABLE IF NOT EXISTS meal_responses (
+    log_id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    meal_timestamp_utc TEXT NOT NULL,
+    meal_ts_epoch INTEGER NOT NULL,    -- 用餐时间 (UTC epoch 毫秒)
+    food_key TEXT NOT NULL,            -- 归一化的食物名称
+    baseline_glucose REAL,
+    peak_glucose REAL,
+    peak_ts_epoch INTEGER,
+    rise REAL,
+    time_to_peak_minutes REAL,
+    iauc REAL,
+    return_to_baseline_minutes REAL,
+    reading_count INTEGER NOT NULL,
+    source_version TEXT NOT NULL,      -- 覆盖该餐窗口各天的日聚合 updated_at
+    computed_at TEXT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+MEAL_RESPONSES_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_meal_responses_user_ts
+ON meal_responses(user_id, meal_ts_epoch)
+"""
+
+# 食物反应索引: 每用户每种食物一行的 meal_responses 汇总, food_response_state 为其同步水位
+# (水位为日聚合 MAX(updated_at); food 日志变化时删除水位行, 下次查询时增量同步)
+FOOD_RESPONSE_INDEX_TABLE = """
+CREATE TABLE IF NOT EXISTS food_response_index (
+    user_id TEXT NOT NULL,
+    food_key TEXT NOT NULL,
+    title TEXT NOT NULL,               -- 最近一次记录时的原始名称
+    log_count INTEGER NOT NULL,
+    meal_count INTEGER NOT NULL,       -- 有反应指标的餐数
+    mean_rise REAL,
+    median_rise REAL,
+    p90_rise REAL,
+    max_rise REAL,
+    spike_count INTEGER NOT NULL,
+    mean_iauc REAL,
+    last_eaten_utc TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, food_key),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
+FOOD_RESPONSE_STATE_TABLE = """
+CREATE TABLE IF NOT EXISTS food_response_state (
+    user_id TEXT PRIMARY KEY,
+    source_watermark TEXT NOT NULL,
+    indexed_at TEXT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+)
+"""
+
 # ============================================================
 # 3. 对话相关表
 # ============================================================
@@ -265,8 +519,22 @@ ALL_TABLES = [
     # 基础表
     ("users", USERS_TABLE),
     ("cgm_readings", CGM_READINGS_TABLE),
+    ("cgm_rollup_hourly", CGM_ROLLUP_HOURLY_TABLE),
+    ("cgm_rollup_daily", CGM_ROLLUP_DAILY_TABLE),
+    ("cgm_agp_daily", CGM_AGP_DAILY_TABLE),
+    ("cgm_agp_profile", CGM_AGP_PROFILE_TABLE),
+    ("glucose_events", GLUCOSE_EVENTS_TABLE),
+    ("glucose_event_state", GLUCOSE_EVENT_STATE_TABLE),
+    ("cgm_alert_state", CGM_ALERT_STATE_TABLE),
+    ("cgm_alert_outbox", CGM_ALERT_OUTBOX_TABLE),
     ("cgm_pattern_actions", CGM_PATTERN_ACTIONS_TABLE),
+    ("user_patterns", USER_PATTERNS_TABLE),
+    ("daily_pattern_rules", DAILY_PATTERN_RULES_TABLE),
+    ("daily_pattern_rule_runs", DAILY_PATTERN_RULE_RUNS_TABLE),
     ("activity_logs", ACTIVITY_LOGS_TABLE),
+    ("meal_responses", MEAL_RESPONSES_TABLE),
+    ("food_response_index", FOOD_RESPONSE_INDEX_TABLE),
+    ("food_response_state", FOOD_RESPONSE_STATE_TABLE),
     
     # 对话表
     ("conversations", CONVERSATIONS_TABLE),
@@ -280,6 +548,10 @@ ALL_TABLES = [
 
 ALL_INDEXES = [
     CGM_READINGS_INDEX,
+    CGM_READINGS_EPOCH_INDEX,
+    USER_PATTERNS_INDEX,
+    CGM_ALERT_OUTBOX_INDEX,
+    MEAL_RESPONSES_INDEX,
 ] + CONVERSATIONS_INDEXES + USER_MEMORIES_INDEXES + USER_TODOS_INDEXES
 
 
@@ -3,9 +3,11 @@ Pytest Configuration for Database Tests
 """
 
 import pytest
+import random
 import sqlite3
 import sys
 import os
+from datetime import datetime, timedelta
 
 # Add project root to path
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -34,6 +36,37 @@ def sample_user_id():
     return "test_user_001"
 
 
+@pytest.fixture
+def cgm_user(db_conn, sample_user_id):
+    """Insert the sample user so cgm_readings foreign keys resolve."""
+    db_conn.execute(
+        "INSERT INTO users (user_id, name) VALUES (?, ?)",
+        (sample_user_id, "Test User")
+    )
+    db_conn.commit()
+    return sample_user_id
+
+
+@pytest.fixture
+def make_readings():
+    """Build save_readings_bulk input: one reading every 5 minutes from start."""
+    def build(values, start=datetime(2025, 1, 1)):
+        return [
+            {"timestamp": (start + timedelta(minutes=5 * i)).isoformat(), "glucose_value": value}
+            for i, value in enumerate(values)
+        ]
+    return build
+
+
+@pytest.fixture
+def random_readings(make_readings):
+    """Build count 5-minute readings with seeded random values from 40 to 300."""
+    def build(count, start=datetime(2025, 1, 1), seed=7):
+        rng = random.Random(seed)
+        return make_readings([rng.randint(40, 300) for _ in range(count)], start)
+    return build
+
+
 @pytest.fixture
 def sample_conversation_data():
     """Sample conversation data for testing."""
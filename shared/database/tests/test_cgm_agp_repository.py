@@ -0,0 +1,71 @@
+"""
+Tests for CGMAgpRepository
+"""
+
+from datetime import datetime, timedelta
+from shared.analytics import ReadingSeries, series_agp
+from shared.database.repositories import CGMAgpRepository, CGMRepository
+
+DAY_START = 1735689600000  # 2025-01-01T00:00:00Z
+DAY_MS = 86400000
+START = datetime(2025, 1, 1, 0, 2, 30)
+
+
+def _direct(db_conn, user_id, start_ms, end_ms):
+    """AGP computed straight from raw readings."""
+    series = ReadingSeries.from_cursor(db_conn.execute(
+        "SELECT ts_epoch, glucose_value FROM cgm_readings "
+        "WHERE user_id = ? AND ts_epoch >= ? AND ts_epoch < ? ORDER BY ts_epoch",
+        (user_id, start_ms, end_ms)
+    ))
+    return series_agp(series)["profile"]
+
+
+def _daily_rows(db_conn):
+    return {
+        row[0]: row[1:] for row in db_conn.execute(
+            "SELECT bucket_start, source_updated_at, codes FROM cgm_agp_daily"
+        )
+    }
+
+
+def test_agp_matches_direct_and_is_cached(db_conn, cgm_user, random_readings):
+    """Test the cached profile equals a direct computation and repeats from cache."""
+    CGMRepository(db_conn).save_readings_bulk(cgm_user, random_readings(5 * 288, START, seed=11))
+    repo = CGMAgpRepository(db_conn)
+
+    end_day = DAY_START + 4 * DAY_MS
+    first = repo.get_agp(cgm_user, end_day, window_days=3)
+    assert first["cached"] is False
+    assert first["days_with_data"] == 3
+    assert first["profile"] == _direct(db_conn, cgm_user, DAY_START + 2 * DAY_MS, end_day + DAY_MS)
+
+    second = repo.get_agp(cgm_user, end_day, window_days=3)
+    assert second["cached"] is True
+    assert second["profile"] == first["profile"]
+
+
+def test_new_day_recomputes_only_that_day(db_conn, cgm_user, random_readings):
+    """Test moving the window forward reuses stored days and a rewrite invalidates."""
+    readings = CGMRepository(db_conn)
+    readings.save_readings_bulk(cgm_user, random_readings(3 * 288, START, seed=11))
+    repo = CGMAgpRepository(db_conn)
+    repo.get_agp(cgm_user, DAY_START + 2 * DAY_MS, window_days=3)
+    before = _daily_rows(db_conn)
+
+    readings.save_readings_bulk(cgm_user, random_readings(288, START + timedelta(days=3), seed=14))
+    agp = repo.get_agp(cgm_user, DAY_START + 3 * DAY_MS, window_days=3)
+    after = _daily_rows(db_conn)
+    assert sorted(after) == [DAY_START + d * DAY_MS for d in range(4)]
+    assert all(after[day] == before[day] for day in before)
+    assert agp["profile"] == _direct(db_conn, cgm_user, DAY_START + DAY_MS, DAY_START + 4 * DAY_MS)
+
+    readings.save_readings_bulk(
+        cgm_user,
+        [{"timestamp": "2025-01-02T08:02:30Z", "glucose_value": 399}],
+        mode="upsert"
+    )
+    agp = repo.get_agp(cgm_user, DAY_START + 3 * DAY_MS, window_days=3)
+    assert agp["cached"] is False
+    assert _daily_rows(db_conn)[DAY_START + DAY_MS] != after[DAY_START + DAY_MS]
+    assert agp["profile"] == _direct(db_conn, cgm_user, DAY_START + DAY_MS, DAY_START + 4 * DAY_MS)
@@ -0,0 +1,90 @@
+"""
+Tests for CGMAlertRepository
+"""
+
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from shared.database.repositories import CGMAlertRepository, CGMRepository
+
+ROOT = Path(__file__).resolve().parents[3]
+
+
+def _recent_start(count):
+    """Start time so that count 5-minute readings end a few minutes ago."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None, second=0, microsecond=0)
+    return now - timedelta(minutes=5 * count)
+
+
+def test_bulk_save_queues_alerts_and_keeps_state(db_conn, cgm_user, make_readings):
+    """Test alerts fire once across sync batches and land in the outbox."""
+    readings = CGMRepository(db_conn)
+    alerts = CGMAlertRepository(db_conn)
+    values = [100, 90, 80, 70, 60, 50, 48, 47]
+    start = _recent_start(len(values))
+
+    readings.save_readings_bulk(cgm_user, make_readings(values[:5], start))
+    assert [a["alert_type"] for a in alerts.get_pending()] == ["predicted_low"]
+
+    # 第二批包含重叠读数, 仍在低血糖中的读数不重复提醒
+    readings.save_readings_bulk(cgm_user, make_readings(values, start))
+    pending = alerts.get_pending(user_id=cgm_user)
+    assert [a["alert_type"] for a in pending] == ["predicted_low", "urgent_low"]
+    assert pending[1]["glucose_value"] == 50
+
+    state = alerts.get_state(cgm_user)
+    assert state.low_active and state.last_glucose == 47
+
+    # 重放同一批不产生新提醒
+    readings.save_readings_bulk(cgm_user, make_readings(values, start), mode="upsert")
+    assert len(alerts.get_pending()) == 2
+
+
+def test_single_reading_save_evaluates(db_conn, cgm_user):
+    """Test save_reading runs the rules for the new point."""
+    start = _recent_start(1)
+    CGMRepository(db_conn).save_reading(cgm_user, start.isoformat(), 45)
+    assert [a["alert_type"] for a in CGMAlertRepository(db_conn).get_pending()] == ["urgent_low"]
+
+
+def test_historical_import_updates_state_without_alerts(db_conn, cgm_user, make_readings):
+    """Test readings older than the age cutoff do not queue alerts."""
+    CGMRepository(db_conn).save_readings_bulk(cgm_user, make_readings([60, 50, 45]))
+    alerts = CGMAlertRepository(db_conn)
+    assert alerts.get_pending() == []
+    assert alerts.get_state(cgm_user).low_active
+
+
+def test_mark_delivered(db_conn, cgm_user, make_readings):
+    """Test delivered alerts leave the pending list."""
+    readings = CGMRepository(db_conn)
+    readings.save_readings_bulk(cgm_user, make_readings([45, 80, 45], _recent_start(3)))
+    alerts = CGMAlertRepository(db_conn)
+    pending = alerts.get_pending()
+    assert len(pending) == 2
+
+    assert alerts.mark_delivered([pending[0]["id"]]) == 1
+    remaining = alerts.get_pending()
+    assert [a["id"] for a in remaining] == [pending[1]["id"]]
+    assert alerts.get_pending(user_id="someone_else") == []
+    # 已投递或不存在的 ID 不计入
+    assert alerts.mark_delivered([pending[0]["id"], pending[1]["id"], 9999]) == 1
+
+
+def test_database_package_imports_without_numpy():
+    """Test shared.database loads when NumPy is missing; only the analytics repositories need it."""
+    script = (
+        "import sys; sys.modules['numpy'] = None\n"
+        "import shared.database\n"
+        "from shared.database.repositories import CGMRepository, UserRepository\n"
+        "try:\n"
+        "    from shared.database.repositories import CGMAlertRepository\n"
+        "except ImportError:\n"
+        "    pass\n"
+        "else:\n"
+        "    raise SystemExit('analytics repository imported without NumPy')\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,64 @@
+"""
+Tests for the vendor CGM export importer
+"""
+
+import json
+import pytest
+from shared.database.cgm_import import iter_raw_readings, VendorCGMImporter
+
+
+RAW_DATA = [
+    {"level": None, "trend": 4, "value": 135.0,
+     "utc": "2025-07-01T18:15:20.000", "localTime": "2025-07-01T11:15:20.000"},
+    {"level": None, "trend": 3, "value": 139.0,
+     "utc": "2025-07-01T18:20:19.000", "localTime": "2025-07-01T11:20:19.000"},
+    {"level": None, "trend": None, "value": None,
+     "utc": "2025-07-01T18:25:19.000", "localTime": "2025-07-01T11:25:19.000"},
+    {"level": None, "trend": 5, "value": 144.0,
+     "utc": "2025-07-01T18:30:19.000Z", "localTime": "2025-07-01T11:30:19.000"},
+]
+
+
+@pytest.fixture
+def export_file(tmp_path):
+    """Write a small vendor export file."""
+    path = tmp_path / "export_reading.json"
+    path.write_text(json.dumps({"code": 200, "data": {"rawData": RAW_DATA}}, indent=2))
+    return str(path)
+
+
+def test_iter_raw_readings_across_chunk_boundaries(export_file):
+    """Test elements split across tiny read chunks are decoded intact."""
+    for read_size in (7, 64, 4096):
+        assert list(iter_raw_readings(export_file, read_size=read_size)) == RAW_DATA
+
+
+def test_iter_raw_readings_without_raw_data(tmp_path):
+    """Test a file without rawData is rejected."""
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps({"code": 500, "data": {}}))
+
+    with pytest.raises(ValueError):
+        list(iter_raw_readings(str(path)))
+
+
+def test_import_file(db_conn, sample_user_id, export_file):
+    """Test importing keeps localTime and trend and normalizes utc."""
+    db_conn.execute("INSERT INTO users (user_id, name) VALUES (?, ?)", (sample_user_id, "Test User"))
+    db_conn.commit()
+
+    importer = VendorCGMImporter(db_conn, batch_size=2, verbose=False)
+    summary = importer.import_file(export_file, sample_user_id)
+
+    assert summary['read'] == 4
+    assert summary['inserted'] == 3
+    assert summary['skipped'] == 1
+
+    rows = db_conn.execute(
+        "SELECT timestamp, glucose_value, local_time, trend FROM cgm_readings ORDER BY timestamp"
+    ).fetchall()
+    assert [tuple(r) for r in rows] == [
+        ("2025-07-01T18:15:20", 135, "2025-07-01T11:15:20", 4),
+        ("2025-07-01T18:20:19", 139, "2025-07-01T11:20:19", 3),
+        ("2025-07-01T18:30:19", 144, "2025-07-01T11:30:19", 5),
+    ]
@@ -0,0 +1,162 @@
+"""
+Tests for CGMRepository
+"""
+
+import pytest
+from datetime import datetime
+from shared.database.repositories import CGMRepository
+
+# make_readings(range(100, ...), START): 08:00 起每 5 分钟一条, 值 100, 101, ...
+START = datetime(2025, 1, 1, 8)
+
+
+def test_save_readings_bulk(db_conn, cgm_user, make_readings):
+    """Test bulk saving readings across several chunks."""
+    repo = CGMRepository(db_conn)
+
+    result = repo.save_readings_bulk(cgm_user, make_readings(range(100, 125), START), chunk_size=10)
+
+    assert result == {"inserted": 25, "duplicates": 0, "skipped": 0}
+    count = db_conn.execute("SELECT COUNT(*) FROM cgm_readings").fetchone()[0]
+    assert count == 25
+
+
+def test_save_readings_bulk_skips_invalid(db_conn, cgm_user, make_readings):
+    """Test invalid readings are skipped instead of failing the batch."""
+    repo = CGMRepository(db_conn)
+
+    readings = make_readings(range(100, 103), START) + [
+        {"timestamp": "not-a-date", "glucose_value": 100},
+        {"timestamp": "2025-01-01T09:00:00", "glucose_value": None},
+        {"glucose_value": 120},
+        "garbage",
+    ]
+    result = repo.save_readings_bulk(cgm_user, readings)
+
+    assert result == {"inserted": 3, "duplicates": 0, "skipped": 4}
+
+
+def test_save_readings_bulk_replay_is_idempotent(db_conn, cgm_user, make_readings):
+    """Test re-ingesting the same batch reports duplicates and writes nothing."""
+    repo = CGMRepository(db_conn)
+    readings = make_readings(range(100, 110), START)
+
+    repo.save_readings_bulk(cgm_user, readings)
+    # 同一时刻的不同写法也视为重复
+    replay = readings + [{"timestamp": "2025-01-01T08:00:00.000Z", "glucose_value": 100}]
+    result = repo.save_readings_bulk(cgm_user, replay)
+
+    assert result == {"inserted": 0, "duplicates": 11, "skipped": 0}
+    count = db_conn.execute("SELECT COUNT(*) FROM cgm_readings").fetchone()[0]
+    assert count == 10
+
+
+def test_save_readings_bulk_upsert_overwrites(db_conn, cgm_user, make_readings):
+    """Test upsert mode replaces the stored value for an existing timestamp."""
+    repo = CGMRepository(db_conn)
+    repo.save_readings_bulk(cgm_user, make_readings(range(100, 103), START))
+
+    corrected = [{"timestamp": "2025-01-01T08:05:00", "glucose_value": 180}]
+    result = repo.save_readings_bulk(cgm_user, corrected, mode="upsert")
+
+    assert result == {"inserted": 0, "duplicates": 1, "skipped": 0}
+    value = db_conn.execute(
+        "SELECT glucose_value FROM cgm_readings WHERE timestamp = ?",
+        ("2025-01-01T08:05:00",)
+    ).fetchone()[0]
+    assert value == 180
+
+
+def test_save_readings_bulk_rolls_back_on_error(db_conn, sample_user_id, make_readings):
+    """Test a failing chunk leaves no partial writes behind."""
+    repo = CGMRepository(db_conn)
+
+    # No users row -> foreign key violation
+    with pytest.raises(Exception):
+        repo.save_readings_bulk(sample_user_id, make_readings(range(100, 105), START))
+
+    count = db_conn.execute("SELECT COUNT(*) FROM cgm_readings").fetchone()[0]
+    assert count == 0
+
+
+def test_save_readings_bulk_sets_ts_epoch(db_conn, cgm_user):
+    """Test ts_epoch is UTC milliseconds for offset, Z and naive inputs."""
+    repo = CGMRepository(db_conn)
+    repo.save_readings_bulk(cgm_user, [
+        {"timestamp": "2025-01-01T09:00:00+01:00", "glucose_value": 100},
+        {"timestamp": "2025-01-01T08:05:00.250Z", "glucose_value": 110},
+        {"timestamp": "2025-01-01T08:10:00", "glucose_value": 120},
+    ])
+
+    rows = db_conn.execute(
+        "SELECT timestamp, ts_epoch FROM cgm_readings ORDER BY ts_epoch"
+    ).fetchall()
+    assert [tuple(r) for r in rows] == [
+        ("2025-01-01T08:00:00", 1735718400000),
+        ("2025-01-01T08:05:00", 1735718700000),
+        ("2025-01-01T08:10:00", 1735719000000),
+    ]
+
+
+def test_get_readings_range_uses_utc_epoch(db_conn, cgm_user, make_readings):
+    """Test range bounds in any ISO 8601 form select the same readings."""
+    repo = CGMRepository(db_conn)
+    repo.save_readings_bulk(cgm_user, make_readings(range(100, 112), START))
+
+    naive = repo.get_readings(cgm_user, "2025-01-01T08:10:00", "2025-01-01T08:30:00")
+    offset = repo.get_readings(cgm_user, "2025-01-01T16:10:00+08:00", "2025-01-01T08:30:00Z")
+
+    assert [r["timestamp"] for r in naive] == [r["timestamp"] for r in offset]
+    assert len(naive) == 5
+    assert naive[0]["timestamp"] == "2025-01-01T08:30:00"
+
+
+
+def test_get_readings_keyset_pagination(db_conn, cgm_user, make_readings):
+    """Test before_ts pages walk history and after_ts returns only newer rows."""
+    repo = CGMRepository(db_conn)
+    repo.save_readings_bulk(cgm_user, make_readings(range(100, 110), START))
+
+    pages, cursor = [], None
+    while True:
+        page = repo.get_readings(cgm_user, limit=4, before_ts=cursor)
+        if not page:
+            break
+        pages.append([r["glucose_value"] for r in page])
+        cursor = page[-1]["ts_epoch"]
+    assert pages == [[109, 108, 107, 106], [105, 104, 103, 102], [101, 100]]
+
+    held = repo.get_readings(cgm_user, limit=3)[-1]["ts_epoch"]  # 客户端持有到 107
+    newer = repo.get_readings(cgm_user, limit=1, after_ts=held)
+    assert [r["glucose_value"] for r in newer] == [108]
+    newer = repo.get_readings(cgm_user, limit=10, after_ts=held)
+    assert [r["glucose_value"] for r in newer] == [109, 108]
+
+
+def test_get_reading_series(db_conn, cgm_user, make_readings):
+    """Test readings load as ascending columns limited to the range."""
+    repo = CGMRepository(db_conn)
+    repo.save_readings_bulk(cgm_user, make_readings(range(100, 112), START))
+
+    series = repo.get_reading_series(cgm_user, "2025-01-01T08:10:00Z", "2025-01-01T08:30:00Z")
+
+    assert list(series.glucose) == [102, 103, 104, 105, 106]
+    assert series.ts[0] == 1735719000000  # 2025-01-01T08:10:00Z
+    assert series.trend is None
+
+def test_get_reading_buckets(db_conn, cgm_user, make_readings):
+    """Test readings are grouped into UTC-aligned buckets with percentiles."""
+    repo = CGMRepository(db_conn)
+    repo.save_readings_bulk(cgm_user, make_readings(range(100, 124), START))  # 08:00 - 09:55
+
+    buckets = repo.get_reading_buckets(
+        cgm_user, "2025-01-01T08:00:00Z", "2025-01-01T09:59:59Z", bucket="1h"
+    )
+
+    assert [b["bucket_start"] for b in buckets] == ["2025-01-01T08:00:00", "2025-01-01T09:00:00"]
+    first = buckets[0]
+    assert (first["count"], first["min"], first["max"], first["mean"]) == (12, 100, 111, 105.5)
+    assert (first["p10"], first["p50"], first["p90"]) == pytest.approx((101.1, 105.5, 109.9))
+
+    with pytest.raises(ValueError):
+        repo.get_reading_buckets(cgm_user, "2025-01-01", "2025-01-02", bucket="7m")
@@ -0,0 +1,96 @@
+"""
+Tests for CGMRollupRepository
+"""
+
+from datetime import datetime
+from shared.database.repositories import CGMRepository, CGMRollupRepository
+
+# 读数不落在整点上
+START = datetime(2025, 1, 1, 0, 2, 30)
+
+
+def _raw_stats(db_conn, user_id, start_ms, end_ms):
+    """Brute-force the same statistics from raw readings."""
+    values = [
+        row[0] for row in db_conn.execute(
+            "SELECT glucose_value FROM cgm_readings "
+            "WHERE user_id = ? AND ts_epoch >= ? AND ts_epoch <= ?",
+            (user_id, start_ms, end_ms)
+        )
+    ]
+    return {
+        "count": len(values),
+        "sum": sum(values),
+        "sum_sq": sum(v * v for v in values),
+        "min": min(values) if values else None,
+        "max": max(values) if values else None,
+        "below_54": sum(v < 54 for v in values),
+        "below_70": sum(v < 70 for v in values),
+        "above_140": sum(v > 140 for v in values),
+        "above_180": sum(v > 180 for v in values),
+        "above_250": sum(v > 250 for v in values),
+    }
+
+
+def test_range_stats_match_raw_scan(db_conn, cgm_user, random_readings):
+    """Test rollup-combined stats equal a raw scan for arbitrary ranges."""
+    CGMRepository(db_conn).save_readings_bulk(cgm_user, random_readings(4 * 288, START))
+    rollups = CGMRollupRepository(db_conn)
+
+    day_start = 1735689600000  # 2025-01-01T00:00:00Z
+    ranges = [
+        (None, None),
+        (day_start, day_start + 86400000 - 1),
+        (day_start + 1234567, day_start + 3 * 86400000 + 7654321),
+        (day_start + 600000, day_start + 1800000),
+        (day_start + 3600000, day_start + 2 * 3600000),
+        (day_start + 5 * 86400000, day_start + 6 * 86400000),
+    ]
+    for start_ms, end_ms in ranges:
+        expected = _raw_stats(db_conn, cgm_user, start_ms or 0, end_ms or 2 ** 62)
+        assert rollups.get_range_stats(cgm_user, start_ms, end_ms) == expected
+
+
+def test_rollups_follow_upserts(db_conn, cgm_user):
+    """Test overwriting a reading updates its hour and day buckets."""
+    repo = CGMRepository(db_conn)
+    repo.save_readings_bulk(cgm_user, [
+        {"timestamp": "2025-01-01T08:00:00", "glucose_value": 100},
+        {"timestamp": "2025-01-01T08:05:00", "glucose_value": 120},
+    ])
+    repo.save_readings_bulk(
+        cgm_user,
+        [{"timestamp": "2025-01-01T08:05:00Z", "glucose_value": 200}],
+        mode="upsert"
+    )
+
+    for table in ("cgm_rollup_hourly", "cgm_rollup_daily"):
+        row = db_conn.execute(
+            f"SELECT reading_count, glucose_sum, glucose_max, above_180 FROM {table}"
+        ).fetchone()
+        assert tuple(row) == (2, 300, 200, 1)
+
+
+def test_rollups_cover_hours_split_across_chunks(db_conn, cgm_user, make_readings):
+    """Test a generator written in small chunks leaves the same rollups as one batch."""
+    readings = make_readings(range(100, 125), datetime(2025, 1, 1, 8))
+    CGMRepository(db_conn).save_readings_bulk(cgm_user, (r for r in readings), chunk_size=7)
+
+    hours = db_conn.execute(
+        "SELECT reading_count, glucose_sum FROM cgm_rollup_hourly ORDER BY bucket_start"
+    ).fetchall()
+    assert [tuple(row) for row in hours] == [(12, sum(range(100, 112))), (12, sum(range(112, 124))), (1, 124)]
+    day = db_conn.execute("SELECT reading_count, glucose_sum FROM cgm_rollup_daily").fetchone()
+    assert tuple(day) == (25, sum(range(100, 125)))
+
+
+def test_get_daily_rollups(db_conn, cgm_user, random_readings):
+    """Test daily rows cover only the requested UTC days."""
+    CGMRepository(db_conn).save_readings_bulk(cgm_user, random_readings(3 * 288, START))
+    rollups = CGMRollupRepository(db_conn)
+
+    day_start = 1735689600000  # 2025-01-01T00:00:00Z
+    rows = rollups.get_daily_rollups(cgm_user, day_start + 86400000, day_start + 5 * 86400000)
+
+    assert [row["bucket_start"] for row in rows] == [day_start + 86400000, day_start + 2 * 86400000]
+    assert all(row["reading_count"] == 288 for row in rows)
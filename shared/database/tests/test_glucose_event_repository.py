@@ -0,0 +1,82 @@
+"""
+Tests for GlucoseEventRepository
+"""
+
+import math
+from datetime import datetime, timedelta
+from shared.analytics import ReadingSeries, detect_episodes
+from shared.database.repositories import CGMRepository, GlucoseEventRepository
+
+DAY_START = 1735689600000  # 2025-01-01T00:00:00Z
+DAY_MS = 86400000
+
+
+def _swing(first_day, days):
+    """5-minute values swinging between ~30 and ~250 mg/dL every 10 hours."""
+    return [
+        round(140 + 110 * math.sin(i / 120 * 2 * math.pi))
+        for i in range(first_day * 288, (first_day + days) * 288)
+    ]
+
+
+def _stored(db_conn):
+    return [
+        (row["event_type"], row["start_ts_epoch"], row["end_ts_epoch"], row["extreme_glucose"])
+        for row in db_conn.execute("SELECT * FROM glucose_events ORDER BY start_ts_epoch, event_type")
+    ]
+
+
+def _direct(db_conn, user_id):
+    """Episodes detected over all of the user's readings at once."""
+    series = ReadingSeries.from_cursor(db_conn.execute(
+        "SELECT ts_epoch, glucose_value FROM cgm_readings WHERE user_id = ? ORDER BY ts_epoch",
+        (user_id,)
+    ))
+    return [
+        (e["event_type"], e["start_ts"], e["end_ts"], e["extreme_glucose"])
+        for e in detect_episodes(series)
+    ]
+
+
+def test_incremental_refresh_matches_full_scan(db_conn, cgm_user, make_readings):
+    """Test appended and rewritten readings leave the same events as a full rebuild."""
+    readings = CGMRepository(db_conn)
+    readings.save_readings_bulk(cgm_user, make_readings(_swing(0, 2)))
+    repo = GlucoseEventRepository(db_conn)
+
+    assert repo.refresh(cgm_user) is True
+    assert repo.refresh(cgm_user) is False
+    assert _stored(db_conn) == _direct(db_conn, cgm_user)
+    first_day = [e for e in _stored(db_conn) if e[1] < DAY_START + DAY_MS]
+
+    # 跨午夜仍在持续的事件随新一天的数据延长, 而不是重复插入
+    readings.save_readings_bulk(cgm_user, make_readings(_swing(2, 1), datetime(2025, 1, 3)))
+    assert repo.refresh(cgm_user) is True
+    assert _stored(db_conn) == _direct(db_conn, cgm_user)
+    assert [e for e in _stored(db_conn) if e[1] < DAY_START + DAY_MS] == first_day
+
+    # 改写旧读数把一个低血糖事件拆开
+    low = min(_stored(db_conn), key=lambda e: e[3])
+    middle = datetime(2025, 1, 1) + timedelta(milliseconds=(low[1] + low[2]) // 2 - DAY_START)
+    readings.save_readings_bulk(
+        cgm_user,
+        [{"timestamp": (middle - timedelta(minutes=5 * k)).isoformat(), "glucose_value": 100} for k in range(2)],
+        mode="upsert"
+    )
+    assert repo.refresh(cgm_user) is True
+    assert _stored(db_conn) == _direct(db_conn, cgm_user)
+
+
+def test_counts_are_range_counts(db_conn, cgm_user, make_readings):
+    """Test per-type counts for a window match the stored events."""
+    CGMRepository(db_conn).save_readings_bulk(cgm_user, make_readings(_swing(0, 3)))
+    repo = GlucoseEventRepository(db_conn)
+
+    start, end = DAY_START + DAY_MS, DAY_START + 2 * DAY_MS
+    events = repo.get_events(cgm_user, start, end)
+    counts = repo.count_events(cgm_user, start, end)
+    assert sum(counts.values()) == len(events) > 0
+    assert counts["hyper"] == sum(e["event_type"] == "hyper" for e in events)
+    assert set(counts) == {"hypo", "severe_hypo", "hyper"}
+    assert [e["event_type"] for e in repo.get_events(cgm_user, start, end, "severe_hypo")] == \
+        ["severe_hypo"] * counts["severe_hypo"]